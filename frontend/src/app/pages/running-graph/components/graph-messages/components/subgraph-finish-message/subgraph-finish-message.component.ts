@@ -1,6 +1,13 @@
 import { Component, Input, ViewEncapsulation } from '@angular/core';
 import { CommonModule } from '@angular/common';
-import { GraphMessage, MessageType, FinishSubflowMessageData } from '../../../../models/graph-session-message.model';
+import {
+  GraphMessage,
+  MessageType,
+  StateHistoryDelta,
+  StateHistoryItem,
+  FinishSubflowMessageData,
+} from '../../../../models/graph-session-message.model';
+import { reconstructStateHistory } from '../../../../utils/state-history.util';
 import { NgxJsonViewerModule } from 'ngx-json-viewer';
 import { expandCollapseAnimation } from '../../../../../../shared/animations/animations-expand-collapse';
 
@@ -356,6 +363,8 @@ export class SubgraphFinishMessageComponent {
   isOutputExpanded = true;
   isVariablesExpanded = false;
   isStateHistoryExpanded = true;
+  private stateHistoryDeltas?: StateHistoryDelta[];
+  private stateHistory: StateHistoryItem[] = [];
 
   toggleMessage(): void {
     this.isMessageExpanded = !this.isMessageExpanded;
@@ -417,14 +426,19 @@ export class SubgraphFinishMessageComponent {
     return {};
   }
 
-  getStateHistory() {
+  getStateHistory(): StateHistoryItem[] {
     if (!this.message.message_data) return [];
 
     if (
       this.message.message_data.message_type === MessageType.SUBGRAPH_FINISH &&
       'state' in this.message.message_data
     ) {
-      return (this.message.message_data as FinishSubflowMessageData).state?.state_history || [];
+      const deltas = (this.message.message_data as FinishSubflowMessageData).state?.state_history_delta;
+      if (deltas !== this.stateHistoryDeltas) {
+        this.stateHistoryDeltas = deltas;
+        this.stateHistory = deltas ? reconstructStateHistory(deltas) : [];
+      }
+      return this.stateHistory;
     }
 
     return [];
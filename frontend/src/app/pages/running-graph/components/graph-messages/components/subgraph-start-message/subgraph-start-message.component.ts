@@ -1,6 +1,13 @@
 import { Component, Input, ViewEncapsulation } from '@angular/core';
 import { CommonModule } from '@angular/common';
-import { GraphMessage, MessageType, StartSubflowMessageData } from '../../../../models/graph-session-message.model';
+import {
+  GraphMessage,
+  MessageType,
+  StateHistoryDelta,
+  StateHistoryItem,
+  StartSubflowMessageData,
+} from '../../../../models/graph-session-message.model';
+import { reconstructStateHistory } from '../../../../utils/state-history.util';
 import { NgxJsonViewerModule } from 'ngx-json-viewer';
 import { expandCollapseAnimation } from '../../../../../../shared/animations/animations-expand-collapse';
 
@@ -356,6 +363,8 @@ export class SubgraphStartMessageComponent {
   isInputsExpanded = true;
   isVariablesExpanded = true;
   isStateHistoryExpanded = true;
+  private stateHistoryDeltas?: StateHistoryDelta[];
+  private stateHistory: StateHistoryItem[] = [];
 
   toggleMessage(): void {
     if (!this.hasContent()) return;
@@ -422,14 +431,19 @@ export class SubgraphStartMessageComponent {
     return {};
   }
 
-  getStateHistory() {
+  getStateHistory(): StateHistoryItem[] {
     if (!this.message.message_data) return [];
 
     if (
       this.message.message_data.message_type === MessageType.SUBGRAPH_START &&
       'state' in this.message.message_data
     ) {
-      return (this.message.message_data as StartSubflowMessageData).state?.state_history || [];
+      const deltas = (this.message.message_data as StartSubflowMessageData).state?.state_history_delta;
+      if (deltas !== this.stateHistoryDeltas) {
+        this.stateHistoryDeltas = deltas;
+        this.stateHistory = deltas ? reconstructStateHistory(deltas) : [];
+      }
+      return this.stateHistory;
     }
 
     return [];
@@ -145,10 +145,20 @@ export interface StateHistoryItem {
   additional_data: Record<string, any>;
 }
 
+// State history item with variables replaced by the diff against the previous item
+export interface StateHistoryDelta extends Omit<StateHistoryItem, 'variables'> {
+  index: number;
+  variables_diff: {
+    set: Record<string, any>;
+    unset: string[];
+  };
+}
+
 // Subflow state interface
 export interface SubflowState {
   variables: Record<string, any>;
-  state_history: StateHistoryItem[];
+  state_history_delta: StateHistoryDelta[];
+  state_history_length: number;
 }
 
 export interface StartSubflowMessageData {
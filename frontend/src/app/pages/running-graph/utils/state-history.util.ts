@@ -0,0 +1,18 @@
+import { StateHistoryDelta, StateHistoryItem } from '../models/graph-session-message.model';
+
+// Mirrors reconstruct_state_history from crew/services/graph/state_history.py
+export function reconstructStateHistory(deltas: StateHistoryDelta[]): StateHistoryItem[] {
+  const stateHistory: StateHistoryItem[] = [];
+  let variables: Record<string, any> = {};
+
+  [...deltas]
+    .sort((a, b) => a.index - b.index)
+    .forEach(({ index, variables_diff, ...item }) => {
+      variables = { ...variables };
+      variables_diff.unset.forEach((key) => delete variables[key]);
+      Object.assign(variables, variables_diff.set);
+      stateHistory.push({ ...item, variables });
+    });
+
+  return stateHistory;
+}
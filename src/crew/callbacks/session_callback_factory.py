@@ -1,6 +1,4 @@
-import json
 import os
-import time
 from typing import Callable, Optional, Union
 
 import asyncio
@@ -12,6 +10,9 @@ from langgraph.types import StreamWriter
 from loguru import logger
 
 from src.crew.services.graph.events import StopEvent
+from src.crew.services.graph.exceptions import StopSession
+from src.crew.services.graph.session_capacity import SessionSlot
+from src.crew.services.graph.state_history import make_state_history_deltas
 from src.crew.models.graph_models import (
     GraphMessage,
     AgentMessageData,
@@ -19,13 +20,16 @@ from src.crew.models.graph_models import (
     TaskMessageData,
     UpdateSessionStatusMessageData,
 )
-from src.crew.services.redis_service import RedisService, SyncPubsubSubscriber
+from src.crew.services.redis_service import RedisService
 from src.crew.services.knowledge_search_service import KnowledgeSearchService
+from src.crew.services.user_input_listener import UserInputListener
 
 
 SESSION_STATUS_CHANNEL = os.environ.get(
     "SESSION_STATUS_CHANNEL", "sessions:session_status"
 )
+# Seconds to wait for user input before the session expires, 0 waits forever
+USER_INPUT_TIMEOUT = float(os.environ.get("USER_INPUT_TIMEOUT", "0")) or None
 
 
 class GraphSessionCallbackFactory:
@@ -80,7 +84,10 @@ class GraphSessionCallbackFactory:
                             "session_id": self.session_id,
                             "status": "end",
                             "status_data": {
-                                "state_history": state_history,
+                                "state_history_delta": make_state_history_deltas(
+                                    state_history
+                                ),
+                                "state_history_length": len(state_history),
                                 "output": last_state["output"],
                             },
                         },
@@ -104,6 +111,7 @@ class CrewCallbackFactory:
         knowledge_search_service: KnowledgeSearchService,
         crewai_output_channel: str,
         stream_writer: Optional[StreamWriter] = None,
+        session_slot: Optional[SessionSlot] = None,
     ):
         self.redis_service = redis_service
         self.crewai_output_channel = crewai_output_channel
@@ -113,6 +121,7 @@ class CrewCallbackFactory:
         self.execution_order = execution_order
         self.stream_writer = stream_writer
         self.knowledge_search_service = knowledge_search_service
+        self.session_slot = session_slot
 
     def get_step_callback(
         self, agent_id: int
@@ -264,15 +273,13 @@ class CrewCallbackFactory:
                 execution_order=self.execution_order,
                 message_data=update_session_status_message_data,
             )
-            crew_callback_receiver = CrewUserCallbackReceiver(
+            user_input_listener = UserInputListener(redis_service=self.redis_service)
+            user_input_request = user_input_listener.register(
+                session_id=self.session_id,
                 crew_id=self.crew_id,
                 node_name=self.node_name,
                 execution_order=self.execution_order,
             )
-            subscriber = SyncPubsubSubscriber(crew_callback_receiver.callback)
-            self.redis_service.subscribe(
-                f"sessions:{self.session_id}:user_input", subscriber
-            )
 
             self.redis_service.update_session_status(
                 session_id=self.session_id,
@@ -284,19 +291,37 @@ class CrewCallbackFactory:
             if self.stream_writer is not None:
                 self.stream_writer(graph_message)
 
+            # Waiting session does not occupy an active session slot
+            if self.session_slot is not None:
+                self.session_slot.suspend()
+
             logger.info("Waiting for user input...")
-            while True:
-                user_input = crew_callback_receiver.results
-                if user_input is not None:
-                    # TODO: remove logging
-                    logger.success(f"get_wait_for_user_callback, {user_input=}")
-                    self.redis_service.unsubscribe(
-                        f"sessions:{self.session_id}:user_input", subscriber
-                    )
-                    break
+            if stop_event is not None:
+                stop_event.add_callback(user_input_request.cancel)
+            try:
+                user_input_request.wait(timeout=USER_INPUT_TIMEOUT)
+            finally:
+                user_input_listener.unregister(user_input_request)
                 if stop_event is not None:
-                    stop_event.check_stop()
-                time.sleep(0.01)
+                    stop_event.remove_callback(user_input_request.cancel)
+
+            if stop_event is not None:
+                stop_event.check_stop()
+
+            user_input = user_input_request.text
+            if user_input is None:
+                logger.warning(
+                    f"No user input for session {self.session_id} in {USER_INPUT_TIMEOUT}s"
+                )
+                if stop_event is not None:
+                    stop_event.status = "expired"
+                    stop_event.set()
+                raise StopSession(status="expired")
+            # TODO: remove logging
+            logger.success(f"get_wait_for_user_callback, {user_input=}")
+
+            if self.session_slot is not None:
+                self.session_slot.resume()
 
             update_session_status_message_data = UpdateSessionStatusMessageData(
                 crew_id=self.crew_id,
@@ -354,26 +379,3 @@ class CrewCallbackFactory:
                 return user_input
 
         return inner
-
-
-class CrewUserCallbackReceiver:
-    def __init__(self, crew_id: int, node_name: str, execution_order: int):
-        self.crew_id = crew_id
-        self.node_name = node_name
-        self.execution_order = execution_order
-        self._results: Optional[str] = None
-
-    @property
-    def results(self) -> Optional[str]:
-        return self._results
-
-    def callback(self, message: dict) -> None:
-        message_data: dict = json.loads(message["data"])
-        if (
-            message_data.get("crew_id") == self.crew_id
-            and message_data.get("node_name") == self.node_name
-            and message_data.get("execution_order") == self.execution_order
-        ):
-            self._results = message_data.get("text", "<NO USER INPUT>")
-            # TODO: remove logging
-            logger.success(f"CrewUserCallbackReceiver, {self._results=}")
@@ -106,6 +106,11 @@ class BaseAgent(ABC, BaseModel):
         default=None,
         description="Maximum number of requests per minute for the agent execution to be respected.",
     )
+    rpm_controller: Optional[Any] = Field(
+        default=None,
+        exclude=True,
+        description="Controller with check_or_wait and stop_rpm_counter used instead of an in-process RPMController, e.g. one shared between processes.",
+    )
     allow_delegation: bool = Field(
         default=False,
         description="Enable agent to delegate and ask questions among each other.",
@@ -191,7 +196,9 @@ class BaseAgent(ABC, BaseModel):
 
         # Set private attributes
         self._logger = Logger(verbose=self.verbose)
-        if self.max_rpm and not self._rpm_controller:
+        if self.rpm_controller is not None and not self._rpm_controller:
+            self._rpm_controller = self.rpm_controller
+        elif self.max_rpm and not self._rpm_controller:
             self._rpm_controller = RPMController(
                 max_rpm=self.max_rpm, logger=self._logger
             )
@@ -212,7 +219,9 @@ class BaseAgent(ABC, BaseModel):
     def set_private_attrs(self):
         """Set private attributes."""
         self._logger = Logger(verbose=self.verbose)
-        if self.max_rpm and not self._rpm_controller:
+        if self.rpm_controller is not None and not self._rpm_controller:
+            self._rpm_controller = self.rpm_controller
+        elif self.max_rpm and not self._rpm_controller:
             self._rpm_controller = RPMController(
                 max_rpm=self.max_rpm, logger=self._logger
             )
@@ -282,6 +291,7 @@ class BaseAgent(ABC, BaseModel):
             **copied_data,
             llm=existing_llm,
             tools=self.tools,
+            rpm_controller=self.rpm_controller,
         )
 
         return copied_agent
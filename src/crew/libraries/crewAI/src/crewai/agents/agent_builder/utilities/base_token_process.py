@@ -8,6 +8,8 @@ class TokenProcess:
         self.cached_prompt_tokens: int = 0
         self.completion_tokens: int = 0
         self.successful_requests: int = 0
+        self.saved_tokens: int = 0
+        self.cached_responses: int = 0
 
     def sum_prompt_tokens(self, tokens: int) -> None:
         self.prompt_tokens += tokens
@@ -23,6 +25,12 @@ class TokenProcess:
     def sum_successful_requests(self, requests: int) -> None:
         self.successful_requests += requests
 
+    def sum_saved_tokens(self, tokens: int) -> None:
+        self.saved_tokens += tokens
+
+    def sum_cached_responses(self, responses: int) -> None:
+        self.cached_responses += responses
+
     def get_summary(self) -> UsageMetrics:
         return UsageMetrics(
             total_tokens=self.total_tokens,
@@ -30,4 +38,6 @@ class TokenProcess:
             cached_prompt_tokens=self.cached_prompt_tokens,
             completion_tokens=self.completion_tokens,
             successful_requests=self.successful_requests,
+            saved_tokens=self.saved_tokens,
+            cached_responses=self.cached_responses,
         )
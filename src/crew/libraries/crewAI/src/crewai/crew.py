@@ -179,6 +179,11 @@ class Crew(BaseModel):
         default=None,
         description="Maximum number of requests per minute for the crew execution to be respected.",
     )
+    rpm_controller: Optional[Any] = Field(
+        default=None,
+        exclude=True,
+        description="Controller with check_or_wait and stop_rpm_counter used instead of an in-process RPMController, e.g. one shared between processes.",
+    )
     prompt_file: str = Field(
         default=None,
         description="Path to the prompt json file to be used for the crew.",
@@ -243,7 +248,12 @@ class Crew(BaseModel):
         self._logger = Logger(verbose=self.verbose)
         if self.output_log_file:
             self._file_handler = FileHandler(self.output_log_file)
-        self._rpm_controller = RPMController(max_rpm=self.max_rpm, logger=self._logger)
+        if self.rpm_controller is not None:
+            self._rpm_controller = self.rpm_controller
+        else:
+            self._rpm_controller = RPMController(
+                max_rpm=self.max_rpm, logger=self._logger
+            )
         if self.function_calling_llm and not isinstance(self.function_calling_llm, LLM):
             self.function_calling_llm = create_llm(self.function_calling_llm)
 
@@ -1054,6 +1064,7 @@ class Crew(BaseModel):
             **copied_data,
             agents=cloned_agents,
             tasks=cloned_tasks,
+            rpm_controller=self.rpm_controller,
         )
 
         return copied_crew
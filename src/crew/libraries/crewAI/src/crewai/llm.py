@@ -7,7 +7,7 @@ import threading
 import time
 import warnings
 from contextlib import contextmanager
-from typing import Any, Dict, List, Optional, TextIO, Union, cast
+from typing import Any, Callable, Dict, List, Optional, TextIO, Union, cast
 
 from dotenv import load_dotenv
 
@@ -255,6 +255,8 @@ class LLM:
         api_key: Optional[str] = None,
         callbacks: List[Any] = [],
         stop_event: Any = None,
+        token_stream_factory: Optional[Callable[[], Any]] = None,
+        response_cache: Any = None,
         **kwargs,
     ):
         self.model = model
@@ -278,6 +280,10 @@ class LLM:
         self.callbacks = callbacks
         self.context_window_size = 0
         self.stop_event = stop_event
+        # Creates an object with add(text) and close() receiving streamed tokens
+        self.token_stream_factory = token_stream_factory
+        # Object with get(params) and set(params, response, usage) reusing responses
+        self.response_cache = response_cache
         self.extra_params = kwargs
 
         litellm.drop_params = True
@@ -378,23 +384,52 @@ class LLM:
                 if self.stop_event is not None:
                     self.stop_event.check_stop()
 
-                for chunk in litellm.completion(**params):
-                    if self.stop_event is not None:
-                        self.stop_event.check_stop()
-
-                    choice = chunk["choices"][0]
-                    delta = choice.get("delta", {})
-                    # accumulate streamed text
-                    if "content" in delta and delta["content"]:
-                        text_piece = delta["content"]
-                        text_response += text_piece
-                    if "tool_calls" in delta and delta["tool_calls"]:
-                        tool_calls.extend(delta["tool_calls"])
-                    # usage sometimes comes as separate event
-                    if "usage" in chunk and chunk["usage"]:
-                        usage_info = chunk["usage"]
+                token_stream = (
+                    self.token_stream_factory()
+                    if self.token_stream_factory is not None
+                    else None
+                )
+
+                cached = (
+                    self.response_cache.get(params)
+                    if self.response_cache is not None
+                    else None
+                )
+                if cached is not None:
+                    if token_stream is not None:
+                        token_stream.add_cached(cached["response"])
+                        token_stream.close()
+                    for callback in callbacks or []:
+                        if hasattr(callback, "log_cache_hit"):
+                            callback.log_cache_hit(usage=cached["usage"])
+                    return cached["response"]
+
+                try:
+                    for chunk in litellm.completion(**params):
+                        if self.stop_event is not None:
+                            self.stop_event.check_stop()
+
+                        choice = chunk["choices"][0]
+                        delta = choice.get("delta", {})
+                        # accumulate streamed text
+                        if "content" in delta and delta["content"]:
+                            text_piece = delta["content"]
+                            text_response += text_piece
+                            if token_stream is not None:
+                                token_stream.add(text_piece)
+                        if "tool_calls" in delta and delta["tool_calls"]:
+                            tool_calls.extend(delta["tool_calls"])
+                        # usage sometimes comes as separate event
+                        if "usage" in chunk and chunk["usage"]:
+                            usage_info = chunk["usage"]
+                finally:
+                    if token_stream is not None:
+                        token_stream.close()
                 end_time = time.time()
 
+                if self.response_cache is not None and not tool_calls:
+                    self.response_cache.set(params, text_response, usage_info)
+
                 # --- 3) Handle callbacks with usage info
                 if callbacks and len(callbacks) > 0 and usage_info:
                     for callback in callbacks:
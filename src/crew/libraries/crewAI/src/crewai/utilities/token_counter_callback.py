@@ -35,3 +35,11 @@ class TokenCalcHandler(CustomLogger):
                         self.token_cost_process.sum_cached_prompt_tokens(
                             usage.prompt_tokens_details.cached_tokens
                         )
+
+    def log_cache_hit(self, usage: Dict[str, int]) -> None:
+        """Count a response reused from the response cache instead of requested."""
+        if self.token_cost_process is None:
+            return
+
+        self.token_cost_process.sum_cached_responses(1)
+        self.token_cost_process.sum_saved_tokens(usage.get("total_tokens", 0))
@@ -1,10 +1,13 @@
 import asyncio
+import multiprocessing
 import os
 import sys
 
 from services.crew.mcp_tool_factory import CrewaiMcpToolFactory
 from dotenv import load_dotenv, find_dotenv
 from services.graph.graph_session_manager_service import GraphSessionManagerService
+from services.graph.redis_checkpointer import RedisCheckpointSaver
+from services.graph.session_dispatcher import SessionDispatcher
 from services.run_python_code_service import RunPythonCodeService
 from services.crew.crew_parser_service import CrewParserService
 from services.knowledge_search_service import KnowledgeSearchService
@@ -17,23 +20,33 @@ if "--debug" in sys.argv:
 else:
     load_dotenv(find_dotenv(".env"))
 
+redis_host = os.environ.get("REDIS_HOST", "127.0.0.1")
+redis_port = int(os.environ.get("REDIS_PORT", 6379))
+redis_password = os.environ.get("REDIS_PASSWORD")
+session_schema_channel = os.environ.get("SESSION_SCHEMA_CHANNEL", "sessions:schema")
+session_timeout_channel = os.environ.get("SESSION_TIMEOUT_CHANNEL", "sessions:timeout")
+stop_session_channel = os.getenv("STOP_SESSION_CHANNEL", "sessions:stop")
+# Number of processes running sessions, MAX_CONCURRENT_SESSIONS applies to each of them
+CREW_WORKERS = int(os.getenv("CREW_WORKERS", "1"))
 
-async def main():
+
+async def main(worker_id: int | None = None):
     # Load configuration from environment variables
     manager_host = os.environ.get("MANAGER_HOST", "127.0.0.1")
     manager_port = int(os.environ.get("MANAGER_PORT", "8001"))
-    redis_host = os.environ.get("REDIS_HOST", "127.0.0.1")
-    redis_port = int(os.environ.get("REDIS_PORT", 6379))
-    redis_password = os.environ.get("REDIS_PASSWORD")
-    session_schema_channel = os.environ.get("SESSION_SCHEMA_CHANNEL", "sessions:schema")
-    session_timeout_channel = os.environ.get(
-        "SESSION_TIMEOUT_CHANNEL", "sessions:timeout"
-    )
     crewai_output_channel = os.environ.get(
         "CREWAI_OUTPUT_CHANNEL", "sessions:crewai_output"
     )
-    stop_session_channel = os.getenv("STOP_SESSION_CHANNEL", "sessions:stop")
     MAX_CONCURRENT_SESSIONS = int(os.getenv("MAX_CONCURRENT_SESSIONS", "20"))
+    SESSION_CLASS_LIMITS = {
+        "interactive": os.getenv("MAX_INTERACTIVE_SESSIONS"),
+        "webhook": os.getenv("MAX_WEBHOOK_SESSIONS"),
+        "batch": os.getenv("MAX_BATCH_SESSIONS"),
+    }
+    SESSION_CHECKPOINTS_ENABLED = (
+        os.getenv("SESSION_CHECKPOINTS_ENABLED", "true").lower() == "true"
+    )
+    SESSION_CHECKPOINT_TTL = int(os.getenv("SESSION_CHECKPOINT_TTL", "86400"))
     # Initialize services
     redis_service = RedisService(
         host=redis_host, port=redis_port, password=redis_password
@@ -47,6 +60,12 @@ async def main():
         redis_service=redis_service,
         python_code_executor_service=python_code_executor_service,
         mcp_tool_factory=mcp_tool_factory,
+        max_concurrent_sessions=MAX_CONCURRENT_SESSIONS,
+    )
+    checkpointer = (
+        RedisCheckpointSaver(redis_service=redis_service, ttl=SESSION_CHECKPOINT_TTL)
+        if SESSION_CHECKPOINTS_ENABLED
+        else None
     )
     session_manager_service = GraphSessionManagerService(
         redis_service=redis_service,
@@ -59,6 +78,14 @@ async def main():
         # Note:  Used for process human_input
         knowledge_search_service=knowledge_search_service,
         max_concurrent_sessions=MAX_CONCURRENT_SESSIONS,
+        checkpointer=checkpointer,
+        session_class_limits={
+            priority_class: int(limit)
+            for priority_class, limit in SESSION_CLASS_LIMITS.items()
+            if limit
+        },
+        worker_id=worker_id,
+        workers=CREW_WORKERS,
     )
 
     try:
@@ -82,8 +109,68 @@ async def main():
         logger.info("Shutting down...")
 
 
+def run_worker(worker_id: int):
+    logger.info(f"Starting crew worker {worker_id}")
+    try:
+        asyncio.run(main(worker_id=worker_id))
+    except KeyboardInterrupt:
+        pass
+
+
+def start_worker(worker_id: int) -> multiprocessing.Process:
+    process = multiprocessing.get_context("spawn").Process(
+        target=run_worker, args=(worker_id,), name=f"crew-worker-{worker_id}"
+    )
+    process.start()
+    return process
+
+
+async def dispatch():
+    """
+    Run sessions in CREW_WORKERS processes. This process only forwards session
+    messages to the workers and restarts workers that exited.
+    """
+    redis_service = RedisService(
+        host=redis_host, port=redis_port, password=redis_password
+    )
+    dispatcher = SessionDispatcher(
+        redis_service=redis_service,
+        session_schema_channel=session_schema_channel,
+        session_timeout_channel=session_timeout_channel,
+        stop_session_channel=stop_session_channel,
+    )
+    workers = {worker_id: start_worker(worker_id) for worker_id in range(CREW_WORKERS)}
+
+    try:
+        logger.info("Initializing Redis connection...")
+        await redis_service.connect()
+        logger.info("Redis connection established.")
+
+        dispatcher.start()
+        while True:
+            await asyncio.sleep(1)
+            for worker_id, process in workers.items():
+                if not process.is_alive():
+                    logger.warning(
+                        f"Crew worker {worker_id} exited with code {process.exitcode}, restarting"
+                    )
+                    workers[worker_id] = start_worker(worker_id)
+
+    except Exception as e:
+        logger.error(f"An error occurred: {e}", exc_info=True)
+    finally:
+        logger.info("Shutting down workers...")
+        for process in workers.values():
+            process.terminate()
+        for process in workers.values():
+            process.join()
+
+
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if CREW_WORKERS > 1:
+            asyncio.run(dispatch())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Shutting down due to keyboard interrupt.")
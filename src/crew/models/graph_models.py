@@ -60,6 +60,19 @@ class PythonMessageData:
 class LLMMessageData:
     response: str
     message_type: str = "llm"
+    time_to_first_token: float | None = None
+    token_usage: dict | None = None
+
+
+@dataclass
+class LLMChunkMessageData:
+    stream_id: str
+    index: int
+    chunk: str
+    crew_id: int | None = None
+    agent_id: int | None = None
+    time_to_first_token: float | None = None
+    message_type: str = "llm_chunk"
 
 
 @dataclass
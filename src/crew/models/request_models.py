@@ -22,7 +22,9 @@ class LLMConfigData(BaseModel):
     deployment_id: str | None = None
     headers: dict[str, str] | None = None
     extra_headers: dict[str, str] | None = None
-    
+    cache_responses: bool = True
+    cache_ttl: int | None = None
+
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -313,6 +315,10 @@ class SessionData(BaseModel):
     unique_subgraph_list: list[SubGraphData] = []
     initial_state: dict[str, Any] = {}
     output_state: dict[str, Any] = {}
+    # Used by the session scheduler
+    graph_id: int | None = None
+    tenant_id: int | None = None
+    priority_class: str = "interactive"
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -341,6 +347,11 @@ class CodeResultData(BaseModel):
     stderr: str
     stdout: str
     returncode: int = 0
+    # Usage of the execution, only wall_time is set if the interpreter crashed
+    # or timed out
+    peak_rss_kb: int | None = None
+    cpu_time: float | None = None
+    wall_time: float | None = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -357,6 +368,31 @@ class CodeTaskData(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class CodeBatchItemData(BaseModel):
+    execution_id: str
+    code: str
+    entrypoint: str
+    func_kwargs: dict | None = None
+    global_kwargs: dict[str, Any] | None = None
+    # Limits of the task, the sandbox defaults are used if not set
+    timeout: float | None = None
+    max_cpu_seconds: float | None = None
+    max_memory_mb: int | None = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CodeBatchTaskData(BaseModel):
+    # Independent tasks run by the sandbox in one venv, every one is answered
+    # with its own CodeResultData
+    venv_name: str
+    libraries: list[str]
+    batch_id: str
+    tasks: list[CodeBatchItemData]
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class CrewNodeData(BaseModel):
     node_name: str
     crew: CrewData
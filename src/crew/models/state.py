@@ -1,7 +1,11 @@
-from typing import Any, Literal
+from typing import Annotated, Any, Literal
 from typing_extensions import TypedDict
 from dotdict import DotDict
 
+# Always imported by the full path, LangGraph compares reducers by identity and
+# this module is loaded both as `models.state` and `src.crew.models.state`
+from src.crew.models.state_updates import apply_state_update
+
 
 class ReturnCodeError(Exception): ...
 
@@ -16,6 +20,6 @@ class StateHistoryItem(TypedDict):
 
 
 class State(TypedDict):
-    state_history: list["StateHistoryItem"] = []
-    variables: DotDict
-    system_variables: Any
+    state_history: Annotated[list["StateHistoryItem"], apply_state_update]
+    variables: Annotated[DotDict, apply_state_update]
+    system_variables: Annotated[Any, apply_state_update]
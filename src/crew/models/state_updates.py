@@ -0,0 +1,118 @@
+from dataclasses import dataclass, field
+from typing import Any
+
+from dotdict import DotDict
+from loguru import logger
+
+
+_MISSING = object()
+
+
+def _merge_value(base: Any, current: Any, new: Any, path: str) -> Any:
+    """
+    Three-way merge of a value changed by a branch (`new`) into `current`.
+
+    `current` already contains writes of branches applied earlier in the same step.
+    Nested dicts are merged key by key, for other conflicting values the branch
+    applied later wins. Branches are applied in the order of their node names.
+    """
+    if current is base or current == base:
+        return new
+    if new == base:
+        return current
+    if isinstance(current, dict) and isinstance(new, dict):
+        base = base if isinstance(base, dict) else {}
+        merged = {}
+        for key in dict.fromkeys([*current, *new]):
+            value = _merge_value(
+                base.get(key, _MISSING),
+                current.get(key, _MISSING),
+                new.get(key, _MISSING),
+                path=f"{path}.{key}",
+            )
+            if value is not _MISSING:
+                merged[key] = value
+        return merged
+
+    logger.warning(f"Conflicting writes to variables.{path}, last branch wins")
+    return new
+
+
+class StateUpdate:
+    """Partial update of a `State` channel produced by one graph branch."""
+
+    def apply(self, current: Any) -> Any:
+        raise NotImplementedError
+
+
+@dataclass
+class VariablesUpdate(StateUpdate):
+    """
+    Changes one graph branch made to `variables`.
+
+    `previous` holds the values the branch started from for every changed key that
+    existed before, so concurrent branches can be merged three-way.
+    """
+
+    set: dict = field(default_factory=dict)
+    unset: list = field(default_factory=list)
+    previous: dict = field(default_factory=dict)
+
+    def apply(self, current: DotDict | None) -> DotDict:
+        # Merged in place, so properties and setters of the variables are kept.
+        # Branches forked from `current` only share values replaced here.
+        merged = current if current is not None else DotDict()
+
+        for key in self.unset:
+            value = _merge_value(
+                self.previous.get(key, _MISSING),
+                merged.get(key, _MISSING),
+                _MISSING,
+                path=key,
+            )
+            if value is _MISSING:
+                merged.pop(key, None)
+            else:
+                merged[key] = value
+
+        for key, new in self.set.items():
+            merged[key] = _merge_value(
+                self.previous.get(key, _MISSING),
+                merged.get(key, _MISSING),
+                new,
+                path=key,
+            )
+        return merged
+
+
+@dataclass
+class StateHistoryUpdate(StateUpdate):
+    """State history items appended by one graph branch."""
+
+    items: list = field(default_factory=list)
+
+    def apply(self, current: list | None) -> list:
+        return [*(current or []), *self.items]
+
+
+@dataclass
+class SystemVariablesUpdate(StateUpdate):
+    """Changed top-level keys and node entries of `system_variables`."""
+
+    set: dict = field(default_factory=dict)
+    nodes: dict = field(default_factory=dict)
+
+    def apply(self, current: dict | None) -> dict:
+        merged = {**(current or {}), **self.set}
+        merged["nodes"] = {**(current or {}).get("nodes", {}), **self.nodes}
+        return merged
+
+
+def apply_state_update(current: Any, update: Any) -> Any:
+    """
+    Reducer of `State` channels. Updates produced by `make_state_update` are merged
+    into the current value, any other value replaces it.
+    """
+    if isinstance(update, StateUpdate):
+        return update.apply(current)
+    return update
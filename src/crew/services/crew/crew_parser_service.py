@@ -1,14 +1,17 @@
 from typing import Optional
 from typing import Any, Type
+from functools import partial
 import copy
 
 from loguru import logger
 
 from crewai import Agent, Crew, Task
+from crewai.agents.cache import CacheHandler
 from langchain_core.tools import BaseTool
 from langgraph.types import StreamWriter
 
 from src.crew.services.graph.events import StopEvent
+from src.crew.services.graph.token_stream import TokenStream
 from src.crew.utils.parse_llm import parse_llm, parse_memory_llm, parse_memory_embedder
 from src.crew.callbacks.session_callback_factory import CrewCallbackFactory
 from src.crew.services.schema_converter.converter import generate_model_from_schema
@@ -28,6 +31,19 @@ from src.crew.models.request_models import (
 from src.crew.settings import PGVECTOR_MEMORY_CONFIG
 
 from src.crew.services.crew.proxy_tool_factory import ProxyToolFactory
+from src.crew.services.crew.tool_class_data_cache import ToolClassDataCache
+from src.crew.services.llm_response_cache import LLMResponseCache
+from src.crew.services.crew.tool_result_cache import (
+    TOOL_RESULT_CACHE_TTLS,
+    ToolResultCache,
+    ToolResultCacheHandler,
+    tool_fingerprint,
+)
+from src.crew.services.crew.rate_limiter import (
+    RedisRateLimiter,
+    RedisRPMController,
+    llm_rate_limit_key,
+)
 from src.crew.services.crew.mcp_tool_factory import CrewaiMcpToolFactory
 
 
@@ -39,6 +55,7 @@ class CrewParserService(metaclass=SingletonMeta):
         redis_service: RedisService,
         python_code_executor_service: RunPythonCodeService,
         mcp_tool_factory: CrewaiMcpToolFactory,
+        max_concurrent_sessions: int = 20,
     ):
         self.redis_service = redis_service
 
@@ -46,8 +63,13 @@ class CrewParserService(metaclass=SingletonMeta):
             host=manager_host,
             port=manager_port,
             python_code_executor_service=python_code_executor_service,
+            max_concurrent_sessions=max_concurrent_sessions,
+            class_data_cache=ToolClassDataCache(redis_service=redis_service),
         )
         self.mcp_tool_factory = mcp_tool_factory
+        self.rate_limiter = RedisRateLimiter(redis_service=redis_service)
+        self.tool_result_cache = ToolResultCache(redis_service=redis_service)
+        self.llm_response_cache = LLMResponseCache(redis_service=redis_service)
 
     def parse_agent(
         self,
@@ -62,6 +84,7 @@ class CrewParserService(metaclass=SingletonMeta):
         execution_order: int,
         tool_list: list[BaseTool] | None = None,
         stream_writer: Optional[StreamWriter] = None,
+        cache_handler: CacheHandler | None = None,
     ) -> Agent:
         llm = None
         if agent_data.llm is not None:
@@ -71,7 +94,23 @@ class CrewParserService(metaclass=SingletonMeta):
                 )
             except Exception:
                 logger.warning("Cannot log agent temperature")
-            llm = parse_llm(agent_data.llm, stop_event=stop_event)
+            token_stream_factory = None
+            if stream_writer is not None:
+                token_stream_factory = partial(
+                    TokenStream,
+                    session_id=session_id,
+                    node_name=node_name,
+                    execution_order=execution_order,
+                    writer=stream_writer,
+                    crew_id=crew_id,
+                    agent_id=agent_data.id,
+                )
+            llm = parse_llm(
+                agent_data.llm,
+                stop_event=stop_event,
+                token_stream_factory=token_stream_factory,
+                response_cache=self.llm_response_cache.for_llm(agent_data.llm),
+            )
 
         if tool_list is None:
             tool_list = []
@@ -79,7 +118,11 @@ class CrewParserService(metaclass=SingletonMeta):
         function_calling_llm = None
         if agent_data.function_calling_llm is not None:
             function_calling_llm = parse_llm(
-                agent_data.function_calling_llm, stop_event=stop_event
+                agent_data.function_calling_llm,
+                stop_event=stop_event,
+                response_cache=self.llm_response_cache.for_llm(
+                    agent_data.function_calling_llm
+                ),
             )
         rag_search_config = None
         if agent_data.rag_search_config:
@@ -94,6 +137,15 @@ class CrewParserService(metaclass=SingletonMeta):
             execution_order=execution_order,
             stream_writer=stream_writer,
         )
+        rpm_controller = None
+        if agent_data.max_rpm:
+            rpm_controller = RedisRPMController(
+                limiter=self.rate_limiter,
+                key=llm_rate_limit_key(agent_data.llm),
+                max_rpm=agent_data.max_rpm,
+                stop_event=stop_event,
+            )
+
         agent_config = {
             "role": agent_data.role,
             "goal": agent_data.goal,
@@ -104,6 +156,7 @@ class CrewParserService(metaclass=SingletonMeta):
             "memory": agent_data.memory,
             "max_iter": agent_data.max_iter,
             "max_rpm": agent_data.max_rpm,
+            "rpm_controller": rpm_controller,
             "max_execution_time": agent_data.max_execution_time,
             "cache": agent_data.cache,
             "max_retry_limit": agent_data.max_retry_limit,
@@ -118,6 +171,9 @@ class CrewParserService(metaclass=SingletonMeta):
             "stop_event": stop_event,
         }
 
+        if cache_handler is not None:
+            agent_config["cache_handler"] = cache_handler
+
         if not tool_list:
             agent_config["tool_choice"] = "none"
 
@@ -180,6 +236,13 @@ class CrewParserService(metaclass=SingletonMeta):
             "planning_llm": crew_data.planning,
             "stop_event": stop_event,
         }
+        if crew_data.max_rpm:
+            crew_config["rpm_controller"] = RedisRPMController(
+                limiter=self.rate_limiter,
+                key=f"crew:{crew_data.id}",
+                max_rpm=crew_data.max_rpm,
+                stop_event=stop_event,
+            )
 
         if crew_data.memory:
             memory_config = copy.deepcopy(PGVECTOR_MEMORY_CONFIG)
@@ -208,6 +271,7 @@ class CrewParserService(metaclass=SingletonMeta):
             crew_config["memory_config"] = memory_config
 
         tool_map = {}
+        tool_fingerprints = {}
         for base_tool_data in crew_data.tools:
             if isinstance(base_tool_data.data, PythonCodeToolData):
                 tool = self.proxy_tool_factory.create_python_code_proxy_tool(
@@ -229,6 +293,19 @@ class CrewParserService(metaclass=SingletonMeta):
                 )
 
             tool_map[base_tool_data.unique_name] = tool
+            fingerprint = tool_fingerprint(base_tool_data.data)
+            if tool_fingerprints.setdefault(tool.name, fingerprint) != fingerprint:
+                # Results of same-named tools can not be told apart
+                tool_fingerprints[tool.name] = None
+
+        cache_handler = ToolResultCacheHandler(
+            store=self.tool_result_cache,
+            session_id=session_id,
+            crew_id=crew_data.id,
+            execution_order=execution_order,
+            tool_fingerprints=tool_fingerprints,
+            tool_ttls=TOOL_RESULT_CACHE_TTLS,
+        )
 
         agent_data_list: list[AgentData] = crew_data.agents
 
@@ -260,6 +337,7 @@ class CrewParserService(metaclass=SingletonMeta):
                 crew_id=crew_data.id,
                 execution_order=execution_order,
                 stream_writer=stream_writer,
+                cache_handler=cache_handler,
             )
         crew_config["agents"] = id_agent_map.values()
 
@@ -270,12 +348,16 @@ class CrewParserService(metaclass=SingletonMeta):
 
         if crew_data.manager_llm:
             crew_config["manager_llm"] = parse_llm(
-                llm=crew_data.manager_llm, stop_event=stop_event
+                llm=crew_data.manager_llm,
+                stop_event=stop_event,
+                response_cache=self.llm_response_cache.for_llm(crew_data.manager_llm),
             )
 
         if crew_data.planning_llm:
             crew_config["planning_llm"] = parse_llm(
-                llm=crew_data.planning_llm, stop_event=stop_event
+                llm=crew_data.planning_llm,
+                stop_event=stop_event,
+                response_cache=self.llm_response_cache.for_llm(crew_data.planning_llm),
             )
 
         task_list_data: list[TaskData] = crew_data.tasks
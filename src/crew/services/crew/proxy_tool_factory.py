@@ -1,8 +1,12 @@
 from typing import Any
+import os
+import random
+import threading
 import time
 import concurrent.futures
 import asyncio
 import requests
+from requests.adapters import HTTPAdapter
 from loguru import logger
 
 
@@ -15,11 +19,19 @@ from src.crew.models.request_models import (
     ToolInitConfigurationModel,
 )
 
+from src.crew.services.crew.tool_class_data_cache import ToolClassDataCache
 from src.crew.services.graph.events import StopEvent
 from src.crew.services.schema_converter.converter import generate_model_from_schema
 from src.crew.services.pickle_encode import txt_to_obj
 from src.crew.services.run_python_code_service import RunPythonCodeService
 
+# Request threads and keep-alive connections to the manager per running session
+TOOL_CALLS_PER_SESSION = 4
+CONNECT_TIMEOUT = 10
+# Seconds to wait for the response of the manager, e.g. for a tool run
+TOOL_READ_TIMEOUT = float(os.getenv("TOOL_READ_TIMEOUT", "600"))
+MAX_RETRY_DELAY = 10
+
 
 class ProxyToolFactory:
     def __init__(
@@ -27,12 +39,30 @@ class ProxyToolFactory:
         host: str,
         port: int,
         python_code_executor_service: RunPythonCodeService,
+        max_concurrent_sessions: int = 20,
+        pool_size: int | None = None,
+        read_timeout: float = TOOL_READ_TIMEOUT,
+        class_data_cache: ToolClassDataCache | None = None,
     ):
         self.host = host
         self.port = port
         self.python_code_executor_service = python_code_executor_service
+        self.class_data_cache = class_data_cache
+        self.read_timeout = read_timeout
         self.loop = asyncio.get_event_loop()
 
+        if pool_size is None:
+            pool_size = max_concurrent_sessions * TOOL_CALLS_PER_SESSION
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Requests run here so a caller can stop waiting when the session is stopped
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=pool_size, thread_name_prefix="proxy-tool"
+        )
+
     def create_python_code_proxy_tool(
         self,
         python_code_tool_data: PythonCodeToolData,
@@ -78,20 +108,31 @@ class ProxyToolFactory:
         if tool_data.tool_config is not None:
             tool_init_configuration = tool_data.tool_config.tool_init_configuration
 
-        resp = self.post_data_with_retry(
-            url=f"http://{self.host}:{self.port}/tool/{tool_data.name_alias}/class-data",
-            json=ToolInitConfigurationModel(
-                tool_init_configuration=tool_init_configuration
-            ).model_dump(),
-            stop_event=stop_event,
-        )
-        data_txt = resp.json()["classdata"]
-        data: dict = txt_to_obj(data_txt)
-        data["args_schema"] = generate_model_from_schema(
-            data["args_schema"]
-        )  # TODO: rename
-
-        logger.info(data)
+        def load_class_data() -> tuple[dict, str | None, str | None]:
+            resp = self.post_data_with_retry(
+                url=f"http://{self.host}:{self.port}/tool/{tool_data.name_alias}/class-data",
+                json=ToolInitConfigurationModel(
+                    tool_init_configuration=tool_init_configuration
+                ).model_dump(),
+                stop_event=stop_event,
+            )
+            resp_data = resp.json()
+            data: dict = txt_to_obj(resp_data["classdata"])
+            data["args_schema"] = generate_model_from_schema(
+                data["args_schema"]
+            )  # TODO: rename
+
+            logger.info(data)
+            return data, resp_data.get("image_name"), resp_data.get("image_version")
+
+        if self.class_data_cache is None:
+            data, _, _ = load_class_data()
+        else:
+            data = self.class_data_cache.get_or_load(
+                tool_alias=tool_data.name_alias,
+                init_configuration=tool_init_configuration,
+                load=load_class_data,
+            )
 
         proxy_tool_factory = self  # VERY BAD CODE!!
 
@@ -139,34 +180,73 @@ class ProxyToolFactory:
         return ToolResponse.model_validate(response.json()).data
 
     def post_data_with_retry(
-        self, url, json=None, retries=15, delay=3, stop_event: StopEvent | None = None
+        self,
+        url,
+        json=None,
+        retries=15,
+        delay=0.5,
+        stop_event: StopEvent | None = None,
     ):
+        """
+        Post data over the pooled session, retrying failed attempts with jittered
+        exponential backoff (`delay` doubles on every attempt up to MAX_RETRY_DELAY).
+        Waits return as soon as `stop_event` is set.
+
+        A response not received within `read_timeout` is not retried, so that a
+        hung tool holds a request thread at most that long.
+        """
         if json is None:
             json = {}
 
         for attempt in range(retries):
             try:
                 logger.info(f"Attempt {attempt + 1} to post data...")
-                with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                    future = executor.submit(requests.post, url, json=json)
-
-                    while True:
-                        if stop_event is not None:
-                            stop_event.check_stop()
-
-                        try:
-                            resp = future.result(timeout=0.01)
-                            if resp.status_code == 200:
-                                return resp
-                            else:
-                                logger.error(f"Bad status: {resp.status_code}")
-                                break
-                        except concurrent.futures.TimeoutError:
-                            continue
-
+                future = self.executor.submit(
+                    self.session.post,
+                    url,
+                    json=json,
+                    timeout=(CONNECT_TIMEOUT, self.read_timeout),
+                )
+                resp = self._wait_for_response(future, stop_event)
+                if resp.status_code == 200:
+                    return resp
+                logger.error(f"Bad status: {resp.status_code}")
+
+            except requests.exceptions.ReadTimeout as e:
+                raise Exception(
+                    f"No response within {self.read_timeout} seconds."
+                ) from e
             except requests.exceptions.RequestException as e:
                 logger.error(f"Request failed: {e}")
             if attempt < retries - 1:
-                time.sleep(delay)
+                backoff = random.uniform(0, min(MAX_RETRY_DELAY, delay * 2**attempt))
+                if stop_event is not None:
+                    stop_event.wait(backoff)
+                    stop_event.check_stop()
+                else:
+                    time.sleep(backoff)
 
         raise Exception(f"Failed to post data after {retries} attempts.")
+
+    def _wait_for_response(
+        self,
+        future: concurrent.futures.Future,
+        stop_event: StopEvent | None = None,
+    ) -> requests.Response:
+        if stop_event is None:
+            return future.result()
+
+        done = threading.Event()
+        future.add_done_callback(lambda _: done.set())
+        stop_event.add_callback(done.set)
+        try:
+            done.wait()
+        finally:
+            stop_event.remove_callback(done.set)
+
+        # A request still queued is dropped, a running one is left to finish in
+        # the pool until its read timeout and its response is dropped
+        if stop_event.is_set():
+            future.cancel()
+        stop_event.check_stop()
+        return future.result()
@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+import math
+import time
+
+from loguru import logger
+from redis.exceptions import WatchError
+
+from src.crew.models.request_models import LLMData
+from src.crew.services.graph.events import StopEvent
+from src.crew.services.redis_service import RedisService
+from src.crew.utils.singleton_meta import SingletonMeta
+
+RATE_LIMIT_KEY_PREFIX = "rate_limit"
+
+
+def rate_limit_key(key: str) -> str:
+    return f"{RATE_LIMIT_KEY_PREFIX}:{key}"
+
+
+def llm_rate_limit_key(llm: LLMData | None) -> str:
+    """
+    Limits are shared by every LLM config with the same provider and model,
+    and split further by API key when one is set.
+    """
+    if llm is None:
+        return "llm:default"
+    key = f"llm:{llm.provider}/{llm.config.model}"
+    if llm.config.api_key:
+        api_key_hash = hashlib.sha256(llm.config.api_key.encode()).hexdigest()[:16]
+        key = f"{key}:{api_key_hash}"
+    return key
+
+
+class RedisRateLimiter(metaclass=SingletonMeta):
+    """
+    Token bucket shared through Redis by every crew worker.
+
+    A bucket holds up to `burst` requests (by default `max_rpm`) and refills at
+    `max_rpm` requests per minute. It is stored as the theoretical arrival time of
+    the next request (GCRA), so one key and one optimistic transaction are enough
+    per attempt. Time is taken from the Redis server to keep hosts consistent.
+    """
+
+    def __init__(self, redis_service: RedisService):
+        self.redis_service = redis_service
+
+    @staticmethod
+    def _reserve(
+        now: float, tat: str | bytes | None, max_rpm: int, burst: int | None
+    ) -> tuple[float, float]:
+        """
+        Returns:
+            tuple[float, float]: Seconds to wait (0 if the request is allowed)
+                and the new theoretical arrival time.
+        """
+        interval = 60 / max_rpm
+        tat = max(float(tat) if tat is not None else now, now)
+        new_tat = tat + interval
+        allow_at = new_tat - (burst or max_rpm) * interval
+        return max(allow_at - now, 0.0), new_tat
+
+    def try_acquire(self, key: str, max_rpm: int, burst: int | None = None) -> float:
+        """
+        Take a request from the bucket if possible.
+
+        Returns:
+            float: 0 if the request was taken, otherwise seconds until it can be.
+        """
+        redis_key = rate_limit_key(key)
+        with self.redis_service.sync_redis_client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(redis_key)
+                    seconds, microseconds = pipe.time()
+                    now = seconds + microseconds / 1_000_000
+                    wait, new_tat = self._reserve(
+                        now, pipe.get(redis_key), max_rpm, burst
+                    )
+                    if wait > 0:
+                        pipe.unwatch()
+                        return wait
+
+                    pipe.multi()
+                    pipe.set(redis_key, new_tat, px=math.ceil((new_tat - now) * 1000))
+                    pipe.execute()
+                    return 0.0
+                except WatchError:
+                    continue
+
+    async def atry_acquire(
+        self, key: str, max_rpm: int, burst: int | None = None
+    ) -> float:
+        redis_key = rate_limit_key(key)
+        async with self.redis_service.aioredis_client.pipeline() as pipe:
+            while True:
+                try:
+                    await pipe.watch(redis_key)
+                    seconds, microseconds = await pipe.time()
+                    now = seconds + microseconds / 1_000_000
+                    wait, new_tat = self._reserve(
+                        now, await pipe.get(redis_key), max_rpm, burst
+                    )
+                    if wait > 0:
+                        await pipe.unwatch()
+                        return wait
+
+                    pipe.multi()
+                    pipe.set(redis_key, new_tat, px=math.ceil((new_tat - now) * 1000))
+                    await pipe.execute()
+                    return 0.0
+                except WatchError:
+                    continue
+
+    def acquire(
+        self,
+        key: str,
+        max_rpm: int,
+        burst: int | None = None,
+        stop_event: StopEvent | None = None,
+    ) -> float:
+        """
+        Block until a request is taken from the bucket. Waits last only until the
+        next token is due and end early when `stop_event` is set.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        start = time.monotonic()
+        while (wait := self.try_acquire(key, max_rpm, burst)) > 0:
+            logger.debug(f"Rate limit of {key} reached, waiting {wait:.3f}s")
+            if stop_event is not None:
+                stop_event.wait(wait)
+                stop_event.check_stop()
+            else:
+                time.sleep(wait)
+        return time.monotonic() - start
+
+    async def aacquire(
+        self,
+        key: str,
+        max_rpm: int,
+        burst: int | None = None,
+        stop_event: StopEvent | None = None,
+    ) -> float:
+        start = time.monotonic()
+        while (wait := await self.atry_acquire(key, max_rpm, burst)) > 0:
+            logger.debug(f"Rate limit of {key} reached, waiting {wait:.3f}s")
+            await asyncio.sleep(wait)
+            if stop_event is not None:
+                stop_event.check_stop()
+        return time.monotonic() - start
+
+
+class RedisRPMController:
+    """
+    Drop-in replacement of crewAI's RPMController backed by RedisRateLimiter.
+    """
+
+    def __init__(
+        self,
+        limiter: RedisRateLimiter,
+        key: str,
+        max_rpm: int,
+        stop_event: StopEvent | None = None,
+    ):
+        self.limiter = limiter
+        self.key = key
+        self.max_rpm = max_rpm
+        self.stop_event = stop_event
+
+    def check_or_wait(self) -> bool:
+        self.limiter.acquire(self.key, self.max_rpm, stop_event=self.stop_event)
+        return True
+
+    def stop_rpm_counter(self):
+        # Buckets expire in Redis on their own
+        pass
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from loguru import logger
+
+from src.crew.services.redis_service import RedisService, SyncPubsubSubscriber
+from src.crew.utils.singleton_meta import SingletonMeta
+
+# Published by the manager when a tool image is built or pulled,
+# {"image_name": ..., "image_version": ...} or {"tool_alias": ...}
+TOOL_IMAGE_UPDATED_CHANNEL = os.environ.get(
+    "TOOL_IMAGE_UPDATED_CHANNEL", "tools:image_updated"
+)
+TOOL_CLASS_DATA_CACHE_TTL = int(os.environ.get("TOOL_CLASS_DATA_CACHE_TTL", "3600"))
+
+
+@dataclass
+class ClassDataEntry:
+    data: dict
+    image_name: str | None
+    image_version: str | None
+    expires_at: float
+
+
+class ToolClassDataCache(metaclass=SingletonMeta):
+    """
+    Process-wide cache of decoded tool class-data.
+
+    Entries are keyed by tool alias and init configuration and remember the image
+    they were read from. They expire after `ttl` seconds and are dropped when the
+    manager reports a new version of their image on TOOL_IMAGE_UPDATED_CHANNEL.
+    Concurrent loads of the same entry are made once.
+    """
+
+    def __init__(
+        self,
+        redis_service: RedisService | None = None,
+        ttl: float = TOOL_CLASS_DATA_CACHE_TTL,
+    ):
+        self.redis_service = redis_service
+        self.ttl = ttl
+        self._entries: dict[tuple[str, str], ClassDataEntry] = {}
+        self._key_locks: dict[tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._listening = False
+
+    @staticmethod
+    def make_key(tool_alias: str, init_configuration: Any) -> tuple[str, str]:
+        config = json.dumps(init_configuration, sort_keys=True, default=str)
+        return tool_alias, hashlib.sha256(config.encode()).hexdigest()
+
+    def get_or_load(
+        self,
+        tool_alias: str,
+        init_configuration: Any,
+        load: Callable[[], tuple[dict, str | None, str | None]],
+    ) -> dict:
+        """
+        Return cached class-data or call `load`, which returns the class-data
+        with the name and version of the image it came from.
+        """
+        self._ensure_listening()
+        key = self.make_key(tool_alias, init_configuration)
+
+        entry = self._get_entry(key)
+        if entry is not None:
+            return entry.data
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another thread may have loaded it meanwhile
+            entry = self._get_entry(key)
+            if entry is not None:
+                return entry.data
+
+            data, image_name, image_version = load()
+            with self._lock:
+                self._entries[key] = ClassDataEntry(
+                    data=data,
+                    image_name=image_name,
+                    image_version=image_version,
+                    expires_at=time.monotonic() + self.ttl,
+                )
+            return data
+
+    def _get_entry(self, key: tuple[str, str]) -> ClassDataEntry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            return entry
+
+    def invalidate(
+        self,
+        tool_alias: str | None = None,
+        image_name: str | None = None,
+        image_version: str | None = None,
+    ) -> int:
+        """
+        Drop entries of a tool alias, or entries of an image with another version
+        than `image_version`. Without arguments the whole cache is cleared.
+
+        Returns:
+            int: Number of dropped entries.
+        """
+
+        def is_stale(key: tuple[str, str], entry: ClassDataEntry) -> bool:
+            if tool_alias is None and image_name is None:
+                return True
+            if tool_alias is not None and key[0] == tool_alias:
+                return True
+            return (
+                image_name is not None
+                and entry.image_name == image_name
+                and (image_version is None or entry.image_version != image_version)
+            )
+
+        with self._lock:
+            stale = [
+                key for key, entry in self._entries.items() if is_stale(key, entry)
+            ]
+            for key in stale:
+                del self._entries[key]
+
+        if stale:
+            logger.info(f"Dropped {len(stale)} cached tool class-data entries")
+        return len(stale)
+
+    def _ensure_listening(self):
+        if self._listening or self.redis_service is None:
+            return
+        with self._lock:
+            if self._listening:
+                return
+            self._listening = True
+        self.redis_service.subscribe(
+            TOOL_IMAGE_UPDATED_CHANNEL, SyncPubsubSubscriber(self._handle_message)
+        )
+
+    def _handle_message(self, message: dict):
+        try:
+            data: dict = json.loads(message["data"])
+            self.invalidate(
+                tool_alias=data.get("tool_alias"),
+                image_name=data.get("image_name"),
+                image_version=data.get("image_version"),
+            )
+        except Exception:
+            logger.exception("Failed to invalidate tool class-data cache")
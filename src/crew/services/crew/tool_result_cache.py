@@ -0,0 +1,233 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any
+
+from crewai.agents.cache import CacheHandler
+from loguru import logger
+from pydantic import BaseModel, PrivateAttr
+
+from src.crew.services.redis_service import RedisService
+from src.crew.utils.singleton_meta import SingletonMeta
+
+TOOL_RESULT_CACHE_MAX_ENTRIES = int(
+    os.environ.get("TOOL_RESULT_CACHE_MAX_ENTRIES", "10000")
+)
+TOOL_RESULT_CACHE_MAX_BYTES = int(
+    os.environ.get("TOOL_RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+)
+# Results of one crew execution are reused by its agents for this long
+TOOL_RESULT_CACHE_SESSION_TTL = int(
+    os.environ.get("TOOL_RESULT_CACHE_SESSION_TTL", "3600")
+)
+# Tools whose results are shared across sessions, {"tool name": ttl in seconds}
+TOOL_RESULT_CACHE_TTLS: dict[str, int] = json.loads(
+    os.environ.get("TOOL_RESULT_CACHE_TTLS") or "{}"
+)
+TOOL_RESULT_CACHE_REDIS = os.environ.get("TOOL_RESULT_CACHE_REDIS", "0") == "1"
+TOOL_RESULT_CACHE_KEY_PREFIX = "tool_results"
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by number of entries and total size in bytes."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[str, tuple[Any, int, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def sizeof(value: Any) -> int | None:
+        if isinstance(value, str):
+            return len(value.encode())
+        try:
+            return len(pickle.dumps(value))
+        except Exception:
+            return None
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, size, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.size -= size
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        size = self.sizeof(value)
+        if size is None or size > self.max_bytes:
+            return
+
+        with self._lock:
+            old_entry = self._entries.pop(key, None)
+            if old_entry is not None:
+                self.size -= old_entry[1]
+            self._entries[key] = (value, size, time.monotonic() + ttl)
+            self.size += size
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+
+class ToolCacheMetrics:
+    """Hits and misses of the tool result cache per tool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tools: dict[str, dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "redis_hits": 0, "misses": 0}
+        )
+
+    def record(self, tool: str, outcome: str):
+        with self._lock:
+            self._tools[tool][outcome] += 1
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {tool: dict(counts) for tool, counts in self._tools.items()}
+
+
+tool_cache_metrics = ToolCacheMetrics()
+
+
+class ToolResultCache(metaclass=SingletonMeta):
+    """
+    Process-wide store of tool results with an optional Redis tier.
+
+    Every entry lives in an in-process LRU cache. Entries of tools shared across
+    sessions are also written to Redis when `use_redis` is set, so that other crew
+    workers can reuse them. Only results that are strings or dicts of JSON values
+    are stored in Redis, as JSON; other results stay in the process.
+    """
+
+    def __init__(
+        self,
+        redis_service: RedisService | None = None,
+        max_entries: int = TOOL_RESULT_CACHE_MAX_ENTRIES,
+        max_bytes: int = TOOL_RESULT_CACHE_MAX_BYTES,
+        use_redis: bool = TOOL_RESULT_CACHE_REDIS,
+    ):
+        self.redis_service = redis_service
+        self.use_redis = use_redis and redis_service is not None
+        self.local = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+
+    def get(self, tool: str, key: str, shared: bool = False) -> Any | None:
+        value = self.local.get(key)
+        if value is not None:
+            tool_cache_metrics.record(tool, "hits")
+            return value
+
+        if shared and self.use_redis:
+            try:
+                redis_key = f"{TOOL_RESULT_CACHE_KEY_PREFIX}:{key}"
+                txt, ttl = (
+                    self.redis_service.sync_redis_client.pipeline()
+                    .get(redis_key)
+                    .ttl(redis_key)
+                    .execute()
+                )
+                if txt is not None:
+                    value = json.loads(txt)
+                    self.local.set(key, value, ttl=max(ttl, 1))
+                    tool_cache_metrics.record(tool, "redis_hits")
+                    return value
+            except Exception:
+                logger.exception(f"Failed to read cached result of {tool}")
+
+        tool_cache_metrics.record(tool, "misses")
+        return None
+
+    @staticmethod
+    def _to_json(value: Any) -> str | None:
+        if not isinstance(value, (str, dict)):
+            return None
+        try:
+            return json.dumps(value)
+        except (TypeError, ValueError):
+            return None
+
+    def set(self, tool: str, key: str, value: Any, ttl: int, shared: bool = False):
+        self.local.set(key, value, ttl=ttl)
+        if not (shared and self.use_redis):
+            return
+        txt = self._to_json(value)
+        if txt is not None:
+            try:
+                self.redis_service.sync_redis_client.set(
+                    f"{TOOL_RESULT_CACHE_KEY_PREFIX}:{key}", txt, ex=ttl
+                )
+            except Exception:
+                logger.exception(f"Failed to cache result of {tool}")
+
+
+def tool_fingerprint(tool_data: BaseModel) -> str:
+    """Hash of a tool configuration, results are only shared between equal ones."""
+    config = json.dumps(tool_data.model_dump(), sort_keys=True, default=str)
+    return hashlib.sha256(config.encode()).hexdigest()[:16]
+
+
+class ToolResultCacheHandler(CacheHandler):
+    """
+    CacheHandler of a crew execution backed by ToolResultCache.
+
+    Results are cached for the execution of the crew (`crew_id`,
+    `execution_order`) only, unless the tool is listed in `tool_ttls`: then they
+    are shared with every session that uses the same tool with the same
+    configuration and expire after the configured TTL. Keys always include the
+    fingerprint of the tool configuration (`tool_fingerprints`). Crews look tools
+    up by name, so tools whose name is used by different configurations
+    (fingerprint None) are not cached.
+    """
+
+    session_id: int
+    crew_id: int | None = None
+    execution_order: int | None = None
+    tool_fingerprints: dict[str, str | None] = {}
+    tool_ttls: dict[str, int] = {}
+    session_ttl: int = TOOL_RESULT_CACHE_SESSION_TTL
+    _store: ToolResultCache = PrivateAttr()
+
+    def __init__(self, store: ToolResultCache, **data):
+        super().__init__(**data)
+        self._store = store
+
+    def _make_key(self, tool: str, input: Any) -> tuple[str, bool] | None:
+        fingerprint = self.tool_fingerprints.get(tool, "")
+        if fingerprint is None:
+            return None
+        arguments = json.dumps(input, sort_keys=True, default=str)
+        arguments_hash = hashlib.sha256(arguments.encode()).hexdigest()
+        tool_key = f"tool:{tool}:{fingerprint}:{arguments_hash}"
+        if tool in self.tool_ttls:
+            return tool_key, True
+        execution = f"{self.session_id}:{self.crew_id}:{self.execution_order}"
+        return f"execution:{execution}:{tool_key}", False
+
+    def add(self, tool, input, output):
+        key = self._make_key(tool, input)
+        if key is None:
+            return
+        key, shared = key
+        ttl = self.tool_ttls[tool] if shared else self.session_ttl
+        self._store.set(tool, key, output, ttl=ttl, shared=shared)
+
+    def read(self, tool, input) -> Any | None:
+        key = self._make_key(tool, input)
+        if key is None:
+            return None
+        key, shared = key
+        return self._store.get(tool, key, shared=shared)
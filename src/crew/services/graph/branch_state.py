@@ -0,0 +1,174 @@
+import copy
+
+from dotdict import DotDict
+
+from src.crew.models.state import State
+from src.crew.models.state_updates import (
+    StateHistoryUpdate,
+    SystemVariablesUpdate,
+    VariablesUpdate,
+)
+from src.crew.services.graph.state_history import diff_variables
+
+
+class _CopyOnRead:
+    """
+    Top-level values are shared with the forked dict until they are read.
+
+    A value is deep copied the first time it is read, so the node can mutate it
+    in place without affecting the state of other branches. Values the node does
+    not read are never copied. `model_dump` returns the values as they are and
+    must not be mutated.
+    """
+
+    def _fork(self, values: dict):
+        values = _dump(values)
+        object.__setattr__(self, "_shared", set(values))
+        dict.update(self, values)
+
+    def _own(self, key):
+        if key in self._shared:
+            self._shared.discard(key)
+            value = dict.__getitem__(self, key)
+            if isinstance(value, (dict, list)):
+                dict.__setitem__(self, key, copy.deepcopy(value))
+
+    def _own_all(self):
+        for key in list(self._shared):
+            self._own(key)
+
+    def __getitem__(self, key):
+        self._own(key)
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        self._shared.discard(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._shared.discard(key)
+        super().__delitem__(key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def setdefault(self, key, default=None):
+        self._own(key)
+        return super().setdefault(key, default)
+
+    def pop(self, key, *args):
+        self._own(key)
+        return super().pop(key, *args)
+
+    def items(self):
+        self._own_all()
+        return super().items()
+
+    def values(self):
+        self._own_all()
+        return super().values()
+
+    def model_dump(self):
+        return dict.copy(self)
+
+
+class _ForkedDict(_CopyOnRead, dict):
+    def __init__(self, values: dict):
+        super().__init__()
+        self._fork(values)
+
+
+class _ForkedVariables(_CopyOnRead, DotDict):
+    def __init__(self, variables: DotDict):
+        super().__init__()
+        self._fork(variables)
+        for name, expression in variables._setters.items():
+            self.add_setter(name, expression.code)
+        for name, expression in variables._properties.items():
+            self.add_property(name, expression.code)
+
+
+def fork_state(state: State) -> State:
+    """
+    Fork the state for a single node, so nodes running in parallel branches
+    can mutate their state in place without affecting each other.
+
+    Variables and system variables are copied lazily, see `_CopyOnRead`.
+    """
+    system_variables = _dump(state.get("system_variables"))
+    forked_system_variables = _ForkedDict(system_variables)
+    if "nodes" in system_variables:
+        forked_system_variables["nodes"] = _ForkedDict(system_variables["nodes"])
+    return {
+        "state_history": list(state["state_history"]),
+        "variables": _ForkedVariables(state["variables"]),
+        "system_variables": forked_system_variables,
+    }
+
+
+def _dump(values: dict | None) -> dict:
+    """Values of a possibly forked dict, without copying them."""
+    if values is None:
+        return {}
+    return values.model_dump() if isinstance(values, _CopyOnRead) else dict(values)
+
+
+def _same(base, value) -> bool:
+    # Values a node did not read are still the objects of the base state
+    return base is value or base == value
+
+
+def make_state_update(base: State, result: State) -> dict:
+    """
+    Convert the state returned by a node into an update relative to `base`.
+
+    The update is merged into the graph state by the reducers of `State`,
+    which combine updates of all branches finished in the same step.
+
+    Args:
+        base (State): State the node received.
+        result (State): State the node returned (usually a mutated fork of `base`).
+
+    Returns:
+        dict: Update for every state channel.
+    """
+    base_variables = _dump(base["variables"])
+    diff = diff_variables(base_variables, _dump(result["variables"]))
+    changed = [*diff["set"], *diff["unset"]]
+    variables_update = VariablesUpdate(
+        set=diff["set"],
+        unset=diff["unset"],
+        previous={key: base_variables[key] for key in changed if key in base_variables},
+    )
+
+    base_history = base["state_history"]
+    result_history = result["state_history"]
+    if result_history[: len(base_history)] == base_history:
+        state_history_update = StateHistoryUpdate(
+            items=result_history[len(base_history) :]
+        )
+    else:
+        # The node rewrote the history, replace it
+        state_history_update = result_history
+
+    base_system_variables = _dump(base.get("system_variables"))
+    result_system_variables = _dump(result.get("system_variables"))
+    base_nodes = _dump(base_system_variables.get("nodes"))
+    system_variables_update = SystemVariablesUpdate(
+        set={
+            key: value
+            for key, value in result_system_variables.items()
+            if key != "nodes" and not _same(base_system_variables.get(key), value)
+        },
+        nodes={
+            name: value
+            for name, value in _dump(result_system_variables.get("nodes")).items()
+            if not _same(base_nodes.get(name), value)
+        },
+    )
+
+    return {
+        "state_history": state_history_update,
+        "variables": variables_update,
+        "system_variables": system_variables_update,
+    }
@@ -9,20 +9,54 @@ from src.crew.models.graph_models import (
     ErrorMessageData,
     ConditionGroupMessageData,
     ConditonGroupManipulationMessageData,
+    LLMChunkMessageData,
 )
 from src.crew.models.state import State
+from src.crew.services.graph.state_history import (
+    make_state_history_delta,
+    make_state_history_deltas,
+)
 
 
 class CustomSessionMessageWriter:
     @classmethod
     def _convert_state(cls, state: State):
+        """
+        Convert state for messages that need the whole state history.
+
+        History is sent as deltas, the full history can be rebuilt with
+        `reconstruct_state_history`.
+        """
+        state_history = state["state_history"]
         return {
             "variables": (
                 state["variables"].model_dump()
                 if state["variables"] is not None
                 else {}
             ),
-            "state_history": state["state_history"],
+            "state_history_delta": make_state_history_deltas(state_history),
+            "state_history_length": len(state_history),
+        }
+
+    @classmethod
+    def _convert_state_delta(cls, state: State):
+        """
+        Convert state for messages that are sent after every node.
+
+        Only the last state history item is sent, with variables replaced by
+        the diff against the previous item.
+        """
+        state_history = state["state_history"]
+        return {
+            "variables": (
+                state["variables"].model_dump()
+                if state["variables"] is not None
+                else {}
+            ),
+            "state_history_delta": (
+                [make_state_history_delta(state_history)] if state_history else []
+            ),
+            "state_history_length": len(state_history),
         }
 
     @classmethod
@@ -75,14 +109,14 @@ class CustomSessionMessageWriter:
             **kwargs: Additional data to include in the finish message.
 
         This function creates a finish message containing the node's output,
-        current state variables, and state history. It also includes any
+        current state variables, and the state history delta. It also includes any
         additional data passed as keyword arguments. The message is then
         written using the provided stream writer.
         """
 
         finish_message_data = FinishMessageData(
             output=output,
-            state=cls._convert_state(state=state),
+            state=cls._convert_state_delta(state=state),
             additional_data=kwargs,
         )
         graph_message = GraphMessage(
@@ -127,6 +161,31 @@ class CustomSessionMessageWriter:
         )
         writer(graph_message)
 
+    @classmethod
+    def add_llm_chunk_message(
+        cls,
+        session_id: int,
+        node_name: str,
+        writer: StreamWriter,
+        execution_order: int,
+        chunk_data: LLMChunkMessageData,
+    ):
+        """
+        Add a batch of streamed LLM tokens.
+
+        Args:
+            writer (StreamWriter): A stream writer to write the message to.
+            execution_order (int): The order of execution of the node.
+            chunk_data (LLMChunkMessageData): Tokens with their position in the stream.
+        """
+        graph_message = GraphMessage(
+            session_id=session_id,
+            name=node_name,
+            execution_order=execution_order,
+            message_data=chunk_data,
+        )
+        writer(graph_message)
+
     @classmethod
     def add_custom_message(
         cls,
@@ -177,7 +236,7 @@ class CustomSessionMessageWriter:
         execution_order: int,
     ):
         error_message_data = ConditonGroupManipulationMessageData(
-            group_name=group_name, state=cls._convert_state(state=state)
+            group_name=group_name, state=cls._convert_state_delta(state=state)
         )
         graph_message = GraphMessage(
             session_id=session_id,
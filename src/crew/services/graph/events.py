@@ -1,4 +1,5 @@
 import threading
+from typing import Callable
 
 from src.crew.services.graph.exceptions import StopSession
 
@@ -7,7 +8,23 @@ class StopEvent(threading.Event):
     def __init__(self, default_status="stop", *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.status = default_status
+        self._callbacks: list[Callable[[], None]] = []
 
     def check_stop(self):
         if self.is_set():
             raise StopSession(status=self.status)
+
+    def set(self):
+        super().set()
+        for callback in list(self._callbacks):
+            callback()
+
+    def add_callback(self, callback: Callable[[], None]):
+        """Call `callback` when the event is set, at once if it is already set."""
+        self._callbacks.append(callback)
+        if self.is_set():
+            callback()
+
+    def remove_callback(self, callback: Callable[[], None]):
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
@@ -0,0 +1,506 @@
+import ast
+import json
+from functools import lru_cache
+from typing import Any, Callable
+
+from dotdict import DotObject
+
+
+class UnsupportedExpressionError(Exception):
+    """Code can not be evaluated in-process and should be sent to the sandbox."""
+
+
+class ExpressionEvaluationError(Exception):
+    """Code was evaluated in-process and raised an error."""
+
+
+SAFE_BUILTINS = {
+    "True": True,
+    "False": False,
+    "None": None,
+    "abs": abs,
+    "all": all,
+    "any": any,
+    "bool": bool,
+    "dict": dict,
+    "enumerate": enumerate,
+    "float": float,
+    "int": int,
+    "len": len,
+    "list": list,
+    "max": max,
+    "min": min,
+    "reversed": reversed,
+    "round": round,
+    "set": set,
+    "sorted": sorted,
+    "str": str,
+    "sum": sum,
+    "tuple": tuple,
+    "zip": zip,
+}
+
+# Methods that do not mutate their object. `replace` and `join` are left out,
+# their result can be far longer than any operand.
+SAFE_METHODS = {
+    "capitalize",
+    "count",
+    "endswith",
+    "find",
+    "get",
+    "index",
+    "isalpha",
+    "isdigit",
+    "isnumeric",
+    "items",
+    "keys",
+    "lower",
+    "lstrip",
+    "model_dump",
+    "rstrip",
+    "split",
+    "startswith",
+    "strip",
+    "title",
+    "upper",
+    "values",
+}
+
+# Methods allowed only in manipulations, they run on a copy of variables.
+MUTATING_METHODS = {
+    "append",
+    "clear",
+    "extend",
+    "insert",
+    "pop",
+    "remove",
+    "setdefault",
+    "update",
+}
+
+# Introspection attributes that give access to frames and their globals.
+FORBIDDEN_ATTRIBUTES = {
+    "ag_code",
+    "ag_frame",
+    "cr_code",
+    "cr_frame",
+    "f_back",
+    "f_builtins",
+    "f_code",
+    "f_globals",
+    "f_locals",
+    "format",
+    "format_map",
+    "gi_code",
+    "gi_frame",
+    "gi_yieldfrom",
+    "mro",
+    "tb_frame",
+    "tb_next",
+}
+
+# Longest str, bytes, list or tuple `*` may build in-process, e.g. `"-" * 20`.
+MAX_REPETITION_LENGTH = 10_000
+
+_EXPRESSION_NODES = (
+    ast.Expression,
+    ast.BoolOp,
+    ast.And,
+    ast.Or,
+    ast.BinOp,
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.FloorDiv,
+    ast.Mod,
+    ast.UnaryOp,
+    ast.Not,
+    ast.USub,
+    ast.UAdd,
+    ast.Compare,
+    ast.Eq,
+    ast.NotEq,
+    ast.Lt,
+    ast.LtE,
+    ast.Gt,
+    ast.GtE,
+    ast.In,
+    ast.NotIn,
+    ast.Is,
+    ast.IsNot,
+    ast.IfExp,
+    ast.Call,
+    ast.keyword,
+    ast.Attribute,
+    ast.Subscript,
+    ast.Slice,
+    ast.Name,
+    ast.Load,
+    ast.Store,
+    ast.Constant,
+    ast.List,
+    ast.Tuple,
+    ast.Set,
+    ast.Dict,
+    ast.JoinedStr,
+    ast.FormattedValue,
+)
+
+_STATEMENT_NODES = (
+    ast.Module,
+    ast.Assign,
+    ast.AugAssign,
+    ast.AnnAssign,
+    ast.Pass,
+    ast.If,
+    ast.Return,
+    ast.Expr,
+    ast.FunctionDef,
+    ast.arguments,
+    ast.arg,
+)
+
+
+class _Validator(ast.NodeVisitor):
+    def __init__(
+        self,
+        allowed_methods: set[str],
+        allow_statements: bool,
+        assign_names_only: bool = False,
+    ):
+        self.allowed_methods = allowed_methods
+        self.assign_names_only = assign_names_only
+        self.allowed_nodes = _EXPRESSION_NODES + (
+            _STATEMENT_NODES if allow_statements else ()
+        )
+
+    def generic_visit(self, node: ast.AST):
+        if not isinstance(node, self.allowed_nodes):
+            raise UnsupportedExpressionError(
+                f"`{type(node).__name__}` is not supported in-process"
+            )
+        super().generic_visit(node)
+
+    def visit_Name(self, node: ast.Name):
+        if node.id.startswith("_"):
+            raise UnsupportedExpressionError(f"Name `{node.id}` is not allowed")
+        self.generic_visit(node)
+
+    def visit_Attribute(self, node: ast.Attribute):
+        if node.attr.startswith("_") or node.attr in FORBIDDEN_ATTRIBUTES:
+            raise UnsupportedExpressionError(f"Attribute `{node.attr}` is not allowed")
+        self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call):
+        func = node.func
+        if isinstance(func, ast.Name):
+            if func.id not in SAFE_BUILTINS:
+                raise UnsupportedExpressionError(f"Call of `{func.id}` is not allowed")
+        elif isinstance(func, ast.Attribute):
+            if func.attr not in self.allowed_methods:
+                raise UnsupportedExpressionError(f"Method `{func.attr}` is not allowed")
+        else:
+            raise UnsupportedExpressionError("Only direct calls are allowed")
+        if any(isinstance(arg, ast.Starred) for arg in node.args):
+            raise UnsupportedExpressionError("Starred arguments are not allowed")
+        self.generic_visit(node)
+
+    def visit_Assign(self, node: ast.Assign):
+        self._check_targets(node.targets)
+        self.generic_visit(node)
+
+    def visit_AugAssign(self, node: ast.AugAssign):
+        # `x += [1]` extends the list in place even if `x` is a local name
+        if self.assign_names_only:
+            raise UnsupportedExpressionError("Augmented assignment is not allowed")
+        # `x *= n` and `x %= n` are not guarded by _RepetitionGuard
+        if isinstance(node.op, (ast.Mult, ast.Mod)):
+            raise UnsupportedExpressionError(
+                f"`{type(node.op).__name__}` assignment is not supported in-process"
+            )
+        self.generic_visit(node)
+
+    def visit_AnnAssign(self, node: ast.AnnAssign):
+        self._check_targets([node.target])
+        self.generic_visit(node)
+
+    def _check_targets(self, targets: list[ast.expr]):
+        # Functions get live objects from the state, so they can only assign locals
+        if self.assign_names_only and not all(
+            isinstance(target, ast.Name) for target in targets
+        ):
+            raise UnsupportedExpressionError("Only local variables can be assigned")
+
+    def visit_Expr(self, node: ast.Expr):
+        # Docstrings and method calls like `variables.items.append(1)`
+        if not isinstance(node.value, (ast.Constant, ast.Call)):
+            raise UnsupportedExpressionError("Bare expressions are not allowed")
+        self.generic_visit(node)
+
+    def visit_FormattedValue(self, node: ast.FormattedValue):
+        # `f"{1:0500000d}"` pads the result to any width
+        if node.format_spec is not None:
+            raise UnsupportedExpressionError("Format spec is not supported in-process")
+        self.generic_visit(node)
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        if node.decorator_list:
+            raise UnsupportedExpressionError("Decorators are not allowed")
+        defaults = node.args.defaults + [
+            default for default in node.args.kw_defaults if default is not None
+        ]
+        if not all(isinstance(default, ast.Constant) for default in defaults):
+            raise UnsupportedExpressionError("Only constant defaults are allowed")
+        for child in ast.walk(node):
+            if child is not node and isinstance(child, ast.FunctionDef):
+                raise UnsupportedExpressionError("Nested functions are not allowed")
+        self.generic_visit(node)
+
+
+def _multiply(left: Any, right: Any) -> Any:
+    for sequence, count in ((left, right), (right, left)):
+        if (
+            isinstance(sequence, (str, bytes, list, tuple))
+            and isinstance(count, int)
+            and len(sequence) * count > MAX_REPETITION_LENGTH
+        ):
+            raise UnsupportedExpressionError("Repetition result is too large")
+    return left * right
+
+
+def _modulo(left: Any, right: Any) -> Any:
+    # `"%0500000d" % 1` pads the result to any width
+    if isinstance(left, (str, bytes)):
+        raise UnsupportedExpressionError(
+            "String formatting is not supported in-process"
+        )
+    return left % right
+
+
+class _RepetitionGuard(ast.NodeTransformer):
+    """
+    Replace `a * b` with a call that refuses to build huge sequences
+    and `a % b` with a call that refuses string formatting.
+    """
+
+    _GUARDS = {ast.Mult: "__multiply__", ast.Mod: "__modulo__"}
+
+    def visit_BinOp(self, node: ast.BinOp):
+        self.generic_visit(node)
+        guard = self._GUARDS.get(type(node.op))
+        if guard is None:
+            return node
+        return ast.copy_location(
+            ast.Call(
+                func=ast.Name(id=guard, ctx=ast.Load()),
+                args=[node.left, node.right],
+                keywords=[],
+            ),
+            node,
+        )
+
+
+class _AnnotationRemover(ast.NodeTransformer):
+    """Annotations are evaluated at definition time and are not needed."""
+
+    def visit_arg(self, node: ast.arg):
+        node.annotation = None
+        return node
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        node.returns = None
+        self.generic_visit(node)
+        return node
+
+    def visit_AnnAssign(self, node: ast.AnnAssign):
+        if node.value is None:
+            return ast.Pass()
+        return ast.Assign(targets=[node.target], value=node.value, lineno=node.lineno)
+
+
+def _validate(
+    tree: ast.AST,
+    allowed_methods: set[str],
+    allow_statements: bool,
+    assign_names_only: bool = False,
+):
+    _Validator(
+        allowed_methods=allowed_methods,
+        allow_statements=allow_statements,
+        assign_names_only=assign_names_only,
+    ).visit(tree)
+
+
+def _cached_compile(func):
+    """
+    Cache compiled code and also the reason why code is not supported,
+    so that code falling back to the sandbox is not parsed again.
+    """
+
+    @lru_cache(maxsize=1024)
+    def cached(*args):
+        try:
+            return func(*args)
+        except UnsupportedExpressionError as e:
+            return e
+
+    def inner(*args):
+        result = cached(*args)
+        if isinstance(result, UnsupportedExpressionError):
+            raise UnsupportedExpressionError(str(result))
+        return result
+
+    return inner
+
+
+@_cached_compile
+def _compile_expression(expression: str):
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise UnsupportedExpressionError(f"Invalid expression: {e}") from e
+    _validate(tree, allowed_methods=SAFE_METHODS, allow_statements=False)
+    tree = ast.fix_missing_locations(_RepetitionGuard().visit(tree))
+    return compile(tree, "<expression>", "eval")
+
+
+@_cached_compile
+def _compile_statements(code: str):
+    try:
+        tree = ast.parse(code.strip(), mode="exec")
+    except SyntaxError as e:
+        raise UnsupportedExpressionError(f"Invalid code: {e}") from e
+    if any(isinstance(node, (ast.FunctionDef, ast.Return)) for node in ast.walk(tree)):
+        raise UnsupportedExpressionError("Only assignments are allowed")
+    _validate(
+        tree, allowed_methods=SAFE_METHODS | MUTATING_METHODS, allow_statements=True
+    )
+    tree = _RepetitionGuard().visit(_AnnotationRemover().visit(tree))
+    return compile(ast.fix_missing_locations(tree), "<manipulation>", "exec")
+
+
+@_cached_compile
+def _compile_function(code: str, entrypoint: str):
+    try:
+        tree = ast.parse(code, mode="exec")
+    except SyntaxError as e:
+        raise UnsupportedExpressionError(f"Invalid code: {e}") from e
+    if len(tree.body) != 1 or not isinstance(tree.body[0], ast.FunctionDef):
+        raise UnsupportedExpressionError("Code must contain only one function")
+    if tree.body[0].name != entrypoint:
+        raise UnsupportedExpressionError(f"Entrypoint `{entrypoint}` is not defined")
+    _validate(
+        tree,
+        allowed_methods=SAFE_METHODS,
+        allow_statements=True,
+        assign_names_only=True,
+    )
+    tree = _RepetitionGuard().visit(_AnnotationRemover().visit(tree))
+    return compile(ast.fix_missing_locations(tree), "<function>", "exec")
+
+
+def _restricted_globals(names: dict[str, Any] | None = None) -> dict[str, Any]:
+    return {
+        "__builtins__": SAFE_BUILTINS,
+        **(names or {}),
+        "__multiply__": _multiply,
+        "__modulo__": _modulo,
+    }
+
+
+def _to_json_compatible(value: Any) -> Any:
+    # The sandbox returns results through json, keep the same semantics
+    try:
+        return json.loads(json.dumps(value))
+    except (TypeError, ValueError) as e:
+        raise ExpressionEvaluationError(f"Result is not JSON serializable: {e}") from e
+
+
+class ExpressionEngine:
+    """
+    Restricted in-process evaluator for pure Python expressions over `variables`.
+
+    Code is parsed once, checked against a whitelist of AST nodes, builtins and
+    methods, and compiled. Code that does not qualify (imports, loops,
+    comprehensions, unknown calls, dunder access, ...) raises
+    `UnsupportedExpressionError`, so the caller can fall back to the sandbox.
+    Evaluation raises it as well if `*` would build a sequence longer than
+    `MAX_REPETITION_LENGTH` or if `%` formats a string.
+    """
+
+    def evaluate_expression(self, expression: str, names: dict[str, Any]) -> Any:
+        """
+        Evaluate a single expression, e.g. `variables.count > 2`.
+        Raises:
+            UnsupportedExpressionError: If expression can not be evaluated in-process.
+            ExpressionEvaluationError: If evaluation raised an error.
+        """
+        compiled = _compile_expression(expression)
+        try:
+            return eval(compiled, _restricted_globals(names))
+        except UnsupportedExpressionError:
+            raise
+        except Exception as e:
+            raise ExpressionEvaluationError(f"{type(e).__name__}: {e}") from e
+
+    def execute_statements(self, code: str, names: dict[str, Any]) -> dict[str, Any]:
+        """
+        Execute assignments, e.g. `variables.count = variables.count + 1`,
+        and return the namespace after execution.
+        """
+        compiled = _compile_statements(code)
+        namespace = _restricted_globals(names)
+        try:
+            exec(compiled, namespace)
+        except UnsupportedExpressionError:
+            raise
+        except Exception as e:
+            raise ExpressionEvaluationError(f"{type(e).__name__}: {e}") from e
+        return namespace
+
+    def compile_function(self, code: str, entrypoint: str) -> Callable[..., Any]:
+        """
+        Check that `code` defines only a pure `entrypoint` function and return a callable
+        taking `inputs` and `global_kwargs` the same way `RunPythonCodeService.run_code` does.
+        """
+        compiled = _compile_function(code, entrypoint)
+
+        def call_function(
+            inputs: dict[str, Any], global_kwargs: dict[str, Any] | None = None
+        ) -> Any:
+            namespace = _restricted_globals(global_kwargs)
+            try:
+                exec(compiled, namespace)
+                # inputs are wrapped into DotObject in the sandbox too
+                result = namespace[entrypoint](
+                    **{key: DotObject(value) for key, value in inputs.items()}
+                )
+            except UnsupportedExpressionError:
+                raise
+            except Exception as e:
+                raise ExpressionEvaluationError(f"{type(e).__name__}: {e}") from e
+            return _to_json_compatible(result)
+
+        return call_function
+
+    def is_supported_expression(self, expression: str) -> bool:
+        try:
+            _compile_expression(expression)
+        except UnsupportedExpressionError:
+            return False
+        return True
+
+    def is_supported_statements(self, code: str) -> bool:
+        try:
+            _compile_statements(code)
+        except UnsupportedExpressionError:
+            return False
+        return True
+
+    def is_supported_function(self, code: str, entrypoint: str) -> bool:
+        try:
+            _compile_function(code, entrypoint)
+        except UnsupportedExpressionError:
+            return False
+        return True
@@ -1,6 +1,9 @@
 import json
 
-from langgraph.graph import StateGraph
+from loguru import logger
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import END, StateGraph
 from langgraph.graph.state import CompiledStateGraph
 from langgraph.types import StreamWriter
 
@@ -18,6 +21,12 @@ from src.crew.services.graph.nodes.llm_node import LLMNode
 from src.crew.services.graph.nodes.webhook_trigger_node import WebhookTriggerNode
 from src.crew.services.graph.nodes.telegram_trigger_node import TelegramTriggerNode
 from src.crew.services.graph.events import StopEvent
+from src.crew.services.graph.branch_state import fork_state, make_state_update
+from src.crew.services.graph.session_capacity import SessionSlot
+from src.crew.services.graph.expression_engine import (
+    ExpressionEngine,
+    UnsupportedExpressionError,
+)
 from src.crew.services.graph.subgraphs.decision_table_node import (
     DecisionTableNodeSubgraph,
 )
@@ -46,6 +55,7 @@ from models.request_models import (
 )
 from src.crew.services.run_python_code_service import RunPythonCodeService
 from src.crew.services.knowledge_search_service import KnowledgeSearchService
+from src.crew.services.llm_response_cache import LLMResponseCache
 
 from src.crew.utils import map_variables_to_input
 
@@ -63,6 +73,8 @@ class SessionGraphBuilder:
         crewai_output_channel: str,
         knowledge_search_service: KnowledgeSearchService,
         stop_event: StopEvent,
+        checkpointer: BaseCheckpointSaver | None = None,
+        session_slot: SessionSlot | None = None,
     ):
         """
         Initializes the SessionGraphBuilder with the required services and session details.
@@ -73,6 +85,9 @@ class SessionGraphBuilder:
             crew_parser_service (CrewParserService): The service responsible for parsing crew data.
             python_code_executor_service (RunPythonCodeService): The service responsible for executing Python code.
             crewai_output_channel (str): The output channel for CrewAI communications.
+            checkpointer (BaseCheckpointSaver | None): Saver used to persist the graph state
+                after every step so the session can be resumed.
+            session_slot (SessionSlot | None): Slot released while the session waits for user input.
         """
 
         self.session_id = session_id
@@ -83,8 +98,13 @@ class SessionGraphBuilder:
         self.knowledge_search_service = knowledge_search_service
 
         self._graph_builder = StateGraph(State)
+        # Plain edges, added to the graph on compile, see `_add_edges`
+        self._edges: list[tuple[str, str]] = []
         self._end_node_result: dict | None = {}
         self.stop_event = stop_event
+        self.expression_engine = ExpressionEngine()
+        self.checkpointer = checkpointer
+        self.session_slot = session_slot
 
     def add_conditional_edges(
         self,
@@ -110,6 +130,17 @@ class SessionGraphBuilder:
         if input_map is None:
             input_map = {}
 
+        # Pure functions without libraries are evaluated in-process
+        in_process_function = None
+        if not python_code_data.libraries:
+            try:
+                in_process_function = self.expression_engine.compile_function(
+                    code=python_code_data.code,
+                    entrypoint=python_code_data.entrypoint,
+                )
+            except UnsupportedExpressionError as e:
+                logger.debug(f"Conditional edge from {from_node} uses sandbox: {e}")
+
         # name = f"{from_node}_conditional_edge"
         # @psutil_wrapper
         async def inner_decision_function(state: State):
@@ -122,16 +153,30 @@ class SessionGraphBuilder:
                 },
             }
 
-            python_code_execution_data = (
-                await self.python_code_executor_service.run_code(
-                    python_code_data=python_code_data,
-                    inputs=input_,
-                    stop_event=self.stop_event,
-                    additional_global_kwargs=additional_global_kwargs,
+            run_in_sandbox = in_process_function is None
+            if in_process_function is not None:
+                try:
+                    result = in_process_function(
+                        inputs=input_,
+                        global_kwargs={
+                            **(python_code_data.global_kwargs or {}),
+                            **additional_global_kwargs,
+                        },
+                    )
+                except UnsupportedExpressionError as e:
+                    logger.debug(f"Conditional edge from {from_node} uses sandbox: {e}")
+                    run_in_sandbox = True
+            if run_in_sandbox:
+                python_code_execution_data = (
+                    await self.python_code_executor_service.run_code(
+                        python_code_data=python_code_data,
+                        inputs=input_,
+                        stop_event=self.stop_event,
+                        additional_global_kwargs=additional_global_kwargs,
+                    )
                 )
-            )
 
-            result = json.loads(python_code_execution_data["result_data"])
+                result = json.loads(python_code_execution_data["result_data"])
 
             assert isinstance(
                 result, str
@@ -145,16 +190,83 @@ class SessionGraphBuilder:
         )
 
     def add_edge(self, start_key: str, end_key: str):
-        self._graph_builder.add_edge(start_key, end_key)
+        self._edges.append((start_key, end_key))
+
+    @staticmethod
+    def _reachable(start: str, edges: dict[str, list[str]]) -> set[str]:
+        reached, pending = {start}, [start]
+        while pending:
+            for key in edges.get(pending.pop(), ()):
+                if key not in reached:
+                    reached.add(key)
+                    pending.append(key)
+        return reached
+
+    def _is_join(
+        self,
+        node_name: str,
+        start_keys: list[str],
+        successors: dict[str, list[str]],
+        predecessors: dict[str, list[str]],
+    ) -> bool:
+        """
+        Whether `start_keys` are parallel branches meeting at `node_name`: all of them
+        follow one fan-out node through plain edges and none of them follows
+        `node_name`, i.e. closes a loop. Branches chosen by conditional edges never
+        run together, so they are not joined.
+        """
+        if node_name == END:
+            return False
+        if not self._reachable(node_name, successors).isdisjoint(start_keys):
+            return False
+        common_ancestors = set.intersection(
+            *(self._reachable(key, predecessors) for key in start_keys)
+        )
+        return any(len(successors.get(key, ())) > 1 for key in common_ancestors)
+
+    def _add_edges(self):
+        """
+        Add plain edges to the graph. A join node after parallel branches gets one
+        waiting edge from all of them, so it runs once after the last branch, also
+        when the branches take a different number of steps.
+        """
+        successors: dict[str, list[str]] = {}
+        predecessors: dict[str, list[str]] = {}
+        for start_key, end_key in self._edges:
+            successors.setdefault(start_key, []).append(end_key)
+            predecessors.setdefault(end_key, []).append(start_key)
+
+        for end_key, start_keys in predecessors.items():
+            if len(start_keys) > 1 and self._is_join(
+                end_key, start_keys, successors, predecessors
+            ):
+                self._graph_builder.add_edge(start_keys, end_key)
+            else:
+                for start_key in start_keys:
+                    self._graph_builder.add_edge(start_key, end_key)
 
     def set_entrypoint(self, node_name: str):
         self._graph_builder.set_entry_point(node_name)
 
+    def _add_branch_node(self, node_name: str, run):
+        """
+        Add a node that works on its own copy of the state and returns only its changes.
+
+        Branches after a fan-out run in the same LangGraph step, their updates are
+        merged by the reducers of `State`.
+        """
+
+        async def inner(state: State, writer: StreamWriter, config: RunnableConfig):
+            result = await run(fork_state(state), writer, config)
+            return make_state_update(base=state, result=result)
+
+        self._graph_builder.add_node(node_name, inner)
+
     def add_node(self, node: BaseNode):
-        async def inner(state: State, writer: StreamWriter):
+        async def run(state: State, writer: StreamWriter, config: RunnableConfig):
             return await node.run(state, writer)
 
-        self._graph_builder.add_node(node.node_name, inner)
+        self._add_branch_node(node.node_name, run)
 
     def add_decision_table_node(
         self, decision_table_node_data: DecisionTableNodeData
@@ -173,10 +285,14 @@ class SessionGraphBuilder:
             graph_builder=subgraph_builder,
             stop_event=self.stop_event,
             run_code_execution_service=self.python_code_executor_service,
+            expression_engine=self.expression_engine,
         )
         subgraph: CompiledStateGraph = builder.build()
 
-        self._graph_builder.add_node(decision_table_node_data.node_name, subgraph)
+        async def run(state: State, writer: StreamWriter, config: RunnableConfig):
+            return await subgraph.ainvoke(state, config)
+
+        self._add_branch_node(decision_table_node_data.node_name, run)
 
         async def condition(state: State, writer: StreamWriter):
             decision_node_variables = state["system_variables"]["nodes"][
@@ -206,10 +322,10 @@ class SessionGraphBuilder:
             stop_event=stop_event,
         )
 
-        async def inner(state: State, writer: StreamWriter):
+        async def run(state: State, writer: StreamWriter, config: RunnableConfig):
             return await builder.run(state, writer)
 
-        self._graph_builder.add_node(subgraph_node_data.node_name, inner)
+        self._add_branch_node(subgraph_node_data.node_name, run)
 
     @property
     def end_node_result(self):
@@ -224,8 +340,8 @@ class SessionGraphBuilder:
         self._end_node_result = value
 
     def compile(self) -> CompiledStateGraph:
-        # checkpointer = MemorySaver()
-        return self._graph_builder.compile()  # checkpointer=checkpointer
+        self._add_edges()
+        return self._graph_builder.compile(checkpointer=self.checkpointer)
 
     def compile_from_schema(self, session_data: SessionData) -> CompiledStateGraph:
         """
@@ -259,6 +375,7 @@ class SessionGraphBuilder:
                 output_variable_path=crew_node_data.output_variable_path,
                 knowledge_search_service=self.knowledge_search_service,
                 stop_event=self.stop_event,
+                session_slot=self.session_slot,
             )
             self.add_node(crew_node)
 
@@ -304,6 +421,9 @@ class SessionGraphBuilder:
                 input_map=llm_node_data.input_map,
                 output_variable_path=llm_node_data.output_variable_path,
                 stop_event=self.stop_event,
+                response_cache=LLMResponseCache(
+                    redis_service=self.redis_service
+                ).for_llm(llm_node_data.llm_data),
             )
             self.add_node(llm_node)
 
@@ -7,12 +7,28 @@ import asyncio
 
 from loguru import logger
 from dotdict import DotDict
+from langgraph.checkpoint.base import BaseCheckpointSaver
 
 from src.crew.services.graph.events import StopEvent
 from src.crew.services.graph.exceptions import StopSession
 from src.crew.services.crew.crew_parser_service import CrewParserService
 from src.crew.services.redis_service import AsyncPubsubSubscriber, RedisService
 from src.crew.services.graph.graph_builder import SessionGraphBuilder
+from src.crew.services.graph.session_capacity import SessionCapacityLimiter
+from src.crew.services.graph.session_dispatcher import (
+    claim_session,
+    session_owner_key,
+    session_queue_key,
+    worker_channel,
+)
+from src.crew.services.graph.session_scheduler import (
+    PRIORITY_CLASSES,
+    ScheduledSession,
+    SessionScheduler,
+)
+from src.crew.services.graph.token_stream import token_stream_metrics
+from src.crew.services.crew.tool_result_cache import tool_cache_metrics
+from src.crew.services.llm_response_cache import llm_cache_metrics
 from src.crew.services.run_python_code_service import RunPythonCodeService
 from src.crew.services.knowledge_search_service import KnowledgeSearchService
 
@@ -21,6 +37,12 @@ from src.crew.utils.singleton_meta import SingletonMeta
 from src.crew.models.request_models import SessionData, StopSessionMessage
 from src.crew.models.graph_models import GraphMessage
 
+# Hash of session id -> SessionData JSON for sessions that have not finished yet
+ACTIVE_SESSIONS_KEY = "sessions:active"
+SCHEDULER_METRICS_KEY = "sessions:scheduler_metrics"
+# Seconds a worker waits before checking for free slots again
+CLAIM_POLL_INTERVAL = 0.05
+
 
 @dataclass
 class SessionCoroItem:
@@ -40,6 +62,11 @@ class GraphSessionManagerService(metaclass=SingletonMeta):
         stop_session_channel: str,
         knowledge_search_service: KnowledgeSearchService,
         max_concurrent_sessions: int = 20,
+        checkpointer: BaseCheckpointSaver | None = None,
+        session_class_limits: dict[str, int | None] | None = None,
+        metrics_interval: float = 10,
+        worker_id: int | None = None,
+        workers: int = 1,
     ):
         """
         Initializes the GraphSessionManagerService with the required services and configuration.
@@ -50,6 +77,17 @@ class GraphSessionManagerService(metaclass=SingletonMeta):
             python_code_executor_service (RunPythonCodeService): The service responsible for executing Python code.
             session_schema_channel (str): The Redis channel for listening to session schema messages.
             crewai_output_channel (str): The Redis channel for publishing CrewAI output messages.
+            max_concurrent_sessions (int): Maximum number of sessions running at once.
+                Sessions waiting for user input do not count.
+            checkpointer (BaseCheckpointSaver | None): Saver for graph checkpoints. If set,
+                unfinished sessions are resumed from their last checkpoint on startup.
+            session_class_limits (dict[str, int | None] | None): Maximum number of running
+                sessions per priority class (interactive, webhook, batch).
+            metrics_interval (float): Seconds between scheduler metrics updates in Redis.
+            worker_id (int | None): Id of this worker process when sessions are sharded
+                between processes by `SessionDispatcher`. Sessions are then claimed from
+                the shared queue instead of the session channels.
+            workers (int): Number of worker processes.
         """
 
         self.redis_service = redis_service
@@ -61,17 +99,102 @@ class GraphSessionManagerService(metaclass=SingletonMeta):
         self.stop_session_channel = stop_session_channel
         self.knowledge_search_service = knowledge_search_service
         self.session_graph_pool: dict[int, SessionCoroItem] = {}
-        self.session_queue = asyncio.Queue()
+        self.scheduler = SessionScheduler(class_limits=session_class_limits)
+        self.metrics_interval = metrics_interval
         self._worker_task: asyncio.Task | None = None
-        self._semaphore = asyncio.Semaphore(max_concurrent_sessions)
+        self.capacity_limiter = SessionCapacityLimiter(max_concurrent_sessions)
+        self.checkpointer = checkpointer
+        self.worker_id = worker_id
+        self.workers = workers
         self.counter = 0
 
     def start(self):
-        self._listener_task = asyncio.create_task(self._listen_to_channels())
+        if self.worker_id is None:
+            self._listener_task = asyncio.create_task(self._listen_to_channels())
+        else:
+            self._listener_task = asyncio.create_task(self._listen_to_worker_channel())
+            self._claim_task = asyncio.create_task(self._claim_sessions())
         self._worker_task = asyncio.create_task(self._session_worker())
+        self._metrics_task = asyncio.create_task(self._report_metrics())
+        if self.checkpointer is not None:
+            self._resume_task = asyncio.create_task(self._resume_sessions())
         logger.info("Session Manager Service is now running.")
 
-    async def run_session(self, session_data: SessionData, stop_event: StopEvent):
+    async def _resume_sessions(self):
+        """
+        Enqueue sessions left unfinished by a previous run of the service.
+        """
+        active_sessions = await self.redis_service.aioredis_client.hgetall(
+            ACTIVE_SESSIONS_KEY
+        )
+        for session_id, data in active_sessions.items():
+            if not await self._owns_resumed_session(int(session_id)):
+                continue
+            try:
+                session_data = SessionData.model_validate_json(data)
+            except Exception:
+                logger.exception("Failed to restore session data")
+                continue
+
+            logger.info(f"Resuming session {session_data.id} from checkpoint")
+            await self._enqueue_session(session_data, resume=True)
+
+    async def _owns_resumed_session(self, session_id: int) -> bool:
+        """
+        Whether this worker resumes the session. A worker resumes the sessions it
+        owned and adopts sessions of workers that no longer exist.
+        """
+        if self.worker_id is None:
+            return True
+
+        owner_key = session_owner_key(session_id)
+        owner = await self.redis_service.aioredis_client.get(owner_key)
+        if owner is not None and owner.isdigit() and int(owner) < self.workers:
+            return int(owner) == self.worker_id
+        if session_id % self.workers != self.worker_id:
+            return False
+
+        await self.redis_service.aioredis_client.set(owner_key, self.worker_id)
+        return True
+
+    async def _release_ownership(self, session_id: int):
+        if self.worker_id is None:
+            return
+        await self.redis_service.aioredis_client.delete(session_owner_key(session_id))
+
+    async def _remember_session(self, session_id: int, data: str):
+        if self.checkpointer is None:
+            return
+        await self.redis_service.aioredis_client.hset(
+            ACTIVE_SESSIONS_KEY, str(session_id), data
+        )
+
+    async def _forget_session(self, session_id: int):
+        """
+        Remove the stored data and checkpoints of a session that can not be resumed anymore.
+        """
+        if self.checkpointer is None:
+            return
+        try:
+            await self.redis_service.aioredis_client.hdel(
+                ACTIVE_SESSIONS_KEY, str(session_id)
+            )
+            await self.checkpointer.adelete_thread(str(session_id))
+        except Exception:
+            logger.exception(f"Failed to delete checkpoints of session {session_id}")
+
+    async def _discard_queued_session(self, session_id: int):
+        """
+        Forget a session removed from the scheduler before it started. It never
+        runs, so run_session does not do it and it would be resumed after a restart.
+        """
+        await self._forget_session(session_id)
+        await self._release_ownership(session_id)
+
+    async def run_session(
+        self, session_data: SessionData, stop_event: StopEvent, resume: bool = False
+    ):
+        finished = True
         try:
             session_id = session_data.id
             initial_state = session_data.initial_state
@@ -84,6 +207,8 @@ class GraphSessionManagerService(metaclass=SingletonMeta):
                 crewai_output_channel=self.crewai_output_channel,
                 knowledge_search_service=self.knowledge_search_service,
                 stop_event=stop_event,
+                checkpointer=self.checkpointer,
+                session_slot=self.capacity_limiter.slot(session_id),
             )
 
             graph = session_graph_builder.compile_from_schema(session_data=session_data)
@@ -92,14 +217,31 @@ class GraphSessionManagerService(metaclass=SingletonMeta):
                 "variables": DotDict(initial_state),
                 "system_variables": {"nodes": {}},
             }
+            # TODO: change hardcoded recursion limit
+            config = {
+                "recursion_limit": 1000,
+                "configurable": {"thread_id": str(session_id)},
+            }
+            if resume:
+                snapshot = await graph.aget_state(config)
+                if snapshot.next:
+                    # Continue from the last checkpoint, pending nodes run again
+                    logger.info(f"Session {session_id} resumes at {snapshot.next}")
+                    state = None
+                else:
+                    # Nothing to resume, reducers would merge the fresh input
+                    # into the old checkpoint, so the session starts over
+                    logger.info(f"Session {session_id} has nothing to resume")
+                    await self.checkpointer.adelete_thread(str(session_id))
+
             await self.redis_service.aupdate_session_status(
                 session_id=session_id, status="run"
             )
             async for stream_mode, chunk in graph.astream(
                 input=state,
-                config={"recursion_limit": 1000},
+                config=config,
                 stream_mode=["values", "custom"],
-            ):  # TODO: change hardcoded recursion limit
+            ):
                 if stream_mode == "custom":
                     data = asdict(chunk)
                     assert isinstance(data, dict), "custom chunk must be a dict"
@@ -137,6 +279,8 @@ class GraphSessionManagerService(metaclass=SingletonMeta):
         except asyncio.CancelledError:
             # Status updated in _handle_session_timeout
             logger.warning(f"Session {session_id} was cancelled")
+            # Keep checkpoints, the session is resumed on the next start
+            finished = False
         except StopSession:
             await self.redis_service.aupdate_session_status(
                 session_id=session_id, status=stop_event.status
@@ -162,6 +306,10 @@ class GraphSessionManagerService(metaclass=SingletonMeta):
             graph_end_message_data["uuid"] = str(uuid.uuid4())
 
             self.redis_service.publish("graph:messages", graph_end_message_data)
+            if finished:
+                await self._forget_session(session_id)
+                # Cancelled sessions keep their owner and are resumed by the same worker
+                await self._release_ownership(session_id)
 
     async def _listen_callback(self, message: dict[str, Any]):
         try:
@@ -194,20 +342,81 @@ class GraphSessionManagerService(metaclass=SingletonMeta):
             subscriber=subscriber,
         )
 
+    async def _listen_to_worker_channel(self):
+        subscriber = AsyncPubsubSubscriber(self._worker_channel_callback)
+        await self.redis_service.asubscribe(
+            worker_channel(self.worker_id), subscriber=subscriber
+        )
+
+    async def _worker_channel_callback(self, message: dict[str, Any]):
+        """Handle a message forwarded by `SessionDispatcher`."""
+        try:
+            forwarded = json.loads(message["data"])
+        except Exception:
+            logger.exception(f"Invalid message in {message['channel']}")
+            return
+        await self._listen_callback(forwarded)
+
+    async def _claim_sessions(self):
+        """
+        Pop sessions from the shared queue while this worker has free slots.
+        Queues are checked in priority order, classes at their cap are skipped.
+        """
+        logger.info(f"Worker {self.worker_id} is claiming sessions")
+        while True:
+            queue_keys = [
+                session_queue_key(priority_class)
+                for priority_class in PRIORITY_CLASSES
+                if self.scheduler.accepts(priority_class)
+            ]
+            busy = self.capacity_limiter.active_sessions + self.scheduler.pending_count
+            if not queue_keys or busy >= self.capacity_limiter.max_active_sessions:
+                await asyncio.sleep(CLAIM_POLL_INTERVAL)
+                continue
+
+            try:
+                item = await self.redis_service.aioredis_client.brpop(
+                    queue_keys, timeout=1
+                )
+                if item is None:
+                    continue
+
+                _, data = item
+                session_id = json.loads(data)["id"]
+                if not await claim_session(
+                    self.redis_service.aioredis_client, session_id, self.worker_id
+                ):
+                    logger.info(f"Session {session_id} was stopped before it started")
+                    continue
+
+                logger.info(f"Worker {self.worker_id} claimed session {session_id}")
+                await self._handle_session_start(data)
+            except Exception:
+                logger.exception("Failed to claim session")
+                await asyncio.sleep(1)
+
     async def _handle_session_start(self, data: str):
         try:
             logger.info(f"Received message from channel {self.session_schema_channel}")
             session_data = SessionData.model_validate_json(data)
-
-            stop_event = StopEvent()
-            coro = self.session_runner(session_data, stop_event)
-            coro_item = SessionCoroItem(coro, stop_event)
-            self.session_graph_pool[session_data.id] = coro_item
-            await self.session_queue.put(session_data.id)
+            await self._remember_session(session_data.id, data)
+            await self._enqueue_session(session_data)
 
         except Exception as e:
             logger.exception(f"Error handling session start: {e}")
 
+    async def _enqueue_session(self, session_data: SessionData, resume: bool = False):
+        stop_event = StopEvent()
+        coro = self.session_runner(session_data, stop_event, resume=resume)
+        coro_item = SessionCoroItem(coro, stop_event)
+        self.session_graph_pool[session_data.id] = coro_item
+        self.scheduler.submit(
+            session_id=session_data.id,
+            priority_class=session_data.priority_class,
+            tenant_key=str(session_data.tenant_id or "default"),
+            flow_key=str(session_data.graph_id or session_data.graph.name),
+        )
+
     async def _handle_session_timeout(self, data: str):
         """
         Handle session timeout message
@@ -224,6 +433,8 @@ class GraphSessionManagerService(metaclass=SingletonMeta):
 
                     # Remove task from pool and cancel
                     session_task = self.session_graph_pool.pop(session_id)
+                    if self.scheduler.remove(session_id):
+                        await self._discard_queued_session(session_id)
 
                     stop_event = session_task.stop_event
                     stop_event.status = "expired"
@@ -243,6 +454,7 @@ class GraphSessionManagerService(metaclass=SingletonMeta):
                     await self.redis_service.aupdate_session_status(
                         session_id=session_id, status="expired"
                     )
+                    await self._forget_session(session_id)
             else:
                 logger.info(f"Handling timeout for session {session_id}")
 
@@ -262,19 +474,24 @@ class GraphSessionManagerService(metaclass=SingletonMeta):
             logger.warning(
                 f"Can not fetch task from session_graph_pool for session ID: {session_id}."
             )
+            await self._forget_session(session_id)
             return
         self.session_graph_pool[session_id].stop_event.set()
         self.session_graph_pool.pop(session_id, None)
+        if self.scheduler.remove(session_id):
+            await self._discard_queued_session(session_id)
 
-    async def session_runner(self, data: SessionData, stop_event: StopEvent):
-        async with self._semaphore:
-            logger.info(f"Acquired semaphore for session {data.id}")
-            await self.run_session(data, stop_event)
-            self.counter += 1
-            logger.debug(f"Tasks executed: {self.counter}")
+    async def session_runner(
+        self, data: SessionData, stop_event: StopEvent, resume: bool = False
+    ):
+        await self.run_session(data, stop_event, resume=resume)
+        self.counter += 1
+        logger.debug(f"Tasks executed: {self.counter}")
 
-    def create_callback(self, sid):
+    def create_callback(self, sid, scheduled: ScheduledSession):
         def remove_task_from_pool(completed_task):
+            self.capacity_limiter.finish(sid)
+            self.scheduler.release(scheduled)
             if sid not in self.session_graph_pool:
                 logger.warning(f"Task for session {sid} is not in pool")
                 return
@@ -287,15 +504,45 @@ class GraphSessionManagerService(metaclass=SingletonMeta):
     async def _session_worker(self):
         logger.info("Session worker started")
         while True:
-            session_id: int = await self.session_queue.get()
+            await self.scheduler.wait_for_candidate()
+            await self.capacity_limiter.acquire()
+
+            # Choose after the slot is free, sessions may arrive while waiting
+            scheduled = self.scheduler.pop_next()
+            if scheduled is None:
+                self.capacity_limiter.release()
+                continue
+
+            session_id = scheduled.session_id
             session_coro_item: SessionCoroItem = self.session_graph_pool.get(session_id)
             if session_coro_item is None:
                 logger.warning(f"Session {session_id} was removed before it started")
+                self.capacity_limiter.release()
+                self.scheduler.release(scheduled)
                 continue
 
             logger.info(f"Dequeued session {session_id}")
 
             task = asyncio.create_task(session_coro_item.coro)
 
-            task.add_done_callback(self.create_callback(session_id))
-            self.session_queue.task_done()
+            task.add_done_callback(self.create_callback(session_id, scheduled))
+
+    def get_metrics(self) -> dict:
+        return {
+            "active_sessions": self.capacity_limiter.active_sessions,
+            "suspended_sessions": len(self.capacity_limiter.suspended_sessions),
+            "classes": self.scheduler.metrics(),
+            "llm_streams": token_stream_metrics.to_dict(),
+            "tool_cache": tool_cache_metrics.to_dict(),
+            "llm_cache": llm_cache_metrics.to_dict(),
+        }
+
+    async def _report_metrics(self):
+        while True:
+            await asyncio.sleep(self.metrics_interval)
+            try:
+                await self.redis_service.aioredis_client.set(
+                    SCHEDULER_METRICS_KEY, json.dumps(self.get_metrics())
+                )
+            except Exception:
+                logger.exception("Failed to report scheduler metrics")
@@ -4,10 +4,12 @@ import copy
 from langgraph.types import StreamWriter
 from src.crew.services.graph.events import StopEvent
 from src.crew.services.graph.custom_message_writer import CustomSessionMessageWriter
+from src.crew.services.graph.state_history import snapshot_variables
 from src.crew.models.state import State
 
 from src.crew.utils import map_variables_to_input
 from src.crew.utils import set_output_variables
+from src.crew.utils import next_execution_order
 
 
 class BaseNode(ABC):
@@ -41,19 +43,22 @@ class BaseNode(ABC):
 
     def _calc_execution_order(self, state: State, name: str) -> int:
         """
-        Calculate the number of times the node with the given name has been executed.
+        Calculate the number of times the node with the given name has been executed
+        and count the current execution.
+
+        The counter is stored in `state["system_variables"]["nodes"][name]`, so this
+        takes constant time regardless of the length of the state history.
 
         Args:
             state (State): The current state.
             name (str): The name of the node.
 
         Returns:
-            int: The number of times the node has been executed.
+            int: The number of times the node has been executed before.
         """
-        state_history = state.get("state_history", None)
-        if not state_history:
-            return 0
-        return sum(1 for item in state.get("state_history") if item["name"] == name)
+        if state.get("system_variables") is None:
+            state["system_variables"] = {}
+        return next_execution_order(state["system_variables"], name)
 
     def add_start_message(
         self, writer: StreamWriter, input_: Any, execution_order: int
@@ -93,7 +98,7 @@ class BaseNode(ABC):
             **kwargs: Additional data to include in the finish message.
 
         This function creates a finish message containing the node's output,
-        current state variables, and state history. It also includes any
+        current state variables, and the state history delta. It also includes any
         additional data passed as keyword arguments. The message is then
         written using the provided stream writer.
         """
@@ -223,18 +228,22 @@ class BaseNode(ABC):
         This function appends a new entry to the state's history, capturing the
         type, name, input, output, and any additional data. It deep copies the
         input, output, and additional data to ensure that the history reflects
-        the state at the time of execution.
+        the state at the time of execution. Variables are stored as a snapshot
+        that shares unchanged values with the previous history item.
         """
 
         variables = state["variables"]
         state_history = state["state_history"]
+        previous_variables = state_history[-1]["variables"] if state_history else None
         state_history.append(
             {
                 "type": type,
                 "name": name,
                 "additional_data": copy.deepcopy(kwargs),
                 "input": copy.deepcopy(input),
-                "variables": copy.deepcopy(variables.model_dump()),
+                "variables": snapshot_variables(
+                    variables.model_dump(), previous=previous_variables
+                ),
                 "output": copy.deepcopy(output),
             }
         )
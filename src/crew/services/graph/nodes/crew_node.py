@@ -8,6 +8,7 @@ from src.crew.callbacks.session_callback_factory import CrewCallbackFactory
 from src.crew.services.crew.crew_parser_service import CrewParserService
 from src.crew.services.graph.events import StopEvent
 from src.crew.services.graph.nodes import BaseNode
+from src.crew.services.graph.session_capacity import SessionSlot
 from src.crew.services.redis_service import RedisService
 from src.crew.services.knowledge_search_service import KnowledgeSearchService
 from src.crew.models.request_models import CrewData
@@ -30,6 +31,7 @@ class CrewNode(BaseNode):
         input_map: dict,
         output_variable_path: str,
         knowledge_search_service: KnowledgeSearchService,
+        session_slot: SessionSlot | None = None,
     ):
         super().__init__(
             session_id=session_id,
@@ -43,6 +45,7 @@ class CrewNode(BaseNode):
         self.crewai_output_channel = crewai_output_channel
         self.crew_parser_service = crew_parser_service
         self.knowledge_search_service = knowledge_search_service
+        self.session_slot = session_slot
 
     async def execute(
         self, state: State, writer: StreamWriter, execution_order: int, input_: Any
@@ -56,6 +59,7 @@ class CrewNode(BaseNode):
             crewai_output_channel=self.crewai_output_channel,
             stream_writer=writer,
             knowledge_search_service=self.knowledge_search_service,
+            session_slot=self.session_slot,
         )
 
         gloabl_kwargs = {
@@ -86,6 +90,8 @@ class CrewNode(BaseNode):
                 "prompt_tokens": crew_output.token_usage.prompt_tokens,
                 "completion_tokens": crew_output.token_usage.completion_tokens,
                 "successful_requests": crew_output.token_usage.successful_requests,
+                "saved_tokens": crew_output.token_usage.saved_tokens,
+                "cached_responses": crew_output.token_usage.cached_responses,
             }
 
             logger.info(f"Crew {self.node_name} token usage: {token_usage}")
@@ -11,6 +11,8 @@ from src.crew.models.graph_models import LLMMessageData, GraphMessage
 from src.crew.models.state import State
 from src.crew.services.graph.events import StopEvent
 from src.crew.services.graph.nodes import BaseNode
+from src.crew.services.graph.token_stream import TokenStream
+from src.crew.services.llm_response_cache import LLMResponseCacheClient
 
 
 class LLMNode(BaseNode):
@@ -24,6 +26,7 @@ class LLMNode(BaseNode):
         llm_data: LLMData,
         input_map: dict,
         output_variable_path: str,
+        response_cache: LLMResponseCacheClient | None = None,
     ):
         super().__init__(
             session_id=session_id,
@@ -52,8 +55,9 @@ class LLMNode(BaseNode):
             "base_url": llm_config.base_url,
             "api_version": llm_config.api_version,
             "api_key": llm_config.api_key,
-            "stream": False,
+            "stream": True,
         }
+        self.response_cache = response_cache
 
     async def execute(
         self, state: State, writer: StreamWriter, input_: Any, execution_order: int
@@ -61,13 +65,58 @@ class LLMNode(BaseNode):
         message = {"role": "user", "content": input_["query"]}
         params = {**self.params, "messages": [message]}
 
-        model_response: ModelResponse = await litellm.acompletion(**params)
-        response_message: StopIteration = cast(
-            Choices, cast(ModelResponse, model_response).choices
-        )[0].message.content
+        token_stream = TokenStream(
+            session_id=self.session_id,
+            node_name=self.node_name,
+            execution_order=execution_order,
+            writer=writer,
+        )
+        cached = None
+        if self.response_cache is not None:
+            cached = await self.response_cache.aget(params)
+
+        if cached is not None:
+            response_message = cached["response"]
+            token_stream.add_cached(response_message)
+            token_stream.close()
+            token_usage = {
+                "total_tokens": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "successful_requests": 0,
+                "saved_tokens": cached["usage"].get("total_tokens", 0),
+                "cached_responses": 1,
+            }
+        else:
+            chunks = []
+            try:
+                async for chunk in await litellm.acompletion(**params):
+                    self.stop_event.check_stop()
+                    chunks.append(chunk)
+                    if chunk.choices:
+                        token_stream.add(chunk.choices[0].delta.content or "")
+            finally:
+                token_stream.close()
+
+            # Assemble the full response like a non-streamed completion
+            model_response = litellm.stream_chunk_builder(chunks, messages=[message])
+            response_message: StopIteration = cast(
+                Choices, cast(ModelResponse, model_response).choices
+            )[0].message.content
+            usage = getattr(model_response, "usage", None)
+            token_usage = {
+                "total_tokens": getattr(usage, "total_tokens", 0) or 0,
+                "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+                "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+                "successful_requests": 1,
+            }
+            if self.response_cache is not None:
+                await self.response_cache.aset(params, response_message, usage)
 
         llm_message_data = LLMMessageData(
             response=response_message,
+            time_to_first_token=token_stream.time_to_first_token,
+            token_usage=token_usage,
         )
         graph_message = GraphMessage(
             session_id=self.session_id,
@@ -0,0 +1,639 @@
+import base64
+from typing import Any, AsyncIterator, Iterator, Sequence
+
+import ormsgpack
+from dotdict import DotDict, DotList
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.jsonplus import (
+    JsonPlusSerializer,
+    _msgpack_default,
+    _msgpack_ext_hook,
+    _option,
+)
+
+from src.crew.services.graph.state_history import (
+    make_state_history_delta,
+    reconstruct_state_history,
+)
+from src.crew.services.redis_service import RedisService
+
+
+EXT_DOTDICT = 100
+
+# Subclasses of builtin types go to `_default` instead of being packed as the base type
+_OPTION = _option | ormsgpack.OPT_PASSTHROUGH_SUBCLASS
+
+
+def _pack(obj: Any) -> bytes:
+    return ormsgpack.packb(obj, default=_default, option=_OPTION)
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, DotDict):
+        # Values together with the code of properties and setters
+        return ormsgpack.Ext(EXT_DOTDICT, _pack(obj.__reduce__()[1][0]))
+    if isinstance(obj, DotList):
+        return list(obj)
+    try:
+        return _msgpack_default(obj)
+    except TypeError:
+        for type_ in (dict, list, tuple, str, int, float):
+            if isinstance(obj, type_):
+                return type_(obj)
+        raise
+
+
+def _ext_hook(code: int, data: bytes) -> Any:
+    if code == EXT_DOTDICT:
+        return DotDict(
+            ormsgpack.unpackb(
+                data, ext_hook=_ext_hook, option=ormsgpack.OPT_NON_STR_KEYS
+            )
+        )
+    return _msgpack_ext_hook(code, data)
+
+
+class CheckpointSerializer(JsonPlusSerializer):
+    """
+    Serializer for checkpoints stored in Redis.
+
+    LangGraph's msgpack serializer packs dict subclasses as plain dicts, so graph
+    state would lose its `DotDict` variables. They are packed as an extension type
+    instead. Checkpoints are never unpickled, Redis is shared with other services.
+    """
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        if obj is None or isinstance(obj, (bytes, bytearray)):
+            return super().dumps_typed(obj)
+        try:
+            return "msgpack", _pack(obj)
+        except ormsgpack.MsgpackEncodeError:
+            return super().dumps_typed(obj)
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_ == "msgpack":
+            return ormsgpack.unpackb(
+                payload, ext_hook=_ext_hook, option=ormsgpack.OPT_NON_STR_KEYS
+            )
+        return super().loads_typed(data)
+
+
+class RedisCheckpointSaver(BaseCheckpointSaver):
+    """
+    LangGraph checkpointer storing session checkpoints in Redis.
+
+    Keys (`thread_id` is the session id):
+        checkpoint_namespaces:{thread_id}             set of checkpoint namespaces
+        checkpoints:{thread_id}:{ns}                  sorted set of checkpoint ids
+        checkpoint:{thread_id}:{ns}:{id}              hash with checkpoint and metadata
+        checkpoint_writes:{thread_id}:{ns}:{id}       hash with pending writes
+        checkpoint_history:{thread_id}:{ns}           list of state history deltas
+
+    Checkpoints do not contain `state_history`, it grows with every step and would
+    make the bytes written quadratic in the number of steps. Only the new items are
+    appended to the history list as deltas (see `make_state_history_delta`), a
+    checkpoint stores the length of its history and rebuilds it on load.
+    The history of a thread is expected to only grow. If the last stored item
+    differs from the one in a new checkpoint, the list is written again.
+
+    Checkpoint ids are uuid6 and sort lexicographically in creation order, so all
+    of them are stored with score 0 and ordered by value.
+
+    Sessions are only resumed from their latest checkpoint, so a put removes the
+    checkpoints of the namespace older than the parent of the new one together
+    with their writes. The parent is kept because writes of its tasks may still
+    be stored while the next checkpoint is put.
+    """
+
+    def __init__(self, redis_service: RedisService, ttl: int | None = None):
+        """
+        Args:
+            redis_service (RedisService): Connected Redis service.
+            ttl (int | None): Seconds to keep checkpoints of a session after the
+                last write. Checkpoints never expire if None.
+        """
+        super().__init__(serde=CheckpointSerializer())
+        self.redis_service = redis_service
+        self.ttl = ttl
+
+    @staticmethod
+    def _namespaces_key(thread_id: str) -> str:
+        return f"checkpoint_namespaces:{thread_id}"
+
+    @staticmethod
+    def _checkpoints_key(thread_id: str, checkpoint_ns: str) -> str:
+        return f"checkpoints:{thread_id}:{checkpoint_ns}"
+
+    @staticmethod
+    def _checkpoint_key(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> str:
+        return f"checkpoint:{thread_id}:{checkpoint_ns}:{checkpoint_id}"
+
+    @staticmethod
+    def _writes_key(thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> str:
+        return f"checkpoint_writes:{thread_id}:{checkpoint_ns}:{checkpoint_id}"
+
+    @staticmethod
+    def _history_key(thread_id: str, checkpoint_ns: str) -> str:
+        return f"checkpoint_history:{thread_id}:{checkpoint_ns}"
+
+    @staticmethod
+    def _parse_config(config: RunnableConfig) -> tuple[str, str, str | None]:
+        configurable = config["configurable"]
+        return (
+            str(configurable["thread_id"]),
+            configurable.get("checkpoint_ns", ""),
+            get_checkpoint_id(config),
+        )
+
+    def _dumps(self, obj: Any) -> str:
+        # Clients use `decode_responses`, so values are stored as text
+        type_, data = self.serde.dumps_typed(obj)
+        return f"{type_}:{base64.b64encode(data).decode('ascii')}"
+
+    def _loads(self, data: str) -> Any:
+        type_, payload = data.split(":", 1)
+        return self.serde.loads_typed((type_, base64.b64decode(payload)))
+
+    def _history_commands(
+        self,
+        pipe,
+        config: RunnableConfig,
+        state_history: list[dict],
+        stored_length: int,
+        last_stored: str | None,
+    ):
+        """Append items of `state_history` missing in the stored history list."""
+        thread_id, checkpoint_ns, _ = self._parse_config(config)
+        history_key = self._history_key(thread_id, checkpoint_ns)
+
+        start = stored_length
+        if stored_length > len(state_history) or (
+            stored_length
+            and self._dumps(make_state_history_delta(state_history, stored_length - 1))
+            != last_stored
+        ):
+            # The history was rewritten
+            pipe.delete(history_key)
+            start = 0
+        if start < len(state_history):
+            pipe.rpush(
+                history_key,
+                *(
+                    self._dumps(make_state_history_delta(state_history, index))
+                    for index in range(start, len(state_history))
+                ),
+            )
+        if self.ttl is not None:
+            pipe.expire(history_key, self.ttl)
+
+    def _history_range(
+        self, thread_id: str, checkpoint_ns: str, saved: dict[str, str]
+    ) -> tuple[str, int, int] | None:
+        """Key and index range of the history items of a stored checkpoint."""
+        if "state_history_length" not in saved:
+            return None
+        return (
+            self._history_key(thread_id, checkpoint_ns),
+            0,
+            int(saved["state_history_length"]) - 1,
+        )
+
+    def _put_commands(
+        self,
+        pipe,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+    ) -> RunnableConfig:
+        thread_id, checkpoint_ns, parent_checkpoint_id = self._parse_config(config)
+        checkpoint_id = checkpoint["id"]
+
+        checkpoint_key = self._checkpoint_key(thread_id, checkpoint_ns, checkpoint_id)
+        checkpoints_key = self._checkpoints_key(thread_id, checkpoint_ns)
+        namespaces_key = self._namespaces_key(thread_id)
+
+        mapping = {
+            "metadata": self._dumps(get_checkpoint_metadata(config, metadata)),
+            "parent_checkpoint_id": parent_checkpoint_id or "",
+        }
+        channel_values = checkpoint["channel_values"]
+        if "state_history" in channel_values:
+            mapping["state_history_length"] = len(channel_values["state_history"])
+            checkpoint = {
+                **checkpoint,
+                "channel_values": {
+                    key: value
+                    for key, value in channel_values.items()
+                    if key != "state_history"
+                },
+            }
+        mapping["checkpoint"] = self._dumps(checkpoint)
+        pipe.hset(checkpoint_key, mapping=mapping)
+        pipe.zadd(checkpoints_key, {checkpoint_id: 0})
+        pipe.sadd(namespaces_key, checkpoint_ns)
+        if self.ttl is not None:
+            for key in (checkpoint_key, checkpoints_key, namespaces_key):
+                pipe.expire(key, self.ttl)
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }
+        }
+
+    def _stale_range(self, config: RunnableConfig) -> tuple[str, str, str] | None:
+        """Key and lex range of the checkpoints older than the parent in `config`."""
+        thread_id, checkpoint_ns, parent_checkpoint_id = self._parse_config(config)
+        if parent_checkpoint_id is None:
+            return None
+        return (
+            self._checkpoints_key(thread_id, checkpoint_ns),
+            "-",
+            f"({parent_checkpoint_id}",
+        )
+
+    def _prune_commands(self, pipe, config: RunnableConfig, stale_ids: list[str]):
+        thread_id, checkpoint_ns, _ = self._parse_config(config)
+        keys = []
+        for checkpoint_id in stale_ids:
+            keys.append(self._checkpoint_key(thread_id, checkpoint_ns, checkpoint_id))
+            keys.append(self._writes_key(thread_id, checkpoint_ns, checkpoint_id))
+        pipe.delete(*keys)
+        pipe.zrem(self._checkpoints_key(thread_id, checkpoint_ns), *stale_ids)
+
+    def _put_writes_commands(
+        self,
+        pipe,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str,
+    ):
+        thread_id, checkpoint_ns, checkpoint_id = self._parse_config(config)
+        writes_key = self._writes_key(thread_id, checkpoint_ns, checkpoint_id)
+
+        for idx, (channel, value) in enumerate(writes):
+            write_idx = WRITES_IDX_MAP.get(channel, idx)
+            field = f"{task_id}:{write_idx}"
+            data = self._dumps((task_id, channel, value, task_path, write_idx))
+            # Special writes (errors, interrupts) overwrite, regular ones are idempotent
+            if write_idx >= 0:
+                pipe.hsetnx(writes_key, field, data)
+            else:
+                pipe.hset(writes_key, field, data)
+        if self.ttl is not None:
+            pipe.expire(writes_key, self.ttl)
+
+    def _make_tuple(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        checkpoint_id: str,
+        saved: dict[str, str],
+        writes: dict[str, str],
+        history: list[str] | None,
+    ) -> CheckpointTuple:
+        checkpoint = self._loads(saved["checkpoint"])
+        if history is not None:
+            checkpoint["channel_values"]["state_history"] = reconstruct_state_history(
+                [self._loads(delta) for delta in history]
+            )
+        pending_writes = sorted(
+            (self._loads(value) for value in writes.values()),
+            key=lambda write: (write[3], write[0], write[4]),
+        )
+        parent_checkpoint_id = saved.get("parent_checkpoint_id")
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=checkpoint,
+            metadata=self._loads(saved["metadata"]),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, value)
+                for task_id, channel, value, *_ in pending_writes
+            ],
+        )
+
+    def _filter_ids(
+        self,
+        checkpoint_ids: list[str],
+        config_checkpoint_id: str | None,
+        before: RunnableConfig | None,
+    ) -> list[str]:
+        before_checkpoint_id = get_checkpoint_id(before) if before else None
+        return [
+            checkpoint_id
+            for checkpoint_id in checkpoint_ids
+            if (config_checkpoint_id is None or checkpoint_id == config_checkpoint_id)
+            and (before_checkpoint_id is None or checkpoint_id < before_checkpoint_id)
+        ]
+
+    @staticmethod
+    def _matches(metadata: dict, filter: dict[str, Any] | None) -> bool:
+        return not filter or all(
+            metadata.get(key) == value for key, value in filter.items()
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        redis_client = self.redis_service.sync_redis_client
+        thread_id, checkpoint_ns, checkpoint_id = self._parse_config(config)
+
+        if checkpoint_id is None:
+            latest = redis_client.zrange(
+                self._checkpoints_key(thread_id, checkpoint_ns), 0, 0, desc=True
+            )
+            if not latest:
+                return None
+            checkpoint_id = latest[0]
+
+        saved = redis_client.hgetall(
+            self._checkpoint_key(thread_id, checkpoint_ns, checkpoint_id)
+        )
+        if not saved:
+            return None
+        writes = redis_client.hgetall(
+            self._writes_key(thread_id, checkpoint_ns, checkpoint_id)
+        )
+        history_range = self._history_range(thread_id, checkpoint_ns, saved)
+        history = redis_client.lrange(*history_range) if history_range else None
+        return self._make_tuple(
+            thread_id, checkpoint_ns, checkpoint_id, saved, writes, history
+        )
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        redis_client = self.redis_service.aioredis_client
+        thread_id, checkpoint_ns, checkpoint_id = self._parse_config(config)
+
+        if checkpoint_id is None:
+            latest = await redis_client.zrange(
+                self._checkpoints_key(thread_id, checkpoint_ns), 0, 0, desc=True
+            )
+            if not latest:
+                return None
+            checkpoint_id = latest[0]
+
+        saved = await redis_client.hgetall(
+            self._checkpoint_key(thread_id, checkpoint_ns, checkpoint_id)
+        )
+        if not saved:
+            return None
+        writes = await redis_client.hgetall(
+            self._writes_key(thread_id, checkpoint_ns, checkpoint_id)
+        )
+        history_range = self._history_range(thread_id, checkpoint_ns, saved)
+        history = await redis_client.lrange(*history_range) if history_range else None
+        return self._make_tuple(
+            thread_id, checkpoint_ns, checkpoint_id, saved, writes, history
+        )
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        if config is None:
+            # Listing checkpoints of every session would require a full key scan
+            raise ValueError("RedisCheckpointSaver.list requires a thread_id")
+
+        redis_client = self.redis_service.sync_redis_client
+        thread_id = str(config["configurable"]["thread_id"])
+        config_checkpoint_ns = config["configurable"].get("checkpoint_ns")
+        config_checkpoint_id = get_checkpoint_id(config)
+
+        if config_checkpoint_ns is not None:
+            namespaces = [config_checkpoint_ns]
+        else:
+            namespaces = sorted(redis_client.smembers(self._namespaces_key(thread_id)))
+
+        for checkpoint_ns in namespaces:
+            checkpoint_ids = redis_client.zrange(
+                self._checkpoints_key(thread_id, checkpoint_ns), 0, -1, desc=True
+            )
+            for checkpoint_id in self._filter_ids(
+                checkpoint_ids, config_checkpoint_id, before
+            ):
+                if limit is not None and limit <= 0:
+                    return
+                saved = redis_client.hgetall(
+                    self._checkpoint_key(thread_id, checkpoint_ns, checkpoint_id)
+                )
+                if not saved or not self._matches(
+                    self._loads(saved["metadata"]), filter
+                ):
+                    continue
+                writes = redis_client.hgetall(
+                    self._writes_key(thread_id, checkpoint_ns, checkpoint_id)
+                )
+                history_range = self._history_range(thread_id, checkpoint_ns, saved)
+                history = redis_client.lrange(*history_range) if history_range else None
+                if limit is not None:
+                    limit -= 1
+                yield self._make_tuple(
+                    thread_id, checkpoint_ns, checkpoint_id, saved, writes, history
+                )
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        if config is None:
+            raise ValueError("RedisCheckpointSaver.alist requires a thread_id")
+
+        redis_client = self.redis_service.aioredis_client
+        thread_id = str(config["configurable"]["thread_id"])
+        config_checkpoint_ns = config["configurable"].get("checkpoint_ns")
+        config_checkpoint_id = get_checkpoint_id(config)
+
+        if config_checkpoint_ns is not None:
+            namespaces = [config_checkpoint_ns]
+        else:
+            namespaces = sorted(
+                await redis_client.smembers(self._namespaces_key(thread_id))
+            )
+
+        for checkpoint_ns in namespaces:
+            checkpoint_ids = await redis_client.zrange(
+                self._checkpoints_key(thread_id, checkpoint_ns), 0, -1, desc=True
+            )
+            for checkpoint_id in self._filter_ids(
+                checkpoint_ids, config_checkpoint_id, before
+            ):
+                if limit is not None and limit <= 0:
+                    return
+                saved = await redis_client.hgetall(
+                    self._checkpoint_key(thread_id, checkpoint_ns, checkpoint_id)
+                )
+                if not saved or not self._matches(
+                    self._loads(saved["metadata"]), filter
+                ):
+                    continue
+                writes = await redis_client.hgetall(
+                    self._writes_key(thread_id, checkpoint_ns, checkpoint_id)
+                )
+                history_range = self._history_range(thread_id, checkpoint_ns, saved)
+                history = (
+                    await redis_client.lrange(*history_range) if history_range else None
+                )
+                if limit is not None:
+                    limit -= 1
+                yield self._make_tuple(
+                    thread_id, checkpoint_ns, checkpoint_id, saved, writes, history
+                )
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        redis_client = self.redis_service.sync_redis_client
+        state_history = checkpoint["channel_values"].get("state_history")
+        if state_history is not None:
+            thread_id, checkpoint_ns, _ = self._parse_config(config)
+            history_key = self._history_key(thread_id, checkpoint_ns)
+            pipe = redis_client.pipeline()
+            pipe.llen(history_key)
+            pipe.lindex(history_key, -1)
+            stored_length, last_stored = pipe.execute()
+
+        pipe = redis_client.pipeline()
+        if state_history is not None:
+            self._history_commands(
+                pipe, config, state_history, stored_length, last_stored
+            )
+        next_config = self._put_commands(pipe, config, checkpoint, metadata)
+        pipe.execute()
+
+        stale_range = self._stale_range(config)
+        if stale_range is not None:
+            stale_ids = redis_client.zrangebylex(*stale_range)
+            if stale_ids:
+                pipe = redis_client.pipeline()
+                self._prune_commands(pipe, config, stale_ids)
+                pipe.execute()
+        return next_config
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        redis_client = self.redis_service.aioredis_client
+        state_history = checkpoint["channel_values"].get("state_history")
+        if state_history is not None:
+            thread_id, checkpoint_ns, _ = self._parse_config(config)
+            history_key = self._history_key(thread_id, checkpoint_ns)
+            pipe = redis_client.pipeline()
+            pipe.llen(history_key)
+            pipe.lindex(history_key, -1)
+            stored_length, last_stored = await pipe.execute()
+
+        pipe = redis_client.pipeline()
+        if state_history is not None:
+            self._history_commands(
+                pipe, config, state_history, stored_length, last_stored
+            )
+        next_config = self._put_commands(pipe, config, checkpoint, metadata)
+        await pipe.execute()
+
+        stale_range = self._stale_range(config)
+        if stale_range is not None:
+            stale_ids = await redis_client.zrangebylex(*stale_range)
+            if stale_ids:
+                pipe = redis_client.pipeline()
+                self._prune_commands(pipe, config, stale_ids)
+                await pipe.execute()
+        return next_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        pipe = self.redis_service.sync_redis_client.pipeline()
+        self._put_writes_commands(pipe, config, writes, task_id, task_path)
+        pipe.execute()
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        pipe = self.redis_service.aioredis_client.pipeline()
+        self._put_writes_commands(pipe, config, writes, task_id, task_path)
+        await pipe.execute()
+
+    def delete_thread(self, thread_id: str) -> None:
+        redis_client = self.redis_service.sync_redis_client
+        thread_id = str(thread_id)
+        keys = [self._namespaces_key(thread_id)]
+        for checkpoint_ns in redis_client.smembers(self._namespaces_key(thread_id)):
+            checkpoints_key = self._checkpoints_key(thread_id, checkpoint_ns)
+            keys.append(checkpoints_key)
+            keys.append(self._history_key(thread_id, checkpoint_ns))
+            for checkpoint_id in redis_client.zrange(checkpoints_key, 0, -1):
+                keys.append(
+                    self._checkpoint_key(thread_id, checkpoint_ns, checkpoint_id)
+                )
+                keys.append(self._writes_key(thread_id, checkpoint_ns, checkpoint_id))
+        redis_client.delete(*keys)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        redis_client = self.redis_service.aioredis_client
+        thread_id = str(thread_id)
+        keys = [self._namespaces_key(thread_id)]
+        for checkpoint_ns in await redis_client.smembers(
+            self._namespaces_key(thread_id)
+        ):
+            checkpoints_key = self._checkpoints_key(thread_id, checkpoint_ns)
+            keys.append(checkpoints_key)
+            keys.append(self._history_key(thread_id, checkpoint_ns))
+            for checkpoint_id in await redis_client.zrange(checkpoints_key, 0, -1):
+                keys.append(
+                    self._checkpoint_key(thread_id, checkpoint_ns, checkpoint_id)
+                )
+                keys.append(self._writes_key(thread_id, checkpoint_ns, checkpoint_id))
+        await redis_client.delete(*keys)
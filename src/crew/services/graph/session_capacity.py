@@ -0,0 +1,107 @@
+import asyncio
+import concurrent.futures
+
+from loguru import logger
+
+from src.crew.services.graph.exceptions import StopSession
+
+
+class SessionCapacityLimiter:
+    """
+    Bounds the number of actively running sessions.
+
+    Sessions waiting for user input are suspended: their slot is released so other
+    sessions can run, and acquired again before the session continues.
+    """
+
+    def __init__(self, max_active_sessions: int):
+        self.max_active_sessions = max_active_sessions
+        self._semaphore = asyncio.Semaphore(max_active_sessions)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.suspended_sessions: set[int] = set()
+        # Acquisitions of suspended sessions that are resuming, by session id
+        self._resuming: dict[int, asyncio.Task] = {}
+
+    @property
+    def active_sessions(self) -> int:
+        return self.max_active_sessions - self._semaphore._value
+
+    async def acquire(self, session_id: int | None = None):
+        self._loop = asyncio.get_running_loop()
+        await self._semaphore.acquire()
+        if session_id is not None:
+            logger.info(f"Acquired session slot for session {session_id}")
+
+    def release(self, session_id: int | None = None):
+        self._semaphore.release()
+        if session_id is not None:
+            logger.info(f"Released session slot for session {session_id}")
+
+    def finish(self, session_id: int):
+        """
+        Release the slot of a finished session unless it is already suspended.
+        A session may finish (e.g. be stopped) while it waits for a slot to resume,
+        the waiting acquisition is cancelled then, so it never takes a slot.
+        """
+        if session_id in self.suspended_sessions:
+            self.suspended_sessions.discard(session_id)
+            resuming = self._resuming.pop(session_id, None)
+            if resuming is not None:
+                resuming.cancel()
+            return
+        self.release(session_id)
+
+    def slot(self, session_id: int) -> "SessionSlot":
+        return SessionSlot(limiter=self, session_id=session_id)
+
+    def suspend(self, session_id: int):
+        """
+        Release the slot of a session that waits for user input.
+        Called from crew worker threads.
+        """
+        if session_id in self.suspended_sessions:
+            return
+        self.suspended_sessions.add(session_id)
+        self._loop.call_soon_threadsafe(self.release, session_id)
+
+    async def _acquire_for_resume(self, session_id: int):
+        # Runs in the event loop like `finish`, so they never interleave
+        if session_id not in self.suspended_sessions:
+            raise asyncio.CancelledError()
+        self._resuming[session_id] = asyncio.current_task()
+        try:
+            await self.acquire(session_id)
+        finally:
+            self._resuming.pop(session_id, None)
+        self.suspended_sessions.discard(session_id)
+
+    def resume(self, session_id: int):
+        """
+        Block the calling worker thread until the session gets a slot again.
+
+        Raises:
+            StopSession: If the session finished while waiting for a slot.
+        """
+        if session_id not in self.suspended_sessions:
+            return
+        future = asyncio.run_coroutine_threadsafe(
+            self._acquire_for_resume(session_id), self._loop
+        )
+        try:
+            future.result()
+        except concurrent.futures.CancelledError:
+            raise StopSession(f"Session {session_id} finished while resuming")
+
+
+class SessionSlot:
+    """Handle passed to session callbacks to suspend and resume a single session."""
+
+    def __init__(self, limiter: SessionCapacityLimiter, session_id: int):
+        self.limiter = limiter
+        self.session_id = session_id
+
+    def suspend(self):
+        self.limiter.suspend(self.session_id)
+
+    def resume(self):
+        self.limiter.resume(self.session_id)
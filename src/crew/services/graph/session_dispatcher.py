@@ -0,0 +1,177 @@
+import asyncio
+import json
+from typing import Any
+
+from loguru import logger
+import redis.asyncio as aioredis
+
+from src.crew.services.redis_service import AsyncPubsubSubscriber, RedisService
+from src.crew.services.graph.session_scheduler import PRIORITY_CLASSES
+
+# Owner value of a session stopped before any worker claimed it
+CANCELLED_OWNER = "cancelled"
+CANCELLED_OWNER_TTL = 24 * 60 * 60
+
+
+def session_queue_key(priority_class: str) -> str:
+    """Redis list with sessions of a priority class waiting for a worker."""
+    return f"sessions:queue:{priority_class}"
+
+
+def session_owner_key(session_id: int) -> str:
+    """Redis key with the id of the worker running the session."""
+    return f"sessions:{session_id}:owner"
+
+
+def worker_channel(worker_id: int) -> str:
+    """Redis channel for stop and timeout messages of sessions owned by a worker."""
+    return f"sessions:worker:{worker_id}"
+
+
+async def claim_session(
+    redis_client: aioredis.Redis, session_id: int, worker_id: int
+) -> bool:
+    """
+    Take ownership of a session popped from the queue.
+
+    Returns:
+        bool: False if the session was stopped before it was claimed.
+    """
+    owner_key = session_owner_key(session_id)
+    if await redis_client.set(owner_key, worker_id, nx=True):
+        return True
+
+    owner = await redis_client.get(owner_key)
+    if owner == CANCELLED_OWNER:
+        await redis_client.delete(owner_key)
+    else:
+        logger.warning(f"Session {session_id} is already owned by worker {owner}")
+    return False
+
+
+async def cancel_or_get_owner(
+    redis_client: aioredis.Redis, session_id: int
+) -> str | None:
+    """
+    Return the worker owning the session. If no worker claimed it yet,
+    mark it as cancelled so it is dropped when popped from the queue.
+    """
+    owner_key = session_owner_key(session_id)
+    if await redis_client.set(
+        owner_key, CANCELLED_OWNER, nx=True, ex=CANCELLED_OWNER_TTL
+    ):
+        return None
+
+    owner = await redis_client.get(owner_key)
+    if owner == CANCELLED_OWNER:
+        return None
+    return owner
+
+
+class SessionDispatcher:
+    """
+    Distributes sessions between crew worker processes.
+
+    The dispatcher is the only subscriber of the session channels, so Django still
+    sees a single crew listener. Started sessions are pushed to a queue per priority
+    class, a worker with a free slot pops a session and claims it (see
+    `claim_session`), so every session runs at most once. Stop and timeout messages
+    are forwarded to the worker that owns the session.
+    """
+
+    def __init__(
+        self,
+        redis_service: RedisService,
+        session_schema_channel: str,
+        session_timeout_channel: str,
+        stop_session_channel: str,
+    ):
+        self.redis_service = redis_service
+        self.session_schema_channel = session_schema_channel
+        self.session_timeout_channel = session_timeout_channel
+        self.stop_session_channel = stop_session_channel
+
+    def start(self):
+        self._listener_task = asyncio.create_task(self._listen_to_channels())
+        logger.info("Session dispatcher is now running.")
+
+    async def _listen_to_channels(self):
+        subscriber = AsyncPubsubSubscriber(self._listen_callback)
+        await self.redis_service.asubscribe(
+            [
+                self.session_schema_channel,
+                self.session_timeout_channel,
+                self.stop_session_channel,
+            ],
+            subscriber=subscriber,
+        )
+
+    async def _listen_callback(self, message: dict[str, Any]):
+        try:
+            channel = message["channel"]
+            data = message["data"]
+            logger.debug(f"Get message from {channel}: {data}")
+
+            if channel == self.session_schema_channel:
+                await self._handle_session_start(data)
+            elif channel == self.session_timeout_channel:
+                await self._handle_session_timeout(data)
+            elif channel == self.stop_session_channel:
+                await self._handle_stop_session(data)
+            else:
+                logger.info(f"Unknown channel {channel}")
+        except Exception:
+            logger.exception("Failed to dispatch session message")
+
+    async def _handle_session_start(self, data: str):
+        session = json.loads(data)
+        priority_class = session.get("priority_class", "interactive")
+        if priority_class not in PRIORITY_CLASSES:
+            priority_class = "batch"
+
+        await self.redis_service.aioredis_client.lpush(
+            session_queue_key(priority_class), data
+        )
+        logger.info(f"Session {session['id']} queued for workers ({priority_class})")
+
+    async def _forward(self, session_id: int, channel: str, data: str) -> bool:
+        """
+        Forward a message to the worker owning the session.
+
+        Returns:
+            bool: False if no worker claimed the session.
+        """
+        owner = await cancel_or_get_owner(
+            self.redis_service.aioredis_client, session_id
+        )
+        if owner is None:
+            return False
+
+        await self.redis_service.aioredis_client.publish(
+            worker_channel(owner), json.dumps({"channel": channel, "data": data})
+        )
+        logger.info(
+            f"Forwarded {channel} message of session {session_id} to worker {owner}"
+        )
+        return True
+
+    async def _handle_session_timeout(self, data: str):
+        timeout_data = json.loads(data)
+        session_id = timeout_data.get("session_id")
+        if timeout_data.get("action") != "timeout":
+            return
+
+        if not await self._forward(session_id, self.session_timeout_channel, data):
+            logger.info(f"Session {session_id} expired before it started")
+            await self.redis_service.aupdate_session_status(
+                session_id=session_id, status="expired"
+            )
+
+    async def _handle_stop_session(self, data: str):
+        session_id = json.loads(data)["session_id"]
+
+        if not await self._forward(session_id, self.stop_session_channel, data):
+            logger.info(f"Session {session_id} stopped before it started")
+            await self.redis_service.aupdate_session_status(
+                session_id=session_id, status="stop"
+            )
@@ -0,0 +1,210 @@
+import asyncio
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+
+from loguru import logger
+
+# Classes in order of priority
+PRIORITY_CLASSES = ("interactive", "webhook", "batch")
+
+
+@dataclass
+class ScheduledSession:
+    session_id: int
+    priority_class: str
+    tenant_key: str
+    flow_key: str
+    enqueued_at: float = field(default_factory=time.monotonic)
+    started_at: float | None = None
+
+
+@dataclass
+class ClassMetrics:
+    pending: int = 0
+    running: int = 0
+    started: int = 0
+    total_wait_time: float = 0.0
+    max_wait_time: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "pending": self.pending,
+            "running": self.running,
+            "started": self.started,
+            "avg_wait_time": (
+                self.total_wait_time / self.started if self.started else 0.0
+            ),
+            "max_wait_time": self.max_wait_time,
+        }
+
+
+class SessionScheduler:
+    """
+    Chooses which pending session starts next.
+
+    Classes are served in priority order (interactive, webhook, batch), a class that
+    reached its concurrency cap is skipped. Inside a class the session goes to the
+    tenant with the fewest running sessions, then to the flow of that tenant with the
+    fewest running sessions, ties are broken by the oldest waiting session. A burst
+    of sessions from one flow or tenant therefore does not delay the others.
+
+    The global limit of running sessions is kept by `SessionCapacityLimiter`.
+    """
+
+    def __init__(self, class_limits: dict[str, int | None] | None = None):
+        """
+        Args:
+            class_limits (dict[str, int | None] | None): Maximum number of running
+                sessions per priority class. Missing or None means no class limit.
+        """
+        class_limits = class_limits or {}
+        unknown = set(class_limits) - set(PRIORITY_CLASSES)
+        if unknown:
+            raise ValueError(f"Unknown priority classes: {', '.join(unknown)}")
+
+        self.class_limits = class_limits
+        # class -> tenant -> flow -> sessions in arrival order
+        self._pending: dict[str, dict[str, dict[str, deque[ScheduledSession]]]] = {
+            priority_class: defaultdict(lambda: defaultdict(deque))
+            for priority_class in PRIORITY_CLASSES
+        }
+        self._pending_ids: dict[int, ScheduledSession] = {}
+        self._running_tenants: dict[tuple[str, str], int] = defaultdict(int)
+        self._running_flows: dict[tuple[str, str, str], int] = defaultdict(int)
+        self._metrics = {
+            priority_class: ClassMetrics() for priority_class in PRIORITY_CLASSES
+        }
+        self._changed = asyncio.Event()
+
+    def submit(
+        self,
+        session_id: int,
+        priority_class: str = "interactive",
+        tenant_key: str = "default",
+        flow_key: str = "default",
+    ) -> ScheduledSession:
+        if priority_class not in PRIORITY_CLASSES:
+            logger.warning(
+                f"Unknown priority class {priority_class} of session {session_id}, using batch"
+            )
+            priority_class = "batch"
+
+        scheduled = ScheduledSession(
+            session_id=session_id,
+            priority_class=priority_class,
+            tenant_key=tenant_key,
+            flow_key=flow_key,
+        )
+        self._pending[priority_class][tenant_key][flow_key].append(scheduled)
+        self._pending_ids[session_id] = scheduled
+        self._metrics[priority_class].pending += 1
+        self._changed.set()
+        return scheduled
+
+    def remove(self, session_id: int) -> bool:
+        """Remove a pending session, e.g. when it is stopped before it starts."""
+        scheduled = self._pending_ids.pop(session_id, None)
+        if scheduled is None:
+            return False
+
+        tenants = self._pending[scheduled.priority_class]
+        flows = tenants[scheduled.tenant_key]
+        flows[scheduled.flow_key].remove(scheduled)
+        if not flows[scheduled.flow_key]:
+            del flows[scheduled.flow_key]
+        if not flows:
+            del tenants[scheduled.tenant_key]
+        self._metrics[scheduled.priority_class].pending -= 1
+        self._changed.set()
+        return True
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending_ids)
+
+    def accepts(self, priority_class: str) -> bool:
+        """Whether one more session of the class could start without waiting for its cap."""
+        limit = self.class_limits.get(priority_class)
+        metrics = self._metrics[priority_class]
+        return limit is None or metrics.running + metrics.pending < limit
+
+    def _has_room(self, priority_class: str) -> bool:
+        limit = self.class_limits.get(priority_class)
+        return limit is None or self._metrics[priority_class].running < limit
+
+    def _candidate(self) -> ScheduledSession | None:
+        for priority_class in PRIORITY_CLASSES:
+            tenants = self._pending[priority_class]
+            if not tenants or not self._has_room(priority_class):
+                continue
+
+            tenant_key = min(
+                tenants,
+                key=lambda tenant: (
+                    self._running_tenants[(priority_class, tenant)],
+                    min(q[0].enqueued_at for q in tenants[tenant].values()),
+                ),
+            )
+            flows = tenants[tenant_key]
+            flow_key = min(
+                flows,
+                key=lambda flow: (
+                    self._running_flows[(priority_class, tenant_key, flow)],
+                    flows[flow][0].enqueued_at,
+                ),
+            )
+            return flows[flow_key][0]
+        return None
+
+    async def wait_for_candidate(self):
+        """Wait until some pending session is allowed to start."""
+        while self._candidate() is None:
+            self._changed.clear()
+            await self._changed.wait()
+
+    def pop_next(self) -> ScheduledSession | None:
+        """Take the next session to start and count it as running."""
+        scheduled = self._candidate()
+        if scheduled is None:
+            return None
+
+        self.remove(scheduled.session_id)
+        scheduled.started_at = time.monotonic()
+        wait_time = scheduled.started_at - scheduled.enqueued_at
+
+        metrics = self._metrics[scheduled.priority_class]
+        metrics.running += 1
+        metrics.started += 1
+        metrics.total_wait_time += wait_time
+        metrics.max_wait_time = max(metrics.max_wait_time, wait_time)
+        self._running_tenants[(scheduled.priority_class, scheduled.tenant_key)] += 1
+        self._running_flows[
+            (scheduled.priority_class, scheduled.tenant_key, scheduled.flow_key)
+        ] += 1
+
+        logger.info(
+            f"Scheduled session {scheduled.session_id} ({scheduled.priority_class}) "
+            f"after {wait_time:.3f}s in queue"
+        )
+        return scheduled
+
+    def release(self, scheduled: ScheduledSession):
+        """Mark a started session as finished."""
+        self._metrics[scheduled.priority_class].running -= 1
+
+        tenant = (scheduled.priority_class, scheduled.tenant_key)
+        flow = (*tenant, scheduled.flow_key)
+        self._running_tenants[tenant] -= 1
+        if not self._running_tenants[tenant]:
+            del self._running_tenants[tenant]
+        self._running_flows[flow] -= 1
+        if not self._running_flows[flow]:
+            del self._running_flows[flow]
+        self._changed.set()
+
+    def metrics(self) -> dict[str, dict]:
+        return {
+            priority_class: metrics.to_dict()
+            for priority_class, metrics in self._metrics.items()
+        }
@@ -0,0 +1,116 @@
+import copy
+from typing import Any
+
+
+def snapshot_variables(variables: dict, previous: dict | None = None) -> dict:
+    """
+    Create an immutable snapshot of `variables` sharing unchanged values with `previous`.
+
+    Only top-level keys whose value differs from the previous snapshot are deep copied,
+    every other key points to the object already stored in `previous`. Snapshots must
+    never be mutated in place, otherwise every history item sharing the value changes too.
+
+    Args:
+        variables (dict): Current variables (e.g. `state["variables"].model_dump()`).
+        previous (dict | None): Snapshot of the previous state history item.
+
+    Returns:
+        dict: Snapshot of the variables.
+    """
+    if previous is None:
+        return copy.deepcopy(variables)
+
+    snapshot = {}
+    for key, value in variables.items():
+        if key in previous and previous[key] == value:
+            snapshot[key] = previous[key]
+        else:
+            snapshot[key] = copy.deepcopy(value)
+    return snapshot
+
+
+def diff_variables(previous: dict | None, current: dict) -> dict:
+    """
+    Calculate top-level difference between two variables snapshots.
+
+    Returns:
+        dict: {"set": {key: value}, "unset": [key]} that turns `previous` into `current`.
+    """
+    previous = previous or {}
+    set_ = {
+        key: value
+        for key, value in current.items()
+        if key not in previous or previous[key] is not value and previous[key] != value
+    }
+    unset = [key for key in previous if key not in current]
+    return {"set": set_, "unset": unset}
+
+
+def apply_variables_diff(variables: dict | None, diff: dict) -> dict:
+    """
+    Apply a diff produced by `diff_variables` and return a new variables dict.
+    """
+    result = dict(variables or {})
+    for key in diff.get("unset", []):
+        result.pop(key, None)
+    result.update(diff.get("set", {}))
+    return result
+
+
+def make_state_history_delta(state_history: list[dict], index: int = -1) -> dict:
+    """
+    Convert a state history item into a delta carrying only changed variables.
+
+    Args:
+        state_history (list[dict]): Full state history.
+        index (int): Index of the item to convert. Defaults to the last item.
+
+    Returns:
+        dict: History item with `variables` replaced by `variables_diff` and its `index`.
+    """
+    if index < 0:
+        index += len(state_history)
+    item = state_history[index]
+    previous_variables = state_history[index - 1]["variables"] if index > 0 else None
+
+    delta: dict[str, Any] = {
+        key: value for key, value in item.items() if key != "variables"
+    }
+    delta["index"] = index
+    delta["variables_diff"] = diff_variables(previous_variables, item["variables"])
+    return delta
+
+
+def make_state_history_deltas(state_history: list[dict]) -> list[dict]:
+    """
+    Convert the whole state history into deltas, see `make_state_history_delta`.
+    """
+    return [
+        make_state_history_delta(state_history, index)
+        for index in range(len(state_history))
+    ]
+
+
+def reconstruct_state_history(deltas: list[dict]) -> list[dict]:
+    """
+    Rebuild full state history from the ordered list of deltas.
+
+    Raises:
+        ValueError: If deltas are not consecutive starting from index 0.
+    """
+    state_history = []
+    variables = None
+    for expected_index, delta in enumerate(sorted(deltas, key=lambda d: d["index"])):
+        if delta["index"] != expected_index:
+            raise ValueError(
+                f"State history delta with index {expected_index} is missing"
+            )
+        variables = apply_variables_diff(variables, delta["variables_diff"])
+        item = {
+            key: value
+            for key, value in delta.items()
+            if key not in {"index", "variables_diff"}
+        }
+        item["variables"] = variables
+        state_history.append(item)
+    return state_history
@@ -1,5 +1,7 @@
 import json
+import textwrap
 from loguru import logger
+from dotdict import DotDict
 
 from langgraph.graph import StateGraph
 from langgraph.graph.state import CompiledStateGraph
@@ -8,6 +10,11 @@ from langgraph.types import StreamWriter
 
 from src.crew.services.graph.events import StopEvent
 from src.crew.services.graph.custom_message_writer import CustomSessionMessageWriter
+from src.crew.services.graph.expression_engine import (
+    ExpressionEngine,
+    ExpressionEvaluationError,
+    UnsupportedExpressionError,
+)
 from src.crew.models.request_models import (
     ConditionGroupData,
     DecisionTableNodeData,
@@ -16,12 +23,61 @@ from src.crew.models.request_models import (
 from src.crew.models.state import State
 
 from src.crew.services.run_python_code_service import RunPythonCodeService
+from src.crew.utils import next_execution_order
 
 
 class DecisionTableNodeDataError(Exception):
     """Custom exception for errors related to DecisionTableNodeData."""
 
 
+_BATCH_MAIN_CODE = """
+def main(variables):
+    group_results = []
+    group_variables = []
+    for group_index, group in enumerate(_groups):
+        stage = "condition"
+        try:
+            result = group["conditions"] is not None
+            for condition in group["conditions"] or []:
+                value = condition(variables)
+                assert isinstance(value, bool), "Expression must return a boolean value"
+                if not value:
+                    result = False
+                    break
+            group_results.append(result)
+            group_variables.append(None)
+            if result and group["manipulation"] is not None:
+                stage = "manipulation"
+                variables.update(group["manipulation"](variables))
+                group_variables[-1] = _copy.deepcopy(variables)
+        except Exception as e:
+            return {
+                "group_results": group_results,
+                "group_variables": group_variables,
+                "matched_group_index": None,
+                "error": {
+                    "group_index": group_index,
+                    "stage": stage,
+                    "details": f"{type(e).__name__}: {e}",
+                },
+            }
+        # A passed group without next node continues with the next group
+        if result and group["has_next_node"]:
+            return {
+                "group_results": group_results,
+                "group_variables": group_variables,
+                "matched_group_index": group_index,
+                "error": None,
+            }
+    return {
+        "group_results": group_results,
+        "group_variables": group_variables,
+        "matched_group_index": None,
+        "error": None,
+    }
+"""
+
+
 class DecisionTableNodeSubgraph:
     TYPE = "DECISION_TABLE"
 
@@ -33,6 +89,7 @@ class DecisionTableNodeSubgraph:
         stop_event: StopEvent,
         run_code_execution_service: RunPythonCodeService,
         custom_session_message_writer: CustomSessionMessageWriter | None = None,
+        expression_engine: ExpressionEngine | None = None,
     ):
         self.decision_table_node_data = decision_table_node_data
         self._graph_builder = graph_builder
@@ -45,6 +102,11 @@ class DecisionTableNodeSubgraph:
             custom_session_message_writer or CustomSessionMessageWriter()
         )
         self.run_code_execution_service = run_code_execution_service
+        self.expression_engine = expression_engine or ExpressionEngine()
+        # Tables that need the sandbox are evaluated in one batched call
+        self._batch_code: str | None = (
+            self._build_batch_code() if self._requires_sandbox() else None
+        )
 
     async def _execute_condition_group(
         self,
@@ -78,10 +140,39 @@ class DecisionTableNodeSubgraph:
         self,
         manipulation: str | None,
         state: State,
-    ) -> bool:
+    ) -> None:
         if manipulation is None:
-            return True
+            return
+
+        # DotDict rebuilds nested containers, so the manipulation works on a copy
+        variables = DotDict(state["variables"].model_dump())
+        try:
+            namespace = self.expression_engine.execute_statements(
+                code=manipulation, names={"variables": variables}
+            )
+        except UnsupportedExpressionError as e:
+            logger.debug(f"Manipulation will be executed in sandbox: {e}")
+            return await self._execute_manipulation_in_sandbox(
+                manipulation=manipulation, state=state
+            )
+        except ExpressionEvaluationError as e:
+            raise DecisionTableNodeDataError(
+                f"Manipulation execution failed with error: {e}"
+            ) from e
+
+        # The manipulation may rebind `variables`, as it can in the sandbox
+        variables = namespace["variables"]
+        if not isinstance(variables, dict):
+            raise DecisionTableNodeDataError(
+                "Manipulation execution failed with error: variables must be a dict"
+            )
+        state["variables"].update(DotDict(variables).model_dump())
 
+    async def _execute_manipulation_in_sandbox(
+        self,
+        manipulation: str,
+        state: State,
+    ) -> None:
         code = f"""
 def main(**kwargs) -> bool:
     variables = kwargs.get("variables", {{}})
@@ -115,6 +206,33 @@ def main(**kwargs) -> bool:
         self,
         expression: str,
         state: State,
+    ) -> bool:
+        # Conditions must not change the state, so they are evaluated on a copy
+        variables = DotDict(state["variables"].model_dump())
+        try:
+            result = self.expression_engine.evaluate_expression(
+                expression=expression, names={"variables": variables}
+            )
+        except UnsupportedExpressionError as e:
+            logger.debug(f"Expression will be executed in sandbox: {e}")
+            return await self._execute_expression_in_sandbox(
+                expression=expression, state=state
+            )
+        except ExpressionEvaluationError as e:
+            raise DecisionTableNodeDataError(
+                f"Expression execution failed with error: {e}"
+            ) from e
+
+        if not isinstance(result, bool):
+            raise DecisionTableNodeDataError(
+                "Expression execution failed with error: Expression must return a boolean value"
+            )
+        return result
+
+    async def _execute_expression_in_sandbox(
+        self,
+        expression: str,
+        state: State,
     ) -> bool:
         code = f"""
 def main(variables: dict) -> bool:
@@ -143,6 +261,150 @@ def main(variables: dict) -> bool:
             )
         return json.loads(python_code_execution_data["result_data"]) or False
 
+    def _requires_sandbox(self) -> bool:
+        """
+        Check if any condition or manipulation of the table can not be evaluated in-process.
+        """
+        for condition_group in self.decision_table_node_data.conditional_group_list:
+            expressions = (
+                [condition.condition for condition in condition_group.condition_list]
+                if condition_group.group_type == "simple"
+                else [condition_group.expression]
+            )
+            for expression in expressions:
+                if expression is not None and not (
+                    self.expression_engine.is_supported_expression(expression)
+                ):
+                    return True
+            if condition_group.manipulation and not (
+                self.expression_engine.is_supported_statements(
+                    condition_group.manipulation
+                )
+            ):
+                return True
+        return False
+
+    def _build_batch_code(self) -> str:
+        """
+        Generate code evaluating the whole decision table in one sandbox call.
+
+        Groups are evaluated in order with the same short-circuit semantics as
+        `_execute_condition_group`, the manipulation of every passed group is
+        applied. Evaluation stops on the first passed group with a next node or
+        on the first error, like the condition group nodes do.
+        """
+        definitions = []
+        groups = []
+        for group_index, condition_group in enumerate(
+            self.decision_table_node_data.conditional_group_list
+        ):
+            if condition_group.group_type == "simple":
+                expressions = [
+                    condition.condition for condition in condition_group.condition_list
+                ]
+            elif condition_group.expression is not None:
+                expressions = [condition_group.expression]
+            else:
+                expressions = None
+
+            condition_names = []
+            for condition_index, expression in enumerate(expressions or []):
+                name = f"_condition_{group_index}_{condition_index}"
+                definitions.append(
+                    f"def {name}(variables):\n    return ({expression})\n"
+                )
+                condition_names.append(name)
+
+            manipulation_name = "None"
+            if condition_group.manipulation:
+                manipulation_name = f"_manipulation_{group_index}"
+                manipulation = textwrap.indent(
+                    textwrap.dedent(condition_group.manipulation).strip(), "    "
+                )
+                definitions.append(
+                    f"def {manipulation_name}(variables):\n"
+                    f"{manipulation}\n"
+                    f"    return variables\n"
+                )
+
+            conditions = (
+                f"[{', '.join(condition_names)}]" if expressions is not None else "None"
+            )
+            groups.append(
+                f'    {{"conditions": {conditions}, "manipulation": {manipulation_name}, '
+                f'"has_next_node": {condition_group.next_node is not None}}},'
+            )
+
+        return (
+            "import copy as _copy\n"
+            + "\n".join(definitions)
+            + "\n_groups = [\n"
+            + "\n".join(groups)
+            + "\n]\n"
+            + _BATCH_MAIN_CODE
+        )
+
+    async def _evaluate_in_sandbox(self, state: State) -> dict:
+        """
+        Evaluate all condition groups in one sandbox round trip.
+
+        Returns:
+            dict: {"group_results": [bool],
+                "group_variables": [dict | None] (variables after the manipulation),
+                "matched_group_index": int | None,
+                "error": {"group_index": int, "stage": str, "details": str} | None}
+        """
+        python_code_data = PythonCodeData(
+            venv_name="default",
+            code=self._batch_code,
+            entrypoint="main",
+            libraries=[],
+        )
+        python_code_execution_data: dict = (
+            await self.run_code_execution_service.run_code(
+                python_code_data=python_code_data,
+                inputs={"variables": state["variables"].model_dump()},
+                stop_event=self.stop_event,
+            )
+        )
+        if python_code_execution_data["returncode"] != 0:
+            return {
+                "group_results": [],
+                "group_variables": [],
+                "matched_group_index": None,
+                "error": {
+                    "group_index": 0,
+                    "stage": "condition",
+                    "details": python_code_execution_data["stderr"],
+                },
+            }
+        return json.loads(python_code_execution_data["result_data"])
+
+    def _raise_batch_error(self, group_index: int, stage: str, batch_result: dict):
+        error = batch_result["error"]
+        if (
+            error is not None
+            and error["group_index"] == group_index
+            and error["stage"] == stage
+        ):
+            name = "Expression" if stage == "condition" else "Manipulation"
+            raise DecisionTableNodeDataError(
+                f"{name} execution failed with error: {error['details']}"
+            )
+
+    def _get_batch_condition_result(self, group_index: int, batch_result: dict) -> bool:
+        self._raise_batch_error(group_index, "condition", batch_result)
+        group_results = batch_result["group_results"]
+        if group_index < len(group_results):
+            return group_results[group_index]
+        return False
+
+    def _apply_batch_manipulation(
+        self, group_index: int, batch_result: dict, state: State
+    ) -> None:
+        self._raise_batch_error(group_index, "manipulation", batch_result)
+        state["variables"].update(batch_result["group_variables"][group_index])
+
     def execution_order(self, state: State):
         return state["system_variables"]["nodes"][self.node_name]["execution_order"]
 
@@ -170,26 +432,13 @@ def main(variables: dict) -> bool:
                 "result_node": None,
                 "default_node": self.decision_table_node_data.default_next_node,  # TODO: rename it to result or smt
             }
-            if state["system_variables"].get("nodes") is None:
-                state["system_variables"]["nodes"] = {}
-            if state["system_variables"]["nodes"].get(self.node_name) is None:
-                state["system_variables"]["nodes"][self.node_name] = update_variables
+            next_execution_order(state["system_variables"], self.node_name)
+            state["system_variables"]["nodes"][self.node_name].update(update_variables)
+            if self._batch_code is not None:
                 state["system_variables"]["nodes"][self.node_name][
-                    "execution_order"
-                ] = 0
+                    "batch_result"
+                ] = await self._evaluate_in_sandbox(state=state)
 
-            else:
-                state["system_variables"]["nodes"][self.node_name].update(
-                    update_variables
-                )
-                state["system_variables"]["nodes"][self.node_name][
-                    "execution_order"
-                ] = (
-                    state["system_variables"]["nodes"][self.node_name][
-                        "execution_order"
-                    ]
-                    + 1
-                )
             self.custom_session_message_writer.add_start_message(
                 session_id=self.session_id,
                 node_name=self.node_name,
@@ -212,6 +461,7 @@ def main(variables: dict) -> bool:
                     f"result_node is already set to {decision_node_variables['result_node']}, skipping condition groups."
                 )
                 decision_node_variables["next_node"] = END
+                decision_node_variables.pop("batch_result", None)
                 self.custom_session_message_writer.add_finish_message(
                     session_id=self.session_id,
                     node_name=self.node_name,
@@ -235,6 +485,7 @@ def main(variables: dict) -> bool:
                     self.decision_table_node_data.default_next_node or END
                 )
                 decision_node_variables["next_node"] = END
+                decision_node_variables.pop("batch_result", None)
                 self.custom_session_message_writer.add_finish_message(
                     session_id=self.session_id,
                     node_name=self.node_name,
@@ -258,6 +509,7 @@ def main(variables: dict) -> bool:
 
         def condition_group_wrapper(
             condition_group: ConditionGroupData,
+            condition_index: int,
         ) -> callable:
             async def condition_group_function(state: State, writer: StreamWriter):
                 try:
@@ -267,10 +519,16 @@ def main(variables: dict) -> bool:
                     decision_node_variables = state["system_variables"]["nodes"][
                         self.node_name
                     ]
-                    condition_result = await self._execute_condition_group(
-                        condition_group=condition_group,
-                        state=state,
-                    )
+                    batch_result = decision_node_variables.get("batch_result")
+                    if batch_result is not None:
+                        condition_result = self._get_batch_condition_result(
+                            group_index=condition_index, batch_result=batch_result
+                        )
+                    else:
+                        condition_result = await self._execute_condition_group(
+                            condition_group=condition_group,
+                            state=state,
+                        )
                     self.custom_session_message_writer.add_condition_group_message(
                         session_id=self.session_id,
                         node_name=self.node_name,
@@ -284,10 +542,17 @@ def main(variables: dict) -> bool:
                             f"Condition group '{condition_group.group_name}' passed."
                         )
                         if condition_group.manipulation:
-                            await self._execute_manipulation(
-                                manipulation=condition_group.manipulation,
-                                state=state,
-                            )
+                            if batch_result is not None:
+                                self._apply_batch_manipulation(
+                                    group_index=condition_index,
+                                    batch_result=batch_result,
+                                    state=state,
+                                )
+                            else:
+                                await self._execute_manipulation(
+                                    manipulation=condition_group.manipulation,
+                                    state=state,
+                                )
                             self.custom_session_message_writer.add_condition_group_manipulation_message(
                                 session_id=self.session_id,
                                 node_name=self.node_name,
@@ -331,7 +596,9 @@ def main(variables: dict) -> bool:
             condition_group_name = f"{self.node_name}_condition_group_{condition_index}"
             self._graph_builder.add_node(
                 condition_group_name,
-                condition_group_wrapper(condition_group=condition_group),
+                condition_group_wrapper(
+                    condition_group=condition_group, condition_index=condition_index
+                ),
             )
             self._graph_builder.add_edge(condition_group_name, main_node)
 
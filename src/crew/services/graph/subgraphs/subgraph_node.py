@@ -1,4 +1,4 @@
-from utils import map_variables_to_input
+from utils import map_variables_to_input, next_execution_order
 from copy import deepcopy
 from dotdict import DotDict
 from models.request_models import SubGraphNodeData, GraphData, SubGraphData
@@ -79,6 +79,7 @@ class SubGraphNode:
             crewai_output_channel=self.session_graph_builder.crewai_output_channel,
             knowledge_search_service=self.session_graph_builder.knowledge_search_service,
             stop_event=self.stop_event,
+            session_slot=self.session_graph_builder.session_slot,
         )
 
     def _build_simple_graph(self) -> CompiledStateGraph:
@@ -90,8 +91,13 @@ class SubGraphNode:
     async def run(self, state, writer: StreamWriter):
         """Execute the subgraph and handle input/output mapping."""
         subgraph_input = self._prepare_subgraph_input(state)
+        if state.get("system_variables") is None:
+            state["system_variables"] = {}
+        execution_order = next_execution_order(
+            state["system_variables"], self.node_name
+        )
 
-        self._send_start_message(state, subgraph_input, writer)
+        self._send_start_message(state, subgraph_input, writer, execution_order)
 
         subgraph_state = self._create_subgraph_state(state, subgraph_input)
         compiled_subgraph = self.build(initial_state=subgraph_input)
@@ -101,19 +107,22 @@ class SubGraphNode:
         updated_state = self._process_subgraph_result(state, subgraph_input, result)
 
         self._send_finish_message(
-            updated_state, result["variables"].model_dump(), writer
+            updated_state, result["variables"].model_dump(), writer, execution_order
         )
 
         return {
             "variables": updated_state["variables"],
             "state_history": updated_state["state_history"],
+            "system_variables": state["system_variables"],
         }
 
     def _prepare_subgraph_input(self, state) -> dict:
         """Map variables from parent state to subgraph input."""
         return map_variables_to_input(state["variables"], self.input_map)
 
-    def _send_start_message(self, state, subgraph_input, writer: StreamWriter):
+    def _send_start_message(
+        self, state, subgraph_input, writer: StreamWriter, execution_order: int = 0
+    ):
         """Send subgraph start message to writer."""
         start_message_data = SubGraphStartMessageData(
             state=self.custom_session_message_writer._convert_state(state=state),
@@ -122,7 +131,7 @@ class SubGraphNode:
         graph_message = GraphMessage(
             session_id=self.session_id,
             name=self.node_name,
-            execution_order=0,
+            execution_order=execution_order,
             message_data=start_message_data,
         )
         writer(graph_message)
@@ -207,7 +216,11 @@ class SubGraphNode:
         }
 
     def _send_finish_message(
-        self, updated_state, subgraph_output, writer: StreamWriter
+        self,
+        updated_state,
+        subgraph_output,
+        writer: StreamWriter,
+        execution_order: int = 0,
     ):
         """Send subgraph finish message to writer."""
         finish_message_data = SubGraphFinishMessageData(
@@ -219,7 +232,7 @@ class SubGraphNode:
         graph_message = GraphMessage(
             session_id=self.session_id,
             name=self.node_name,
-            execution_order=0,
+            execution_order=execution_order,
             message_data=finish_message_data,
         )
         writer(graph_message)
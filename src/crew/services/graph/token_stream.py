@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+import uuid
+
+from langgraph.types import StreamWriter
+from loguru import logger
+
+from src.crew.models.graph_models import LLMChunkMessageData
+from src.crew.services.graph.custom_message_writer import CustomSessionMessageWriter
+
+# Seconds streamed tokens are collected before they are sent as one message
+TOKEN_STREAM_INTERVAL = float(os.environ.get("TOKEN_STREAM_INTERVAL", "0.05"))
+
+
+class TokenStreamMetrics:
+    """Time to first token of LLM streams in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.streams = 0
+        self.total_time_to_first_token = 0.0
+        self.max_time_to_first_token = 0.0
+
+    def record(self, time_to_first_token: float):
+        with self._lock:
+            self.streams += 1
+            self.total_time_to_first_token += time_to_first_token
+            self.max_time_to_first_token = max(
+                self.max_time_to_first_token, time_to_first_token
+            )
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "streams": self.streams,
+                "avg_time_to_first_token": (
+                    self.total_time_to_first_token / self.streams
+                    if self.streams
+                    else 0.0
+                ),
+                "max_time_to_first_token": self.max_time_to_first_token,
+            }
+
+
+token_stream_metrics = TokenStreamMetrics()
+
+
+class TokenStream:
+    """
+    Sends tokens of one LLM completion as `llm_chunk` graph messages.
+
+    Tokens are coalesced: a message is written when `interval` seconds passed since
+    the previous one, the rest is written by `close`. The first message carries the
+    time to first token, measured from the creation of the stream, unless the
+    completion came from the cache (`add_cached`).
+    """
+
+    def __init__(
+        self,
+        session_id: int,
+        node_name: str,
+        execution_order: int,
+        writer: StreamWriter,
+        crew_id: int | None = None,
+        agent_id: int | None = None,
+        interval: float = TOKEN_STREAM_INTERVAL,
+    ):
+        self.session_id = session_id
+        self.node_name = node_name
+        self.execution_order = execution_order
+        self.writer = writer
+        self.crew_id = crew_id
+        self.agent_id = agent_id
+        self.interval = interval
+        self.stream_id = str(uuid.uuid4())
+        self.started_at = time.monotonic()
+        self.time_to_first_token: float | None = None
+        self._buffer: list[str] = []
+        self._index = 0
+        self._last_write = self.started_at
+
+    def add(self, text: str):
+        if not text:
+            return
+        now = time.monotonic()
+        if self.time_to_first_token is None:
+            self.time_to_first_token = now - self.started_at
+            token_stream_metrics.record(self.time_to_first_token)
+            logger.debug(
+                f"First token of {self.node_name} in session {self.session_id} "
+                f"after {self.time_to_first_token:.3f}s"
+            )
+
+        self._buffer.append(text)
+        if now - self._last_write >= self.interval or self._index == 0:
+            self.flush()
+
+    def add_cached(self, text: str):
+        """Send a cached completion, it has no time to first token."""
+        if not text:
+            return
+        self._buffer.append(text)
+        self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+
+        chunk_data = LLMChunkMessageData(
+            stream_id=self.stream_id,
+            index=self._index,
+            chunk="".join(self._buffer),
+            crew_id=self.crew_id,
+            agent_id=self.agent_id,
+            time_to_first_token=self.time_to_first_token if self._index == 0 else None,
+        )
+        CustomSessionMessageWriter.add_llm_chunk_message(
+            session_id=self.session_id,
+            node_name=self.node_name,
+            writer=self.writer,
+            execution_order=self.execution_order,
+            chunk_data=chunk_data,
+        )
+        self._buffer.clear()
+        self._index += 1
+        self._last_write = time.monotonic()
+
+    def close(self):
+        self.flush()
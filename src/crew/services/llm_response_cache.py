@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any
+
+import litellm
+from loguru import logger
+
+from src.crew.models.request_models import LLMData
+from src.crew.services.crew.tool_result_cache import LRUCache
+from src.crew.services.redis_service import RedisService
+from src.crew.utils.singleton_meta import SingletonMeta
+
+LLM_RESPONSE_CACHE_TTL = int(os.environ.get("LLM_RESPONSE_CACHE_TTL", "86400"))
+LLM_RESPONSE_CACHE_MAX_ENTRIES = int(
+    os.environ.get("LLM_RESPONSE_CACHE_MAX_ENTRIES", "5000")
+)
+LLM_RESPONSE_CACHE_MAX_BYTES = int(
+    os.environ.get("LLM_RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+)
+LLM_RESPONSE_CACHE_REDIS = os.environ.get("LLM_RESPONSE_CACHE_REDIS", "0") == "1"
+LLM_RESPONSE_CACHE_KEY_PREFIX = "llm_responses"
+
+# Parameters that do not change the completion
+IGNORED_PARAMS = {"stream", "stream_options", "timeout"}
+
+
+def is_deterministic(params: dict) -> bool:
+    """Only prompts sent with temperature 0 for a single plain completion are cached."""
+    return (
+        params.get("temperature") == 0
+        and params.get("n") in (None, 1)
+        and not params.get("tools")
+        and not params.get("logprobs")
+    )
+
+
+class LLMCacheMetrics:
+    """Hits, misses and tokens saved by the LLM response cache in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_tokens = 0
+
+    def record_hit(self, saved_tokens: int):
+        with self._lock:
+            self.hits += 1
+            self.saved_tokens += saved_tokens
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "saved_tokens": self.saved_tokens,
+            }
+
+
+llm_cache_metrics = LLMCacheMetrics()
+
+
+class LLMResponseCache(metaclass=SingletonMeta):
+    """
+    Exact-match cache of LLM responses.
+
+    Entries are keyed by a hash of the model, messages and every parameter of the
+    call, including the API key, and hold the response text with the token usage
+    of the call that produced it. They live in an in-process LRU cache and, when
+    `use_redis` is set, in Redis so that other crew workers can reuse them.
+    """
+
+    def __init__(
+        self,
+        redis_service: RedisService | None = None,
+        max_entries: int = LLM_RESPONSE_CACHE_MAX_ENTRIES,
+        max_bytes: int = LLM_RESPONSE_CACHE_MAX_BYTES,
+        use_redis: bool = LLM_RESPONSE_CACHE_REDIS,
+    ):
+        self.redis_service = redis_service
+        self.use_redis = use_redis and redis_service is not None
+        self.local = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+
+    @staticmethod
+    def make_key(params: dict) -> str | None:
+        if not is_deterministic(params):
+            return None
+        key_params = {k: v for k, v in params.items() if k not in IGNORED_PARAMS}
+        dumped = json.dumps(key_params, sort_keys=True, default=str)
+        return hashlib.sha256(dumped.encode()).hexdigest()
+
+    def for_llm(self, llm: LLMData) -> "LLMResponseCacheClient | None":
+        """Cache bound to the TTL of an LLM config, None if the config opted out."""
+        if not llm.config.cache_responses:
+            return None
+        return LLMResponseCacheClient(
+            cache=self, ttl=llm.config.cache_ttl or LLM_RESPONSE_CACHE_TTL
+        )
+
+    def _record(self, entry: dict | None) -> dict | None:
+        if entry is None:
+            llm_cache_metrics.record_miss()
+        else:
+            llm_cache_metrics.record_hit(entry["usage"].get("total_tokens", 0))
+        return entry
+
+    def get(self, key: str) -> dict | None:
+        entry = self.local.get(key)
+        if entry is None and self.use_redis:
+            try:
+                data = self.redis_service.sync_redis_client.get(
+                    f"{LLM_RESPONSE_CACHE_KEY_PREFIX}:{key}"
+                )
+                if data is not None:
+                    entry = json.loads(data)
+            except Exception:
+                logger.exception("Failed to read cached LLM response")
+        return self._record(entry)
+
+    async def aget(self, key: str) -> dict | None:
+        entry = self.local.get(key)
+        if entry is None and self.use_redis:
+            try:
+                data = await self.redis_service.aioredis_client.get(
+                    f"{LLM_RESPONSE_CACHE_KEY_PREFIX}:{key}"
+                )
+                if data is not None:
+                    entry = json.loads(data)
+            except Exception:
+                logger.exception("Failed to read cached LLM response")
+        return self._record(entry)
+
+    def set(self, key: str, entry: dict, ttl: int):
+        self.local.set(key, entry, ttl=ttl)
+        if self.use_redis:
+            try:
+                self.redis_service.sync_redis_client.set(
+                    f"{LLM_RESPONSE_CACHE_KEY_PREFIX}:{key}", json.dumps(entry), ex=ttl
+                )
+            except Exception:
+                logger.exception("Failed to cache LLM response")
+
+    async def aset(self, key: str, entry: dict, ttl: int):
+        self.local.set(key, entry, ttl=ttl)
+        if self.use_redis:
+            try:
+                await self.redis_service.aioredis_client.set(
+                    f"{LLM_RESPONSE_CACHE_KEY_PREFIX}:{key}", json.dumps(entry), ex=ttl
+                )
+            except Exception:
+                logger.exception("Failed to cache LLM response")
+
+
+class LLMResponseCacheClient:
+    """
+    LLMResponseCache with the TTL of one LLM config.
+
+    Passed to crewAI LLM as `response_cache`, entries are
+    {"response": str, "usage": {"prompt_tokens", "completion_tokens", "total_tokens"}}.
+    """
+
+    def __init__(self, cache: LLMResponseCache, ttl: int):
+        self.cache = cache
+        self.ttl = ttl
+
+    def get(self, params: dict) -> dict | None:
+        key = self.cache.make_key(params)
+        if key is None:
+            return None
+        return self.cache.get(key)
+
+    async def aget(self, params: dict) -> dict | None:
+        key = self.cache.make_key(params)
+        if key is None:
+            return None
+        return await self.cache.aget(key)
+
+    def set(self, params: dict, response: str, usage: Any):
+        key = self.cache.make_key(params)
+        if key is None or not response:
+            return
+        self.cache.set(key, make_entry(params, response, usage), self.ttl)
+
+    async def aset(self, params: dict, response: str, usage: Any):
+        key = self.cache.make_key(params)
+        if key is None or not response:
+            return
+        await self.cache.aset(key, make_entry(params, response, usage), self.ttl)
+
+
+def make_entry(params: dict, response: str, usage: Any) -> dict:
+    """
+    Cache entry with the token usage of the call. Streams without usage are
+    counted with the tokenizer of the model.
+    """
+    if usage is None:
+        prompt_tokens = litellm.token_counter(
+            model=params["model"], messages=params["messages"]
+        )
+        completion_tokens = litellm.token_counter(model=params["model"], text=response)
+    elif isinstance(usage, dict):
+        prompt_tokens = usage.get("prompt_tokens") or 0
+        completion_tokens = usage.get("completion_tokens") or 0
+    else:
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    return {
+        "response": response,
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
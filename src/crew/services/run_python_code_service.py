@@ -6,7 +6,13 @@ from loguru import logger
 from src.crew.services.graph.events import StopEvent
 from src.crew.utils.singleton_meta import SingletonMeta
 from src.crew.services.redis_service import AsyncPubsubSubscriber, RedisService
-from src.crew.models.request_models import CodeResultData, CodeTaskData, PythonCodeData
+from src.crew.models.request_models import (
+    CodeBatchItemData,
+    CodeBatchTaskData,
+    CodeResultData,
+    CodeTaskData,
+    PythonCodeData,
+)
 
 
 class RunPythonCodeService(metaclass=SingletonMeta):
@@ -49,8 +55,9 @@ class RunPythonCodeService(metaclass=SingletonMeta):
         total_len = 0
         for g in self.redis_service._async_pubsub_groups.values():
             total_len += len(g._subscribers)
-        await self.redis_service.apublish(
-            "code_exec_tasks", code_task_data.model_dump()
+        # Redis Stream read by the sandbox consumer group
+        await self.redis_service.aioredis_client.xadd(
+            "code_exec_tasks", {"data": code_task_data.model_dump_json()}
         )
         logger.info("Waiting for code_results")
 
@@ -62,6 +69,67 @@ class RunPythonCodeService(metaclass=SingletonMeta):
                 stop_event.check_stop()
             await asyncio.sleep(0.001)
 
+    async def run_code_batch(
+        self,
+        python_code_data: PythonCodeData,
+        inputs_list: list[dict[str, Any]],
+        additional_global_kwargs: dict[str, Any] | None = None,
+        stop_event: StopEvent | None = None,
+        timeout: float | None = None,
+        max_cpu_seconds: float | None = None,
+        max_memory_mb: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Run the code once per inputs in one sandbox round trip, e.g. for a
+        map-style node over a list. Returns the results in the order of inputs.
+        The limits apply to every task, the sandbox defaults are used if not set.
+        """
+        if not inputs_list:
+            return []
+
+        global_kwargs = {
+            **(python_code_data.global_kwargs or {}),
+            **(additional_global_kwargs or {}),
+        }
+        code_batch_task_data = CodeBatchTaskData(
+            venv_name=python_code_data.venv_name,
+            libraries=python_code_data.libraries,
+            batch_id=str(uuid.uuid4()),
+            tasks=[
+                CodeBatchItemData(
+                    execution_id=str(uuid.uuid4()),
+                    code=python_code_data.code,
+                    entrypoint=python_code_data.entrypoint,
+                    func_kwargs=inputs,
+                    global_kwargs=global_kwargs,
+                    timeout=timeout,
+                    max_cpu_seconds=max_cpu_seconds,
+                    max_memory_mb=max_memory_mb,
+                )
+                for inputs in inputs_list
+            ],
+        )
+        execution_ids = [task.execution_id for task in code_batch_task_data.tasks]
+        callback_receiver = RunPythonBatchCallbackReceiver(execution_ids=execution_ids)
+
+        subscriber = AsyncPubsubSubscriber(callback_receiver.callback)
+        await self.redis_service.asubscribe("code_results", subscriber=subscriber)
+        await self.redis_service.aioredis_client.xadd(
+            "code_exec_tasks", {"data": code_batch_task_data.model_dump_json()}
+        )
+        logger.info(f"Waiting for {len(execution_ids)} code_results")
+
+        try:
+            while not callback_receiver.done:
+                if stop_event is not None:
+                    stop_event.check_stop()
+                await asyncio.sleep(0.001)
+        finally:
+            self.redis_service.unsubscribe("code_results", subscriber=subscriber)
+        return [
+            callback_receiver.results[execution_id] for execution_id in execution_ids
+        ]
+
 
 class RunPythonCallbackReceiver:
     def __init__(self, execution_id: str):
@@ -74,3 +142,18 @@ class RunPythonCallbackReceiver:
         if code_result_data.execution_id == self.execution_id:
             self.results = code_result_data.model_dump()
             logger.info(f"Received code result for execution ID: {self.execution_id}")
+
+
+class RunPythonBatchCallbackReceiver:
+    def __init__(self, execution_ids: list[str]):
+        self.execution_ids = set(execution_ids)
+        self.results: dict[str, dict[str, Any]] = {}
+
+    @property
+    def done(self) -> bool:
+        return len(self.results) == len(self.execution_ids)
+
+    async def callback(self, message: dict[str, Any]):
+        code_result_data = CodeResultData.model_validate_json(message["data"])
+        if code_result_data.execution_id in self.execution_ids:
+            self.results[code_result_data.execution_id] = code_result_data.model_dump()
@@ -3,6 +3,7 @@ from typing import Type
 from pathlib import Path
 import re
 import sys
+import threading
 from tempfile import TemporaryDirectory
 
 import uuid
@@ -13,6 +14,9 @@ from datamodel_code_generator import InputFileType, generate
 from datamodel_code_generator.parser.base import title_to_class_name
 from datamodel_code_generator import DataModelType
 
+# datamodel-code-generator changes the working directory while generating
+_generate_lock = threading.Lock()
+
 
 def generate_model_from_schema(schema_dict: dict) -> Type[BaseModel]:
     class_name = title_to_class_name(schema_dict["title"])
@@ -20,14 +24,15 @@ def generate_model_from_schema(schema_dict: dict) -> Type[BaseModel]:
     with TemporaryDirectory() as temporary_directory_name:
         temporary_directory = Path(temporary_directory_name)
         output = Path(temporary_directory / "model.py")
-        generate(
-            json.dumps(schema_dict),
-            input_file_type=InputFileType.JsonSchema,
-            output=output,
-            # set up the output model types
-            output_model_type=DataModelType.PydanticV2BaseModel,
-            class_name=class_name,
-        )
+        with _generate_lock:
+            generate(
+                json.dumps(schema_dict),
+                input_file_type=InputFileType.JsonSchema,
+                output=output,
+                # set up the output model types
+                output_model_type=DataModelType.PydanticV2BaseModel,
+                class_name=class_name,
+            )
         class_definition: str = output.read_text()
 
     dynamic_module = ModuleType(module_name)
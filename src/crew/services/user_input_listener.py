@@ -0,0 +1,119 @@
+import json
+import threading
+import time
+from collections import defaultdict
+
+from loguru import logger
+
+from src.crew.services.redis_service import RedisService
+from src.crew.utils.singleton_meta import SingletonMeta
+
+USER_INPUT_CHANNEL_PATTERN = "sessions:*:user_input"
+
+
+class UserInputRequest:
+    """A single wait for user input of an agent or a crew manager."""
+
+    def __init__(
+        self, session_id: int, crew_id: int, node_name: str, execution_order: int
+    ):
+        self.key = (session_id, crew_id, node_name, execution_order)
+        self.text: str | None = None
+        self._event = threading.Event()
+
+    def resolve(self, text: str):
+        self.text = text
+        self._event.set()
+
+    def cancel(self):
+        """Wake the waiting thread without input, e.g. when the session is stopped."""
+        self._event.set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """
+        Block until the request is resolved or cancelled.
+
+        Returns:
+            bool: False if the timeout expired.
+        """
+        return self._event.wait(timeout)
+
+
+class UserInputListener(metaclass=SingletonMeta):
+    """
+    Receives user input for all sessions of the process with one pattern subscription
+    and one reader thread, and hands it to the waiting requests.
+    """
+
+    def __init__(self, redis_service: RedisService):
+        self.redis_service = redis_service
+        self._requests: dict[tuple, list[UserInputRequest]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            pubsub = self.redis_service.sync_redis_client.pubsub(
+                ignore_subscribe_messages=True
+            )
+            pubsub.psubscribe(**{USER_INPUT_CHANNEL_PATTERN: self._handle_message})
+            self._thread = pubsub.run_in_thread(
+                sleep_time=1,
+                daemon=True,
+                exception_handler=self._handle_exception,
+            )
+            logger.info(f"Listening to {USER_INPUT_CHANNEL_PATTERN}")
+
+    def _handle_exception(self, error, pubsub, thread):
+        logger.error(f"Error in user input listener: {error}")
+        # The reader thread retries on its next iteration, do not spin on a lost connection
+        time.sleep(1)
+
+    def register(
+        self, session_id: int, crew_id: int, node_name: str, execution_order: int
+    ) -> UserInputRequest:
+        """Register a request before the user is asked, so no answer is missed."""
+        self._ensure_started()
+        request = UserInputRequest(
+            session_id=session_id,
+            crew_id=crew_id,
+            node_name=node_name,
+            execution_order=execution_order,
+        )
+        with self._lock:
+            self._requests[request.key].append(request)
+        return request
+
+    def unregister(self, request: UserInputRequest):
+        with self._lock:
+            requests = self._requests.get(request.key)
+            if requests is None or request not in requests:
+                return
+            requests.remove(request)
+            if not requests:
+                del self._requests[request.key]
+
+    @property
+    def waiting(self) -> int:
+        with self._lock:
+            return sum(len(requests) for requests in self._requests.values())
+
+    def _handle_message(self, message: dict):
+        try:
+            session_id = int(message["channel"].split(":")[1])
+            message_data: dict = json.loads(message["data"])
+            key = (
+                session_id,
+                message_data.get("crew_id"),
+                message_data.get("node_name"),
+                message_data.get("execution_order"),
+            )
+            with self._lock:
+                requests = self._requests.pop(key, [])
+
+            for request in requests:
+                request.resolve(message_data.get("text", "<NO USER INPUT>"))
+        except Exception:
+            logger.exception(f"Failed to handle user input from {message['channel']}")
@@ -0,0 +1,124 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+from litellm import ModelResponse
+from litellm.types.utils import Delta, StreamingChoices
+
+from services.graph.nodes.llm_node import LLMNode
+from src.crew.services.llm_response_cache import (
+    LLMResponseCache,
+    LLMResponseCacheClient,
+)
+from src.crew.services.graph.token_stream import token_stream_metrics
+from src.crew.utils.singleton_meta import SingletonMeta
+
+TOKENS = [f"token{index} " for index in range(30)]
+TOKEN_DELAY = 0.01
+
+
+async def fake_stream():
+    for token in TOKENS:
+        await asyncio.sleep(TOKEN_DELAY)
+        yield ModelResponse(
+            id="chatcmpl-1",
+            model="gpt-4o",
+            stream=True,
+            choices=[StreamingChoices(index=0, delta=Delta(content=token))],
+        )
+
+
+@pytest.mark.asyncio
+async def test_llm_node_streams_coalesced_tokens():
+    node = LLMNode(
+        session_id=1,
+        node_name="llm",
+        stop_event=MagicMock(),
+        llm_data=MagicMock(),
+        input_map={},
+        output_variable_path=None,
+    )
+    messages = []
+
+    async def acompletion(**params):
+        assert params["stream"] is True
+        return fake_stream()
+
+    with patch("litellm.acompletion", acompletion):
+        result = await node.execute(
+            state=MagicMock(),
+            writer=messages.append,
+            input_={"query": "Write something"},
+            execution_order=0,
+        )
+
+    # Final result is assembled as before
+    assert result == {"response": "".join(TOKENS)}
+    *chunks, final = messages
+    assert final.message_data.message_type == "llm"
+    assert final.message_data.response == "".join(TOKENS)
+    assert final.message_data.time_to_first_token > 0
+
+    # First token is sent at once, the rest in batches of about 50 ms
+    chunk_data = [message.message_data for message in chunks]
+    assert all(data.message_type == "llm_chunk" for data in chunk_data)
+    assert chunk_data[0].chunk == TOKENS[0]
+    assert chunk_data[0].time_to_first_token is not None
+    assert "".join(data.chunk for data in chunk_data) == "".join(TOKENS)
+    assert [data.index for data in chunk_data] == list(range(len(chunk_data)))
+    assert len({data.stream_id for data in chunk_data}) == 1
+    assert 3 <= len(chunk_data) <= 15
+
+
+@pytest.mark.asyncio
+async def test_llm_node_reuses_cached_response():
+    SingletonMeta._instances.pop(LLMResponseCache, None)
+    llm_data = MagicMock()
+    llm_data.config.temperature = 0
+    llm_data.config.n = None
+    llm_data.config.logprobs = None
+    node = LLMNode(
+        session_id=1,
+        node_name="llm",
+        stop_event=MagicMock(),
+        llm_data=llm_data,
+        input_map={},
+        output_variable_path=None,
+        response_cache=LLMResponseCacheClient(cache=LLMResponseCache(), ttl=60),
+    )
+    calls = []
+
+    async def acompletion(**params):
+        calls.append(params)
+        return fake_stream()
+
+    results = []
+    streams = []
+    with patch("litellm.acompletion", acompletion):
+        for _ in range(2):
+            messages = []
+            result = await node.execute(
+                state=MagicMock(),
+                writer=messages.append,
+                input_={"query": "Classify this"},
+                execution_order=0,
+            )
+            results.append((result, messages[-1].message_data))
+            streams.append(token_stream_metrics.streams)
+    SingletonMeta._instances.pop(LLMResponseCache, None)
+
+    assert len(calls) == 1
+    (first, first_data), (second, second_data) = results
+    # Replies from the cache do not count as streams with a time to first token
+    assert streams[1] == streams[0]
+    assert first_data.time_to_first_token is not None
+    assert second_data.time_to_first_token is None
+    assert first == second == {"response": "".join(TOKENS)}
+    assert first_data.token_usage["successful_requests"] == 1
+    assert first_data.token_usage["total_tokens"] > 0
+    assert second_data.token_usage["total_tokens"] == 0
+    assert second_data.token_usage["cached_responses"] == 1
+    assert (
+        second_data.token_usage["saved_tokens"]
+        == first_data.token_usage["total_tokens"]
+    )
@@ -0,0 +1,188 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from dotdict import DotDict
+from langgraph.graph import StateGraph
+
+from src.crew.models.graph_models import ConditonGroupManipulationMessageData
+from models.state import State
+from models.request_models import (
+    ConditionData,
+    ConditionGroupData,
+    DecisionTableNodeData,
+)
+from services.graph.subgraphs.decision_table_node import DecisionTableNodeSubgraph
+
+
+def run_code_locally(python_code_data, inputs, **kwargs) -> dict:
+    """Mimics the sandbox: executes entrypoint with DotDict kwargs."""
+    namespace = {}
+    exec(python_code_data.code, namespace)
+    result = namespace[python_code_data.entrypoint](**DotDict(inputs))
+    return {"returncode": 0, "result_data": json.dumps(result), "stderr": ""}
+
+
+@pytest.fixture
+def decision_table_node_data() -> DecisionTableNodeData:
+    # `**` is not supported in-process, so the table is evaluated in the sandbox
+    return DecisionTableNodeData(
+        node_name="decision_table",
+        conditional_group_list=[
+            ConditionGroupData(
+                group_name=f"group_{index}",
+                group_type="simple",
+                condition_list=[
+                    ConditionData(condition="True"),
+                    ConditionData(condition=f"variables.value ** 2 == {index ** 2}"),
+                ],
+                next_node=f"node_{index}",
+            )
+            for index in range(9)
+        ]
+        + [
+            ConditionGroupData(
+                group_name="group_manipulation",
+                group_type="complex",
+                expression="variables.value ** 2 == 100",
+                manipulation="variables.matched = True",
+                next_node="node_manipulation",
+            )
+        ],
+        default_next_node="default_node",
+        next_error_node="error_node",
+    )
+
+
+def run_decision_table(decision_table_node_data, variables: dict):
+    run_code_execution_service = MagicMock()
+    run_code_execution_service.run_code = AsyncMock(side_effect=run_code_locally)
+    builder = DecisionTableNodeSubgraph(
+        session_id=1,
+        decision_table_node_data=decision_table_node_data,
+        graph_builder=StateGraph(State),
+        stop_event=MagicMock(),
+        run_code_execution_service=run_code_execution_service,
+    )
+    graph = builder.build()
+    state = {
+        "state_history": [],
+        "variables": DotDict(variables),
+        "system_variables": {"nodes": {}},
+    }
+
+    async def run_graph():
+        messages = []
+        final_state = None
+        async for stream_mode, chunk in graph.astream(
+            state, stream_mode=["values", "custom"]
+        ):
+            if stream_mode == "custom":
+                messages.append(chunk.message_data)
+            else:
+                final_state = chunk
+        return final_state, messages
+
+    final_state, messages = asyncio.run(run_graph())
+    return final_state, run_code_execution_service.run_code, messages
+
+
+def test_decision_table_is_evaluated_in_one_sandbox_call(decision_table_node_data):
+    final_state, run_code, _ = run_decision_table(
+        decision_table_node_data, {"value": 7}
+    )
+
+    decision_node_variables = final_state["system_variables"]["nodes"]["decision_table"]
+    assert decision_node_variables["result_node"] == "node_7"
+    assert run_code.await_count == 1
+
+
+def test_decision_table_batch_manipulation(decision_table_node_data):
+    final_state, run_code, _ = run_decision_table(
+        decision_table_node_data, {"value": 10}
+    )
+
+    decision_node_variables = final_state["system_variables"]["nodes"]["decision_table"]
+    assert decision_node_variables["result_node"] == "node_manipulation"
+    assert final_state["variables"]["matched"] is True
+    assert run_code.await_count == 1
+
+
+def test_decision_table_batch_error(decision_table_node_data):
+    final_state, run_code, _ = run_decision_table(decision_table_node_data, {})
+
+    decision_node_variables = final_state["system_variables"]["nodes"]["decision_table"]
+    assert decision_node_variables["result_node"] == "error_node"
+    assert run_code.await_count == 1
+
+
+def test_decision_table_in_process_manipulation_rebinds_variables():
+    decision_table_node_data = DecisionTableNodeData(
+        node_name="decision_table",
+        conditional_group_list=[
+            ConditionGroupData(
+                group_name="group_rebind",
+                group_type="complex",
+                expression="variables.value == 1",
+                manipulation="variables = {'value': variables.value + 1}",
+                next_node="node_rebind",
+            )
+        ],
+        default_next_node="default_node",
+        next_error_node="error_node",
+    )
+
+    final_state, run_code, _ = run_decision_table(
+        decision_table_node_data, {"value": 1}
+    )
+
+    assert final_state["variables"]["value"] == 2
+    assert run_code.await_count == 0
+
+
+def test_decision_table_batch_continues_after_group_without_next_node():
+    decision_table_node_data = DecisionTableNodeData(
+        node_name="decision_table",
+        conditional_group_list=[
+            ConditionGroupData(
+                group_name="group_count",
+                group_type="complex",
+                expression="variables.value ** 2 == 4",
+                manipulation="variables.counted = True",
+                next_node=None,
+            ),
+            ConditionGroupData(
+                group_name="group_route",
+                group_type="complex",
+                expression="variables.counted",
+                manipulation="variables.routed = True",
+                next_node="node_route",
+            ),
+        ],
+        default_next_node="default_node",
+        next_error_node="error_node",
+    )
+
+    final_state, run_code, messages = run_decision_table(
+        decision_table_node_data, {"value": 2}
+    )
+
+    decision_node_variables = final_state["system_variables"]["nodes"]["decision_table"]
+    assert decision_node_variables["result_node"] == "node_route"
+    assert final_state["variables"]["counted"] is True
+    assert final_state["variables"]["routed"] is True
+    assert run_code.await_count == 1
+
+    manipulation_messages = [
+        message
+        for message in messages
+        if isinstance(message, ConditonGroupManipulationMessageData)
+    ]
+    assert [message.group_name for message in manipulation_messages] == [
+        "group_count",
+        "group_route",
+    ]
+    first_variables = manipulation_messages[0].state["variables"]
+    assert first_variables["counted"] is True
+    assert "routed" not in first_variables
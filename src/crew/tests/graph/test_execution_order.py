@@ -0,0 +1,99 @@
+import asyncio
+from typing import Any
+from unittest.mock import MagicMock
+
+from dotdict import DotDict
+from langgraph.graph import StateGraph, END
+
+from models.state import State
+from services.graph.nodes.base_node import BaseNode
+from utils.execution_order import next_execution_order
+
+
+LOOP_ITERATIONS = 1000
+
+
+class CounterNode(BaseNode):
+    TYPE = "PYTHON"
+
+    async def execute(
+        self, state: State, writer, execution_order: int, input_: Any
+    ) -> int:
+        return state["variables"].counter + 1
+
+
+class NotIterableList(list):
+    def __iter__(self):
+        raise AssertionError("state_history must not be scanned")
+
+
+def test_next_execution_order():
+    system_variables = {}
+
+    assert next_execution_order(system_variables, "node") == 0
+    assert next_execution_order(system_variables, "node") == 1
+    assert next_execution_order(system_variables, "other_node") == 0
+    assert system_variables["nodes"]["node"]["execution_order"] == 1
+
+
+def test_calc_execution_order_does_not_scan_state_history():
+    node = CounterNode(session_id=1, node_name="counter", stop_event=MagicMock())
+    state = {
+        "state_history": NotIterableList([{"name": "counter"}] * 1000),
+        "variables": DotDict(),
+        "system_variables": {"nodes": {"counter": {"execution_order": 41}}},
+    }
+
+    assert node._calc_execution_order(state=state, name="counter") == 42
+
+
+def test_loop_graph_counts_execution_order_per_iteration():
+    node = CounterNode(
+        session_id=1,
+        node_name="counter",
+        stop_event=MagicMock(),
+        output_variable_path="variables.counter",
+    )
+    graph_builder = StateGraph(State)
+
+    async def inner(state: State, writer):
+        return await node.run(state, writer)
+
+    graph_builder.add_node(node.node_name, inner)
+    graph_builder.set_entry_point(node.node_name)
+    graph_builder.add_conditional_edges(
+        node.node_name,
+        lambda state: (
+            END if state["variables"].counter >= LOOP_ITERATIONS else node.node_name
+        ),
+    )
+    graph = graph_builder.compile()
+
+    state = {
+        "state_history": [],
+        "variables": DotDict({"counter": 0}),
+        "system_variables": {"nodes": {}},
+    }
+
+    async def run_graph():
+        execution_orders = []
+        final_state = None
+        async for stream_mode, chunk in graph.astream(
+            state,
+            config={"recursion_limit": LOOP_ITERATIONS + 1},
+            stream_mode=["values", "custom"],
+        ):
+            if stream_mode == "custom" and chunk.message_data.message_type == "start":
+                execution_orders.append(chunk.execution_order)
+            elif stream_mode == "values":
+                final_state = chunk
+        return execution_orders, final_state
+
+    execution_orders, final_state = asyncio.run(run_graph())
+
+    assert execution_orders == list(range(LOOP_ITERATIONS))
+    assert len(final_state["state_history"]) == LOOP_ITERATIONS
+    assert (
+        final_state["system_variables"]["nodes"]["counter"]["execution_order"]
+        == LOOP_ITERATIONS - 1
+    )
@@ -0,0 +1,138 @@
+import pytest
+from dotdict import DotDict
+
+from services.graph.expression_engine import (
+    ExpressionEngine,
+    ExpressionEvaluationError,
+    UnsupportedExpressionError,
+)
+
+
+@pytest.fixture
+def expression_engine() -> ExpressionEngine:
+    return ExpressionEngine()
+
+
+@pytest.fixture
+def variables() -> DotDict:
+    return DotDict({"test1": 1, "test2": [2, {"test3": "secret_value"}]})
+
+
+@pytest.mark.parametrize(
+    "expression, expected",
+    [
+        ("True", True),
+        ("variables.test1 == 1", True),
+        ("variables.test2[0] == 2 and variables.test1 > 5", False),
+        ("variables.test2[1].test3.startswith('secret')", True),
+        ("'-' * 3 == '---'", True),
+        ("variables.test1 * 3 == 3", True),
+        ("len(variables.get('missing', [])) == 0", True),
+        ("variables.test1 % 2 == 1", True),
+        ("f'{variables.test1}!' == '1!'", True),
+    ],
+)
+def test_evaluate_expression(expression_engine, variables, expression, expected):
+    result = expression_engine.evaluate_expression(
+        expression=expression, names={"variables": variables}
+    )
+
+    assert result is expected
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "__import__('os').system('ls')",
+        "variables.__class__",
+        "open('/etc/passwd').read()",
+        "(item for item in []).gi_frame.f_back",
+        "'{0.__class__}'.format(variables)",
+        "variables.test2.append(1)",
+        "2 ** 1000000",
+        "any(item == 2 for item in variables.test2)",
+        "[item for item in variables.test2]",
+        "len([0] * 10000000000) > 0",
+        "len(10000000000 * 'a') > 0",
+        "len(('a' * 1000).replace('', 'a' * 1000)) > 0",
+        "len(('a' * 1000).replace('', 'a' * 1000).replace('', 'a')) > 0",
+        "len(('a' * 10000).join(['b'] * 10000)) > 0",
+        "len('%0500000d' % 1) > 0",
+        "len(f'{1:0500000d}') > 0",
+    ],
+)
+def test_unsupported_expression(expression_engine, variables, expression):
+    with pytest.raises(UnsupportedExpressionError):
+        expression_engine.evaluate_expression(
+            expression=expression, names={"variables": variables}
+        )
+
+
+def test_expression_evaluation_error(expression_engine, variables):
+    with pytest.raises(ExpressionEvaluationError):
+        expression_engine.evaluate_expression(
+            expression="variables.test666 == 2", names={"variables": variables}
+        )
+
+
+def test_execute_statements(expression_engine, variables):
+    expression_engine.execute_statements(
+        code="variables.test1 = variables.test1 + 1\nvariables.test2.append(3)",
+        names={"variables": variables},
+    )
+
+    assert variables.test1 == 2
+    assert variables.test2[-1] == 3
+
+
+def test_execute_statements_rebinding_variables(expression_engine, variables):
+    namespace = expression_engine.execute_statements(
+        code="variables = {'test1': variables.test1 + 1}",
+        names={"variables": variables},
+    )
+
+    assert namespace["variables"] == {"test1": 2}
+
+
+def test_execute_statements_repetition_limit(expression_engine, variables):
+    with pytest.raises(UnsupportedExpressionError):
+        expression_engine.execute_statements(
+            code="variables.items = [0] * 10000000000", names={"variables": variables}
+        )
+    with pytest.raises(UnsupportedExpressionError):
+        expression_engine.execute_statements(
+            code="variables.test2 *= 3", names={"variables": variables}
+        )
+    with pytest.raises(UnsupportedExpressionError):
+        expression_engine.execute_statements(
+            code="text = '%0500000d'\ntext %= 1", names={"variables": variables}
+        )
+
+
+def test_compile_function(expression_engine):
+    code = '''
+def main(value: int, threshold: int = 10) -> str:
+    """Choose next node."""
+    doubled = value * 2
+    if doubled > threshold and state["variables"]["enabled"]:
+        return "big_node"
+    return "small_node"
+'''
+    function = expression_engine.compile_function(code=code, entrypoint="main")
+
+    global_kwargs = {"state": {"variables": {"enabled": True}, "state_history": []}}
+    assert function(inputs={"value": 6}, global_kwargs=global_kwargs) == "big_node"
+    assert function(inputs={"value": 1}, global_kwargs=global_kwargs) == "small_node"
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "import requests\ndef main():\n    return 'node'",
+        "def main():\n    for i in range(10):\n        pass\n    return 'node'",
+        "def main(items):\n    items += [1]\n    return 'node'",
+        "def helper():\n    return 'node'\ndef main():\n    return helper()",
+    ],
+)
+def test_unsupported_function(expression_engine, code):
+    assert not expression_engine.is_supported_function(code=code, entrypoint="main")
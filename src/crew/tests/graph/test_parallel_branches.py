@@ -0,0 +1,208 @@
+import asyncio
+import time
+from typing import Any
+from unittest.mock import Mock
+
+import pytest
+from dotdict import DotDict
+from langgraph.types import StreamWriter
+
+from models.state import State
+from src.crew.models.state_updates import VariablesUpdate
+from services.graph.branch_state import fork_state, make_state_update
+from services.graph.events import StopEvent
+from services.graph.graph_builder import SessionGraphBuilder
+from services.graph.nodes import BaseNode
+from utils.execution_order import next_execution_order
+
+CREW_DURATION = 2
+
+
+class FakeCrewNode(BaseNode):
+    """Blocks a worker thread like a crew kickoff does."""
+
+    TYPE = "CREW"
+
+    def __init__(self, node_name: str, duration: float, output: Any):
+        super().__init__(
+            session_id=1,
+            node_name=node_name,
+            stop_event=StopEvent(),
+            output_variable_path=f"variables.{node_name}",
+        )
+        self.custom_session_message_writer = Mock()
+        self.duration = duration
+        self.output = output
+
+    async def execute(
+        self, state: State, writer: StreamWriter, execution_order: int, input_: Any
+    ):
+        await asyncio.to_thread(time.sleep, self.duration)
+        return self.output
+
+
+def make_builder() -> SessionGraphBuilder:
+    return SessionGraphBuilder(
+        session_id=1,
+        redis_service=Mock(),
+        crew_parser_service=Mock(),
+        python_code_executor_service=Mock(),
+        crewai_output_channel="",
+        knowledge_search_service=Mock(),
+        stop_event=StopEvent(),
+    )
+
+
+def initial_state() -> dict:
+    return {
+        "state_history": [],
+        "variables": DotDict({"topic": "ai", "shared": {"a": 1}}),
+        "system_variables": {"nodes": {}},
+    }
+
+
+async def run_graph(graph) -> dict:
+    final_state = None
+    async for stream_mode, chunk in graph.astream(
+        input=initial_state(),
+        config={"recursion_limit": 1000},
+        stream_mode=["values", "custom"],
+    ):
+        if stream_mode == "values":
+            final_state = chunk
+    return final_state
+
+
+@pytest.mark.asyncio
+async def test_independent_branches_run_concurrently():
+    builder = make_builder()
+    builder.add_node(FakeCrewNode("split", duration=0, output="go"))
+    for index in range(3):
+        branch = f"research_{index}"
+        builder.add_node(
+            FakeCrewNode(branch, duration=CREW_DURATION, output={"index": index})
+        )
+        builder.add_edge("split", branch)
+        builder.add_edge(branch, "join")
+    builder.add_node(FakeCrewNode("join", duration=0, output="done"))
+    builder.set_entrypoint("split")
+    graph = builder.compile()
+
+    start = time.perf_counter()
+    final_state = await run_graph(graph)
+    elapsed = time.perf_counter() - start
+
+    # Sequential execution would take 3 * CREW_DURATION
+    assert elapsed < CREW_DURATION * 1.5
+
+    variables = final_state["variables"]
+    assert isinstance(variables, DotDict)
+    assert [variables[f"research_{index}"].index for index in range(3)] == [0, 1, 2]
+    assert variables.topic == "ai"
+    assert variables.join == "done"
+
+    # Branches are merged in the order of node names, join runs once
+    assert [item["name"] for item in final_state["state_history"]] == [
+        "split",
+        "research_0",
+        "research_1",
+        "research_2",
+        "join",
+    ]
+    nodes = final_state["system_variables"]["nodes"]
+    assert {name: node["execution_order"] for name, node in nodes.items()} == {
+        "split": 0,
+        "research_0": 0,
+        "research_1": 0,
+        "research_2": 0,
+        "join": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_join_after_branches_of_unequal_length_runs_once():
+    builder = make_builder()
+    builder.add_node(FakeCrewNode("split", duration=0, output="go"))
+    # split -> short -> join and split -> long_1 -> long_2 -> long_3 -> join
+    branches = [["short"], ["long_1", "long_2", "long_3"]]
+    for branch in branches:
+        previous = "split"
+        for node_name in branch:
+            builder.add_node(FakeCrewNode(node_name, duration=0, output=node_name))
+            builder.add_edge(previous, node_name)
+            previous = node_name
+        builder.add_edge(previous, "join")
+    builder.add_node(FakeCrewNode("join", duration=0, output="done"))
+    builder.set_entrypoint("split")
+    graph = builder.compile()
+
+    final_state = await run_graph(graph)
+
+    names = [item["name"] for item in final_state["state_history"]]
+    assert names.count("join") == 1
+    assert names[-1] == "join"
+    assert final_state["system_variables"]["nodes"]["join"]["execution_order"] == 0
+    assert final_state["variables"].short == "short"
+    assert final_state["variables"].long_3 == "long_3"
+
+
+def test_loop_and_alternative_paths_are_not_joined():
+    builder = make_builder()
+    for node_name in ("start", "body", "left", "right", "after"):
+        builder.add_node(FakeCrewNode(node_name, duration=0, output=node_name))
+    # start -> body -> start is a loop, left and right are never both run
+    builder.add_edge("start", "body")
+    builder.add_edge("body", "start")
+    builder.add_edge("left", "after")
+    builder.add_edge("right", "after")
+    builder.add_edge("after", "start")
+    builder.set_entrypoint("start")
+    graph = builder.compile()
+
+    waiting_edges = graph.builder.waiting_edges
+    assert waiting_edges == set()
+
+
+def test_merge_variables_conflicts():
+    base = DotDict({"shared": {"a": 1, "b": 1}, "value": 0, "removed": 1})
+    shared = base["shared"]
+
+    first = VariablesUpdate(
+        set={"shared": {"a": 2, "b": 1}, "value": 1},
+        unset=["removed"],
+        previous={"shared": shared, "value": 0, "removed": 1},
+    ).apply(base)
+    second = VariablesUpdate(
+        set={"shared": {"a": 1, "b": 3}, "value": 2},
+        previous={"shared": shared, "value": 0},
+    ).apply(first)
+
+    # Nested dicts are merged key by key, other conflicts are won by the later branch
+    assert second.model_dump() == {"shared": {"a": 2, "b": 3}, "value": 2}
+    # Merged into the existing variables
+    assert second is base
+
+
+def test_fork_copies_only_read_values():
+    shared = DotDict({"a": 1})
+    untouched = DotDict({"large": list(range(1000))})
+    state = {
+        "state_history": [],
+        "variables": DotDict({"shared": shared, "untouched": untouched}),
+        "system_variables": {"nodes": {"other": {"execution_order": 3}}},
+    }
+
+    forked = fork_state(state)
+    forked["variables"].shared.a = 2
+    forked["variables"].added = 1
+    next_execution_order(forked["system_variables"], "node")
+
+    assert state["variables"]["shared"].a == 1
+    assert state["system_variables"] == {"nodes": {"other": {"execution_order": 3}}}
+    assert (
+        forked["variables"].model_dump()["untouched"] is state["variables"]["untouched"]
+    )
+
+    update = make_state_update(base=state, result=forked)
+    assert update["variables"].set == {"shared": {"a": 2}, "added": 1}
+    assert update["system_variables"].nodes == {"node": {"execution_order": 0}}
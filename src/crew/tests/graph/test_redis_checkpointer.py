@@ -0,0 +1,228 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+from dotdict import DotDict
+from langgraph.graph import StateGraph
+
+from models.state import State
+from services.graph.redis_checkpointer import (
+    CheckpointSerializer,
+    RedisCheckpointSaver,
+)
+from services.graph.session_capacity import SessionCapacityLimiter
+from src.crew.services.graph.exceptions import StopSession
+
+
+@pytest.fixture
+def checkpointer() -> RedisCheckpointSaver:
+    server = fakeredis.FakeServer()
+    redis_service = SimpleNamespace(
+        sync_redis_client=fakeredis.FakeRedis(server=server, decode_responses=True),
+        aioredis_client=fakeredis.FakeAsyncRedis(server=server, decode_responses=True),
+    )
+    return RedisCheckpointSaver(redis_service=redis_service)
+
+
+def build_graph(checkpointer, calls: list[str], fail_on: str | None = None):
+    def make_node(name: str):
+        async def node(state: State):
+            if name == fail_on:
+                raise RuntimeError("process restarted")
+            calls.append(name)
+            state["variables"][name] = len(calls)
+            state["state_history"].append(
+                {"name": name, "variables": state["variables"].model_dump()}
+            )
+            return state
+
+        return node
+
+    graph_builder = StateGraph(State)
+    for name in ("first", "second", "third"):
+        graph_builder.add_node(name, make_node(name))
+    graph_builder.set_entry_point("first")
+    graph_builder.add_edge("first", "second")
+    graph_builder.add_edge("second", "third")
+    return graph_builder.compile(checkpointer=checkpointer)
+
+
+def initial_state() -> dict:
+    return {
+        "state_history": [],
+        "variables": DotDict({"input": {"value": 1}}),
+        "system_variables": {"nodes": {}},
+    }
+
+
+@pytest.mark.asyncio
+async def test_session_resumes_from_last_checkpoint(checkpointer):
+    config = {"configurable": {"thread_id": "1"}}
+    calls = []
+
+    graph = build_graph(checkpointer, calls, fail_on="third")
+    with pytest.raises(RuntimeError):
+        await graph.ainvoke(initial_state(), config)
+    assert calls == ["first", "second"]
+
+    graph = build_graph(checkpointer, calls)
+    snapshot = await graph.aget_state(config)
+    assert snapshot.next == ("third",)
+
+    result = await graph.ainvoke(None, config)
+
+    # Completed nodes are not executed again
+    assert calls == ["first", "second", "third"]
+    assert isinstance(result["variables"], DotDict)
+    assert result["variables"].input.value == 1
+    assert [item["name"] for item in result["state_history"]] == [
+        "first",
+        "second",
+        "third",
+    ]
+
+
+def test_sync_api_and_delete_thread(checkpointer):
+    config = {"configurable": {"thread_id": "2"}}
+    calls = []
+    graph = build_graph(checkpointer, calls)
+
+    asyncio.run(graph.ainvoke(initial_state(), config))
+
+    latest = checkpointer.get_tuple(config)
+    checkpoints = list(checkpointer.list(config))
+    assert latest.config == checkpoints[0].config
+    assert [c.checkpoint["id"] for c in checkpoints] == sorted(
+        (c.checkpoint["id"] for c in checkpoints), reverse=True
+    )
+    assert len(list(checkpointer.list(config, limit=1))) == 1
+    assert checkpoints[0].parent_config == checkpoints[1].config
+
+    checkpointer.delete_thread("2")
+
+    assert checkpointer.get_tuple(config) is None
+    assert checkpointer.redis_service.sync_redis_client.keys("*") == []
+
+
+@pytest.mark.asyncio
+async def test_only_latest_checkpoints_are_kept(checkpointer):
+    config = {"configurable": {"thread_id": "3"}}
+    redis_client = checkpointer.redis_service.aioredis_client
+    graph = build_graph(checkpointer, calls=[])
+
+    await graph.ainvoke(initial_state(), config)
+    keys_after_first_run = set(await redis_client.keys("*"))
+    await graph.ainvoke(initial_state(), config)
+
+    # The latest checkpoint and its parent, whatever the number of steps
+    checkpoints = [c async for c in checkpointer.alist(config)]
+    assert len(checkpoints) == 2
+    assert checkpoints[0].parent_config == checkpoints[1].config
+    assert len(await redis_client.keys("*")) == len(keys_after_first_run)
+
+    snapshot = await graph.aget_state(config)
+    assert snapshot.values["variables"]["third"] == 6
+
+
+@pytest.mark.asyncio
+async def test_state_history_is_stored_once(checkpointer):
+    config = {"configurable": {"thread_id": "4"}}
+    redis_client = checkpointer.redis_service.aioredis_client
+    graph = build_graph(checkpointer, calls=[])
+
+    result = await graph.ainvoke(initial_state(), config)
+
+    history = await redis_client.lrange("checkpoint_history:4:", 0, -1)
+    assert len(history) == len(result["state_history"]) == 3
+    for checkpoint_id in await redis_client.zrange("checkpoints:4:", 0, -1):
+        saved = await redis_client.hgetall(f"checkpoint:4::{checkpoint_id}")
+        assert saved["checkpoint"].startswith("msgpack:")
+        checkpoint = checkpointer._loads(saved["checkpoint"])
+        assert "state_history" not in checkpoint["channel_values"]
+
+    snapshot = await graph.aget_state(config)
+    assert snapshot.values["state_history"] == result["state_history"]
+
+    # A new run on the same thread rewrites the history
+    await graph.ainvoke(initial_state(), config)
+    snapshot = await graph.aget_state(config)
+    history = snapshot.values["state_history"]
+    assert [item["variables"]["first"] for item in history] == [4, 4, 4]
+    assert await redis_client.llen("checkpoint_history:4:") == 3
+
+
+def test_serializer_keeps_dotdict_and_refuses_pickle():
+    serializer = CheckpointSerializer()
+    variables = DotDict({"nested": {"value": 1}, "rows": [{"a": 1}]})
+    variables.add_setter("nested", "value")
+
+    loaded = serializer.loads_typed(serializer.dumps_typed({"variables": variables}))
+
+    assert isinstance(loaded["variables"], DotDict)
+    assert loaded["variables"].nested.value == 1
+    assert loaded["variables"].rows[0].a == 1
+    assert loaded["variables"]._setters["nested"].code == "value"
+    with pytest.raises(NotImplementedError):
+        serializer.loads_typed(("pickle", b""))
+
+
+@pytest.mark.asyncio
+async def test_suspended_session_releases_capacity():
+    limiter = SessionCapacityLimiter(max_active_sessions=1)
+    await limiter.acquire(session_id=1)
+    assert limiter.active_sessions == 1
+
+    # Session 1 waits for user input in a crew worker thread
+    resumed = threading.Event()
+
+    def wait_for_user():
+        limiter.suspend(1)
+        user_input.wait()
+        limiter.resume(1)
+        resumed.set()
+
+    user_input = threading.Event()
+    worker = asyncio.get_running_loop().run_in_executor(None, wait_for_user)
+
+    await asyncio.wait_for(limiter.acquire(session_id=2), timeout=1)
+    assert limiter.active_sessions == 1
+
+    # User answers while session 2 is active, session 1 waits for a free slot
+    user_input.set()
+    await asyncio.sleep(0.05)
+    assert not resumed.is_set()
+
+    limiter.finish(2)
+    await asyncio.wait_for(worker, timeout=1)
+    assert resumed.is_set()
+    assert limiter.active_sessions == 1
+
+    limiter.finish(1)
+    assert limiter.active_sessions == 0
+
+
+@pytest.mark.asyncio
+async def test_session_stopped_while_resuming_does_not_leak_slot():
+    limiter = SessionCapacityLimiter(max_active_sessions=1)
+    await limiter.acquire(session_id=1)
+    limiter.suspend(1)
+    await asyncio.sleep(0)
+    await limiter.acquire(session_id=2)
+
+    # User answers, but session 2 holds the only slot
+    def resume():
+        with pytest.raises(StopSession):
+            limiter.resume(1)
+
+    worker = asyncio.get_running_loop().run_in_executor(None, resume)
+    await asyncio.sleep(0.05)
+
+    # Session 1 is stopped while waiting for the slot
+    limiter.finish(1)
+    await asyncio.wait_for(worker, timeout=1)
+
+    limiter.finish(2)
+    assert limiter.active_sessions == 0
+    assert not limiter.suspended_sessions
@@ -0,0 +1,100 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock
+
+import fakeredis
+import pytest
+
+from services.graph.session_dispatcher import (
+    SessionDispatcher,
+    claim_session,
+    session_queue_key,
+    worker_channel,
+)
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+@pytest.fixture
+def dispatcher(redis_client) -> SessionDispatcher:
+    redis_service = AsyncMock()
+    redis_service.aioredis_client = redis_client
+    return SessionDispatcher(
+        redis_service=redis_service,
+        session_schema_channel="sessions:schema",
+        session_timeout_channel="sessions:timeout",
+        stop_session_channel="sessions:stop",
+    )
+
+
+async def claim_all(redis_client, worker_id: int, claimed: list):
+    while True:
+        item = await redis_client.brpop(
+            [session_queue_key("interactive"), session_queue_key("webhook")],
+            timeout=0.1,
+        )
+        if item is None:
+            return
+        session_id = json.loads(item[1])["id"]
+        if await claim_session(redis_client, session_id, worker_id):
+            claimed.append((worker_id, session_id))
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_every_session_is_claimed_once(dispatcher, redis_client):
+    for session_id in range(50):
+        await dispatcher._listen_callback(
+            {
+                "channel": "sessions:schema",
+                "data": json.dumps({"id": session_id, "priority_class": "webhook"}),
+            }
+        )
+
+    claimed = []
+    await asyncio.gather(
+        *(claim_all(redis_client, worker_id, claimed) for worker_id in range(4))
+    )
+
+    assert sorted(session_id for _, session_id in claimed) == list(range(50))
+    assert len({worker_id for worker_id, _ in claimed}) > 1
+
+    # A session pushed to the queue twice still runs once
+    assert not await claim_session(redis_client, 0, worker_id=3)
+
+
+@pytest.mark.asyncio
+async def test_stop_is_routed_to_session_owner(dispatcher, redis_client):
+    pubsub = redis_client.pubsub()
+    await pubsub.subscribe(worker_channel(2))
+    await pubsub.get_message(timeout=0.1)
+
+    assert await claim_session(redis_client, 7, worker_id=2)
+    stop_data = json.dumps({"session_id": 7})
+    await dispatcher._listen_callback({"channel": "sessions:stop", "data": stop_data})
+
+    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=0.1)
+    assert json.loads(message["data"]) == {
+        "channel": "sessions:stop",
+        "data": stop_data,
+    }
+    dispatcher.redis_service.aupdate_session_status.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_session_stopped_in_queue_is_not_claimed(dispatcher, redis_client):
+    await dispatcher._listen_callback(
+        {"channel": "sessions:schema", "data": json.dumps({"id": 8})}
+    )
+    await dispatcher._listen_callback(
+        {"channel": "sessions:stop", "data": json.dumps({"session_id": 8})}
+    )
+
+    dispatcher.redis_service.aupdate_session_status.assert_awaited_once_with(
+        session_id=8, status="stop"
+    )
+    assert await redis_client.llen(session_queue_key("interactive")) == 1
+    assert not await claim_session(redis_client, 8, worker_id=0)
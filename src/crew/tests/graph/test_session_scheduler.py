@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from services.graph.session_capacity import SessionCapacityLimiter
+from services.graph.session_scheduler import SessionScheduler
+
+
+async def simulate(scheduler: SessionScheduler, max_active: int, duration: float):
+    """Run scheduled sessions like GraphSessionManagerService._session_worker does."""
+    limiter = SessionCapacityLimiter(max_active_sessions=max_active)
+    started = []
+    tasks = []
+
+    async def run(scheduled):
+        await asyncio.sleep(duration)
+        limiter.finish(scheduled.session_id)
+        scheduler.release(scheduled)
+
+    async def worker():
+        while True:
+            await scheduler.wait_for_candidate()
+            await limiter.acquire()
+            scheduled = scheduler.pop_next()
+            if scheduled is None:
+                limiter.release()
+                continue
+            started.append(scheduled)
+            tasks.append(asyncio.create_task(run(scheduled)))
+
+    worker_task = asyncio.create_task(worker())
+    return started, tasks, worker_task
+
+
+@pytest.mark.asyncio
+async def test_webhook_burst_does_not_starve_interactive_sessions():
+    scheduler = SessionScheduler(class_limits={"webhook": 2})
+    for session_id in range(100):
+        scheduler.submit(session_id, "webhook", tenant_key="1", flow_key="burst")
+
+    started, tasks, worker_task = await simulate(scheduler, max_active=4, duration=0.05)
+    await asyncio.sleep(0.01)
+
+    # Webhook class is capped, interactive sessions get the free slots at once
+    assert [s.session_id for s in started] == [0, 1]
+    for session_id in range(100, 102):
+        scheduler.submit(session_id, "interactive", tenant_key="2", flow_key="chat")
+    await asyncio.sleep(0.01)
+
+    assert [s.session_id for s in started[2:]] == [100, 101]
+    metrics = scheduler.metrics()
+    assert metrics["webhook"]["running"] == 2
+    assert metrics["webhook"]["pending"] == 98
+    assert metrics["interactive"]["running"] == 2
+    assert metrics["interactive"]["max_wait_time"] < 0.05
+
+    worker_task.cancel()
+    for task in tasks:
+        task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_sessions_are_shared_fairly_between_flows_and_tenants():
+    scheduler = SessionScheduler()
+    # Tenant 1 floods with one flow, then other flows and tenants arrive
+    for session_id in range(50):
+        scheduler.submit(session_id, "batch", tenant_key="1", flow_key="a")
+    for session_id in range(50, 60):
+        scheduler.submit(session_id, "batch", tenant_key="1", flow_key="b")
+    for session_id in range(60, 70):
+        scheduler.submit(session_id, "batch", tenant_key="2", flow_key="c")
+
+    started, tasks, worker_task = await simulate(scheduler, max_active=4, duration=0.02)
+    await asyncio.sleep(0.2)
+    worker_task.cancel()
+    for task in tasks:
+        task.cancel()
+
+    # Within the first sessions every tenant and flow got its share
+    first = started[:12]
+    tenants = [s.tenant_key for s in first]
+    assert tenants.count("1") == tenants.count("2") == 6
+    flows = [s.flow_key for s in first if s.tenant_key == "1"]
+    assert flows.count("a") == flows.count("b") == 3
+
+    # Sessions of one flow keep their arrival order
+    flow_a = [s.session_id for s in started if s.flow_key == "a"]
+    assert flow_a == sorted(flow_a)
+
+
+def test_removed_session_is_not_scheduled():
+    scheduler = SessionScheduler()
+    scheduler.submit(1)
+    scheduler.submit(2)
+
+    assert scheduler.remove(1)
+    assert not scheduler.remove(1)
+    assert scheduler.pop_next().session_id == 2
+    assert scheduler.pop_next() is None
+    assert scheduler.metrics()["interactive"]["pending"] == 0
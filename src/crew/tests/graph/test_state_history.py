@@ -0,0 +1,86 @@
+from dotdict import DotDict
+from services.graph.state_history import (
+    snapshot_variables,
+    diff_variables,
+    make_state_history_delta,
+    make_state_history_deltas,
+    reconstruct_state_history,
+)
+import pytest
+
+
+def _history_item(name: str, variables: dict) -> dict:
+    return {
+        "type": "PYTHON",
+        "name": name,
+        "additional_data": {},
+        "input": {},
+        "variables": variables,
+        "output": None,
+    }
+
+
+def test_snapshot_shares_unchanged_values():
+    variables = DotDict({"file": {"content": "a" * 1000}, "counter": 1})
+    first = snapshot_variables(variables.model_dump())
+
+    variables.counter = 2
+    second = snapshot_variables(variables.model_dump(), previous=first)
+
+    assert second["file"] is first["file"]
+    assert first["counter"] == 1
+    assert second["counter"] == 2
+
+
+def test_snapshot_is_not_affected_by_nested_mutation():
+    variables = DotDict({"nested": {"value": 1}})
+    first = snapshot_variables(variables.model_dump())
+
+    variables.nested.value = 2
+    second = snapshot_variables(variables.model_dump(), previous=first)
+
+    assert first["nested"]["value"] == 1
+    assert second["nested"]["value"] == 2
+
+
+def test_diff_variables():
+    diff = diff_variables({"a": 1, "b": 2, "c": 3}, {"a": 1, "b": 5, "d": 4})
+
+    assert diff == {"set": {"b": 5, "d": 4}, "unset": ["c"]}
+
+
+def test_state_history_deltas():
+    state_history = []
+    deltas = []
+    for step, variables in enumerate(
+        [{"a": 1}, {"a": 1, "b": 2}, {"b": 3}, {"b": 3, "c": [1, 2]}]
+    ):
+        previous = state_history[-1]["variables"] if state_history else None
+        state_history.append(
+            _history_item(f"node_{step}", snapshot_variables(variables, previous))
+        )
+        deltas.append(make_state_history_delta(state_history))
+
+    assert [delta["index"] for delta in deltas] == [0, 1, 2, 3]
+    assert deltas[0]["variables_diff"] == {"set": {"a": 1}, "unset": []}
+    assert deltas[2]["variables_diff"] == {"set": {"b": 3}, "unset": ["a"]}
+    assert deltas[3]["variables_diff"] == {"set": {"c": [1, 2]}, "unset": []}
+    assert "variables" not in deltas[3]
+
+
+def test_reconstruct_state_history():
+    state_history = []
+    for step, variables in enumerate(
+        [{"a": 1}, {"a": 1, "b": 2}, {"b": 3}, {"b": 3, "c": [1, 2]}]
+    ):
+        previous = state_history[-1]["variables"] if state_history else None
+        state_history.append(
+            _history_item(f"node_{step}", snapshot_variables(variables, previous))
+        )
+
+    deltas = make_state_history_deltas(state_history)
+
+    assert reconstruct_state_history(deltas) == state_history
+    assert reconstruct_state_history(list(reversed(deltas))) == state_history
+    with pytest.raises(ValueError):
+        reconstruct_state_history(deltas[:1] + deltas[2:])
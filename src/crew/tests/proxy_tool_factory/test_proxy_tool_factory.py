@@ -0,0 +1,211 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+from src.crew.services.crew.proxy_tool_factory import ProxyToolFactory
+from src.crew.services.crew.tool_class_data_cache import ToolClassDataCache
+from src.crew.services.graph.events import StopEvent
+from src.crew.services.graph.exceptions import StopSession
+from src.crew.services.pickle_encode import obj_to_txt
+from src.crew.utils.singleton_meta import SingletonMeta
+
+TOOL_CALLS = 1000
+
+
+class StubManagerHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Like uvicorn in the manager, avoid delayed ACK stalls on kept-alive connections
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        server = self.server
+        server.connections.add(self.client_address)
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+
+        if server.failures > 0:
+            server.failures -= 1
+            status, response = 503, b"{}"
+        elif self.path.endswith("/class-data"):
+            server.class_data_requests += 1
+            tool_alias = self.path.split("/")[2]
+            class_data = {
+                "name": tool_alias,
+                "description": f"Tool {tool_alias}",
+                "args_schema": {
+                    "title": "Args",
+                    "type": "object",
+                    "properties": {"query": {"type": "string"}},
+                },
+            }
+            status, response = (
+                200,
+                json.dumps(
+                    {
+                        "classdata": obj_to_txt(class_data),
+                        "image_name": "stub_tools",
+                        "image_version": server.image_version,
+                    }
+                ).encode(),
+            )
+        elif self.path.endswith("/slow/run"):
+            time.sleep(5)
+            status, response = 200, b"{}"
+        else:
+            run_kwargs = json.loads(body)["run_kwargs"]
+            status, response = 200, json.dumps({"data": run_kwargs["value"]}).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubManagerHandler)
+    server.daemon_threads = True
+    server.connections = set()
+    server.failures = 0
+    server.class_data_requests = 0
+    server.image_version = "sha256:1"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def factory(stub_server) -> ProxyToolFactory:
+    return ProxyToolFactory(
+        host="127.0.0.1",
+        port=stub_server.server_address[1],
+        python_code_executor_service=Mock(),
+        pool_size=4,
+    )
+
+
+@pytest.fixture
+def class_data_cache():
+    SingletonMeta._instances.pop(ToolClassDataCache, None)
+    yield ToolClassDataCache(ttl=60)
+    SingletonMeta._instances.pop(ToolClassDataCache, None)
+
+
+def tool_data(name_alias: str = "stub"):
+    return SimpleNamespace(
+        name_alias=name_alias,
+        tool_config=SimpleNamespace(
+            model_dump=lambda: {}, tool_init_configuration={"api_key": "key"}
+        ),
+    )
+
+
+def test_tool_calls_reuse_connections(factory, stub_server):
+    """Micro-benchmark: 1000 proxied tool calls against a local stub manager."""
+    data = tool_data()
+
+    start = time.perf_counter()
+    results = [
+        factory.run_tool_in_container(tool_data=data, run_kwargs={"value": index})
+        for index in range(TOOL_CALLS)
+    ]
+    pooled = time.perf_counter() - start
+
+    assert results == list(range(TOOL_CALLS))
+    assert len(stub_server.connections) == 1
+
+    url = f"http://127.0.0.1:{stub_server.server_address[1]}/tool/stub/run"
+    start = time.perf_counter()
+    for index in range(TOOL_CALLS):
+        requests.post(url, json={"tool_config": {}, "run_kwargs": {"value": index}})
+    unpooled = time.perf_counter() - start
+
+    print(
+        f"{TOOL_CALLS} tool calls: pooled {pooled:.2f}s, "
+        f"new connection per call {unpooled:.2f}s"
+    )
+
+
+def test_failed_attempts_are_retried(factory, stub_server):
+    stub_server.failures = 2
+
+    result = factory.run_tool_in_container(
+        tool_data=tool_data(), run_kwargs={"value": 1}
+    )
+
+    assert result == 1
+
+
+def test_stop_interrupts_waiting_request(factory):
+    stop_event = StopEvent()
+    threading.Timer(0.2, stop_event.set).start()
+
+    start = time.perf_counter()
+    with pytest.raises(StopSession):
+        factory.run_tool_in_container(
+            tool_data=tool_data("slow"), run_kwargs={}, stop_event=stop_event
+        )
+
+    assert time.perf_counter() - start < 1
+
+
+def test_hung_tool_releases_request_thread(stub_server):
+    factory = ProxyToolFactory(
+        host="127.0.0.1",
+        port=stub_server.server_address[1],
+        python_code_executor_service=Mock(),
+        pool_size=1,
+        read_timeout=0.2,
+    )
+
+    start = time.perf_counter()
+    with pytest.raises(Exception, match="No response"):
+        factory.run_tool_in_container(tool_data=tool_data("slow"), run_kwargs={})
+    assert time.perf_counter() - start < 1
+
+    result = factory.run_tool_in_container(
+        tool_data=tool_data(), run_kwargs={"value": 1}
+    )
+    assert result == 1
+
+
+def test_warm_class_data_cache_skips_manager(factory, stub_server, class_data_cache):
+    factory.class_data_cache = class_data_cache
+    aliases = [f"tool_{index}" for index in range(20)]
+
+    def build_session_tools():
+        # 5 agents using the same 20 tools, built concurrently
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            return list(
+                executor.map(
+                    lambda alias: factory.create_proxy_tool(tool_data(alias)),
+                    aliases * 5,
+                )
+            )
+
+    tools = build_session_tools()
+    assert stub_server.class_data_requests == 20
+    assert {tool.name for tool in tools} == set(aliases)
+
+    build_session_tools()
+    assert stub_server.class_data_requests == 20
+
+    # A rebuilt image drops the entries read from the old one
+    stub_server.image_version = "sha256:2"
+    class_data_cache._handle_message(
+        {"data": json.dumps({"image_name": "stub_tools", "image_version": "sha256:2"})}
+    )
+    build_session_tools()
+    assert stub_server.class_data_requests == 40
@@ -0,0 +1,109 @@
+from unittest.mock import patch
+
+import pytest
+from crewai import LLM
+from crewai.agents.agent_builder.utilities.base_token_process import TokenProcess
+from crewai.utilities.token_counter_callback import TokenCalcHandler
+from litellm import ModelResponse
+from litellm.types.utils import Delta, StreamingChoices, Usage
+
+from src.crew.models.request_models import LLMConfigData, LLMData
+from src.crew.services.llm_response_cache import LLMResponseCache
+from src.crew.utils.singleton_meta import SingletonMeta
+
+MESSAGES = [{"role": "user", "content": "Classify: the order arrived broken"}]
+
+
+@pytest.fixture
+def response_cache():
+    SingletonMeta._instances.pop(LLMResponseCache, None)
+    yield LLMResponseCache()
+    SingletonMeta._instances.pop(LLMResponseCache, None)
+
+
+def llm_data(**config) -> LLMData:
+    return LLMData(
+        provider="openai",
+        config=LLMConfigData(model="gpt-4o", api_key="key", **config),
+    )
+
+
+class FakeCompletion:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, **params):
+        self.calls += 1
+        yield ModelResponse(
+            stream=True,
+            choices=[StreamingChoices(index=0, delta=Delta(content="complaint"))],
+        )
+        yield ModelResponse(
+            stream=True,
+            choices=[StreamingChoices(index=0, delta=Delta(content=None))],
+            usage=Usage(prompt_tokens=12, completion_tokens=2, total_tokens=14),
+        )
+
+
+def call_llm(llm: LLM, token_process: TokenProcess) -> str:
+    return llm.call(MESSAGES, callbacks=[TokenCalcHandler(token_process)])
+
+
+def test_deterministic_prompt_is_answered_from_cache(response_cache):
+    data = llm_data(temperature=0)
+    llm = LLM(
+        model="openai/gpt-4o",
+        temperature=0,
+        api_key="key",
+        response_cache=response_cache.for_llm(data),
+    )
+    token_process = TokenProcess()
+    completion = FakeCompletion()
+
+    with patch("litellm.completion", completion):
+        assert call_llm(llm, token_process) == "complaint"
+        assert call_llm(llm, token_process) == "complaint"
+
+    assert completion.calls == 1
+    summary = token_process.get_summary()
+    assert summary.cached_responses == 1
+    assert summary.saved_tokens == 14
+    assert summary.successful_requests == 1
+
+
+@pytest.mark.parametrize(
+    "config",
+    [{"temperature": 0.7}, {"temperature": None}],
+)
+def test_non_deterministic_prompt_is_not_cached(response_cache, config):
+    llm = LLM(
+        model="openai/gpt-4o",
+        api_key="key",
+        response_cache=response_cache.for_llm(llm_data(**config)),
+        **config,
+    )
+    completion = FakeCompletion()
+
+    with patch("litellm.completion", completion):
+        call_llm(llm, TokenProcess())
+        call_llm(llm, TokenProcess())
+
+    assert completion.calls == 2
+
+
+def test_llm_config_can_opt_out(response_cache):
+    assert (
+        response_cache.for_llm(llm_data(temperature=0, cache_responses=False)) is None
+    )
+    assert response_cache.for_llm(llm_data(temperature=0, cache_ttl=60)).ttl == 60
+
+
+def test_cache_key_depends_on_api_key(response_cache):
+    params = {"model": "openai/gpt-4o", "messages": MESSAGES, "temperature": 0}
+
+    assert response_cache.make_key(
+        {**params, "api_key": "first", "stream": True}
+    ) == response_cache.make_key({**params, "api_key": "first"})
+    assert response_cache.make_key(
+        {**params, "api_key": "first"}
+    ) != response_cache.make_key({**params, "api_key": "second"})
@@ -0,0 +1,122 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+import redis
+from fakeredis import TcpFakeServer
+
+from src.crew.services.crew.rate_limiter import RedisRateLimiter, RedisRPMController
+from src.crew.services.graph.events import StopEvent
+from src.crew.services.graph.exceptions import StopSession
+from src.crew.utils.singleton_meta import SingletonMeta
+
+PROCESSES = 4
+REQUESTS_PER_PROCESS = 10
+MAX_RPM = 1200
+BURST = 5
+
+
+def make_limiter(sync_client=None, async_client=None) -> RedisRateLimiter:
+    SingletonMeta._instances.pop(RedisRateLimiter, None)
+    return RedisRateLimiter(
+        redis_service=SimpleNamespace(
+            sync_redis_client=sync_client, aioredis_client=async_client
+        )
+    )
+
+
+def acquire_requests(port: int, results):
+    limiter = make_limiter(sync_client=redis.Redis(port=port))
+    for _ in range(REQUESTS_PER_PROCESS):
+        limiter.acquire("llm:openai/gpt-4o", MAX_RPM, burst=BURST)
+        results.put(time.time())
+
+
+@pytest.fixture
+def redis_server():
+    server = TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def reset_limiter():
+    yield
+    SingletonMeta._instances.pop(RedisRateLimiter, None)
+
+
+def test_limit_is_shared_between_processes(redis_server):
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    processes = [
+        context.Process(target=acquire_requests, args=(redis_server, results))
+        for _ in range(PROCESSES)
+    ]
+
+    start = time.time()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=30)
+        assert process.exitcode == 0
+
+    timestamps = sorted(results.get() for _ in range(PROCESSES * REQUESTS_PER_PROCESS))
+    rate = MAX_RPM / 60
+    elapsed = timestamps[-1] - start
+
+    # Requests past the burst are spread at the bucket rate, not per process
+    assert elapsed >= (len(timestamps) - BURST) / rate * 0.9
+    # Waits end when the next token is due instead of after a full minute
+    assert elapsed < 10
+
+    # No window holds more requests than the bucket allows
+    for first in range(len(timestamps)):
+        for last in range(first, len(timestamps)):
+            window = timestamps[last] - timestamps[first]
+            assert last - first + 1 <= BURST + rate * window + 1
+
+
+@pytest.mark.asyncio
+async def test_async_acquire_does_not_block_event_loop():
+    limiter = make_limiter(async_client=fakeredis.aioredis.FakeRedis())
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    ticker_task = asyncio.create_task(ticker())
+    start = time.monotonic()
+    await asyncio.gather(
+        *(limiter.aacquire("llm:openai/gpt-4o", max_rpm=600, burst=1) for _ in range(4))
+    )
+    elapsed = time.monotonic() - start
+    ticker_task.cancel()
+
+    assert elapsed >= 0.3 * 0.9
+    assert ticks >= 15
+
+
+def test_stop_interrupts_rate_limit_wait():
+    limiter = make_limiter(sync_client=fakeredis.FakeRedis())
+    stop_event = StopEvent()
+    controller = RedisRPMController(
+        limiter=limiter, key="crew:1", max_rpm=1, stop_event=stop_event
+    )
+    controller.check_or_wait()
+
+    threading.Timer(0.2, stop_event.set).start()
+    start = time.monotonic()
+    with pytest.raises(StopSession):
+        controller.check_or_wait()
+
+    assert time.monotonic() - start < 1
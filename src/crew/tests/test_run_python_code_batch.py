@@ -0,0 +1,99 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from src.crew.models.request_models import CodeResultData, PythonCodeData
+from src.crew.services.run_python_code_service import RunPythonCodeService
+from src.crew.utils.singleton_meta import SingletonMeta
+
+
+class FakeSandbox:
+    """Answers every task of a batch on code_results, last task first."""
+
+    def __init__(self):
+        self.subscribers = []
+        self.messages = []
+        self.aioredis_client = SimpleNamespace(xadd=self.xadd)
+
+    async def asubscribe(self, channel, subscriber):
+        self.subscribers.append(subscriber)
+
+    def unsubscribe(self, channel, subscriber):
+        self.subscribers.remove(subscriber)
+
+    async def xadd(self, stream, fields):
+        batch = json.loads(fields["data"])
+        self.messages.append(batch)
+        asyncio.create_task(self.answer(batch))
+
+    async def answer(self, batch):
+        for task in reversed(batch["tasks"]):
+            result = CodeResultData(
+                execution_id=task["execution_id"],
+                result_data=json.dumps(task["func_kwargs"]["value"] * 2),
+                stderr="",
+                stdout="",
+            )
+            for subscriber in list(self.subscribers):
+                await subscriber.update({"data": result.model_dump_json()})
+
+
+@pytest.fixture
+def sandbox():
+    SingletonMeta._instances.pop(RunPythonCodeService, None)
+    sandbox = FakeSandbox()
+    yield sandbox
+    SingletonMeta._instances.pop(RunPythonCodeService, None)
+
+
+def test_batch_is_sent_in_one_message(sandbox):
+    service = RunPythonCodeService(redis_service=sandbox)
+    python_code_data = PythonCodeData(
+        venv_name="default",
+        code="def main(value):\n    return value * 2",
+        entrypoint="main",
+        libraries=["requests"],
+        global_kwargs={"a": 1},
+    )
+
+    results = asyncio.run(
+        service.run_code_batch(
+            python_code_data,
+            [{"value": value} for value in range(5)],
+            additional_global_kwargs={"state": {}},
+            timeout=30,
+            max_cpu_seconds=10,
+            max_memory_mb=256,
+        )
+    )
+
+    (batch,) = sandbox.messages
+    assert batch["libraries"] == ["requests"]
+    assert [task["global_kwargs"] for task in batch["tasks"]] == [
+        {"a": 1, "state": {}}
+    ] * 5
+    assert {
+        (task["timeout"], task["max_cpu_seconds"], task["max_memory_mb"])
+        for task in batch["tasks"]
+    } == {(30, 10, 256)}
+    # In the order of the inputs, though answered in reverse
+    assert [json.loads(result["result_data"]) for result in results] == [
+        0,
+        2,
+        4,
+        6,
+        8,
+    ]
+    assert sandbox.subscribers == []
+
+
+def test_empty_batch_is_not_sent(sandbox):
+    service = RunPythonCodeService(redis_service=sandbox)
+    python_code_data = PythonCodeData(
+        venv_name="default", code="", entrypoint="main", libraries=[]
+    )
+
+    assert asyncio.run(service.run_code_batch(python_code_data, [])) == []
+    assert sandbox.messages == []
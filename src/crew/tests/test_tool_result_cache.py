@@ -0,0 +1,169 @@
+from types import SimpleNamespace
+
+import fakeredis
+import pytest
+from crewai import Agent
+
+from src.crew.services.crew.tool_result_cache import (
+    LRUCache,
+    ToolResultCache,
+    ToolResultCacheHandler,
+    tool_cache_metrics,
+)
+from src.crew.utils.singleton_meta import SingletonMeta
+
+
+@pytest.fixture
+def redis_service():
+    return SimpleNamespace(sync_redis_client=fakeredis.FakeRedis(decode_responses=True))
+
+
+def make_store(redis_service=None, **kwargs) -> ToolResultCache:
+    # A new store stands for another crew worker
+    SingletonMeta._instances.pop(ToolResultCache, None)
+    store = ToolResultCache(redis_service=redis_service, use_redis=True, **kwargs)
+    SingletonMeta._instances.pop(ToolResultCache, None)
+    return store
+
+
+def make_handler(store, session_id: int, **kwargs) -> ToolResultCacheHandler:
+    return ToolResultCacheHandler(store=store, session_id=session_id, **kwargs)
+
+
+def test_lru_cache_is_bounded_by_entries_and_size():
+    cache = LRUCache(max_entries=3, max_bytes=10)
+
+    for key in "abcd":
+        cache.set(key, "x", ttl=60)
+    assert len(cache) == 3
+    assert cache.get("a") is None
+
+    cache.get("b")
+    cache.set("e", "12345678", ttl=60)
+    assert cache.size <= 10
+    assert cache.get("b") == "x"
+    assert cache.get("c") is None
+
+    # Values larger than the whole cache are not stored
+    cache.set("f", "x" * 11, ttl=60)
+    assert cache.get("f") is None
+
+
+def test_results_are_scoped_to_session_unless_tool_opts_in(redis_service):
+    store = make_store(redis_service)
+    tool_ttls = {"Search": 600}
+    first = make_handler(store, 1, tool_ttls=tool_ttls)
+    second = make_handler(store, 2, tool_ttls=tool_ttls)
+
+    first.add("Read file", {"path": "a.txt"}, "content")
+    first.add("Search", {"query": "crew"}, "results")
+
+    assert first.read("Read file", {"path": "a.txt"}) == "content"
+    assert second.read("Read file", {"path": "a.txt"}) is None
+    assert second.read("Search", {"query": "crew"}) == "results"
+    # Only opted-in tools reach Redis
+    assert redis_service.sync_redis_client.keys("tool_results:*") == [
+        f"tool_results:{first._make_key('Search', {'query': 'crew'})[0]}"
+    ]
+
+
+def test_results_are_scoped_to_crew_execution():
+    store = make_store()
+    fingerprints = {"Read file": "config-1"}
+    handler = make_handler(
+        store, 1, crew_id=1, execution_order=1, tool_fingerprints=fingerprints
+    )
+    handler.add("Read file", {"path": "a.txt"}, "content")
+
+    assert handler.read("Read file", {"path": "a.txt"}) == "content"
+    # Another crew of the session, the same crew run again
+    for crew_id, execution_order in ((2, 1), (1, 2)):
+        other = make_handler(
+            store,
+            1,
+            crew_id=crew_id,
+            execution_order=execution_order,
+            tool_fingerprints=fingerprints,
+        )
+        assert other.read("Read file", {"path": "a.txt"}) is None
+    # Another configuration of the tool in the same execution
+    assert (
+        make_handler(
+            store,
+            1,
+            crew_id=1,
+            execution_order=1,
+            tool_fingerprints={"Read file": "config-2"},
+        ).read("Read file", {"path": "a.txt"})
+        is None
+    )
+
+
+def test_same_named_tools_with_different_configs_are_not_cached():
+    handler = make_handler(
+        make_store(), 1, tool_fingerprints={"Read file": None}, tool_ttls={}
+    )
+
+    handler.add("Read file", {"path": "a.txt"}, "content")
+
+    assert handler.read("Read file", {"path": "a.txt"}) is None
+
+
+def test_shared_results_reach_other_workers_through_redis(redis_service):
+    tool_ttls = {"Search": 600}
+    fingerprints = {"Search": "config-1"}
+    make_handler(
+        make_store(redis_service),
+        1,
+        tool_ttls=tool_ttls,
+        tool_fingerprints=fingerprints,
+    ).add("Search", {"query": "crew"}, "results")
+
+    other_worker = make_store(redis_service)
+    handler = make_handler(
+        other_worker, 2, tool_ttls=tool_ttls, tool_fingerprints=fingerprints
+    )
+    hits_before = tool_cache_metrics.to_dict().get("Search", {}).get("redis_hits", 0)
+
+    assert handler.read("Search", {"query": "crew"}) == "results"
+    assert tool_cache_metrics.to_dict()["Search"]["redis_hits"] == hits_before + 1
+    # Kept locally after the first read
+    assert handler.read("Search", {"query": "crew"}) == "results"
+    assert tool_cache_metrics.to_dict()["Search"]["redis_hits"] == hits_before + 1
+
+    # Another configuration of the tool does not see the result
+    assert (
+        make_handler(
+            other_worker,
+            3,
+            tool_ttls=tool_ttls,
+            tool_fingerprints={"Search": "config-2"},
+        ).read("Search", {"query": "crew"})
+        is None
+    )
+
+
+def test_only_json_results_reach_redis(redis_service):
+    store = make_store(redis_service)
+    handler = make_handler(store, 1, tool_ttls={"Search": 600, "Read file": 600})
+
+    handler.add("Search", {"query": "crew"}, {"results": ["a", "b"]})
+    handler.add("Read file", {"path": "a.txt"}, SimpleNamespace(content="a"))
+
+    (key,) = redis_service.sync_redis_client.keys("tool_results:*")
+    assert redis_service.sync_redis_client.get(key) == '{"results": ["a", "b"]}'
+    assert make_handler(make_store(redis_service), 2, tool_ttls={"Search": 600}).read(
+        "Search", {"query": "crew"}
+    ) == {"results": ["a", "b"]}
+    # Other results are only reused by this worker
+    assert handler.read("Read file", {"path": "a.txt"}) == SimpleNamespace(content="a")
+
+
+def test_agent_uses_cache_handler():
+    handler = make_handler(make_store(), 1)
+
+    agent = Agent(
+        role="role", goal="goal", backstory="backstory", cache_handler=handler
+    )
+
+    assert agent.tools_handler.cache is handler
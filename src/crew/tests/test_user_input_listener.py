@@ -0,0 +1,130 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import fakeredis
+import pytest
+
+import callbacks.session_callback_factory as session_callback_factory
+from callbacks.session_callback_factory import CrewCallbackFactory
+from src.crew.services.graph.events import StopEvent
+from src.crew.services.graph.exceptions import StopSession
+from src.crew.services.user_input_listener import UserInputListener
+from src.crew.utils.singleton_meta import SingletonMeta
+
+WAITING_SESSIONS = 500
+
+
+@pytest.fixture
+def redis_service():
+    SingletonMeta._instances.pop(UserInputListener, None)
+    service = SimpleNamespace(
+        sync_redis_client=fakeredis.FakeRedis(decode_responses=True),
+        update_session_status=Mock(),
+    )
+    yield service
+    listener = SingletonMeta._instances.pop(UserInputListener, None)
+    if listener is not None and listener._thread is not None:
+        listener._thread.stop()
+
+
+def make_callback(redis_service, session_id: int, stop_event: StopEvent):
+    factory = CrewCallbackFactory(
+        session_id=session_id,
+        node_name="ask",
+        crew_id=1,
+        execution_order=0,
+        redis_service=redis_service,
+        knowledge_search_service=Mock(),
+        crewai_output_channel="",
+    )
+    return factory.get_wait_for_user_callback(stop_event=stop_event)
+
+
+def send_user_input(redis_service, session_id: int, text: str):
+    redis_service.sync_redis_client.publish(
+        f"sessions:{session_id}:user_input",
+        json.dumps(
+            {"crew_id": 1, "node_name": "ask", "execution_order": 0, "text": text}
+        ),
+    )
+
+
+def wait_until(condition, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Condition was not met in time"
+        time.sleep(0.01)
+
+
+def test_many_waiting_sessions_share_one_listener(redis_service):
+    results = {}
+
+    def run(session_id: int):
+        callback = make_callback(redis_service, session_id, StopEvent())
+        results[session_id] = callback()
+
+    base_threads = threading.active_count()
+    threads = [
+        threading.Thread(target=run, args=(session_id,))
+        for session_id in range(WAITING_SESSIONS)
+    ]
+    for thread in threads:
+        thread.start()
+
+    listener = UserInputListener(redis_service=redis_service)
+    wait_until(lambda: listener.waiting == WAITING_SESSIONS)
+
+    # Only the waiting threads themselves and one reader thread
+    assert threading.active_count() == base_threads + WAITING_SESSIONS + 1
+
+    # Waiting threads sleep instead of polling
+    cpu_start = time.process_time()
+    time.sleep(1)
+    assert time.process_time() - cpu_start < 0.2
+
+    for session_id in range(WAITING_SESSIONS):
+        send_user_input(redis_service, session_id, f"answer {session_id}")
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert results == {
+        session_id: f"answer {session_id}" for session_id in range(WAITING_SESSIONS)
+    }
+    assert listener.waiting == 0
+
+
+def test_wait_expires_after_timeout(redis_service, monkeypatch):
+    monkeypatch.setattr(session_callback_factory, "USER_INPUT_TIMEOUT", 0.1)
+    stop_event = StopEvent()
+
+    with pytest.raises(StopSession) as exc_info:
+        make_callback(redis_service, 1, stop_event)()
+
+    assert exc_info.value.status == "expired"
+    assert stop_event.status == "expired"
+    assert UserInputListener(redis_service=redis_service).waiting == 0
+
+
+def test_stopped_session_stops_waiting(redis_service):
+    stop_event = StopEvent()
+    errors = []
+
+    def run():
+        try:
+            make_callback(redis_service, 1, stop_event)()
+        except StopSession as e:
+            errors.append(e.status)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    listener = UserInputListener(redis_service=redis_service)
+    wait_until(lambda: listener.waiting == 1)
+
+    stop_event.set()
+    thread.join(timeout=5)
+
+    assert errors == ["stop"]
+    assert listener.waiting == 0
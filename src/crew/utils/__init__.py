@@ -6,6 +6,7 @@ from .groq import TokenThrottledChatGroq
 from .parse_llm import parse_llm
 from .map_variables import map_variables_to_input
 from .set_output_variables import set_output_variables
+from .execution_order import next_execution_order
 
 __all__ = [
     "load_env",
@@ -16,4 +17,5 @@ __all__ = [
     "parse_llm",
     "map_variables_to_input",
     "set_output_variables",
+    "next_execution_order",
 ]
@@ -0,0 +1,19 @@
+from typing import Any
+
+
+def next_execution_order(system_variables: dict[str, Any], node_name: str) -> int:
+    """
+    Return the execution order for the current run of the node and update the counter.
+
+    Execution order is stored in `system_variables["nodes"][node_name]["execution_order"]`,
+    it is 0 for the first run of the node and is incremented on every next run.
+    """
+    nodes: dict = system_variables.setdefault("nodes", {})
+    node_variables: dict | None = nodes.get(node_name)
+    if node_variables is None or "execution_order" not in node_variables:
+        node_variables = nodes.setdefault(node_name, {})
+        node_variables["execution_order"] = 0
+    else:
+        node_variables["execution_order"] += 1
+
+    return node_variables["execution_order"]
@@ -4,7 +4,7 @@ from models.request_models import LLMData
 
 
 def parse_llm(llm: LLMData, **kwargs):
-    llm_config = {**llm.config.model_dump()}
+    llm_config = llm.config.model_dump(exclude={"cache_responses", "cache_ttl"})
     llm_config.update(kwargs)
     return LLM(**llm_config)
 
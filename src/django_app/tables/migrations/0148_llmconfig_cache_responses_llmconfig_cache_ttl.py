@@ -0,0 +1,32 @@
+# Generated by Django 5.1.3 on 2026-10-19 10:12
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tables", "0147_merge_chunk_preview_migrations_2"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="llmconfig",
+            name="cache_responses",
+            field=models.BooleanField(
+                default=True,
+                help_text="Reuse responses to identical prompts sent with temperature 0",
+            ),
+        ),
+        migrations.AddField(
+            model_name="llmconfig",
+            name="cache_ttl",
+            field=models.IntegerField(
+                blank=True,
+                help_text="Seconds a cached response is reused, crew default if empty",
+                null=True,
+                validators=[django.core.validators.MinValueValidator(1)],
+            ),
+        ),
+    ]
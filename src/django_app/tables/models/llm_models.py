@@ -81,6 +81,16 @@ class LLMConfig(AbstractDefaultFillableModel):
     headers = models.JSONField(default=dict, blank=True)
     extra_headers = models.JSONField(default=dict, blank=True)
     timeout = models.FloatField(default=120.0, null=True, blank=True)
+    cache_responses = models.BooleanField(
+        default=True,
+        help_text="Reuse responses to identical prompts sent with temperature 0",
+    )
+    cache_ttl = models.IntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(1)],
+        help_text="Seconds a cached response is reused, crew default if empty",
+    )
     is_visible = models.BooleanField(default=True)
 
     def get_default_model(self):
@@ -21,7 +21,9 @@ class LLMConfigData(BaseModel):
     deployment_id: str | None = None
     headers: dict[str, str] | None = None
     extra_headers: dict[str, str] | None = None
-    
+    cache_responses: bool = True
+    cache_ttl: int | None = None
+
 
 
 class EmbedderConfigData(BaseModel):
@@ -239,6 +241,10 @@ class SessionData(BaseModel):
     graph: "GraphData"
     unique_subgraph_list: list["SubGraphData"] = []
     initial_state: dict[str, Any] = {}
+    # Used by the crew session scheduler
+    graph_id: int | None = None
+    tenant_id: int | None = None
+    priority_class: Literal["interactive", "webhook", "batch"] = "interactive"
 
 
 class TaskMessageData(BaseModel):
@@ -261,6 +267,11 @@ class CodeResultData(BaseModel):
     stderr: str
     stdout: str
     returncode: int = 0
+    # Usage of the execution, only wall_time is set if the interpreter crashed
+    # or timed out
+    peak_rss_kb: int | None = None
+    cpu_time: float | None = None
+    wall_time: float | None = None
 
 
 class CodeTaskData(BaseModel):
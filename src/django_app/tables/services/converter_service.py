@@ -442,6 +442,8 @@ class ConverterService(metaclass=SingletonMeta):
                 deployment_id=config.model.deployment_id,
                 headers=config.headers,
                 extra_headers=config.extra_headers,
+                cache_responses=config.cache_responses,
+                cache_ttl=config.cache_ttl,
             ),
         )
 
@@ -28,6 +28,8 @@ GRAPH_MESSAGE_UPDATE_CHANNEL = os.environ.get(
 )
 WEBHOOK_MESSAGE_CHANNEL = os.environ.get("WEBHOOK_MESSAGE_CHANNEL", "webhooks")
 TELEGRAM_TRIGGER_PREFIX = "telegram-trigger/"
+# Streamed only, the complete result arrives in a following message
+TRANSIENT_MESSAGE_TYPES = {"llm_chunk"}
 
 
 class RedisPubSub:
@@ -155,6 +157,8 @@ class RedisPubSub:
             "prompt_tokens": 0,
             "completion_tokens": 0,
             "successful_requests": 0,
+            "saved_tokens": 0,
+            "cached_responses": 0,
         }
 
         for key in cached_keys:
@@ -181,6 +185,10 @@ class RedisPubSub:
                     total_usage["successful_requests"] += token_usage.get(
                         "successful_requests", 0
                     )
+                    total_usage["saved_tokens"] += token_usage.get("saved_tokens", 0)
+                    total_usage["cached_responses"] += token_usage.get(
+                        "cached_responses", 0
+                    )
 
             except Exception as e:
                 logger.error(f"Error parsing cached message for key {key}: {e}")
@@ -212,16 +220,18 @@ class RedisPubSub:
             )
 
             # Save in buffer.
-            buffer.append(
-                dict(
-                    session_id=session_id,
-                    created_at=graph_session_message_data.timestamp,
-                    name=graph_session_message_data.name,
-                    execution_order=graph_session_message_data.execution_order,
-                    message_data=graph_session_message_data.message_data,
-                    uuid=message_uuid,
+            message_type = graph_session_message_data.message_data.get("message_type")
+            if message_type not in TRANSIENT_MESSAGE_TYPES:
+                buffer.append(
+                    dict(
+                        session_id=session_id,
+                        created_at=graph_session_message_data.timestamp,
+                        name=graph_session_message_data.name,
+                        execution_order=graph_session_message_data.execution_order,
+                        message_data=graph_session_message_data.message_data,
+                        uuid=message_uuid,
+                    )
                 )
-            )
 
             # Notify SSE about updates.
             self.redis_client.publish(
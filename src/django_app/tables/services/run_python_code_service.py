@@ -45,9 +45,9 @@ class RunPythonCodeService(metaclass=SingletonMeta):
             global_kwargs={**python_code.global_kwargs, **additional_global_kwargs},
         )
 
-        channel = self.code_exec_task_channel
-        self.redis_service.redis_client.publish(
-            channel, code_task_data.model_dump_json()
+        # Redis Stream read by the sandbox consumer group
+        self.redis_service.redis_client.xadd(
+            self.code_exec_task_channel, {"data": code_task_data.model_dump_json()}
         )
         return execution_id
 
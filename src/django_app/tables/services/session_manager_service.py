@@ -99,17 +99,25 @@ class SessionManagerService(metaclass=SingletonMeta):
     def create_session_data(
         self,
         session: Session,
+        priority_class: str = "interactive",
     ) -> SessionData:
         self.subgraph_validator.validate(session.graph)
 
         unique_subgraphs: dict[int, SubGraphData] = {}
         graph_data = self._build_graph_data(session.graph, unique_subgraphs)
 
+        tenant_id = None
+        if session.graph_user is not None:
+            tenant_id = session.graph_user.user.organization_id
+
         return SessionData(
             id=session.pk,
             graph=graph_data,
             unique_subgraph_list=list(unique_subgraphs.values()),
             initial_state=session.variables,
+            graph_id=session.graph_id,
+            tenant_id=tenant_id,
+            priority_class=priority_class,
         )
 
     def run_session(
@@ -118,6 +126,7 @@ class SessionManagerService(metaclass=SingletonMeta):
         variables: dict | None = None,
         username: str | None = None,
         entrypoint: str | None = None,
+        priority_class: str = "interactive",
     ) -> int:
         logger.info(f"'run_session' got variables: {variables}")
 
@@ -130,7 +139,9 @@ class SessionManagerService(metaclass=SingletonMeta):
             username=username,
             entrypoint=entrypoint,
         )
-        session_data: SessionData = self.create_session_data(session=session)
+        session_data: SessionData = self.create_session_data(
+            session=session, priority_class=priority_class
+        )
         # TODO: add ping or waiting for crew to accept connections
 
         session.graph_schema = session_data.graph.model_dump(mode="json")
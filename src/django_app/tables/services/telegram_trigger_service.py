@@ -97,6 +97,7 @@ class TelegramTriggerService(metaclass=SingletonMeta):
                 graph_id=telegram_trigger_node.graph.pk,
                 variables={"telegram_payload": payload},
                 entrypoint=telegram_trigger_node.node_name,
+                priority_class="webhook",
             )
 
     def get_trigger_info(self, telegram_bot_api_key: str):
@@ -23,4 +23,5 @@ class WebhookTriggerService(metaclass=SingletonMeta):
                 graph_id=webhook_trigger_node.graph.pk,
                 variables=variables,
                 entrypoint=webhook_trigger_node.node_name,
+                priority_class="webhook",
             )
@@ -30,14 +30,15 @@ from helpers.logger import logger
 app = FastAPI()
 
 import_tool_data_repository = ImportToolDataRepository()
+redis_service = RedisService()
 tool_image_service = ToolImageService(
-    import_tool_data_repository=import_tool_data_repository
+    import_tool_data_repository=import_tool_data_repository,
+    redis_service=redis_service,
 )
 tool_container_service = ToolContainerService(
     tool_image_service=tool_image_service,
     import_tool_data_repository=import_tool_data_repository,
 )
-redis_service = RedisService()
 
 session_repository = SessionRepository(AsyncSessionLocal)
 
@@ -61,12 +62,16 @@ def post_class_data(
 ):
     logger.info(f"{tool_alias}; {tool_init_configuration.tool_init_configuration}")
     try:
-        classdata = tool_container_service.request_class_data(
+        class_data = tool_container_service.request_class_data(
             tool_alias=tool_alias,
             tool_init_configuration=tool_init_configuration.model_dump(),
-        )["classdata"]
+        )
         logger.info(f"Class data retrieved successfully for tool alias: {tool_alias}")
-        return ClassDataResponseModel(classdata=classdata)
+        return ClassDataResponseModel(
+            classdata=class_data["classdata"],
+            image_name=class_data.get("image_name"),
+            image_version=class_data.get("image_version"),
+        )
     except Exception as e:
         logger.error(f"Failed to retrieve class data for tool alias {tool_alias}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
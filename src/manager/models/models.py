@@ -22,6 +22,8 @@ class ToolListResponseModel(BaseModel):
 
 class ClassDataResponseModel(BaseModel):
     classdata: str
+    image_name: str | None = None
+    image_version: str | None = None
 
 
 class RunToolResponseModel(BaseModel):
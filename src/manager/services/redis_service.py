@@ -1,5 +1,6 @@
 import os
 import json
+import redis
 import redis.asyncio as aioredis
 from redis.client import PubSub
 from redis.retry import Retry
@@ -11,6 +12,7 @@ from helpers.logger import logger
 class RedisService:
     def __init__(self, session_start_channel="sessions:start"):
         self.aioredis_client = None
+        self.redis_client = None
         self.session_start_channel = session_start_channel
         self._retry = Retry(backoff=ExponentialBackoff(cap=3), retries=10)
 
@@ -23,6 +25,11 @@ class RedisService:
             retry=self._retry,
             password=password,
         )
+        self.redis_client = redis.Redis.from_url(
+            f"redis://{host}:{port}",
+            retry=self._retry,
+            password=password,
+        )
         self.pubsub = self.aioredis_client.pubsub()
         await self.pubsub.subscribe(self.session_start_channel)
 
@@ -55,6 +62,11 @@ class RedisService:
         await pubsub.subscribe(channel)
         return pubsub
 
+    def publish(self, channel: str, message: object):
+        """Publish from sync code, e.g. endpoints running in the threadpool."""
+        self.redis_client.publish(channel, json.dumps(message))
+        logger.info(f"Message published to channel '{channel}'.")
+
     async def async_publish(self, channel: str, message: object):
         await self.aioredis_client.publish(channel, json.dumps(message))
         logger.info(f"Message published to channel '{channel}'.")
@@ -86,7 +86,15 @@ class ToolContainerService:
             f"http://{container.name}:8000/tool/{tool_alias}/class-data/",
             json=tool_init_configuration,
         )
-        return response.json()
+        class_data = response.json()
+        # Lets crew cache class-data until the image changes
+        class_data["image_name"] = (
+            self.import_tool_data_repository.find_image_name_by_tool_alias(
+                tool_alias=tool_alias
+            )
+        )
+        class_data["image_version"] = container.image.id
+        return class_data
 
     def request_run_tool(
         self, tool_alias: str, run_tool_params_model: RunToolParamsModel
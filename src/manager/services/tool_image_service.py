@@ -4,18 +4,40 @@ import docker.errors
 
 from helpers.logger import logger
 from services.build_tool import ToolDockerImageBuilder
+from services.redis_service import RedisService
 from repositories.import_tool_data_repository import ImportToolDataRepository
 
 import docker
 from docker.models.images import Image
 from docker.client import DockerClient
 
+# Crew drops cached tool class-data of images announced here
+TOOL_IMAGE_UPDATED_CHANNEL = os.environ.get(
+    "TOOL_IMAGE_UPDATED_CHANNEL", "tools:image_updated"
+)
+
 
 class ToolImageService:
     client: DockerClient = docker.client.from_env()
 
-    def __init__(self, import_tool_data_repository: ImportToolDataRepository):
+    def __init__(
+        self,
+        import_tool_data_repository: ImportToolDataRepository,
+        redis_service: RedisService | None = None,
+    ):
         self.import_tool_data_repository = import_tool_data_repository
+        self.redis_service = redis_service
+
+    def notify_image_updated(self, image_name: str, image: Image):
+        if self.redis_service is None or self.redis_service.redis_client is None:
+            return
+        try:
+            self.redis_service.publish(
+                TOOL_IMAGE_UPDATED_CHANNEL,
+                {"image_name": image_name, "image_version": image.id},
+            )
+        except Exception as e:
+            logger.warning(f"Failed to announce new image {image_name}: {e}")
 
     def build_image(self, image_name: str) -> Image:
         import_tool_data = self.import_tool_data_repository.get_import_class_data(
@@ -77,9 +99,12 @@ class ToolImageService:
 
             image = self.pull_from_dockerhub(image_name)
             if image:
+                self.notify_image_updated(image_name=image_name, image=image)
                 return image
 
             logger.info(f"Image for alias {tool_alias} not found on DockerHub.")
 
         logger.info("Building new image.")
-        return self.build_image(image_name=image_name)
+        image = self.build_image(image_name=image_name)
+        self.notify_image_updated(image_name=image_name, image=image)
+        return image
@@ -267,6 +267,11 @@ class CodeResultData(BaseModel):
     stderr: str
     stdout: str
     returncode: int = 0
+    # Usage of the execution, only wall_time is set if the interpreter crashed
+    # or timed out
+    peak_rss_kb: int | None = None
+    cpu_time: float | None = None
+    wall_time: float | None = None
 
 
 class CodeTaskData(BaseModel):
@@ -41,8 +41,9 @@ class PythonCodeExecutorService(metaclass=SingletonMeta):
         )
 
         pubsub = await self.redis_service.async_subscribe("code_results")
-        await self.redis_service.async_publish(
-            "code_exec_tasks", code_task_data.model_dump()
+        # Redis Stream read by the sandbox consumer group
+        await self.redis_service.aioredis_client.xadd(
+            "code_exec_tasks", {"data": code_task_data.model_dump_json()}
         )
         logger.info("Waiting for code_results")
 
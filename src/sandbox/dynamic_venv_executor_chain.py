@@ -4,10 +4,33 @@ import asyncio
 import hashlib
 import json
 import os
+import shutil
 import sys
+import time
+import uuid
 from pathlib import Path
-from typing import Any, Dict, List
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List
 from models import CodeResultData
+from services.venv_builds import (
+    LAYERS_DIR,
+    WHEEL_CACHE_DIR,
+    VenvBuild,
+    is_venv_ready,
+    mark_used,
+)
+from services.venv_layers import BaseLayer, select_layer
+from services.venv_store import VenvGarbageCollector
+from services.interpreter_pool import (
+    CODE_CACHE_DIR,
+    EXECUTION_MAX_CPU_SECONDS,
+    EXECUTION_MAX_MEMORY_MB,
+    EXECUTION_TIMEOUT,
+    CodeCacheStats,
+    InterpreterPoolManager,
+    InterpreterWorker,
+    WorkerError,
+)
 from utils.logger import logger
 
 
@@ -51,12 +74,79 @@ class DummyHandler(AbstractHandler):
         return await super().handle(context)
 
 
+def set_venv_path(context: Dict[str, Any], venv_path: Path):
+    python_executable = (
+        venv_path / Path("bin/python")
+        if os.name != "nt"
+        else venv_path / Path("Scripts/python")
+    )
+    context["venv_path"] = venv_path
+    context["python_executable"] = python_executable
+    context["hash_file"] = venv_path / "libhash"
+
+
 class CreateVenvHandler(AbstractHandler):
+    """
+    Provides the venv of the libraries, building it once per lib_hash.
+
+    Only one task builds a venv at a time: tasks of this process wait for the
+    build in progress and share its result, other processes wait for the file
+    lock of the lib_hash. The venv is created in a build directory, the
+    libraries are installed into it by InstallLibrariesHandler, which then
+    swaps it in.
+
+    `in_use` counts the tasks of every lib_hash going through the chain, their
+    venvs are not removed by VenvGarbageCollector. New venvs extend the ready
+    layer of `layers` with the most of their libraries, see BaseLayer.
+    """
+
+    def __init__(self, layers: list[BaseLayer] | None = None):
+        self._builds: dict[str, VenvBuild] = {}
+        self.in_use: Counter[str] = Counter()
+        self.layers = layers if layers is not None else []
+
     def calculate_hash(self, libraries: List[str]) -> str:
         """Calculate a hash of the libraries list."""
         libraries_str = json.dumps(libraries, sort_keys=True)
         return hashlib.sha256(libraries_str.encode("utf-8")).hexdigest()
 
+    async def _start_build(
+        self, context: Dict[str, Any]
+    ) -> VenvBuild | CodeResultData | None:
+        """
+        Wait until the venv is ready or this task has to build it. Returns the
+        build this task owns, None if the venv is ready or the result of the
+        build this task waited for if it failed.
+        """
+        lib_hash = context["lib_hash"]
+        venv_path = context["venv_path"]
+        while not is_venv_ready(venv_path, lib_hash):
+            build = self._builds.get(lib_hash)
+            if build is not None:
+                logger.info(f"Waiting for the build of {venv_path}...")
+                result = await asyncio.shield(build.future)
+                if result is not None:
+                    return result
+                continue
+
+            build = VenvBuild(context["base_venv_path"], lib_hash)
+            self._builds[lib_hash] = build
+            build.future.add_done_callback(
+                lambda _, lib_hash=lib_hash: self._builds.pop(lib_hash, None)
+            )
+            try:
+                await build.lock.acquire()
+            except BaseException:
+                build.finish(None)
+                raise
+
+            if is_venv_ready(venv_path, lib_hash):
+                # Built by another process while waiting for the lock
+                build.finish(None)
+                break
+            return build
+        return None
+
     async def handle(self, context: Dict[str, Any]) -> Any:
         """Create virtual environment task."""
 
@@ -69,34 +159,88 @@ class CreateVenvHandler(AbstractHandler):
         lib_hash = self.calculate_hash(context["libraries"])
         base_venv_path = context.get("base_venv_path")
         venv_path: Path = Path(base_venv_path) / Path(lib_hash)
-        python_executable = (
-            venv_path / Path("bin/python")
-            if os.name != "nt"
-            else venv_path / Path("Scripts/python")
-        )
-        hash_file = venv_path / "libhash"
-        context["venv_path"] = venv_path
-        context["python_executable"] = python_executable
-        context["hash_file"] = hash_file
         context["lib_hash"] = lib_hash
-
-        if not venv_path.exists():
-            logger.info(f"Creating virtual environment at {venv_path}...")
+        set_venv_path(context, venv_path)
+
+        self.in_use[lib_hash] += 1
+        try:
+            return await self._provide_venv(context)
+        finally:
+            self.in_use[lib_hash] -= 1
+            if not self.in_use[lib_hash]:
+                del self.in_use[lib_hash]
+
+    async def _provide_venv(self, context: Dict[str, Any]) -> Any:
+        venv_path = context["venv_path"]
+        # Before checking the venv, so that the garbage collector keeps it
+        mark_used(venv_path)
+        build = await self._start_build(context)
+        if isinstance(build, CodeResultData):
+            # The build this task waited for failed
+            return build.model_copy(update={"execution_id": context["execution_id"]})
+
+        if build is None:
+            logger.info(f"Virtual environment already exists at {venv_path}.")
+        else:
+            logger.info(f"Creating virtual environment at {build.build_path}...")
             process = await asyncio.create_subprocess_shell(
-                f"{sys.executable} -m venv {venv_path}",
+                f"{sys.executable} -m venv --without-pip {build.build_path}",
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
             )
-            await process.communicate()
-        else:
-            logger.info(f"Virtual environment already exists at {venv_path}.")
+            stdout, stderr = await process.communicate()
+            if process.returncode != 0:
+                result = CodeResultData(
+                    execution_id=context["execution_id"],
+                    stderr=stderr.decode("utf-8", errors="replace"),
+                    stdout=stdout.decode("utf-8", errors="replace"),
+                    returncode=process.returncode,
+                )
+                build.finish(result)
+                return result
+            context["venv_build"] = build
+            set_venv_path(context, build.build_path)
+
+            layer = select_layer(self.layers, context["libraries"])
+            if layer is not None:
+                logger.info(f"Extending base layer {layer.venv_path}...")
+                layer.extend(build.build_path)
+                context["install_libraries"] = layer.extra_libraries(
+                    context["libraries"]
+                )
 
-        if self._next_handler:
-            return await super().handle(context)
-        return "Virtual environment created."
+        try:
+            if self._next_handler:
+                return await super().handle(context)
+            if build is not None:
+                build.commit()
+            return "Virtual environment created."
+        finally:
+            if build is not None and not build.done:
+                # A handler failed before the libraries were installed
+                build.finish(None)
 
 
 class InstallLibrariesHandler(AbstractHandler):
+    """
+    Installs the libraries into the venv being built.
+
+    Wheels downloaded or built for one venv are kept in `wheel_cache_path` and
+    reused by every other venv, libraries given as local directories are built
+    into wheels there once. Wheels in `wheelhouse_path` are preferred over
+    the index, with `offline` they are the only source.
+    """
+
+    def __init__(
+        self,
+        wheel_cache_path: str | Path | None = None,
+        wheelhouse_path: str | Path | None = None,
+        offline: bool = False,
+    ):
+        self.wheel_cache_path = wheel_cache_path
+        self.wheelhouse_path = wheelhouse_path
+        self.offline = offline
+
     def calculate_hash(self, libraries: List[str]) -> str:
         """Calculate a hash of the libraries list."""
         libraries_str = json.dumps(libraries, sort_keys=True)
@@ -117,7 +261,6 @@ class InstallLibrariesHandler(AbstractHandler):
 
     async def handle(self, context: Dict[str, Any]) -> Any:
         """Install libraries asynchronously."""
-        python_executable = context["python_executable"]
         lib_hash = context.get("lib_hash")
         hash_changed = self._hash_changed(
             lib_hash=lib_hash, hash_file=context["hash_file"]
@@ -125,89 +268,17 @@ class InstallLibrariesHandler(AbstractHandler):
 
         if hash_changed:
             logger.info("Installing libraries...")
-
-            # Upgrade pip
-            process = await asyncio.create_subprocess_shell(
-                f"{python_executable} -m pip install --upgrade pip",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            stdout, stderr = await process.communicate()
-            stderr = stderr.decode("utf-8", errors="replace")
-            stdout = stdout.decode("utf-8", errors="replace")
-            returncode = process.returncode
-
-            if returncode != 0:
-                return CodeResultData(
-                    execution_id=context["execution_id"],
-                    stderr=stderr,
-                    stdout=stdout,
-                    returncode=returncode,
-                )
-
-            # Uninstall all libraries
-            logger.info("Uninstalling all libraries...")
-            process = await asyncio.create_subprocess_shell(
-                f"{python_executable} -m pip freeze",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            stdout, stderr = await process.communicate()
-            returncode = process.returncode
-
-            stderr = stderr.decode("utf-8", errors="replace")
-            stdout = stdout.decode("utf-8", errors="replace")
-            if returncode != 0:
-                return CodeResultData(
-                    execution_id=context["execution_id"],
-                    stderr=stderr,
-                    stdout=stdout,
-                    returncode=returncode,
-                )
-
-            installed_packages = stdout.splitlines()
-
-            for package in installed_packages:
-                package_name = package.split("==")[0]
-                logger.info(f"Uninstalling {package_name}...")
-                await asyncio.create_subprocess_shell(
-                    f"{python_executable} -m pip uninstall -y {package_name}",
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                )
-                stdout, stderr = await process.communicate()
-                stderr = stderr.decode("utf-8", errors="replace")
-                stdout = stdout.decode("utf-8", errors="replace")
-                if returncode != 0:
-                    return CodeResultData(
-                        execution_id=context["execution_id"],
-                        stderr=stderr,
-                        stdout=stdout,
-                        returncode=returncode,
-                    )
-
-            # Install libraries
-            for library in context["libraries"]:
-                logger.info(f"Installing {library}...")
-                process = await asyncio.create_subprocess_shell(
-                    f"{python_executable} -m pip install {library}",
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                )
-                stdout, stderr = await process.communicate()
-                stderr = stderr.decode("utf-8", errors="replace")
-                stdout = stdout.decode("utf-8", errors="replace")
-                returncode = process.returncode
-
-                if returncode != 0:
-                    return CodeResultData(
-                        execution_id=context["execution_id"],
-                        stderr=stderr,
-                        stdout=stdout,
-                        returncode=returncode,
-                    )
+            result = await self._install(context)
+            build: VenvBuild | None = context.get("venv_build")
+            if result is not None:
+                if build is not None:
+                    build.finish(result)
+                return result
 
             self._update_hash(lib_hash=lib_hash, hash_file=context["hash_file"])
+            if build is not None:
+                build.commit()
+                set_venv_path(context, build.venv_path)
         else:
             logger.info("Libraries are up-to-date. Skipping installation.")
 
@@ -215,99 +286,251 @@ class InstallLibrariesHandler(AbstractHandler):
             return await super().handle(context)
         return "Libraries installed."
 
+    async def _pip(self, context: Dict[str, Any], *args: str) -> CodeResultData | None:
+        """
+        Run pip of this service for the venv, venvs are created without pip.
+        Returns the result if it failed.
+        """
+        process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-m",
+            "pip",
+            "--python",
+            str(context["python_executable"]),
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            return CodeResultData(
+                execution_id=context["execution_id"],
+                stderr=stderr.decode("utf-8", errors="replace"),
+                stdout=stdout.decode("utf-8", errors="replace"),
+                returncode=process.returncode,
+            )
+        return None
+
+    def _source_args(self) -> list[str]:
+        args = ["--disable-pip-version-check", "--prefer-binary"]
+        if self.wheel_cache_path is not None:
+            args += ["--cache-dir", str(self.wheel_cache_path)]
+        if self.wheelhouse_path is not None:
+            args += ["--find-links", str(self.wheelhouse_path)]
+        if self.offline:
+            args.append("--no-index")
+        return args
+
+    @staticmethod
+    def _hash_directory(path: Path) -> str:
+        files = []
+        for file in sorted(path.rglob("*")):
+            relative = file.relative_to(path)
+            if file.is_file() and not any(
+                part.startswith(".") or part == "__pycache__" for part in relative.parts
+            ):
+                stat = file.stat()
+                files.append([relative.as_posix(), stat.st_size, stat.st_mtime_ns])
+        return hashlib.sha256(json.dumps(files).encode("utf-8")).hexdigest()
+
+    async def _local_wheel(
+        self, context: Dict[str, Any], path: Path
+    ) -> str | CodeResultData:
+        """
+        Wheel of a library given as a local directory, built once per version of
+        its files. pip does not cache wheels of local directories.
+        """
+        wheel_dir = (
+            Path(self.wheel_cache_path)
+            / "local"
+            / f"{path.name}-{self._hash_directory(path)[:16]}"
+        )
+        if not wheel_dir.exists():
+            build_dir = wheel_dir.with_name(f".{wheel_dir.name}.{uuid.uuid4().hex[:8]}")
+            result = await self._pip(
+                context,
+                "wheel",
+                "--no-deps",
+                *self._source_args(),
+                "--wheel-dir",
+                str(build_dir),
+                str(path),
+            )
+            if result is not None:
+                shutil.rmtree(build_dir, ignore_errors=True)
+                return result
+            try:
+                build_dir.rename(wheel_dir)
+            except OSError:
+                # Built by another task in the meantime
+                shutil.rmtree(build_dir, ignore_errors=True)
+        return str(next(wheel_dir.glob("*.whl")))
+
+    async def _install(self, context: Dict[str, Any]) -> CodeResultData | None:
+        """
+        Install the libraries into the new venv with one pip call, so their
+        dependencies are resolved once. Returns the result if it failed.
+        """
+        install_libraries = context.get("install_libraries", context["libraries"])
+        if not install_libraries:
+            # All of them are in the base layer
+            return None
+
+        libraries = []
+        for library in install_libraries:
+            if self.wheel_cache_path is not None and Path(library).is_dir():
+                library = await self._local_wheel(context, Path(library))
+                if isinstance(library, CodeResultData):
+                    return library
+            libraries.append(library)
+
+        logger.info(f"Installing {', '.join(install_libraries)}...")
+        return await self._pip(context, "install", *self._source_args(), *libraries)
+
 
 class ExecuteCodeHandler(AbstractHandler):
-    def wrap_code(
-        self,
-        code: str,
-        result_file_path: Path,
-        entrypoint: str,
-        func_kwargs: dict[str, Any],
-        global_kwargs: dict[str, Any] | None = None,
-    ):
-        global_kwargs = global_kwargs or dict()
-        code_lines = code.split("\n")
-        code_lines = ["    " + line for line in code_lines]
-        code = "\n".join(code_lines)
-        wrapped_code = f"""
-import sys
-import json
+    """
+    Runs the entrypoint of the code in an interpreter of the venv.
 
-try:
-    from dotdict import DotDict, DotObject, DotList
-    for k, v in {global_kwargs}.items():
-        globals()[k] = v
-    
-{code}
-    
-    __sys_dot_kwargs = DotDict({func_kwargs})
-    
-    sys_result_variable = {entrypoint}(**__sys_dot_kwargs)
-    with open(r'{result_file_path.as_posix()}', 'w', encoding='utf-8') as file:
-        file.write(json.dumps(sys_result_variable))
-except Exception as e:
-    print(str(e), file=sys.stderr)
-    sys.exit(1)
-sys.exit(0)
-"""
-
-        return wrapped_code
+    The code, its arguments and the result are passed over the pipes of
+    services/interpreter_worker.py. The code is compiled once per code hash and
+    venv, the compiled code is kept in the venv for new interpreters.
 
-    async def handle(self, context: Dict[str, Any]) -> Any:
-        """Execute the provided code asynchronously."""
-        python_executable = context["python_executable"]
+    The tasks of a batch (context["batch"]) are spread over the warm
+    interpreters of the venv, or run one after the other in one new interpreter
+    without interpreter pools. Every result is passed to context["on_result"]
+    as soon as it completes.
+    """
 
-        temp_code_path = context["temp_code_path"]
+    def __init__(self, interpreter_pools: InterpreterPoolManager | None = None):
+        self.interpreter_pools = interpreter_pools
+        self.code_cache_stats = CodeCacheStats()
 
-        wrapped_code = self.wrap_code(
-            code=context["code"],
-            result_file_path=context["result_file_path"],
-            entrypoint=context["entrypoint"],
-            func_kwargs=context["func_kwargs"],
-            global_kwargs=context["global_kwargs"],
-        )
+    @staticmethod
+    def make_task(item: Dict[str, Any]) -> dict[str, Any]:
+        code = item["code"]
+        return {
+            "code": code,
+            "code_hash": hashlib.sha256(code.encode("utf-8")).hexdigest(),
+            "entrypoint": item["entrypoint"],
+            "func_kwargs": item.get("func_kwargs") or {},
+            "global_kwargs": item.get("global_kwargs") or {},
+            "limits": {
+                "cpu_seconds": item.get("max_cpu_seconds") or EXECUTION_MAX_CPU_SECONDS,
+                "memory_mb": item.get("max_memory_mb") or EXECUTION_MAX_MEMORY_MB,
+            },
+        }
 
-        # Write the code to a temporary file
-        with open(temp_code_path, "w") as f:
-            f.write(wrapped_code)
+    async def _execute(
+        self,
+        item: Dict[str, Any],
+        run: Callable[..., Awaitable[dict[str, Any]]],
+    ) -> CodeResultData:
+        """Run one task with `run(task, timeout=...)` of a worker or a pool."""
+        timeout = item.get("timeout") or EXECUTION_TIMEOUT
+        started_at = time.perf_counter()
+        try:
+            response = await run(self.make_task(item), timeout=timeout)
+            self.code_cache_stats.record(response.get("code_cache"))
+        except WorkerError as e:
+            response = {
+                "returncode": e.returncode,
+                "stdout": "",
+                "stderr": str(e),
+                "result_data": None,
+                "usage": {"wall_time": time.perf_counter() - started_at},
+            }
+        if response["stderr"]:
+            logger.info(f"Error: {response['stderr']}")
 
-        # Execute the code asynchronously
-        logger.info(f"Executing code using {python_executable}...")
-        process = await asyncio.create_subprocess_shell(
-            f"{python_executable} {temp_code_path}",
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
+        return CodeResultData(
+            execution_id=item["execution_id"],
+            result_data=(
+                response["result_data"] if response["returncode"] == 0 else None
+            ),
+            stderr=response["stderr"],
+            stdout=response["stdout"],
+            returncode=response["returncode"],
+            **response["usage"],
         )
-        stdout, stderr = await process.communicate()
-        stderr = stderr.decode("utf-8", errors="replace")
-        stdout = stdout.decode("utf-8", errors="replace")
-        returncode = process.returncode
-        if stderr:
-            logger.info(f"Error: {stderr}")
 
-        result_file_path: Path | str = context["result_file_path"]
-        if isinstance(result_file_path, Path):
-            result_file_path = result_file_path.as_posix()
+    async def _run_cold(
+        self,
+        python_executable: Path,
+        code_cache_path: Path,
+        items: list[Dict[str, Any]],
+        on_result: Callable[[CodeResultData], Awaitable[None]] | None,
+    ) -> list[CodeResultData]:
+        """Run the tasks in a new interpreter, replaced if a task takes it down."""
+        worker: InterpreterWorker | None = None
+
+        async def run(task: dict[str, Any], timeout: float | None):
+            nonlocal worker
+            if worker is None or not worker.alive:
+                worker = InterpreterWorker(python_executable, code_cache_path)
+                await worker.start()
+            return await worker.execute(task, timeout=timeout)
+
+        results = []
+        try:
+            for item in items:
+                result = await self._execute(item, run)
+                if on_result is not None:
+                    await on_result(result)
+                results.append(result)
+        finally:
+            if worker is not None:
+                await worker.stop()
+        return results
+
+    async def _run_warm(
+        self,
+        lib_hash: str,
+        python_executable: Path,
+        code_cache_path: Path,
+        items: list[Dict[str, Any]],
+        on_result: Callable[[CodeResultData], Awaitable[None]] | None,
+    ) -> list[CodeResultData]:
+        """Run the tasks in the warm interpreters of the venv."""
+        pool = self.interpreter_pools.get_pool(
+            lib_hash, python_executable, code_cache_path
+        )
 
-        result_data = None
+        async def execute(item: Dict[str, Any]) -> CodeResultData:
+            result = await self._execute(item, pool.execute)
+            if on_result is not None:
+                await on_result(result)
+            return result
 
-        if returncode == 0:
-            try:
-                with open(result_file_path, "r", encoding="utf-8") as file:
-                    result_data = file.read()
-            except Exception:
-                logger.exception("Exception reading result file")
+        return list(await asyncio.gather(*(execute(item) for item in items)))
+
+    async def handle(self, context: Dict[str, Any]) -> Any:
+        """Execute the provided code asynchronously."""
+        python_executable = context["python_executable"]
+        code_cache_path = Path(context["venv_path"]) / CODE_CACHE_DIR
+        items = context["batch"] if "batch" in context else [context]
+
+        logger.info(f"Executing {len(items)} task(s) using {python_executable}...")
+        if self.interpreter_pools is not None:
+            results = await self._run_warm(
+                lib_hash=context["lib_hash"],
+                python_executable=python_executable,
+                code_cache_path=code_cache_path,
+                items=items,
+                on_result=context.get("on_result"),
+            )
+        else:
+            results = await self._run_cold(
+                python_executable=python_executable,
+                code_cache_path=code_cache_path,
+                items=items,
+                on_result=context.get("on_result"),
+            )
 
         if self._next_handler:
-            return super().handle(context)
+            return await super().handle(context)
 
-        return CodeResultData(
-            execution_id=context["execution_id"],
-            result_data=result_data,
-            stderr=stderr,
-            stdout=stdout,
-            returncode=returncode,
-        )
+        return results if "batch" in context else results[0]
 
 
 class DynamicVenvExecutorChain:
@@ -315,14 +538,51 @@ class DynamicVenvExecutorChain:
         self,
         output_path: str | Path,
         base_venv_path: str | Path,
+        interpreter_pools: InterpreterPoolManager | None = None,
+        wheel_cache_path: str | Path | None = None,
+        wheelhouse_path: str | Path | None = None,
+        offline: bool = False,
+        venv_gc: VenvGarbageCollector | None = None,
+        base_layers: list[list[str]] | None = None,
     ):
+        """
+        With `interpreter_pools` code runs in warm interpreters of the venv,
+        otherwise every execution starts a new interpreter. The wheel cache is
+        kept in `base_venv_path` unless `wheel_cache_path` is set, see
+        InstallLibrariesHandler for the other arguments. `venv_gc` defaults to a
+        VenvGarbageCollector configured by the environment. `base_layers` are the
+        library sets of the base layers built by `build_layers`.
+        """
         self.output_path = output_path
         self.base_venv_path = base_venv_path
+        self.interpreter_pools = interpreter_pools
+        self.venv_gc = venv_gc or VenvGarbageCollector(
+            base_venv_path=base_venv_path, output_path=output_path
+        )
+
+        self.base_layers = base_layers or []
+        self.layers: list[BaseLayer] = []
 
         # Build the chain of responsibility
-        create_venv_handler = CreateVenvHandler()
-        install_libraries_handler = InstallLibrariesHandler()
-        execute_code_handler = ExecuteCodeHandler()
+        create_venv_handler = CreateVenvHandler(layers=self.layers)
+        self.create_venv_handler = create_venv_handler
+        install_libraries_handler = InstallLibrariesHandler(
+            wheel_cache_path=wheel_cache_path or Path(base_venv_path) / WHEEL_CACHE_DIR,
+            wheelhouse_path=wheelhouse_path,
+            offline=offline,
+        )
+        # Builds the layers in their own directory, left alone by the garbage
+        # collector
+        self.layer_chain: Handler = DummyHandler()
+        self.layer_chain.set_next(CreateVenvHandler()).set_next(
+            InstallLibrariesHandler(
+                wheel_cache_path=install_libraries_handler.wheel_cache_path,
+                wheelhouse_path=wheelhouse_path,
+                offline=offline,
+            )
+        )
+        execute_code_handler = ExecuteCodeHandler(interpreter_pools=interpreter_pools)
+        self.code_cache_stats = execute_code_handler.code_cache_stats
 
         self.chain: Handler = DummyHandler()
 
@@ -330,6 +590,46 @@ class DynamicVenvExecutorChain:
             install_libraries_handler
         ).set_next(execute_code_handler)
 
+    async def build_layers(self):
+        """
+        Build the venvs of the base layers, or find them built. Venvs created
+        before a layer is ready do not extend it.
+        """
+        layers_path = Path(self.base_venv_path) / LAYERS_DIR
+        for index, libraries in enumerate(self.base_layers):
+            context = {
+                "base_venv_path": layers_path,
+                "libraries": libraries,
+                "execution_id": f"base-layer-{index}",
+            }
+            result = await self.layer_chain.handle(context)
+            if isinstance(result, CodeResultData):
+                logger.error(
+                    f"Failed to build base layer of {', '.join(libraries)}: "
+                    f"{result.stderr}"
+                )
+                continue
+            lib_hash = context["lib_hash"]
+            layer = BaseLayer(
+                libraries=context["libraries"],
+                lib_hash=lib_hash,
+                venv_path=layers_path / lib_hash,
+            )
+            if all(existing.lib_hash != lib_hash for existing in self.layers):
+                self.layers.append(layer)
+                logger.info(f"Base layer of {', '.join(libraries)} is ready.")
+
+    def venvs_in_use(self) -> set[str]:
+        """lib_hashes of the venvs of running tasks and warm interpreters."""
+        lib_hashes = set(self.create_venv_handler.in_use)
+        if self.interpreter_pools is not None:
+            lib_hashes.update(self.interpreter_pools.pools)
+        return lib_hashes
+
+    async def collect_garbage(self) -> dict:
+        """Remove least recently used venvs over the budget and old outputs."""
+        return await asyncio.to_thread(self.venv_gc.collect, self.venvs_in_use())
+
     async def run(
         self,
         libraries: list[str],
@@ -339,27 +639,70 @@ class DynamicVenvExecutorChain:
         entrypoint: str = "main",
         func_kwargs: dict[str, Any] | None = None,
         global_kwargs: dict[str, Any] | None = None,
+        timeout: float | None = None,
+        max_cpu_seconds: float | None = None,
+        max_memory_mb: int | None = None,
     ) -> CodeResultData:
         """Run the complete workflow asynchronously."""
         if func_kwargs is None:
             func_kwargs = dict()
 
-        output_path = Path(self.output_path) / execution_id
-        os.makedirs(output_path, exist_ok=True)
+        os.makedirs(self.output_path, exist_ok=True)
         os.makedirs(self.base_venv_path, exist_ok=True)
 
         context = {
             "base_venv_path": self.base_venv_path,
             "libraries": libraries,
-            "temp_code_path": output_path / "code.py",
             "code": code,
-            "result_file_path": output_path / "output.txt",
             "entrypoint": entrypoint,
             "func_kwargs": func_kwargs,
             "execution_id": execution_id,
             "global_kwargs": global_kwargs,
+            "timeout": timeout,
+            "max_cpu_seconds": max_cpu_seconds,
+            "max_memory_mb": max_memory_mb,
         }
 
         result = await self.chain.handle(context)
         logger.info(result)
         return result
+
+    async def run_batch(
+        self,
+        libraries: list[str],
+        venv_name: str,
+        batch_id: str,
+        tasks: list[dict[str, Any]],
+        on_result: Callable[[CodeResultData], Awaitable[None]] | None = None,
+    ) -> list[CodeResultData]:
+        """
+        Run independent tasks in the venv of the libraries, prepared once for
+        all of them. Every task is a dict of the keyword arguments of `run`
+        from `execution_id` on. Results are passed to `on_result` as soon as
+        they complete and returned in the order of the tasks.
+        """
+        os.makedirs(self.output_path, exist_ok=True)
+        os.makedirs(self.base_venv_path, exist_ok=True)
+
+        context = {
+            "base_venv_path": self.base_venv_path,
+            "libraries": libraries,
+            "execution_id": batch_id,
+            "batch": tasks,
+            "on_result": on_result,
+        }
+
+        results = await self.chain.handle(context)
+        if isinstance(results, CodeResultData):
+            # The venv could not be prepared, every task gets its error
+            failed = results
+            results = []
+            for task in tasks:
+                result = failed.model_copy(
+                    update={"execution_id": task["execution_id"]}
+                )
+                if on_result is not None:
+                    await on_result(result)
+                results.append(result)
+        logger.info(f"Batch {batch_id} of {len(tasks)} tasks finished.")
+        return results
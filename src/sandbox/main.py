@@ -1,10 +1,14 @@
 import asyncio
 import json
 import os
+import time
 from pathlib import Path
-from models import CodeTaskData
+from models import CodeBatchTaskData, CodeResultData, CodeTaskData
 from services.redis_service import RedisService
 from dynamic_venv_executor_chain import DynamicVenvExecutorChain
+from services.interpreter_pool import WORKER_POOL_SIZE, InterpreterPoolManager
+from services.task_scheduler import FairTaskScheduler
+from services.task_stream import TaskStream
 from utils.logger import logger
 
 
@@ -12,39 +16,217 @@ redis_host = os.environ.get("REDIS_HOST", "127.0.0.1")
 redis_port = int(os.environ.get("REDIS_PORT", "6379"))
 redis_password = os.getenv("REDIS_PASSWORD")
 code_result_channel = os.environ.get("CODE_RESULT_CHANNEL", "code_results")
-task_channel = os.environ.get("CODE_EXEC_TASK_CHANNEL", "code_exec_tasks")
+# Redis Stream the code tasks are added to
+task_stream_name = os.environ.get("CODE_EXEC_TASK_CHANNEL", "code_exec_tasks")
+task_group = os.environ.get("CODE_EXEC_TASK_GROUP", "sandbox")
+# Tasks not acknowledged for this long are taken over by another consumer
+task_claim_idle_seconds = float(os.environ.get("TASK_CLAIM_IDLE_SECONDS", "60"))
+task_max_deliveries = int(os.environ.get("TASK_MAX_DELIVERIES", "3"))
+max_concurrent_tasks = int(os.environ.get("MAX_CONCURRENT_TASKS", "8"))
+max_buffered_tasks = int(os.environ.get("MAX_BUFFERED_TASKS", "32"))
+max_tasks_per_venv = int(os.environ.get("MAX_TASKS_PER_VENV", str(WORKER_POOL_SIZE)))
+metrics_interval = int(os.environ.get("SANDBOX_METRICS_INTERVAL", "30"))
+# Seconds between collections of unused venvs and old outputs
+venv_gc_interval = float(os.environ.get("VENV_GC_INTERVAL", "300"))
 output_path = Path(os.environ.get("OUTPUT_PATH", "executions"))
 base_venv_path = Path(os.environ.get("BASE_VENV_PATH", "venvs"))
+# Wheels shared by all venvs, in BASE_VENV_PATH by default
+wheel_cache_path = os.environ.get("WHEEL_CACHE_PATH") or None
+# Pre-populated wheels, the only source of libraries with OFFLINE_INSTALL
+wheelhouse_path = os.environ.get("WHEELHOUSE_PATH") or None
+offline_install = os.environ.get("OFFLINE_INSTALL", "0") == "1"
+# JSON list of library sets pre-built as base layers, e.g. [["pandas", "numpy"]]
+base_layers = json.loads(os.environ.get("BASE_LAYERS") or "[]")
 executor_chain = DynamicVenvExecutorChain(
     output_path=output_path,
     base_venv_path=base_venv_path,
+    interpreter_pools=InterpreterPoolManager(),
+    wheel_cache_path=wheel_cache_path,
+    wheelhouse_path=wheelhouse_path,
+    offline=offline_install,
+    base_layers=base_layers,
 )
 os.chdir("savefiles")
 
 redis_service = RedisService(host=redis_host, port=redis_port, password=redis_password)
+task_stream: TaskStream | None = None
+scheduler: FairTaskScheduler | None = None
+# Stream entries queued or running in this consumer
+in_flight: set[str] = set()
 
 
 async def init():
     await redis_service.connect()
 
 
-async def listen_redis():
-    logger.info(f"Subscribed to channel '{task_channel}' for code execution tasks.")
+async def publish_result(result: CodeResultData):
+    await redis_service.async_publish(
+        channel=code_result_channel, message=result.model_dump()
+    )
 
-    pubsub = await redis_service.async_subscribe(task_channel)
 
-    async for message in pubsub.listen():
-        if message["type"] == "message":
-            try:
-                logger.info(f"Received message: {message['data']}")
+async def give_up(message_id: str, data: dict | None, reason: str):
+    """Acknowledge a task that will not run, its caller gets an error result."""
+    logger.error(f"Giving up code task {message_id}: {reason}")
+    tasks = data.get("tasks") if isinstance(data, dict) else None
+    tasks = tasks if isinstance(tasks, list) else [data]
+    for task in tasks:
+        if isinstance(task, dict) and "execution_id" in task:
+            await publish_result(
+                CodeResultData(
+                    execution_id=task["execution_id"],
+                    stderr=reason,
+                    stdout="",
+                    returncode=1,
+                )
+            )
+    await task_stream.ack(message_id)
 
-                data = json.loads(message["data"])
-                code_task_data = CodeTaskData(**data)
 
-                asyncio.create_task(run(code_task_data=code_task_data))
+async def submit(message_id: str, data: dict | None):
+    try:
+        if "tasks" in data:
+            task_data = CodeBatchTaskData(**data)
+        else:
+            task_data = CodeTaskData(**data)
+    except Exception as e:
+        await give_up(message_id, data, f"Invalid code task: {e}")
+        return
+    in_flight.add(message_id)
+    await scheduler.submit(task_data.venv_name, (message_id, task_data))
 
+
+async def run_message(message: tuple[str, CodeTaskData | CodeBatchTaskData]):
+    message_id, task_data = message
+    try:
+        if isinstance(task_data, CodeBatchTaskData):
+            await run_batch(task_data)
+        else:
+            try:
+                await run(code_task_data=task_data)
             except Exception as e:
-                logger.error(f"Error processing message: {e}")
+                logger.exception(f"Error running code task {task_data.execution_id}")
+                await publish_result(
+                    CodeResultData(
+                        execution_id=task_data.execution_id,
+                        stderr=str(e),
+                        stdout="",
+                        returncode=1,
+                    )
+                )
+        await task_stream.ack(message_id)
+    finally:
+        # Not acknowledged if the result could not be published, the task is
+        # claimed again once idle
+        in_flight.discard(message_id)
+
+
+async def maintain_stream():
+    """
+    Keep tasks in flight from being claimed by other consumers, take over
+    tasks of dead ones and report the metrics.
+    """
+    interval = min(task_claim_idle_seconds / 3, metrics_interval)
+    last_report = 0.0
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await task_stream.touch(list(in_flight))
+            messages, exhausted = await task_stream.claim_stale(
+                count=max_buffered_tasks, exclude=in_flight
+            )
+            for message_id, data in exhausted:
+                await give_up(
+                    message_id,
+                    data,
+                    f"Code task was delivered {task_stream.max_deliveries} times "
+                    "without finishing",
+                )
+            for message_id, data in messages:
+                await submit(message_id, data)
+
+            if time.monotonic() - last_report >= metrics_interval:
+                last_report = time.monotonic()
+                metrics = {
+                    **scheduler.to_dict(),
+                    "stream": await task_stream.backlog(),
+                    "code_cache": executor_chain.code_cache_stats.to_dict(),
+                    "venv_store": executor_chain.venv_gc.metrics.to_dict(),
+                }
+                logger.info(f"Sandbox metrics: {metrics}")
+                await redis_service.aioredis_client.set(
+                    f"sandbox:metrics:{task_stream.consumer}",
+                    json.dumps(metrics),
+                    ex=metrics_interval * 3,
+                )
+        except Exception:
+            logger.exception("Failed to maintain code task stream")
+
+
+async def collect_garbage():
+    """Keep the venvs within their disk budget and remove old outputs."""
+    while True:
+        try:
+            await executor_chain.collect_garbage()
+        except Exception:
+            logger.exception("Failed to collect unused virtual environments")
+        await asyncio.sleep(venv_gc_interval)
+
+
+async def consume_tasks():
+    global task_stream, scheduler
+
+    task_stream = TaskStream(
+        redis_client=redis_service.aioredis_client,
+        stream=task_stream_name,
+        group=task_group,
+        claim_idle_ms=int(task_claim_idle_seconds * 1000),
+        max_deliveries=task_max_deliveries,
+    )
+    scheduler = FairTaskScheduler(
+        run_task=run_message,
+        max_workers=max_concurrent_tasks,
+        max_buffered=max_buffered_tasks,
+        max_per_key=max_tasks_per_venv,
+    )
+    await task_stream.ensure_group()
+    scheduler.start()
+
+    # Tasks this consumer received before a restart
+    last_id = "0"
+    while messages := await task_stream.read_own_pending(
+        count=await scheduler.wait_for_capacity(), after_id=last_id
+    ):
+        logger.info(f"Resuming {len(messages)} unfinished code tasks.")
+        for message_id, data in messages:
+            await submit(message_id, data)
+        last_id = messages[-1][0]
+
+    maintenance = asyncio.create_task(maintain_stream())
+    garbage_collection = asyncio.create_task(collect_garbage())
+    # Venvs created until a layer is built install all of their libraries
+    layers = asyncio.create_task(executor_chain.build_layers())
+    logger.info(
+        f"Consuming code execution tasks from stream '{task_stream_name}' "
+        f"as '{task_stream.consumer}'."
+    )
+    try:
+        while True:
+            capacity = await scheduler.wait_for_capacity()
+            try:
+                messages = await task_stream.read(count=capacity, block_ms=5000)
+            except Exception:
+                logger.exception("Failed to read code tasks")
+                await asyncio.sleep(1)
+                continue
+            for message_id, data in messages:
+                logger.info(f"Received code task {message_id}")
+                await submit(message_id, data)
+    finally:
+        maintenance.cancel()
+        garbage_collection.cancel()
+        layers.cancel()
+        await scheduler.close()
 
 
 async def run(code_task_data: CodeTaskData):
@@ -60,12 +242,39 @@ async def run(code_task_data: CodeTaskData):
         entrypoint=code_task_data.entrypoint,
         func_kwargs=code_task_data.func_kwargs,
         global_kwargs=code_task_data.global_kwargs,
+        timeout=code_task_data.timeout,
+        max_cpu_seconds=code_task_data.max_cpu_seconds,
+        max_memory_mb=code_task_data.max_memory_mb,
     )
-    await redis_service.async_publish(
-        channel=code_result_channel, message=result.model_dump()
-    )
+    await publish_result(result)
+
+
+async def run_batch(batch: CodeBatchTaskData):
+    """Run the tasks of a batch, publishing every result as soon as it completes."""
+    unanswered = {task.execution_id for task in batch.tasks}
+
+    async def on_result(result: CodeResultData):
+        await publish_result(result)
+        unanswered.discard(result.execution_id)
+
+    try:
+        await executor_chain.run_batch(
+            venv_name=batch.venv_name,
+            libraries=batch.libraries,
+            batch_id=batch.batch_id,
+            tasks=[task.model_dump() for task in batch.tasks],
+            on_result=on_result,
+        )
+    except Exception as e:
+        logger.exception(f"Error running code batch {batch.batch_id}")
+        for execution_id in list(unanswered):
+            await on_result(
+                CodeResultData(
+                    execution_id=execution_id, stderr=str(e), stdout="", returncode=1
+                )
+            )
 
 
 if __name__ == "__main__":
     asyncio.run(init())
-    asyncio.run(listen_redis())
+    asyncio.run(consume_tasks())
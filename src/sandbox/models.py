@@ -8,6 +8,11 @@ class CodeResultData(BaseModel):
     stderr: str
     stdout: str
     returncode: int = 0
+    # Usage of the execution, only wall_time is set if the interpreter crashed
+    # or timed out
+    peak_rss_kb: int | None = None
+    cpu_time: float | None = None
+    wall_time: float | None = None
 
 
 class CodeTaskData(BaseModel):
@@ -18,3 +23,28 @@ class CodeTaskData(BaseModel):
     entrypoint: str
     func_kwargs: dict | None = None
     global_kwargs: dict[str, Any] | None = None
+    # Seconds, EXECUTION_TIMEOUT if not set
+    timeout: float | None = None
+    # EXECUTION_MAX_CPU_SECONDS and EXECUTION_MAX_MEMORY_MB if not set
+    max_cpu_seconds: float | None = None
+    max_memory_mb: int | None = None
+
+
+class CodeBatchItemData(BaseModel):
+    execution_id: str
+    code: str
+    entrypoint: str
+    func_kwargs: dict | None = None
+    global_kwargs: dict[str, Any] | None = None
+    timeout: float | None = None
+    max_cpu_seconds: float | None = None
+    max_memory_mb: int | None = None
+
+
+class CodeBatchTaskData(BaseModel):
+    # Independent tasks run in the venv of the libraries, every one is answered
+    # with its own CodeResultData as soon as it completes
+    venv_name: str
+    libraries: list[str]
+    batch_id: str
+    tasks: list[CodeBatchItemData]
@@ -0,0 +1,340 @@
+import asyncio
+import json
+import os
+import signal
+import struct
+import time
+from pathlib import Path
+
+from utils.logger import logger
+
+WORKER_SCRIPT = Path(__file__).parent / "interpreter_worker.py"
+
+WORKER_POOL_SIZE = int(os.environ.get("WORKER_POOL_SIZE", "2"))
+# Workers are replaced after this many executions
+WORKER_MAX_EXECUTIONS = int(os.environ.get("WORKER_MAX_EXECUTIONS", "100"))
+# or once their resident memory grew above this
+WORKER_MAX_RSS_MB = int(os.environ.get("WORKER_MAX_RSS_MB", "512"))
+# Pools of venvs that were not used for this long are shut down
+WORKER_IDLE_TIMEOUT = int(os.environ.get("WORKER_IDLE_TIMEOUT", "600"))
+EXECUTION_TIMEOUT = float(os.environ.get("EXECUTION_TIMEOUT", "300"))
+# Default limits of a task, not limited if 0
+EXECUTION_MAX_CPU_SECONDS = float(os.environ.get("EXECUTION_MAX_CPU_SECONDS", "0"))
+EXECUTION_MAX_MEMORY_MB = int(os.environ.get("EXECUTION_MAX_MEMORY_MB", "0"))
+
+# Messages are JSON prefixed with their length, see interpreter_worker.py
+HEADER = struct.Struct(">I")
+# Keys of a reply to a task and their types
+REPLY_TYPES = {
+    "returncode": int,
+    "stdout": str,
+    "stderr": str,
+    "result_data": (str, type(None)),
+    "code_cache": (str, type(None)),
+    "usage": dict,
+    "rss_kb": int,
+}
+# Directory of a venv the workers keep the compiled code of its tasks in
+CODE_CACHE_DIR = "__codecache__"
+
+
+class WorkerError(Exception):
+    """The worker could not finish the task and has been shut down."""
+
+    def __init__(self, message: str, returncode: int):
+        super().__init__(message)
+        self.returncode = returncode
+
+
+class WorkerTimeoutError(WorkerError):
+    pass
+
+
+class CodeCacheStats:
+    """Where the workers took the compiled code of the tasks from."""
+
+    def __init__(self):
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def record(self, code_cache: str | None):
+        if code_cache == "memory":
+            self.memory_hits += 1
+        elif code_cache == "disk":
+            self.disk_hits += 1
+        elif code_cache == "compiled":
+            self.misses += 1
+
+    def to_dict(self) -> dict:
+        total = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / total if total else 0,
+        }
+
+
+class InterpreterWorker:
+    """
+    One warm interpreter of a venv running services/interpreter_worker.py, the
+    compiled code is stored in `code_cache_path` if set.
+    """
+
+    def __init__(
+        self, python_executable: Path | str, code_cache_path: Path | str | None = None
+    ):
+        self.python_executable = python_executable
+        self.code_cache_path = code_cache_path
+        self.process: asyncio.subprocess.Process | None = None
+        self.executions = 0
+        self.rss_kb = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self):
+        args = [str(WORKER_SCRIPT)]
+        if self.code_cache_path is not None:
+            args.append(str(self.code_cache_path))
+        self.process = await asyncio.create_subprocess_exec(
+            str(self.python_executable),
+            *args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            # Killed together with the child running its task
+            start_new_session=True,
+        )
+        ready = await self._read()
+        self.rss_kb = ready["rss_kb"]
+
+    async def _read(self) -> dict:
+        try:
+            header = await self.process.stdout.readexactly(HEADER.size)
+            (length,) = HEADER.unpack(header)
+            message = json.loads(await self.process.stdout.readexactly(length))
+        except asyncio.IncompleteReadError:
+            returncode = await self.process.wait()
+            raise WorkerError(
+                f"Worker exited unexpectedly with code {returncode}", returncode
+            )
+        except ValueError:
+            message = None
+        if not isinstance(message, dict):
+            await self.kill()
+            raise WorkerError("Worker sent an invalid message", -signal.SIGKILL)
+        return message
+
+    async def _read_reply(self) -> dict:
+        reply = await self._read()
+        if not all(
+            isinstance(reply.get(key), types) for key, types in REPLY_TYPES.items()
+        ):
+            await self.kill()
+            raise WorkerError("Worker sent an invalid reply", -signal.SIGKILL)
+        return reply
+
+    async def execute(self, task: dict, timeout: float | None) -> dict:
+        """
+        Run a task {"code", "code_hash", "entrypoint", "func_kwargs",
+        "global_kwargs", "limits"}, returns {"returncode", "stdout", "stderr",
+        "result_data", "code_cache", "usage"}.
+
+        The worker is killed if the task fails with anything but a WorkerError,
+        it is not in a known state then.
+        """
+        self.executions += 1
+        try:
+            return await self._execute(task, timeout)
+        except WorkerError:
+            raise
+        except BaseException:
+            await self.kill()
+            raise
+
+    async def _execute(self, task: dict, timeout: float | None) -> dict:
+        data = json.dumps(task).encode("utf-8")
+        self.process.stdin.write(HEADER.pack(len(data)) + data)
+        try:
+            await self.process.stdin.drain()
+            response = await asyncio.wait_for(self._read_reply(), timeout=timeout)
+        except asyncio.TimeoutError:
+            await self.kill()
+            raise WorkerTimeoutError(
+                f"Execution timed out after {timeout} seconds", -signal.SIGKILL
+            )
+        except (BrokenPipeError, ConnectionResetError):
+            returncode = await self.process.wait()
+            raise WorkerError(
+                f"Worker exited unexpectedly with code {returncode}", returncode
+            )
+        self.rss_kb = response.pop("rss_kb")
+        return response
+
+    def needs_recycle(self, max_executions: int, max_rss_kb: int) -> bool:
+        return (
+            not self.alive
+            or self.executions >= max_executions
+            or self.rss_kb > max_rss_kb
+        )
+
+    async def kill(self):
+        if self.alive:
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await self.process.wait()
+
+    async def stop(self):
+        """Let the worker finish and exit by closing its stdin."""
+        if not self.alive:
+            return
+        self.process.stdin.close()
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            await self.kill()
+
+
+class InterpreterPool:
+    """
+    Warm interpreters of one venv.
+
+    At most `size` tasks run at the same time, each one in its own worker, so a
+    crashing or hanging task only takes its worker down. Workers are replaced in
+    the background after `max_executions` tasks or once they use more than
+    `max_rss_mb` of memory.
+    """
+
+    def __init__(
+        self,
+        python_executable: Path | str,
+        size: int = WORKER_POOL_SIZE,
+        max_executions: int = WORKER_MAX_EXECUTIONS,
+        max_rss_mb: int = WORKER_MAX_RSS_MB,
+        code_cache_path: Path | str | None = None,
+    ):
+        self.python_executable = python_executable
+        self.code_cache_path = code_cache_path
+        self.size = size
+        self.max_executions = max_executions
+        self.max_rss_kb = max_rss_mb * 1024
+        self.last_used = time.monotonic()
+        self._idle: list[InterpreterWorker] = []
+        self._semaphore = asyncio.Semaphore(size)
+        self._background_tasks: set[asyncio.Task] = set()
+        self._closed = False
+
+    async def _spawn(self) -> InterpreterWorker:
+        worker = InterpreterWorker(self.python_executable, self.code_cache_path)
+        try:
+            await worker.start()
+        except BaseException:
+            await worker.kill()
+            raise
+        return worker
+
+    async def _prefork(self):
+        try:
+            worker = await self._spawn()
+        except Exception:
+            logger.exception(f"Failed to start worker for {self.python_executable}")
+            return
+        if self._closed or len(self._idle) >= self.size:
+            await worker.stop()
+        else:
+            self._idle.append(worker)
+
+    def prefork(self, count: int = 1):
+        """Start workers in the background so that next tasks find them warm."""
+        for _ in range(count):
+            task = asyncio.create_task(self._prefork())
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+
+    async def _release(self, worker: InterpreterWorker):
+        if not self._closed and not worker.needs_recycle(
+            self.max_executions, self.max_rss_kb
+        ):
+            self._idle.append(worker)
+            return
+        await worker.stop()
+        if not self._closed:
+            self.prefork()
+
+    async def execute(self, task: dict, timeout: float | None = EXECUTION_TIMEOUT):
+        """
+        Run a task in an idle worker.
+
+        Raises WorkerError if the worker crashed, timed out or sent an invalid
+        reply. The worker is not reused then, nor after any other error.
+        """
+        self.last_used = time.monotonic()
+        async with self._semaphore:
+            worker = self._idle.pop() if self._idle else await self._spawn()
+            try:
+                return await worker.execute(task, timeout=timeout)
+            finally:
+                await self._release(worker)
+
+    async def close(self):
+        self._closed = True
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(worker.stop() for worker in idle))
+
+
+class InterpreterPoolManager:
+    """InterpreterPool per lib_hash."""
+
+    def __init__(
+        self,
+        size: int = WORKER_POOL_SIZE,
+        max_executions: int = WORKER_MAX_EXECUTIONS,
+        max_rss_mb: int = WORKER_MAX_RSS_MB,
+        idle_timeout: float = WORKER_IDLE_TIMEOUT,
+    ):
+        self.size = size
+        self.max_executions = max_executions
+        self.max_rss_mb = max_rss_mb
+        self.idle_timeout = idle_timeout
+        self.pools: dict[str, InterpreterPool] = {}
+        self._closing: set[asyncio.Task] = set()
+
+    def get_pool(
+        self,
+        lib_hash: str,
+        python_executable: Path | str,
+        code_cache_path: Path | str | None = None,
+    ) -> InterpreterPool:
+        self._close_idle_pools()
+        pool = self.pools.get(lib_hash)
+        if pool is None:
+            pool = InterpreterPool(
+                python_executable,
+                size=self.size,
+                max_executions=self.max_executions,
+                max_rss_mb=self.max_rss_mb,
+                code_cache_path=code_cache_path,
+            )
+            self.pools[lib_hash] = pool
+            # The first task starts its own worker, the rest are warmed up
+            pool.prefork(self.size - 1)
+        return pool
+
+    def _close_idle_pools(self):
+        now = time.monotonic()
+        for lib_hash, pool in list(self.pools.items()):
+            if now - pool.last_used > self.idle_timeout:
+                logger.info(f"Closing idle interpreter pool of {lib_hash}")
+                del self.pools[lib_hash]
+                task = asyncio.create_task(pool.close())
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+
+    async def close(self):
+        pools, self.pools = self.pools, {}
+        await asyncio.gather(*(pool.close() for pool in pools.values()), *self._closing)
@@ -0,0 +1,446 @@
+"""
+Interpreter started by InterpreterPool with the python of a venv.
+
+Only the standard library and dotdict may be imported here, the script runs
+outside of the sandbox application. Messages are JSON prefixed with their length
+as a 4-byte big-endian integer. The worker answers with a ready message, then
+reads tasks from stdin and answers every one on the original stdout until stdin
+is closed. Every task runs in a child forked from the worker, the child sends
+its result back over a pipe. The code gets an empty stdin, its output is
+captured and the protocol is closed in the child, so it cannot interfere with
+the protocol. Whatever the code changes, e.g. builtins or imported modules, and
+the threads it leaves behind end with the child, the next task starts from the
+worker as it was.
+
+Modules the code imports are imported in the worker before the first child of
+the code is forked, so that heavy libraries such as pandas are imported once per
+worker and not in every child. Failed imports are ignored, the code reports them
+when it runs.
+
+The compiled code is kept in memory of the worker per code hash and, when the
+worker is started with a directory as its argument, marshalled to that
+directory, so that new workers of the venv do not compile it again. The sandbox
+removes the files least recently loaded over its budget. The body of
+the code is executed again in every child before the entrypoint is called.
+
+The limits of a task are hard limits of the child, set with setrlimit before
+the code runs: the CPU time limit raises CpuTimeExceeded in the code and the
+kernel kills the child CPU_GRACE_SECONDS later, the memory limit caps the address
+space of the child so that allocations beyond it raise MemoryError. A privileged
+child could raise its hard limits, so the worker also kills a child whose CPU
+time or resident memory goes over them. The worker keeps running in all cases.
+
+Task: {"code", "code_hash", "entrypoint", "func_kwargs", "global_kwargs",
+"limits": {"cpu_seconds", "memory_mb"}}
+Result: {"returncode", "stdout", "stderr", "result_data", "code_cache",
+"usage": {"peak_rss_kb", "cpu_time", "wall_time"}, "rss_kb"}, where result_data
+is the JSON of the value returned by the entrypoint and code_cache tells where
+the compiled code came from: memory, disk or compiled.
+"""
+
+import builtins
+import dis
+import importlib
+import importlib.util
+import io
+import json
+import marshal
+import os
+import math
+import resource
+import select
+import signal
+import struct
+import sys
+import time
+from collections import OrderedDict
+from contextlib import redirect_stderr, redirect_stdout
+from types import CodeType
+
+from dotdict import DotDict, DotList, DotObject
+
+HEADER = struct.Struct(">I")
+# Bound before any code runs, the protocol does not depend on the json module
+_dumps = json.dumps
+_loads = json.loads
+# Compiled code kept per code hash
+MAX_COMPILED_CODE = 256
+
+_compiled_code: OrderedDict[str, CodeType] = OrderedDict()
+_code_cache_path: str | None = None
+# Top-level modules the worker tried to import for the code of the tasks
+_preloaded_modules: set[str] = set()
+# Descriptors of the protocol, closed in the children running the tasks
+_protocol_fds: tuple[int, ...] = ()
+# CPU seconds a child may keep running after SIGXCPU before it is killed
+CPU_GRACE_SECONDS = 1
+# Seconds between checks of the limits of a running child
+WATCHDOG_INTERVAL = 0.1
+
+
+class CpuTimeExceeded(BaseException):
+    """Not an Exception, so that the code cannot catch it by accident."""
+
+
+def rss_kb() -> int:
+    """Current resident set size of this worker."""
+    try:
+        with open("/proc/self/statm") as file:
+            pages = int(file.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def cpu_time() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _on_cpu_time_exceeded(signum, frame):
+    raise CpuTimeExceeded()
+
+
+def _cap(value: int, hard: int) -> int:
+    return value if hard == resource.RLIM_INFINITY else min(value, hard)
+
+
+def apply_limits(cpu_seconds: float | None, memory_mb: int | None):
+    """Set the limits of a task as hard limits of the child running it."""
+    if cpu_seconds:
+        # SIGXCPU at the soft limit, the kernel kills the child at the hard one
+        soft = math.ceil(cpu_seconds)
+        hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+        resource.setrlimit(
+            resource.RLIMIT_CPU,
+            (_cap(soft, hard), _cap(soft + CPU_GRACE_SECONDS, hard)),
+        )
+    if memory_mb:
+        hard = resource.getrlimit(resource.RLIMIT_AS)[1]
+        limit = _cap(memory_mb * 1024 * 1024, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def exceeded_limit(
+    pid: int, cpu_seconds: float | None, memory_mb: int | None
+) -> str | None:
+    """The limit a running child is over: cpu, memory or None."""
+    try:
+        if cpu_seconds:
+            with open(f"/proc/{pid}/stat") as file:
+                fields = file.read().rsplit(")", 1)[1].split()
+            used = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+            if used > cpu_seconds + CPU_GRACE_SECONDS:
+                return "cpu"
+        if memory_mb:
+            with open(f"/proc/{pid}/statm") as file:
+                pages = int(file.read().split()[1])
+            if pages * os.sysconf("SC_PAGE_SIZE") > memory_mb * 1024 * 1024:
+                return "memory"
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def read_message(stream) -> dict | None:
+    header = stream.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return None
+    (length,) = HEADER.unpack(header)
+    return _loads(stream.read(length))
+
+
+def write_message(stream, message: dict):
+    data = _dumps(message).encode("utf-8")
+    stream.write(HEADER.pack(len(data)) + data)
+    stream.flush()
+
+
+def _load_marshalled(path: str) -> CodeType | None:
+    try:
+        with open(path, "rb") as file:
+            return marshal.load(file)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+
+def _store_marshalled(path: str, compiled: CodeType):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as file:
+            marshal.dump(compiled, file)
+        os.replace(temp_path, path)
+    except OSError:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+
+
+def compile_code(code: str, code_hash: str) -> tuple[CodeType, str]:
+    """Compiled code and where it came from: memory, disk or compiled."""
+    compiled = _compiled_code.get(code_hash)
+    if compiled is not None:
+        _compiled_code.move_to_end(code_hash)
+        return compiled, "memory"
+
+    source = "disk"
+    path = None
+    if _code_cache_path is not None:
+        # marshal is only compatible within one Python version
+        path = os.path.join(
+            _code_cache_path, f"{code_hash}.{sys.implementation.cache_tag}.marshal"
+        )
+        compiled = _load_marshalled(path)
+        if compiled is not None:
+            # The least recently used files are removed first, see venv_store.py
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+    if compiled is None:
+        source = "compiled"
+        compiled = compile(code, f"<code {code_hash[:12]}>", "exec")
+        if path is not None:
+            _store_marshalled(path, compiled)
+
+    _compiled_code[code_hash] = compiled
+    if len(_compiled_code) > MAX_COMPILED_CODE:
+        _compiled_code.popitem(last=False)
+    return compiled, source
+
+
+def code_imports(compiled: CodeType) -> set[str]:
+    """Top-level modules imported by the code, including imports in functions."""
+    names = set()
+    for instruction in dis.get_instructions(compiled):
+        # Relative imports have an empty name
+        if instruction.opname == "IMPORT_NAME" and instruction.argval:
+            names.add(instruction.argval.split(".")[0])
+    for const in compiled.co_consts:
+        if isinstance(const, CodeType):
+            names |= code_imports(const)
+    return names
+
+
+def preload_modules(names: set[str]):
+    """Import modules in the worker, so that forked children find them imported."""
+    for name in sorted(names - _preloaded_modules):
+        _preloaded_modules.add(name)
+        if name in sys.modules:
+            continue
+        try:
+            if importlib.util.find_spec(name) is None:
+                continue
+            with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+                importlib.import_module(name)
+        except (Exception, SystemExit):
+            pass
+
+
+def call_entrypoint(task: dict, compiled: CodeType) -> str:
+    namespace = {
+        "__name__": "__main__",
+        "__builtins__": builtins,
+        "sys": sys,
+        "json": json,
+        "DotDict": DotDict,
+        "DotObject": DotObject,
+        "DotList": DotList,
+        **(task.get("global_kwargs") or {}),
+    }
+    exec(compiled, namespace)
+    kwargs = DotDict(task.get("func_kwargs") or {})
+    return _dumps(namespace[task["entrypoint"]](**kwargs))
+
+
+def run_code(task: dict, compiled: CodeType) -> dict:
+    """Run the code of a task, in the forked child."""
+    stdout, stderr = io.StringIO(), io.StringIO()
+    returncode = 0
+    result_data = None
+    task_limits = task.get("limits") or {}
+    cpu_seconds = task_limits.get("cpu_seconds")
+    memory_mb = task_limits.get("memory_mb")
+
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+            apply_limits(cpu_seconds, memory_mb)
+            result_data = call_entrypoint(task, compiled)
+        except CpuTimeExceeded:
+            print(f"CPU time limit of {cpu_seconds} seconds exceeded", file=sys.stderr)
+            returncode = 1
+        except MemoryError:
+            if memory_mb:
+                print(f"Memory limit of {memory_mb} MB exceeded", file=sys.stderr)
+            else:
+                print("Out of memory", file=sys.stderr)
+            returncode = 1
+        except SystemExit as e:
+            if e.code is None:
+                returncode = 0
+            elif isinstance(e.code, int):
+                returncode = e.code
+            else:
+                print(e.code, file=sys.stderr)
+                returncode = 1
+        except Exception as e:
+            print(str(e), file=sys.stderr)
+            returncode = 1
+
+    return {
+        "returncode": returncode,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "result_data": result_data,
+    }
+
+
+def _run_child(task: dict, compiled: CodeType, result_fd: int):
+    """Body of the forked child, never returns."""
+    status = 1
+    try:
+        for fd in _protocol_fds:
+            os.close(fd)
+        signal.signal(signal.SIGXCPU, _on_cpu_time_exceeded)
+        data = _dumps(run_code(task, compiled)).encode("utf-8")
+        with os.fdopen(result_fd, "wb") as pipe:
+            pipe.write(data)
+        status = 0
+    finally:
+        # Threads left behind by the code end with the child
+        os._exit(status)
+
+
+def _read_result(data: bytes) -> dict | None:
+    """Result sent by the child, None if it is not one."""
+    try:
+        result = _loads(data)
+    except ValueError:
+        return None
+    if not (
+        isinstance(result, dict)
+        and isinstance(result.get("returncode"), int)
+        and isinstance(result.get("stdout"), str)
+        and isinstance(result.get("stderr"), str)
+        and isinstance(result.get("result_data"), (str, type(None)))
+    ):
+        return None
+    return {
+        key: result[key] for key in ("returncode", "stdout", "stderr", "result_data")
+    }
+
+
+def _wait_for_result(
+    pid: int, result_fd: int, cpu_seconds: float | None, memory_mb: int | None
+) -> tuple[bytes, str | None]:
+    """
+    Result sent by the child and the limit it was killed for. The child could
+    raise its own hard limits if privileged, so they are checked here as well.
+    """
+    timeout = WATCHDOG_INTERVAL if cpu_seconds or memory_mb else None
+    chunks = []
+    try:
+        while True:
+            readable, _, _ = select.select([result_fd], [], [], timeout)
+            if readable:
+                chunk = os.read(result_fd, 65536)
+                if not chunk:
+                    return b"".join(chunks), None
+                chunks.append(chunk)
+            elif exceeded := exceeded_limit(pid, cpu_seconds, memory_mb):
+                os.kill(pid, signal.SIGKILL)
+                return b"", exceeded
+    finally:
+        os.close(result_fd)
+
+
+def _exit_message(
+    returncode: int, exceeded: str | None, task_limits: dict, cpu: float
+) -> str:
+    cpu_seconds = task_limits.get("cpu_seconds")
+    if exceeded == "cpu" or (
+        returncode == -signal.SIGKILL and cpu_seconds and cpu >= cpu_seconds
+    ):
+        return f"CPU time limit of {cpu_seconds} seconds exceeded"
+    if exceeded == "memory":
+        return f"Memory limit of {task_limits.get('memory_mb')} MB exceeded"
+    if returncode < 0:
+        return f"Code killed by signal {-returncode}"
+    return f"Code exited unexpectedly with code {returncode}"
+
+
+def run_task(task: dict) -> dict:
+    """Run a task in a child forked from this worker, which the task cannot alter."""
+    started_at = time.perf_counter()
+    task_limits = task.get("limits") or {}
+    try:
+        compiled, code_cache = compile_code(task["code"], task["code_hash"])
+    except Exception as e:
+        return {
+            "returncode": 1,
+            "stdout": "",
+            "stderr": f"{e}\n",
+            "result_data": None,
+            "code_cache": None,
+            "usage": {"wall_time": time.perf_counter() - started_at},
+            "rss_kb": rss_kb(),
+        }
+
+    if code_cache != "memory":
+        preload_modules(code_imports(compiled))
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        _run_child(task, compiled, write_fd)
+    os.close(write_fd)
+    data, exceeded = _wait_for_result(
+        pid, read_fd, task_limits.get("cpu_seconds"), task_limits.get("memory_mb")
+    )
+    _, status, usage = os.wait4(pid, 0)
+    returncode = os.waitstatus_to_exitcode(status)
+    cpu = usage.ru_utime + usage.ru_stime
+
+    result = _read_result(data) if returncode == 0 else None
+    if result is None:
+        result = {
+            "returncode": returncode,
+            "stdout": "",
+            "stderr": _exit_message(returncode, exceeded, task_limits, cpu),
+            "result_data": None,
+        }
+    result.update(
+        code_cache=code_cache,
+        usage={
+            "peak_rss_kb": usage.ru_maxrss,
+            "cpu_time": cpu,
+            "wall_time": time.perf_counter() - started_at,
+        },
+        rss_kb=rss_kb(),
+    )
+    return result
+
+
+def main():
+    global _code_cache_path, _protocol_fds
+    if len(sys.argv) > 1:
+        _code_cache_path = sys.argv[1]
+        os.makedirs(_code_cache_path, exist_ok=True)
+
+    protocol_in = os.fdopen(os.dup(0), "rb")
+    protocol_out = os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    sys.stdin = open(os.devnull, "r")
+    _protocol_fds = (protocol_in.fileno(), protocol_out.fileno())
+
+    write_message(protocol_out, {"ready": True, "rss_kb": rss_kb()})
+    while (task := read_message(protocol_in)) is not None:
+        write_message(protocol_out, run_task(task))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import asyncio
+import time
+from collections import Counter, deque
+from typing import Any, Awaitable, Callable
+
+from utils.logger import logger
+
+
+class SchedulerMetrics:
+    """Counters of FairTaskScheduler, reported with its current queues."""
+
+    def __init__(self):
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.backpressure_pauses = 0
+        self.backpressure_seconds = 0.0
+
+    def record_start(self, wait: float):
+        self.started += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    def to_dict(self) -> dict:
+        return {
+            "started": self.started,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_seconds": self.total_wait / self.started if self.started else 0,
+            "max_wait_seconds": self.max_wait,
+            "backpressure_pauses": self.backpressure_pauses,
+            "backpressure_seconds": self.backpressure_seconds,
+        }
+
+
+class FairTaskScheduler:
+    """
+    Bounded pool of `max_workers` coroutines running queued tasks.
+
+    Tasks are queued per key (the venv) and the workers take them round-robin
+    from the keys, so a burst for one venv does not delay the others, and at
+    most `max_per_key` tasks of a key run at the same time. At most
+    `max_buffered` tasks wait in the queues, the producer waits for capacity
+    before it takes more tasks from the source.
+    """
+
+    def __init__(
+        self,
+        run_task: Callable[[Any], Awaitable[None]],
+        max_workers: int,
+        max_buffered: int,
+        max_per_key: int | None = None,
+    ):
+        self.run_task = run_task
+        self.max_workers = max_workers
+        self.max_buffered = max_buffered
+        self.max_per_key = max_per_key or max_workers
+        self.metrics = SchedulerMetrics()
+        self._queues: dict[str, deque[tuple[float, Any]]] = {}
+        self._order: deque[str] = deque()
+        self._running: Counter[str] = Counter()
+        self._changed = asyncio.Condition()
+        self._workers: list[asyncio.Task] = []
+
+    @property
+    def buffered(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    @property
+    def running(self) -> int:
+        return sum(self._running.values())
+
+    def start(self):
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.max_workers)
+        ]
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def wait_for_capacity(self) -> int:
+        """Wait until tasks can be queued, returns how many."""
+        async with self._changed:
+            if self.buffered >= self.max_buffered:
+                self.metrics.backpressure_pauses += 1
+                started_at = time.monotonic()
+                await self._changed.wait_for(lambda: self.buffered < self.max_buffered)
+                self.metrics.backpressure_seconds += time.monotonic() - started_at
+            return self.max_buffered - self.buffered
+
+    async def submit(self, key: str, task: Any):
+        async with self._changed:
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = self._queues[key] = deque()
+                self._order.append(key)
+            queue.append((time.monotonic(), task))
+            self._changed.notify_all()
+
+    async def join(self):
+        """Wait until every queued task finished."""
+        async with self._changed:
+            await self._changed.wait_for(
+                lambda: self.buffered == 0 and self.running == 0
+            )
+
+    def _pop_next(self) -> tuple[str, float, Any] | None:
+        for _ in range(len(self._order)):
+            key = self._order[0]
+            self._order.rotate(-1)
+            if self._running[key] >= self.max_per_key:
+                continue
+            queue = self._queues[key]
+            queued_at, task = queue.popleft()
+            if not queue:
+                del self._queues[key]
+                self._order.remove(key)
+            return key, queued_at, task
+        return None
+
+    async def _worker(self):
+        while True:
+            async with self._changed:
+                while (next_task := self._pop_next()) is None:
+                    await self._changed.wait()
+                key, queued_at, task = next_task
+                self._running[key] += 1
+                self.metrics.record_start(time.monotonic() - queued_at)
+                self._changed.notify_all()
+
+            try:
+                await self.run_task(task)
+                self.metrics.completed += 1
+            except Exception:
+                self.metrics.failed += 1
+                logger.exception(f"Task of {key} failed")
+            finally:
+                async with self._changed:
+                    self._running[key] -= 1
+                    if not self._running[key]:
+                        del self._running[key]
+                    self._changed.notify_all()
+
+    def to_dict(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_buffered": self.max_buffered,
+            "running": self.running,
+            "buffered": self.buffered,
+            "queued_per_venv": {key: len(queue) for key, queue in self._queues.items()},
+            "running_per_venv": dict(self._running),
+            **self.metrics.to_dict(),
+        }
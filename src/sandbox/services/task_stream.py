@@ -0,0 +1,139 @@
+import json
+import socket
+
+import redis.asyncio as aioredis
+from redis.exceptions import ResponseError
+from utils.logger import logger
+
+
+class TaskStream:
+    """
+    Consumer of code tasks from a Redis Stream with a consumer group.
+
+    Producers add entries {"data": <CodeTaskData json>}. An entry stays pending
+    until it is acknowledged after its result was published, so tasks of a
+    consumer that died are delivered again: to the same consumer after a restart
+    (`read_own_pending`) or to another one once they are idle for
+    `claim_idle_ms` (`claim_stale`). A consumer keeps the entries it works on
+    from being claimed by touching them more often than that. Entries delivered
+    `max_deliveries` times are given up.
+    """
+
+    def __init__(
+        self,
+        redis_client: aioredis.Redis,
+        stream: str,
+        group: str = "sandbox",
+        consumer: str | None = None,
+        claim_idle_ms: int = 900_000,
+        max_deliveries: int = 3,
+    ):
+        self.redis_client = redis_client
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer or socket.gethostname()
+        self.claim_idle_ms = claim_idle_ms
+        self.max_deliveries = max_deliveries
+
+    async def ensure_group(self):
+        try:
+            await self.redis_client.xgroup_create(
+                self.stream, self.group, id="0", mkstream=True
+            )
+            logger.info(f"Created consumer group '{self.group}' on '{self.stream}'.")
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    @staticmethod
+    def _parse(entries) -> list[tuple[str, dict | None]]:
+        messages = []
+        for message_id, fields in entries:
+            try:
+                messages.append((message_id, json.loads(fields["data"])))
+            except Exception:
+                logger.exception(f"Invalid code task {message_id}: {fields}")
+                messages.append((message_id, None))
+        return messages
+
+    async def read(
+        self, count: int, block_ms: int | None = None
+    ) -> list[tuple[str, dict | None]]:
+        """Read new entries, data is None for entries that could not be parsed."""
+        response = await self.redis_client.xreadgroup(
+            self.group, self.consumer, {self.stream: ">"}, count=count, block=block_ms
+        )
+        if not response:
+            return []
+        return self._parse(response[0][1])
+
+    async def read_own_pending(
+        self, count: int, after_id: str = "0"
+    ) -> list[tuple[str, dict | None]]:
+        """Entries delivered to this consumer before a restart, but not acknowledged."""
+        response = await self.redis_client.xreadgroup(
+            self.group, self.consumer, {self.stream: after_id}, count=count
+        )
+        if not response:
+            return []
+        # Entries deleted from the stream while pending come back without fields
+        return self._parse(entry for entry in response[0][1] if entry[1])
+
+    async def claim_stale(
+        self, count: int, exclude: set[str] = frozenset()
+    ) -> tuple[list[tuple[str, dict | None]], list[tuple[str, dict | None]]]:
+        """
+        Take over entries other consumers did not acknowledge for `claim_idle_ms`.
+
+        Returns the entries to run and the entries that reached `max_deliveries`,
+        those are claimed as well and have to be given up and acknowledged.
+        """
+        pending = await self.redis_client.xpending_range(
+            self.stream,
+            self.group,
+            min="-",
+            max="+",
+            count=count,
+            idle=self.claim_idle_ms,
+        )
+        pending = [entry for entry in pending if entry["message_id"] not in exclude]
+        if not pending:
+            return [], []
+
+        ids = [entry["message_id"] for entry in pending]
+        claimed = await self.redis_client.xclaim(
+            self.stream, self.group, self.consumer, self.claim_idle_ms, ids
+        )
+        exhausted = {
+            entry["message_id"]
+            for entry in pending
+            if entry["times_delivered"] >= self.max_deliveries
+        }
+        claimed = [entry for entry in claimed if entry[1]]
+        messages = self._parse(entry for entry in claimed if entry[0] not in exhausted)
+        if messages:
+            logger.warning(f"Claimed {len(messages)} stale code tasks.")
+        return messages, self._parse(
+            entry for entry in claimed if entry[0] in exhausted
+        )
+
+    async def touch(self, message_ids: list[str]):
+        """Reset the idle time of entries this consumer is still working on."""
+        if message_ids:
+            await self.redis_client.xclaim(
+                self.stream, self.group, self.consumer, 0, message_ids, justid=True
+            )
+
+    async def ack(self, message_id: str):
+        """Acknowledge an entry and remove it, the stream only keeps the backlog."""
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            await pipe.xack(self.stream, self.group, message_id)
+            await pipe.xdel(self.stream, message_id)
+            await pipe.execute()
+
+    async def backlog(self) -> dict:
+        """Entries not delivered yet (lag) and delivered but not acknowledged."""
+        for group in await self.redis_client.xinfo_groups(self.stream):
+            if group["name"] == self.group:
+                return {"lag": group.get("lag"), "pending": group["pending"]}
+        return {"lag": None, "pending": 0}
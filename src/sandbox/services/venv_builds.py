@@ -0,0 +1,130 @@
+import asyncio
+import fcntl
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Any
+
+from utils.logger import logger
+
+BUILDS_DIR = ".builds"
+LOCKS_DIR = ".locks"
+WHEEL_CACHE_DIR = ".wheels"
+LAYERS_DIR = ".layers"
+
+
+class FileLock:
+    """Exclusive fcntl lock of a file, waits without blocking the event loop."""
+
+    def __init__(self, path: Path, poll_interval: float = 0.1):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._fd: int | None = None
+
+    async def acquire(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    await asyncio.sleep(self.poll_interval)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+
+    def try_acquire(self) -> bool:
+        """Acquire the lock if it is free, without waiting."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+def is_venv_ready(venv_path: Path, lib_hash: str) -> bool:
+    """The venv is complete once its libhash file holds the hash of its libraries."""
+    try:
+        return (venv_path / "libhash").read_text().strip() == lib_hash
+    except OSError:
+        return False
+
+
+def mark_used(venv_path: Path):
+    """The modification time of the libhash file is the last use of the venv."""
+    try:
+        os.utime(venv_path / "libhash")
+    except OSError:
+        pass
+
+
+class VenvBuild:
+    """
+    Build of the venv of one lib_hash, in progress in this process.
+
+    The venv is built in `build_path` while the lock of the lib_hash is held, so
+    that other processes wait for it, and `commit` swaps it in as `venv_path`,
+    which is a symlink to the build. Tasks of this process waiting for the build
+    get its result from `future`: None once it is ready or the CodeResultData of
+    the failed step.
+    """
+
+    def __init__(self, base_venv_path: Path, lib_hash: str):
+        self.base_venv_path = Path(base_venv_path)
+        self.lib_hash = lib_hash
+        self.venv_path = self.base_venv_path / lib_hash
+        self.build_path = (
+            self.base_venv_path / BUILDS_DIR / f"{lib_hash}-{uuid.uuid4().hex[:8]}"
+        )
+        self.lock = FileLock(self.base_venv_path / LOCKS_DIR / f"{lib_hash}.lock")
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    @property
+    def done(self) -> bool:
+        return self.future.done()
+
+    def _swap(self):
+        link = self.base_venv_path / f".{self.lib_hash}.{uuid.uuid4().hex[:8]}"
+        link.symlink_to(self.build_path.absolute(), target_is_directory=True)
+
+        previous = None
+        if self.venv_path.is_symlink():
+            previous = self.venv_path.resolve()
+        elif self.venv_path.exists():
+            # Venv built in place by an older version
+            previous = self.venv_path.with_name(f".{link.name}.old")
+            self.venv_path.rename(previous)
+
+        os.replace(link, self.venv_path)
+        if previous is not None and previous != self.build_path.absolute():
+            shutil.rmtree(previous, ignore_errors=True)
+
+    def commit(self):
+        """Swap the finished build in and let the waiting tasks use it."""
+        try:
+            self._swap()
+            logger.info(f"Virtual environment {self.venv_path} is ready.")
+        finally:
+            self.finish(None)
+
+    def finish(self, result: Any | None):
+        if self.done:
+            return
+        self.lock.release()
+        if self.venv_path.resolve() != self.build_path.resolve():
+            shutil.rmtree(self.build_path, ignore_errors=True)
+        self.future.set_result(result)
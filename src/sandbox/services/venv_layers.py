@@ -0,0 +1,67 @@
+import os
+import sys
+from pathlib import Path
+
+from services.venv_builds import is_venv_ready
+
+# Venvs extending a layer find its libraries through this file
+LAYER_PTH_FILE = "_base_layer.pth"
+
+
+def site_packages(venv_path: Path) -> Path:
+    """site-packages of a venv created by the python of this service."""
+    if os.name == "nt":
+        return venv_path / "Lib" / "site-packages"
+    version = f"python{sys.version_info.major}.{sys.version_info.minor}"
+    return venv_path / "lib" / version / "site-packages"
+
+
+def normalize_library(library: str) -> str:
+    return "".join(library.split()).lower()
+
+
+class BaseLayer:
+    """
+    Pre-built venv of common libraries, e.g. pandas and numpy.
+
+    A venv of libraries including all of the layer's extends it with a .pth
+    file pointing to the site-packages of the layer, so that only the other
+    libraries are installed into it. Libraries installed into the venv take
+    precedence over the ones of the layer.
+    """
+
+    def __init__(self, libraries: list[str], lib_hash: str, venv_path: Path):
+        self.libraries = libraries
+        self.lib_hash = lib_hash
+        self.venv_path = Path(venv_path)
+        self._normalized = {normalize_library(library) for library in libraries}
+
+    @property
+    def ready(self) -> bool:
+        return is_venv_ready(self.venv_path, self.lib_hash)
+
+    def covers(self, libraries: list[str]) -> bool:
+        return self._normalized <= {normalize_library(library) for library in libraries}
+
+    def extra_libraries(self, libraries: list[str]) -> list[str]:
+        """Libraries that are not in the layer."""
+        return [
+            library
+            for library in libraries
+            if normalize_library(library) not in self._normalized
+        ]
+
+    def extend(self, venv_path: Path):
+        """Make the libraries of the layer importable in the venv."""
+        # The link to the layer, not the build it points to, stays valid when
+        # the layer is rebuilt
+        layer_site_packages = site_packages(self.venv_path.absolute())
+        (site_packages(venv_path) / LAYER_PTH_FILE).write_text(
+            f"{layer_site_packages}\n"
+        )
+
+
+def select_layer(layers: list[BaseLayer], libraries: list[str]) -> BaseLayer | None:
+    """The ready layer with the most of the libraries."""
+    candidates = [layer for layer in layers if layer.ready and layer.covers(libraries)]
+    return max(candidates, key=lambda layer: len(layer.libraries), default=None)
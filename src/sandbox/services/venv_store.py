@@ -0,0 +1,318 @@
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+from services.interpreter_pool import CODE_CACHE_DIR
+from services.venv_builds import (
+    BUILDS_DIR,
+    LAYERS_DIR,
+    LOCKS_DIR,
+    WHEEL_CACHE_DIR,
+    FileLock,
+)
+from utils.logger import logger
+
+# Disk budget of the venvs in BASE_VENV_PATH, not limited if 0
+VENV_STORE_MAX_MB = int(os.environ.get("VENV_STORE_MAX_MB", "10240"))
+# Venvs used more recently than this, possibly by another process, are kept
+VENV_MIN_IDLE_SECONDS = float(os.environ.get("VENV_MIN_IDLE_SECONDS", "900"))
+# Entries of OUTPUT_PATH older than this are removed
+OUTPUT_RETENTION_SECONDS = float(os.environ.get("OUTPUT_RETENTION_SECONDS", "86400"))
+# Disk budget of the compiled code kept in a venv, not limited if 0
+CODE_CACHE_MAX_MB = int(os.environ.get("CODE_CACHE_MAX_MB", "64"))
+
+# Disk usage of a venv without its code cache, computed once
+SIZE_FILE = "venvsize"
+
+
+def directory_size(path: Path) -> int:
+    """Disk usage of the files in path, symlinks are not followed."""
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_blocks * 512
+            except OSError:
+                pass
+    return total
+
+
+def venv_size(venv_path: Path) -> int:
+    """Disk usage of a venv without its code cache, which keeps changing."""
+    size_file = venv_path / SIZE_FILE
+    try:
+        return int(size_file.read_text())
+    except (OSError, ValueError):
+        pass
+    size = directory_size(venv_path) - directory_size(venv_path / CODE_CACHE_DIR)
+    try:
+        size_file.write_text(str(size))
+    except OSError:
+        pass
+    return size
+
+
+def trim_code_cache(code_cache_path: Path, max_bytes: int) -> tuple[int, int]:
+    """
+    Remove the least recently used compiled code over `max_bytes`, see
+    interpreter_worker.compile_code. Returns the size left and the number of
+    removed files.
+    """
+    files = []
+    try:
+        with os.scandir(code_cache_path) as entries:
+            for entry in entries:
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_blocks * 512, entry.path))
+    except OSError:
+        return 0, 0
+
+    size, removed = 0, 0
+    for _, file_size, path in sorted(files, reverse=True):
+        if max_bytes and size + file_size > max_bytes:
+            Path(path).unlink(missing_ok=True)
+            removed += 1
+        else:
+            size += file_size
+    return size, removed
+
+
+def remove_path(path: Path):
+    if path.is_symlink() or path.is_file():
+        path.unlink(missing_ok=True)
+    else:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+class VenvStoreMetrics:
+    """State of the venv store after the last collection and totals of removals."""
+
+    def __init__(self):
+        self.runs = 0
+        self.venvs = 0
+        self.bytes = 0
+        self.protected = 0
+        self.evicted_venvs = 0
+        self.evicted_bytes = 0
+        self.removed_builds = 0
+        self.removed_outputs = 0
+        self.removed_compiled_code = 0
+        self.last_run_seconds = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "runs": self.runs,
+            "venvs": self.venvs,
+            "bytes": self.bytes,
+            "protected": self.protected,
+            "evicted_venvs": self.evicted_venvs,
+            "evicted_bytes": self.evicted_bytes,
+            "removed_builds": self.removed_builds,
+            "removed_outputs": self.removed_outputs,
+            "removed_compiled_code": self.removed_compiled_code,
+            "last_run_seconds": self.last_run_seconds,
+        }
+
+
+class VenvGarbageCollector:
+    """
+    Keeps the venvs in `base_venv_path` within `max_bytes` by removing the least
+    recently used ones first, see mark_used.
+
+    Venvs in use by this process and venvs used in the last `min_idle_seconds`,
+    which may be in use by another process, are kept even if the store stays
+    over its budget. A venv is only removed while holding the lock of its
+    lib_hash, so never during its build. Builds and temporary links left behind
+    by crashed processes, and entries of `output_path` older than
+    `output_retention_seconds`, are removed as well. The code cache of every
+    venv is kept within `code_cache_max_bytes` and counted in its size.
+
+    `collect` blocks on the file system, run it in a thread.
+    """
+
+    def __init__(
+        self,
+        base_venv_path: str | Path,
+        output_path: str | Path | None = None,
+        max_bytes: int = VENV_STORE_MAX_MB * 1024 * 1024,
+        min_idle_seconds: float = VENV_MIN_IDLE_SECONDS,
+        output_retention_seconds: float = OUTPUT_RETENTION_SECONDS,
+        code_cache_max_bytes: int = CODE_CACHE_MAX_MB * 1024 * 1024,
+    ):
+        self.base_venv_path = Path(base_venv_path)
+        self.output_path = Path(output_path) if output_path is not None else None
+        self.max_bytes = max_bytes
+        self.min_idle_seconds = min_idle_seconds
+        self.output_retention_seconds = output_retention_seconds
+        self.code_cache_max_bytes = code_cache_max_bytes
+        self.metrics = VenvStoreMetrics()
+
+    def _lock(self, lib_hash: str) -> FileLock:
+        return FileLock(self.base_venv_path / LOCKS_DIR / f"{lib_hash}.lock")
+
+    def _last_used(self, venv_path: Path) -> float:
+        try:
+            return os.stat(venv_path / "libhash").st_mtime
+        except OSError:
+            # Not finished, venvs built in place by an older version
+            return os.lstat(venv_path).st_mtime
+
+    def _scan(self) -> list[tuple[float, str, Path]]:
+        """Venvs as (last used, lib_hash, path), least recently used first."""
+        venvs = []
+        with os.scandir(self.base_venv_path) as entries:
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                venv_path = Path(entry.path)
+                try:
+                    venvs.append((self._last_used(venv_path), entry.name, venv_path))
+                except OSError:
+                    continue
+        venvs.sort()
+        return venvs
+
+    def _is_protected(self, lib_hash: str, last_used: float, in_use: set[str]):
+        return lib_hash in in_use or time.time() - last_used < self.min_idle_seconds
+
+    def _evict(self, lib_hash: str, venv_path: Path, in_use: set[str]) -> bool:
+        lock = self._lock(lib_hash)
+        if not lock.try_acquire():
+            # Being built
+            return False
+        try:
+            # Used by another process since the scan
+            if self._is_protected(lib_hash, self._last_used(venv_path), in_use):
+                return False
+            if venv_path.is_symlink():
+                build_path = venv_path.resolve()
+                venv_path.unlink()
+                shutil.rmtree(build_path, ignore_errors=True)
+            else:
+                removed = venv_path.with_name(f".{lib_hash}.{uuid.uuid4().hex[:8]}")
+                venv_path.rename(removed)
+                shutil.rmtree(removed, ignore_errors=True)
+            return True
+        except OSError:
+            logger.exception(f"Failed to remove virtual environment {venv_path}")
+            return False
+        finally:
+            lock.release()
+
+    def _remove_stale_builds(self) -> int:
+        """Builds not swapped in and not in progress, and leftover temporary links."""
+        removed = 0
+        builds_path = self.base_venv_path / BUILDS_DIR
+        if builds_path.is_dir():
+            for build_path in builds_path.iterdir():
+                lib_hash = build_path.name.rsplit("-", 1)[0]
+                venv_path = self.base_venv_path / lib_hash
+                lock = self._lock(lib_hash)
+                if not lock.try_acquire():
+                    continue
+                try:
+                    if venv_path.resolve() != build_path.resolve():
+                        shutil.rmtree(build_path, ignore_errors=True)
+                        removed += 1
+                finally:
+                    lock.release()
+
+        now = time.time()
+        for path in self.base_venv_path.glob(".*"):
+            if path.name in (BUILDS_DIR, LOCKS_DIR, WHEEL_CACHE_DIR, LAYERS_DIR):
+                continue
+            try:
+                if now - os.lstat(path).st_mtime < self.min_idle_seconds:
+                    continue
+            except OSError:
+                continue
+            remove_path(path)
+            removed += 1
+        return removed
+
+    def _remove_old_outputs(self) -> int:
+        if self.output_path is None or not self.output_path.is_dir():
+            return 0
+        removed = 0
+        now = time.time()
+        with os.scandir(self.output_path) as entries:
+            for entry in entries:
+                try:
+                    modified = entry.stat(follow_symlinks=False).st_mtime
+                except OSError:
+                    continue
+                if now - modified > self.output_retention_seconds:
+                    remove_path(Path(entry.path))
+                    removed += 1
+        return removed
+
+    def collect(self, in_use: set[str] | None = None) -> dict:
+        """
+        Remove venvs over the budget, stale builds and old outputs. `in_use` are
+        the lib_hashes of the venvs this process uses. Returns what was removed.
+        """
+        in_use = in_use or set()
+        started_at = time.monotonic()
+        self.base_venv_path.mkdir(parents=True, exist_ok=True)
+
+        venvs = self._scan()
+        sizes = {}
+        removed_compiled_code = 0
+        for _, lib_hash, venv_path in venvs:
+            code_cache_size, removed = trim_code_cache(
+                venv_path / CODE_CACHE_DIR, self.code_cache_max_bytes
+            )
+            sizes[lib_hash] = venv_size(venv_path) + code_cache_size
+            removed_compiled_code += removed
+        total = sum(sizes.values())
+        evicted, evicted_bytes, protected = 0, 0, 0
+        for last_used, lib_hash, venv_path in venvs:
+            if not self.max_bytes or total <= self.max_bytes:
+                break
+            if self._is_protected(lib_hash, last_used, in_use):
+                protected += 1
+                continue
+            if self._evict(lib_hash, venv_path, in_use):
+                evicted += 1
+                evicted_bytes += sizes[lib_hash]
+                total -= sizes[lib_hash]
+
+        removed_builds = self._remove_stale_builds()
+        removed_outputs = self._remove_old_outputs()
+
+        metrics = self.metrics
+        metrics.runs += 1
+        metrics.venvs = len(venvs) - evicted
+        metrics.bytes = total
+        metrics.protected = protected
+        metrics.evicted_venvs += evicted
+        metrics.evicted_bytes += evicted_bytes
+        metrics.removed_builds += removed_builds
+        metrics.removed_outputs += removed_outputs
+        metrics.removed_compiled_code += removed_compiled_code
+        metrics.last_run_seconds = time.monotonic() - started_at
+
+        if evicted or removed_builds or removed_outputs or removed_compiled_code:
+            logger.info(
+                f"Removed {evicted} virtual environments ({evicted_bytes} bytes), "
+                f"{removed_builds} stale builds, {removed_outputs} outputs and "
+                f"{removed_compiled_code} compiled code files."
+            )
+        if self.max_bytes and total > self.max_bytes:
+            logger.warning(
+                f"Virtual environments use {total} bytes, over the budget of "
+                f"{self.max_bytes} bytes, {protected} of them are in use."
+            )
+        return {
+            "evicted_venvs": evicted,
+            "evicted_bytes": evicted_bytes,
+            "protected": protected,
+            "removed_builds": removed_builds,
+            "removed_outputs": removed_outputs,
+            "removed_compiled_code": removed_compiled_code,
+        }
@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime
 import os
 from pathlib import Path
@@ -8,6 +9,12 @@ import pytest
 from typing import Any, Generator
 
 from dynamic_venv_executor_chain import DynamicVenvExecutorChain
+from services.interpreter_pool import InterpreterPoolManager
+
+ADD_CODE = """
+def main(var1, var2):
+    return var1+var2
+"""
 
 
 @pytest.fixture
@@ -49,3 +56,40 @@ def clear_venvs_and_executions(output_path: Path, base_venv_path: Path):
     yield
     shutil.rmtree(output_path)
     shutil.rmtree(base_venv_path)
+
+
+async def run_code(
+    chain: DynamicVenvExecutorChain,
+    code: str = ADD_CODE,
+    func_kwargs: dict | None = None,
+    **kwargs,
+):
+    """Run code with only the predefined libraries, ADD_CODE of 1 and 2 by default."""
+    return await chain.run(
+        libraries=[],
+        venv_name="test",
+        execution_id=str(uuid.uuid4()),
+        code=code,
+        func_kwargs={"var1": 1, "var2": 2} if func_kwargs is None else func_kwargs,
+        **kwargs,
+    )
+
+
+@pytest.fixture(scope="module")
+def venv_dirs(tmp_path_factory) -> tuple[Path, Path]:
+    """Venv with only the predefined libraries, built once for the module."""
+    root = tmp_path_factory.mktemp("venv_dirs")
+    output_path, base_venv_path = root / "executions", root / "venvs"
+    chain = DynamicVenvExecutorChain(
+        output_path=output_path, base_venv_path=base_venv_path
+    )
+    result = asyncio.run(run_code(chain))
+    assert result.returncode == 0, result.stderr
+    return output_path, base_venv_path
+
+
+def worker_pids(pools: InterpreterPoolManager) -> set[int]:
+    """Idle workers of the pools."""
+    return {
+        worker.process.pid for pool in pools.pools.values() for worker in pool._idle
+    }
@@ -0,0 +1,117 @@
+import json
+
+import pytest
+from dynamic_venv_executor_chain import DynamicVenvExecutorChain
+from models import CodeResultData
+from services.interpreter_pool import InterpreterPoolManager
+from fixtures import *
+
+# Reports the interpreter, tasks run in children forked from it
+SLEEP_CODE = """
+import os
+import time
+def main(seconds, value):
+    time.sleep(seconds)
+    return {"value": value, "pid": os.getppid()}
+"""
+
+
+def make_tasks(seconds: list[float]) -> list[dict]:
+    return [
+        {
+            "execution_id": f"task-{i}",
+            "code": SLEEP_CODE,
+            "entrypoint": "main",
+            "func_kwargs": {"seconds": s, "value": i},
+        }
+        for i, s in enumerate(seconds)
+    ]
+
+
+async def run_batch(chain: DynamicVenvExecutorChain, tasks: list[dict], **kwargs):
+    completed: list[CodeResultData] = []
+
+    async def on_result(result: CodeResultData):
+        completed.append(result)
+
+    results = await chain.run_batch(
+        libraries=kwargs.get("libraries", []),
+        venv_name="batch",
+        batch_id="batch",
+        tasks=tasks,
+        on_result=on_result,
+    )
+    return results, completed
+
+
+@pytest.mark.asyncio
+async def test_batch_is_spread_over_the_pool(tmp_path):
+    pools = InterpreterPoolManager(size=3)
+    chain = DynamicVenvExecutorChain(
+        output_path=tmp_path / "executions",
+        base_venv_path=tmp_path / "venvs",
+        interpreter_pools=pools,
+    )
+    try:
+        results, completed = await run_batch(chain, make_tasks([1.5, 0, 0, 0, 0]))
+    finally:
+        await pools.close()
+
+    assert [result.execution_id for result in results] == [
+        f"task-{i}" for i in range(5)
+    ]
+    values = [json.loads(result.result_data) for result in results]
+    assert [value["value"] for value in values] == list(range(5))
+    assert len({value["pid"] for value in values}) > 1
+    # Published as they complete, the slow task last
+    assert len(completed) == 5
+    assert completed[-1].execution_id == "task-0"
+
+
+@pytest.mark.asyncio
+async def test_batch_runs_in_one_new_interpreter(tmp_path):
+    chain = DynamicVenvExecutorChain(
+        output_path=tmp_path / "executions", base_venv_path=tmp_path / "venvs"
+    )
+    tasks = make_tasks([0, 0, 0])
+    tasks.insert(
+        1,
+        {
+            "execution_id": "crashing",
+            "code": "import os\ndef main():\n    os._exit(3)",
+            "entrypoint": "main",
+        },
+    )
+
+    results, completed = await run_batch(chain, tasks)
+
+    assert [result.execution_id for result in completed] == [
+        "task-0",
+        "crashing",
+        "task-1",
+        "task-2",
+    ]
+    assert results[1].returncode == 3
+    pids = [
+        json.loads(result.result_data)["pid"]
+        for result in results
+        if result.result_data
+    ]
+    # The crash only ends the child running the task, not the interpreter
+    assert pids[0] == pids[1] == pids[2]
+
+
+@pytest.mark.asyncio
+async def test_failed_venv_is_reported_for_every_task(tmp_path):
+    chain = DynamicVenvExecutorChain(
+        output_path=tmp_path / "executions", base_venv_path=tmp_path / "venvs"
+    )
+    results, completed = await run_batch(
+        chain,
+        make_tasks([0, 0]),
+        libraries=["epicstaff-package-that-does-not-exist"],
+    )
+
+    assert [result.execution_id for result in completed] == ["task-0", "task-1"]
+    assert all(result.returncode != 0 for result in results)
+    assert results[0].stderr == results[1].stderr != ""
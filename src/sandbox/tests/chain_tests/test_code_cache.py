@@ -0,0 +1,108 @@
+import json
+import shutil
+import statistics
+import time
+
+import pytest
+from dynamic_venv_executor_chain import DynamicVenvExecutorChain
+from services.interpreter_pool import CODE_CACHE_DIR, InterpreterPoolManager
+from fixtures import *
+
+# Trivial entrypoint of a node with a lot of helper code
+LARGE_CODE = (
+    "\n".join(
+        f"def helper_{i}(value):\n"
+        f"    items = [value * j for j in range({i % 7 + 1})]\n"
+        f"    return {{'index': {i}, 'total': sum(items), 'items': items}}\n"
+        for i in range(1000)
+    )
+    + ADD_CODE
+)
+
+
+def code_cache_path(base_venv_path: Path) -> Path:
+    (venv_path,) = [path for path in base_venv_path.iterdir() if path.is_symlink()]
+    return venv_path / CODE_CACHE_DIR
+
+
+@pytest.mark.asyncio
+async def test_compiled_code_is_reused_by_new_workers(venv_dirs):
+    output_path, base_venv_path = venv_dirs
+    shutil.rmtree(code_cache_path(base_venv_path), ignore_errors=True)
+    pools = InterpreterPoolManager(size=1, max_executions=2)
+    chain = DynamicVenvExecutorChain(
+        output_path=output_path,
+        base_venv_path=base_venv_path,
+        interpreter_pools=pools,
+    )
+    try:
+        results = [await run_code(chain) for _ in range(4)]
+    finally:
+        await pools.close()
+
+    assert [json.loads(result.result_data) for result in results] == [3] * 4
+    # Compiled by the first worker, loaded by the one replacing it
+    assert chain.code_cache_stats.to_dict() == {
+        "memory_hits": 2,
+        "disk_hits": 1,
+        "misses": 1,
+        "hit_rate": 0.75,
+    }
+    assert len(list(code_cache_path(base_venv_path).iterdir())) == 1
+
+
+@pytest.mark.asyncio
+async def test_cold_runs_use_compiled_code_of_the_venv(venv_dirs):
+    output_path, base_venv_path = venv_dirs
+    chain = DynamicVenvExecutorChain(
+        output_path=output_path, base_venv_path=base_venv_path
+    )
+    code = ADD_CODE + "\n# cold\n"
+
+    for _ in range(2):
+        result = await run_code(chain, code)
+        assert result.returncode == 0, result.stderr
+
+    assert chain.code_cache_stats.to_dict()["misses"] == 1
+    assert chain.code_cache_stats.to_dict()["disk_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_benchmark_code_cache(venv_dirs):
+    output_path, base_venv_path = venv_dirs
+    runs = 20
+
+    async def measure(chain: DynamicVenvExecutorChain, clear: bool) -> float:
+        latencies = []
+        for _ in range(runs):
+            if clear:
+                shutil.rmtree(code_cache_path(base_venv_path), ignore_errors=True)
+            start = time.perf_counter()
+            result = await run_code(chain, LARGE_CODE)
+            latencies.append(time.perf_counter() - start)
+            assert result.returncode == 0, result.stderr
+        return statistics.median(latencies)
+
+    cold_chain = DynamicVenvExecutorChain(
+        output_path=output_path, base_venv_path=base_venv_path
+    )
+    pools = InterpreterPoolManager(size=1)
+    warm_chain = DynamicVenvExecutorChain(
+        output_path=output_path,
+        base_venv_path=base_venv_path,
+        interpreter_pools=pools,
+    )
+    try:
+        report = {
+            "new interpreter, compiled": await measure(cold_chain, clear=True),
+            "new interpreter, from disk": await measure(cold_chain, clear=False),
+            "warm interpreter, from memory": await measure(warm_chain, clear=False),
+        }
+    finally:
+        await pools.close()
+    for name, p50 in report.items():
+        print(f"{name}: p50={p50 * 1000:.1f}ms")
+
+    assert warm_chain.code_cache_stats.to_dict()["memory_hits"] == runs - 1
+    compiled, from_disk, from_memory = report.values()
+    assert from_memory < from_disk < compiled
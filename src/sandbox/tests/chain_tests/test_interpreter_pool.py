@@ -0,0 +1,356 @@
+import asyncio
+import base64
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+import pytest
+from dynamic_venv_executor_chain import DynamicVenvExecutorChain
+from services import interpreter_pool
+from services.interpreter_pool import (
+    InterpreterPool,
+    InterpreterPoolManager,
+    WorkerError,
+)
+from fixtures import *
+
+
+@pytest.fixture(scope="module")
+def prepared_venv():
+    """Venv with only the predefined libraries, built once for the module."""
+    output_path, base_venv_path = Path("executions"), Path("venvs")
+    chain = DynamicVenvExecutorChain(
+        output_path=output_path, base_venv_path=base_venv_path
+    )
+    result = asyncio.run(
+        chain.run(
+            libraries=[],
+            venv_name="pool",
+            execution_id="prepare",
+            code=ADD_CODE,
+            func_kwargs={"var1": 1, "var2": 2},
+        )
+    )
+    assert result.returncode == 0, result.stderr
+    yield
+    shutil.rmtree(output_path)
+    shutil.rmtree(base_venv_path)
+
+
+def make_chain(
+    **pool_kwargs,
+) -> tuple[DynamicVenvExecutorChain, InterpreterPoolManager]:
+    pools = InterpreterPoolManager(**pool_kwargs)
+    chain = DynamicVenvExecutorChain(
+        output_path="executions", base_venv_path="venvs", interpreter_pools=pools
+    )
+    return chain, pools
+
+
+@pytest.mark.asyncio
+async def test_warm_workers_are_reused_and_recycled(prepared_venv):
+    chain, pools = make_chain(size=1, max_executions=3)
+    try:
+        results = [await run_code(chain) for _ in range(3)]
+        assert [json.loads(r.result_data) for r in results] == [3, 3, 3]
+        assert all(r.returncode == 0 and r.stderr == "" for r in results)
+
+        first_pids = worker_pids(pools)
+        await run_code(chain)
+        # Recycled after the third execution, replaced in the background
+        await asyncio.sleep(1)
+        assert worker_pids(pools)
+        assert worker_pids(pools).isdisjoint(first_pids)
+    finally:
+        await pools.close()
+
+
+@pytest.mark.asyncio
+async def test_worker_is_recycled_on_memory_growth(prepared_venv):
+    chain, pools = make_chain(size=1, max_rss_mb=1)
+    try:
+        await run_code(chain)
+        await asyncio.sleep(1)
+        pids = worker_pids(pools)
+        await run_code(chain)
+        await asyncio.sleep(1)
+        assert worker_pids(pools).isdisjoint(pids)
+    finally:
+        await pools.close()
+
+
+@pytest.mark.asyncio
+async def test_timeout_and_crash_are_isolated(prepared_venv):
+    chain, pools = make_chain(size=2)
+    hanging_code = """
+def main(var1, var2):
+    while True:
+        pass
+"""
+    crashing_code = """
+import os
+def main(var1, var2):
+    os._exit(3)
+"""
+    try:
+        hanging, crashing, healthy = await asyncio.gather(
+            run_code(chain, hanging_code, timeout=2),
+            run_code(chain, crashing_code),
+            run_code(chain),
+        )
+        assert hanging.returncode != 0
+        assert "timed out" in hanging.stderr
+        assert crashing.returncode == 3
+        assert json.loads(healthy.result_data) == 3
+
+        after = await run_code(chain)
+        assert json.loads(after.result_data) == 3
+    finally:
+        await pools.close()
+
+
+@pytest.mark.asyncio
+async def test_user_output_does_not_break_protocol(prepared_venv):
+    chain, pools = make_chain(size=1)
+    code = """
+import sys
+def main(var1, var2):
+    print("hello")
+    print("warning", file=sys.stderr)
+    sys.stdin.read()
+    return var1 + var2
+"""
+    try:
+        result = await run_code(chain, code)
+        assert result.stdout == "hello\n"
+        assert result.stderr == "warning\n"
+        assert json.loads(result.result_data) == 3
+    finally:
+        await pools.close()
+
+
+def percentile(latencies: list[float], p: float) -> float:
+    return statistics.quantiles(latencies, n=100, method="inclusive")[int(p) - 1]
+
+
+@pytest.mark.asyncio
+async def test_benchmark_warm_pool_against_cold_spawn(prepared_venv):
+    runs = 40
+    cold_chain = DynamicVenvExecutorChain(
+        output_path="executions", base_venv_path="venvs"
+    )
+    warm_chain, pools = make_chain(size=1)
+
+    async def measure(chain) -> list[float]:
+        latencies = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = await run_code(chain)
+            latencies.append(time.perf_counter() - start)
+            assert result.returncode == 0
+        return latencies
+
+    try:
+        await run_code(warm_chain)
+        cold = await measure(cold_chain)
+        warm = await measure(warm_chain)
+    finally:
+        await pools.close()
+
+    report = {
+        "cold": (percentile(cold, 50), percentile(cold, 99)),
+        "warm": (percentile(warm, 50), percentile(warm, 99)),
+    }
+    for name, (p50, p99) in report.items():
+        print(f"{name}: p50={p50 * 1000:.1f}ms p99={p99 * 1000:.1f}ms")
+
+    assert report["warm"][0] < report["cold"][0]
+
+
+NUMPY_CODE = """
+import numpy
+
+def main():
+    return int(numpy.arange(10).sum())
+"""
+
+
+@pytest.mark.asyncio
+async def test_benchmark_heavy_library_is_imported_once_per_worker(tmp_path):
+    pools = InterpreterPoolManager(size=1)
+    chain = DynamicVenvExecutorChain(
+        output_path=tmp_path / "executions",
+        base_venv_path=tmp_path / "venvs",
+        interpreter_pools=pools,
+    )
+
+    async def measure() -> float:
+        start = time.perf_counter()
+        result = await chain.run(
+            libraries=["numpy"],
+            venv_name="numpy",
+            execution_id=str(uuid.uuid4()),
+            code=NUMPY_CODE,
+            func_kwargs={},
+        )
+        assert result.returncode == 0, result.stderr
+        assert json.loads(result.result_data) == 45
+        return time.perf_counter() - start
+
+    try:
+        # Builds the venv and imports numpy in the worker
+        await measure()
+        latencies = [await measure() for _ in range(20)]
+    finally:
+        await pools.close()
+
+    python = next((tmp_path / "venvs").glob("**/bin/python"))
+    import_time = float(
+        subprocess.run(
+            [
+                python,
+                "-c",
+                "import time; start = time.perf_counter(); import numpy; "
+                "print(time.perf_counter() - start)",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    )
+    p50 = percentile(latencies, 50)
+    print(f"numpy import: {import_time * 1000:.1f}ms, task p50: {p50 * 1000:.1f}ms")
+
+    # A task importing numpy in its child takes most of the import time
+    assert p50 < import_time / 4
+
+
+@pytest.mark.asyncio
+async def test_large_arguments_and_results_are_passed_in_memory(prepared_venv):
+    chain, pools = make_chain(size=1)
+    code = """
+def main(data):
+    return data[::-1]
+"""
+    data = base64.b64encode(os.urandom(4 * 1024 * 1024)).decode()
+    try:
+        result = await run_code(chain, code, func_kwargs={"data": data})
+        assert result.returncode == 0, result.stderr
+        assert json.loads(result.result_data) == data[::-1]
+        # Nothing is written for the execution
+        assert list(Path("executions").iterdir()) == []
+    finally:
+        await pools.close()
+
+
+@pytest.mark.asyncio
+async def test_code_is_compiled_once_per_worker(prepared_venv):
+    chain, pools = make_chain(size=1)
+    code = """
+def main():
+    return "compiled"
+"""
+    try:
+        results = [await run_code(chain, code, func_kwargs={}) for _ in range(3)]
+        assert all(result.returncode == 0 for result in results)
+        assert chain.code_cache_stats.to_dict()["memory_hits"] == 2
+    finally:
+        await pools.close()
+
+
+@pytest.mark.asyncio
+async def test_tasks_do_not_leak_into_next_tasks(prepared_venv):
+    chain, pools = make_chain(size=1)
+    code = """
+import builtins
+import threading
+import time
+
+def main(patch):
+    if patch:
+        builtins._last_token = "secret"
+        sys.modules["leaked"] = sys
+
+        def print_later():
+            time.sleep(0.2)
+            print("leaked")
+
+        threading.Thread(target=print_later, daemon=True).start()
+        return None
+    time.sleep(0.5)
+    return [hasattr(builtins, "_last_token"), "leaked" in sys.modules]
+"""
+    try:
+        await run_code(chain, code, func_kwargs={"patch": True})
+        pids = worker_pids(pools)
+        result = await run_code(chain, code, func_kwargs={"patch": False})
+
+        assert result.returncode == 0, result.stderr
+        assert json.loads(result.result_data) == [False, False]
+        assert result.stdout == ""
+        assert worker_pids(pools) == pids
+    finally:
+        await pools.close()
+
+
+@pytest.mark.asyncio
+async def test_patched_json_does_not_break_protocol(prepared_venv):
+    chain, pools = make_chain(size=1)
+    code = """
+import builtins
+import json
+
+def main(var1, var2):
+    json.dumps = json.loads = builtins.len = None
+    return var1 + var2
+"""
+    try:
+        result = await run_code(chain, code)
+        assert result.returncode == 0, result.stderr
+        assert json.loads(result.result_data) == 3
+        pids = worker_pids(pools)
+
+        after = await run_code(chain)
+        assert json.loads(after.result_data) == 3
+        assert worker_pids(pools) == pids
+    finally:
+        await pools.close()
+
+
+# Answers the ready message, then every task with a list
+INVALID_WORKER = """
+import json
+import struct
+import sys
+
+HEADER = struct.Struct(">I")
+
+def write(message):
+    data = json.dumps(message).encode()
+    sys.stdout.buffer.write(HEADER.pack(len(data)) + data)
+    sys.stdout.buffer.flush()
+
+write({"ready": True, "rss_kb": 0})
+while header := sys.stdin.buffer.read(HEADER.size):
+    sys.stdin.buffer.read(HEADER.unpack(header)[0])
+    write([])
+"""
+
+
+@pytest.mark.asyncio
+async def test_worker_with_invalid_reply_is_not_reused(tmp_path, monkeypatch):
+    script = tmp_path / "invalid_worker.py"
+    script.write_text(INVALID_WORKER)
+    monkeypatch.setattr(interpreter_pool, "WORKER_SCRIPT", script)
+    pool = InterpreterPool(sys.executable, size=1)
+    try:
+        with pytest.raises(WorkerError, match="invalid"):
+            await pool.execute({"code": ""}, timeout=10)
+        assert pool._idle == []
+    finally:
+        await pool.close()
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+from dynamic_venv_executor_chain import (
+    DynamicVenvExecutorChain,
+    InstallLibrariesHandler,
+)
+from fixtures import *
+
+IMPORT_CODE = """
+import dotenv
+import requests
+def main():
+    return requests.__name__ + dotenv.__name__
+"""
+LIBRARIES = ["python-dotenv", "requests>=2.0"]
+
+
+def run_code(chain: DynamicVenvExecutorChain, execution_id: str, libraries=LIBRARIES):
+    return chain.run(
+        libraries=libraries,
+        venv_name="install",
+        execution_id=execution_id,
+        code=IMPORT_CODE,
+    )
+
+
+@pytest.mark.asyncio
+async def test_libraries_are_installed_with_one_pip_call(tmp_path):
+    chain = DynamicVenvExecutorChain(
+        output_path=tmp_path / "executions", base_venv_path=tmp_path / "venvs"
+    )
+
+    with patch.object(
+        InstallLibrariesHandler,
+        "_pip",
+        autospec=True,
+        side_effect=InstallLibrariesHandler._pip,
+    ) as pip:
+        result = await run_code(chain, "first")
+
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.result_data) == "requestsdotenv"
+    (install,) = [call for call in pip.call_args_list if call.args[2] == "install"]
+    assert install.args[-2:] == tuple(sorted(LIBRARIES))[-2:]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_uses_shared_wheel_cache(tmp_path):
+    async def build(name: str) -> float:
+        chain = DynamicVenvExecutorChain(
+            output_path=tmp_path / "executions",
+            base_venv_path=tmp_path / name,
+            wheel_cache_path=tmp_path / "wheels",
+        )
+        start = time.perf_counter()
+        result = await run_code(chain, name)
+        assert result.returncode == 0, result.stderr
+        return time.perf_counter() - start
+
+    cold = await build("cold")
+    cached = await build("cached")
+    print(f"cold build: {cold:.1f}s, cached rebuild: {cached:.1f}s")
+
+    # dotdict was built into a wheel once
+    assert list((tmp_path / "wheels" / "local").glob("dotdict-*/*.whl"))
+    assert cached < cold
+
+
+def download_wheels(wheelhouse, *libraries: str):
+    # dotdict is built from source, its build backend has to be there as well
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "pip",
+            "download",
+            "--quiet",
+            "--only-binary=:all:",
+            "--dest",
+            str(wheelhouse),
+            *libraries,
+            "poetry-core>=2.0.0,<3.0.0",
+        ],
+        check=True,
+    )
+
+
+@pytest.mark.asyncio
+async def test_unrelated_venvs_build_in_parallel(tmp_path):
+    wheelhouse = tmp_path / "wheelhouse"
+    download_wheels(wheelhouse, *LIBRARIES)
+    chain = DynamicVenvExecutorChain(
+        output_path=tmp_path / "executions",
+        base_venv_path=tmp_path / "venvs",
+        wheel_cache_path=tmp_path / "wheels",
+        wheelhouse_path=wheelhouse,
+        offline=True,
+    )
+    # Builds the dotdict wheel once
+    await run_code(chain, "warm-cache")
+
+    installs = []
+    pip = InstallLibrariesHandler._pip
+
+    async def timed_pip(self, context, *args):
+        start = time.monotonic()
+        result = await pip(self, context, *args)
+        if args[0] == "install":
+            installs.append((start, time.monotonic()))
+        return result
+
+    with patch.object(InstallLibrariesHandler, "_pip", timed_pip):
+        results = await asyncio.gather(
+            *(
+                run_code(chain, f"parallel-{i}", libraries=[*LIBRARIES, f"idna>={i}"])
+                for i in range(1, 4)
+            )
+        )
+
+    assert all(result.returncode == 0 for result in results)
+    assert len(installs) == 3
+    # Each install ran while another one was still running
+    for i, (start, end) in enumerate(installs):
+        assert any(
+            other_start < end and start < other_end
+            for j, (other_start, other_end) in enumerate(installs)
+            if j != i
+        )
+
+
+@pytest.mark.asyncio
+async def test_offline_install_from_wheelhouse(tmp_path):
+    wheelhouse = tmp_path / "wheelhouse"
+    download_wheels(wheelhouse, "python-dotenv")
+    chain = DynamicVenvExecutorChain(
+        output_path=tmp_path / "executions",
+        base_venv_path=tmp_path / "venvs",
+        wheel_cache_path=tmp_path / "wheels",
+        wheelhouse_path=wheelhouse,
+        offline=True,
+    )
+
+    result = await chain.run(
+        libraries=["python-dotenv"],
+        venv_name="offline",
+        execution_id="offline",
+        code="import dotenv\ndef main():\n    return dotenv.__name__",
+    )
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.result_data) == "dotenv"
+
+    missing = await run_code(chain, "missing")
+    assert missing.returncode != 0
+    assert "requests" in missing.stderr
@@ -0,0 +1,173 @@
+import json
+
+import pytest
+from dynamic_venv_executor_chain import DynamicVenvExecutorChain
+from services.interpreter_pool import InterpreterPoolManager
+from fixtures import *
+
+ALLOCATE_CODE = """
+import time
+def main(megabytes, seconds=0):
+    data = bytearray(megabytes * 1024 * 1024)
+    time.sleep(seconds)
+    return len(data)
+"""
+BUSY_CODE = """
+def main():
+    while True:
+        pass
+"""
+# Code trying to get around its limits
+UNLIMITED_CODE = """
+import resource
+import signal
+
+def main(megabytes=0):
+    signal.signal(signal.SIGXCPU, signal.SIG_IGN)
+    for limit in (resource.RLIMIT_CPU, resource.RLIMIT_AS):
+        try:
+            resource.setrlimit(limit, (resource.RLIM_INFINITY, resource.RLIM_INFINITY))
+        except (ValueError, OSError):
+            pass
+    data = bytearray(b"x") * (megabytes * 1024 * 1024)
+    while not megabytes:
+        pass
+    return len(data)
+"""
+
+
+def make_warm_chain(
+    venv_dirs: tuple[Path, Path],
+) -> tuple[DynamicVenvExecutorChain, InterpreterPoolManager]:
+    output_path, base_venv_path = venv_dirs
+    pools = InterpreterPoolManager(size=1)
+    chain = DynamicVenvExecutorChain(
+        output_path=output_path,
+        base_venv_path=base_venv_path,
+        interpreter_pools=pools,
+    )
+    return chain, pools
+
+
+@pytest.mark.asyncio
+async def test_usage_is_reported_per_execution(venv_dirs):
+    chain, pools = make_warm_chain(venv_dirs)
+    try:
+        large = await run_code(
+            chain, ALLOCATE_CODE, func_kwargs={"megabytes": 200, "seconds": 0.5}
+        )
+        small = await run_code(chain, ALLOCATE_CODE, func_kwargs={"megabytes": 1})
+
+        assert large.returncode == 0, large.stderr
+        assert large.peak_rss_kb >= 200 * 1024
+        assert large.wall_time >= 0.5
+        assert large.cpu_time < large.wall_time
+        # The peak of the worker is reset for every execution
+        assert small.peak_rss_kb < 100 * 1024
+        assert small.wall_time < large.wall_time
+    finally:
+        await pools.close()
+
+
+@pytest.mark.asyncio
+async def test_cpu_time_limit_stops_the_code(venv_dirs):
+    chain, pools = make_warm_chain(venv_dirs)
+    try:
+        await run_code(chain, ALLOCATE_CODE, func_kwargs={"megabytes": 1})
+        pids = worker_pids(pools)
+
+        result = await run_code(
+            chain, BUSY_CODE, func_kwargs={}, max_cpu_seconds=1, timeout=30
+        )
+        assert result.returncode == 1
+        assert "CPU time limit of 1 seconds exceeded" in result.stderr
+        # The kernel counts CPU time more precisely than getrusage reports it
+        assert 0.9 <= result.cpu_time < 5
+
+        # The worker keeps running without the limit
+        after = await run_code(
+            chain, ALLOCATE_CODE, func_kwargs={"megabytes": 1, "seconds": 1}
+        )
+        assert after.returncode == 0, after.stderr
+        assert worker_pids(pools) == pids
+    finally:
+        await pools.close()
+
+
+@pytest.mark.asyncio
+async def test_memory_limit_stops_the_code(venv_dirs):
+    chain, pools = make_warm_chain(venv_dirs)
+    try:
+        await run_code(chain, ALLOCATE_CODE, func_kwargs={"megabytes": 1})
+        pids = worker_pids(pools)
+
+        result = await run_code(
+            chain, ALLOCATE_CODE, func_kwargs={"megabytes": 512}, max_memory_mb=256
+        )
+        assert result.returncode == 1
+        assert result.result_data is None
+        assert "Memory limit of 256 MB exceeded" in result.stderr
+
+        after = await run_code(chain, ALLOCATE_CODE, func_kwargs={"megabytes": 512})
+        assert json.loads(after.result_data) == 512 * 1024 * 1024
+        assert worker_pids(pools) == pids
+    finally:
+        await pools.close()
+
+
+@pytest.mark.asyncio
+async def test_limits_apply_to_new_interpreters(venv_dirs):
+    output_path, base_venv_path = venv_dirs
+    chain = DynamicVenvExecutorChain(
+        output_path=output_path, base_venv_path=base_venv_path
+    )
+    result = await run_code(
+        chain, ALLOCATE_CODE, func_kwargs={"megabytes": 512}, max_memory_mb=256
+    )
+    assert "Memory limit of 256 MB exceeded" in result.stderr
+
+
+@pytest.mark.asyncio
+async def test_wall_time_is_reported_on_timeout(venv_dirs):
+    chain, pools = make_warm_chain(venv_dirs)
+    try:
+        result = await run_code(chain, BUSY_CODE, func_kwargs={}, timeout=1)
+        assert "timed out" in result.stderr
+        assert result.wall_time >= 1
+        assert result.peak_rss_kb is None
+
+    finally:
+        await pools.close()
+
+
+@pytest.mark.asyncio
+async def test_code_cannot_lift_its_cpu_time_limit(venv_dirs):
+    chain, pools = make_warm_chain(venv_dirs)
+    try:
+        result = await run_code(
+            chain, UNLIMITED_CODE, func_kwargs={}, max_cpu_seconds=1, timeout=30
+        )
+        assert result.returncode != 0
+        assert "CPU time limit of 1 seconds exceeded" in result.stderr
+        # The kernel counts CPU time more precisely than getrusage reports it
+        assert 0.9 <= result.cpu_time < 5
+    finally:
+        await pools.close()
+
+
+@pytest.mark.asyncio
+async def test_code_cannot_lift_its_memory_limit(venv_dirs):
+    chain, pools = make_warm_chain(venv_dirs)
+    try:
+        result = await run_code(
+            chain,
+            UNLIMITED_CODE,
+            func_kwargs={"megabytes": 384},
+            max_memory_mb=128,
+            timeout=30,
+        )
+        assert result.returncode != 0
+        assert result.result_data is None
+        assert "Memory limit of 128 MB exceeded" in result.stderr
+    finally:
+        await pools.close()
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import sys
+from unittest.mock import patch
+
+import pytest
+from dynamic_venv_executor_chain import DynamicVenvExecutorChain
+from services.venv_builds import BUILDS_DIR, VenvBuild
+from fixtures import *
+
+ADD_CODE = """
+def main(var1, var2):
+    return var1+var2
+"""
+
+# Runs concurrent tasks of one library set in another process
+WORKER_SCRIPT = """
+import asyncio, json, sys
+from dynamic_venv_executor_chain import DynamicVenvExecutorChain
+
+async def main():
+    chain = DynamicVenvExecutorChain(output_path=sys.argv[1], base_venv_path=sys.argv[2])
+    results = await asyncio.gather(*(
+        chain.run(
+            libraries=["python-dotenv"],
+            venv_name="stress",
+            execution_id=f"{sys.argv[3]}-{i}",
+            code='''ADD_CODE''',
+            func_kwargs={"var1": 1, "var2": 2},
+        )
+        for i in range(3)
+    ))
+    print(json.dumps([result.model_dump() for result in results]))
+
+asyncio.run(main())
+""".replace("'''ADD_CODE'''", repr(ADD_CODE))
+
+
+def run_tasks(chain: DynamicVenvExecutorChain, libraries: list[str], count: int):
+    return asyncio.gather(
+        *(
+            chain.run(
+                libraries=libraries,
+                venv_name="stress",
+                execution_id=f"task-{i}",
+                code=ADD_CODE,
+                func_kwargs={"var1": 1, "var2": 2},
+            )
+            for i in range(count)
+        )
+    )
+
+
+@pytest.mark.asyncio
+async def test_concurrent_tasks_share_one_build(tmp_path):
+    chain = DynamicVenvExecutorChain(
+        output_path=tmp_path / "executions", base_venv_path=tmp_path / "venvs"
+    )
+
+    with patch.object(
+        VenvBuild, "commit", autospec=True, side_effect=VenvBuild.commit
+    ) as commit:
+        results = await run_tasks(chain, ["python-dotenv"], count=8)
+
+    assert commit.call_count == 1
+    assert [result.returncode for result in results] == [0] * 8
+    assert {json.loads(result.result_data) for result in results} == {3}
+    assert len(list((tmp_path / "venvs" / BUILDS_DIR).iterdir())) == 1
+
+    # The venv is a symlink to the build swapped in
+    (venv_path,) = [
+        path for path in (tmp_path / "venvs").iterdir() if path.is_symlink()
+    ]
+    assert venv_path.resolve().parent.name == BUILDS_DIR
+
+
+@pytest.mark.asyncio
+async def test_failed_build_is_shared_and_cleaned_up(tmp_path):
+    chain = DynamicVenvExecutorChain(
+        output_path=tmp_path / "executions", base_venv_path=tmp_path / "venvs"
+    )
+
+    with patch.object(
+        VenvBuild, "finish", autospec=True, side_effect=VenvBuild.finish
+    ) as finish:
+        results = await run_tasks(
+            chain, ["epicstaff-package-that-does-not-exist"], count=4
+        )
+
+    assert finish.call_count == 1
+    assert all(result.returncode != 0 for result in results)
+    assert len({result.stderr for result in results}) == 1
+    assert [result.execution_id for result in results] == [
+        f"task-{i}" for i in range(4)
+    ]
+    assert list((tmp_path / "venvs" / BUILDS_DIR).iterdir()) == []
+    assert not any(path.is_symlink() for path in (tmp_path / "venvs").iterdir())
+
+
+@pytest.mark.asyncio
+async def test_processes_build_a_venv_once(tmp_path):
+    processes = [
+        await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-c",
+            WORKER_SCRIPT,
+            str(tmp_path / "executions"),
+            str(tmp_path / "venvs"),
+            f"process-{i}",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            cwd=Path(__file__).parents[2],
+        )
+        for i in range(3)
+    ]
+    outputs = await asyncio.gather(*(process.communicate() for process in processes))
+
+    results = [
+        result
+        for stdout, _ in outputs
+        for result in json.loads(stdout.decode().splitlines()[-1])
+    ]
+    assert len(results) == 9
+    assert all(result["returncode"] == 0 for result in results)
+    assert {json.loads(result["result_data"]) for result in results} == {3}
+    assert len(list((tmp_path / "venvs" / BUILDS_DIR).iterdir())) == 1
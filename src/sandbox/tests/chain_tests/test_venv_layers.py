@@ -0,0 +1,110 @@
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+from dynamic_venv_executor_chain import (
+    DynamicVenvExecutorChain,
+    InstallLibrariesHandler,
+)
+from services.venv_layers import LAYER_PTH_FILE, site_packages
+from fixtures import *
+
+LAYER = ["requests"]
+VERSIONS_CODE = """
+import dotenv
+import idna
+import requests
+def main():
+    return {"requests": requests.__file__, "idna": idna.__version__}
+"""
+
+
+def make_chain(tmp_path: Path, name: str, **kwargs) -> DynamicVenvExecutorChain:
+    return DynamicVenvExecutorChain(
+        output_path=tmp_path / "executions",
+        base_venv_path=tmp_path / name,
+        wheel_cache_path=tmp_path / "wheels",
+        **kwargs,
+    )
+
+
+async def run_code(chain: DynamicVenvExecutorChain, libraries: list[str]):
+    result = await chain.run(
+        libraries=libraries,
+        venv_name="layers",
+        execution_id=str(uuid.uuid4()),
+        code=VERSIONS_CODE,
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.result_data)
+
+
+async def timed(coroutine) -> tuple[float, Any]:
+    start = time.perf_counter()
+    result = await coroutine
+    return time.perf_counter() - start, result
+
+
+def installed(pip) -> list[str]:
+    (install,) = [call for call in pip.call_args_list if call.args[2] == "install"]
+    source_args = InstallLibrariesHandler._source_args(install.args[0])
+    return list(install.args[3 + len(source_args) :])
+
+
+@pytest.mark.asyncio
+async def test_venvs_extend_base_layer(tmp_path):
+    libraries = ["python-dotenv", "requests"]
+    # Fill the wheel cache, so that both builds only install
+    await run_code(make_chain(tmp_path, "warmup"), libraries)
+
+    full, _ = await timed(run_code(make_chain(tmp_path, "full"), libraries))
+
+    chain = make_chain(tmp_path, "layered", base_layers=[LAYER])
+    layer_build, _ = await timed(chain.build_layers())
+    (layer,) = chain.layers
+    with patch.object(
+        InstallLibrariesHandler,
+        "_pip",
+        autospec=True,
+        side_effect=InstallLibrariesHandler._pip,
+    ) as pip:
+        layered, versions = await timed(run_code(chain, libraries))
+
+    print(
+        f"cold venv creation: {full:.1f}s without layer, {layered:.1f}s extending "
+        f"the layer, built once in {layer_build:.1f}s"
+    )
+    assert installed(pip) == ["python-dotenv"]
+    # requests is imported from the layer
+    assert versions["requests"].startswith(str(site_packages(layer.venv_path)))
+    assert layered < full
+
+
+@pytest.mark.asyncio
+async def test_venv_libraries_take_precedence_over_layer(tmp_path):
+    chain = make_chain(tmp_path, "venvs", base_layers=[LAYER])
+    await chain.build_layers()
+    (layer,) = chain.layers
+
+    versions = await run_code(chain, ["python-dotenv", "requests", "idna==3.6"])
+
+    assert versions["idna"] == "3.6"
+    layer_idna = list(site_packages(layer.venv_path).glob("idna-*.dist-info"))
+    assert layer_idna and "3.6" not in layer_idna[0].name
+    venv_path = next(
+        path for path in (tmp_path / "venvs").iterdir() if path.is_symlink()
+    )
+    assert (site_packages(venv_path) / LAYER_PTH_FILE).exists()
+
+
+@pytest.mark.asyncio
+async def test_layers_are_built_once(tmp_path):
+    await make_chain(tmp_path, "venvs", base_layers=[LAYER]).build_layers()
+
+    chain = make_chain(tmp_path, "venvs", base_layers=[LAYER])
+    with patch.object(InstallLibrariesHandler, "_pip", autospec=True) as pip:
+        await chain.build_layers()
+
+    pip.assert_not_called()
+    assert len(chain.layers) == 1 and chain.layers[0].ready
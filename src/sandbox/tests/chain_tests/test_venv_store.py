@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import time
+
+import pytest
+from dynamic_venv_executor_chain import DynamicVenvExecutorChain
+from services.interpreter_pool import CODE_CACHE_DIR, InterpreterPoolManager
+from services.venv_builds import BUILDS_DIR, FileLock, LOCKS_DIR
+from services.venv_store import VenvGarbageCollector, venv_size
+from fixtures import *
+
+
+def make_venv(base_venv_path: Path, name: str, last_used: float) -> str:
+    """Venv as swapped in by VenvBuild, with 16 KB of libraries."""
+    lib_hash = hashlib.sha256(name.encode()).hexdigest()
+    build_path = base_venv_path / BUILDS_DIR / f"{lib_hash}-00000000"
+    build_path.mkdir(parents=True)
+    (build_path / "lib.py").write_bytes(b"x" * 16 * 1024)
+    (build_path / "libhash").write_text(lib_hash)
+    os.utime(build_path / "libhash", (last_used, last_used))
+    (base_venv_path / lib_hash).symlink_to(build_path, target_is_directory=True)
+    return lib_hash
+
+
+def venv_hashes(base_venv_path: Path) -> set[str]:
+    return {path.name for path in base_venv_path.iterdir() if path.is_symlink()}
+
+
+def test_thousands_of_library_sets_are_kept_within_budget(tmp_path):
+    count, budget_count = 3000, 1000
+    long_ago = time.time() - 86400
+    lib_hashes = [
+        make_venv(tmp_path, f"libraries-{i}", last_used=long_ago + i)
+        for i in range(count)
+    ]
+    size = venv_size(tmp_path / lib_hashes[0])
+    in_use = set(lib_hashes[:5])
+    gc = VenvGarbageCollector(
+        base_venv_path=tmp_path, max_bytes=size * budget_count, min_idle_seconds=60
+    )
+
+    start = time.perf_counter()
+    removed = gc.collect(in_use=in_use)
+    print(f"collected {count} venvs in {time.perf_counter() - start:.2f}s")
+
+    # The least recently used are removed first, the ones in use are kept
+    kept = set(lib_hashes[count - budget_count + len(in_use) :]) | in_use
+    assert venv_hashes(tmp_path) == kept
+    assert len(list((tmp_path / BUILDS_DIR).iterdir())) == budget_count
+    assert removed["evicted_venvs"] == count - budget_count
+    assert removed["protected"] == len(in_use)
+    assert gc.metrics.to_dict()["venvs"] == budget_count
+    assert gc.metrics.to_dict()["bytes"] <= size * budget_count
+
+    start = time.perf_counter()
+    assert gc.collect(in_use=in_use)["evicted_venvs"] == 0
+    print(f"collected {budget_count} venvs in {time.perf_counter() - start:.2f}s")
+
+
+def test_code_cache_is_trimmed_and_counted(tmp_path):
+    lib_hash = make_venv(tmp_path, "libraries", last_used=time.time())
+    size = venv_size(tmp_path / lib_hash)
+    code_cache_path = tmp_path / lib_hash / CODE_CACHE_DIR
+    code_cache_path.mkdir()
+    now = time.time()
+    for i in range(4):
+        path = code_cache_path / f"{i}.marshal"
+        path.write_bytes(b"x" * 16 * 1024)
+        os.utime(path, (now - 100 + i, now - 100 + i))
+    gc = VenvGarbageCollector(base_venv_path=tmp_path, code_cache_max_bytes=32 * 1024)
+
+    removed = gc.collect()
+
+    # The least recently used are removed, the rest counts in the size of the venv
+    assert removed["removed_compiled_code"] == 2
+    assert {path.name for path in code_cache_path.iterdir()} == {
+        "2.marshal",
+        "3.marshal",
+    }
+    assert gc.metrics.to_dict()["bytes"] == size + 32 * 1024
+
+
+def test_recently_used_and_building_venvs_are_kept(tmp_path):
+    long_ago = time.time() - 86400
+    unused = make_venv(tmp_path, "unused", last_used=long_ago)
+    recent = make_venv(tmp_path, "recent", last_used=time.time())
+    building = make_venv(tmp_path, "building", last_used=long_ago)
+    lock = FileLock(tmp_path / LOCKS_DIR / f"{building}.lock")
+    assert lock.try_acquire()
+    try:
+        VenvGarbageCollector(
+            base_venv_path=tmp_path, max_bytes=1, min_idle_seconds=60
+        ).collect()
+    finally:
+        lock.release()
+
+    assert venv_hashes(tmp_path) == {recent, building}
+    assert not (tmp_path / BUILDS_DIR / f"{unused}-00000000").exists()
+
+
+def test_stale_builds_and_outputs_are_removed(tmp_path):
+    base_venv_path, output_path = tmp_path / "venvs", tmp_path / "executions"
+    long_ago = time.time() - 86400
+    make_venv(base_venv_path, "ready", last_used=time.time())
+    crashed = base_venv_path / BUILDS_DIR / f"{'a' * 64}-00000000"
+    in_progress = base_venv_path / BUILDS_DIR / f"{'b' * 64}-00000000"
+    crashed.mkdir()
+    in_progress.mkdir()
+    link = base_venv_path / f".{'a' * 64}.00000000"
+    link.symlink_to(crashed)
+    os.utime(link, (long_ago, long_ago), follow_symlinks=False)
+    old_output, new_output = output_path / "old", output_path / "new"
+    old_output.mkdir(parents=True)
+    new_output.mkdir()
+    os.utime(old_output, (long_ago, long_ago))
+
+    lock = FileLock(base_venv_path / LOCKS_DIR / f"{'b' * 64}.lock")
+    assert lock.try_acquire()
+    try:
+        removed = VenvGarbageCollector(
+            base_venv_path=base_venv_path,
+            output_path=output_path,
+            min_idle_seconds=60,
+            output_retention_seconds=3600,
+        ).collect()
+    finally:
+        lock.release()
+
+    assert removed["removed_builds"] == 2
+    assert removed["removed_outputs"] == 1
+    assert not crashed.exists() and not link.is_symlink()
+    assert in_progress.exists()
+    assert len(venv_hashes(base_venv_path)) == 1
+    assert list(output_path.iterdir()) == [new_output]
+
+
+@pytest.mark.asyncio
+async def test_venvs_of_warm_interpreters_are_kept(tmp_path):
+    pools = InterpreterPoolManager(size=1)
+    chain = DynamicVenvExecutorChain(
+        output_path=tmp_path / "executions",
+        base_venv_path=tmp_path / "venvs",
+        interpreter_pools=pools,
+        venv_gc=VenvGarbageCollector(
+            base_venv_path=tmp_path / "venvs", max_bytes=1, min_idle_seconds=0
+        ),
+    )
+
+    async def run_code(libraries: list[str]):
+        result = await chain.run(
+            libraries=libraries,
+            venv_name="gc",
+            execution_id=str(uuid.uuid4()),
+            code="def main():\n    return 1",
+        )
+        assert result.returncode == 0, result.stderr
+        return result
+
+    try:
+        await run_code(["python-dotenv"])
+        # Only the warm pool of the last venv is kept
+        await pools.close()
+        await run_code([])
+
+        removed = await chain.collect_garbage()
+        assert removed["evicted_venvs"] == 1
+        assert removed["protected"] == 1
+        assert venv_hashes(tmp_path / "venvs") == chain.venvs_in_use()
+
+        # Rebuilt when needed again
+        result = await run_code(["python-dotenv"])
+        assert json.loads(result.result_data) == 1
+    finally:
+        await pools.close()
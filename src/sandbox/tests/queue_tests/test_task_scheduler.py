@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from services.task_scheduler import FairTaskScheduler
+
+
+class Recorder:
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.order: list[str] = []
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self, task: str):
+        self.order.append(task)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(self.delay)
+        self.running -= 1
+        if task == "fail":
+            raise ValueError(task)
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded():
+    recorder = Recorder()
+    scheduler = FairTaskScheduler(recorder, max_workers=3, max_buffered=100)
+    scheduler.start()
+    for i in range(20):
+        await scheduler.submit(f"venv_{i}", str(i))
+    await scheduler.submit("venv_fail", "fail")
+    await scheduler.join()
+    await scheduler.close()
+
+    assert recorder.max_running == 3
+    metrics = scheduler.to_dict()
+    assert metrics["started"] == 21
+    assert metrics["completed"] == 20
+    assert metrics["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_venvs_are_served_round_robin():
+    recorder = Recorder()
+    scheduler = FairTaskScheduler(recorder, max_workers=1, max_buffered=100)
+    for i in range(5):
+        await scheduler.submit("busy", f"busy_{i}")
+    await scheduler.submit("quiet", "quiet_0")
+    await scheduler.submit("other", "other_0")
+    scheduler.start()
+    await scheduler.join()
+    await scheduler.close()
+
+    assert recorder.order[:4] == ["busy_0", "quiet_0", "other_0", "busy_1"]
+
+
+@pytest.mark.asyncio
+async def test_tasks_per_venv_are_limited():
+    recorder = Recorder()
+    scheduler = FairTaskScheduler(
+        recorder, max_workers=4, max_buffered=100, max_per_key=1
+    )
+    scheduler.start()
+    for i in range(4):
+        await scheduler.submit("venv", str(i))
+    await scheduler.join()
+    await scheduler.close()
+
+    assert recorder.max_running == 1
+
+
+@pytest.mark.asyncio
+async def test_producer_waits_while_buffer_is_full():
+    recorder = Recorder(delay=0.05)
+    scheduler = FairTaskScheduler(recorder, max_workers=1, max_buffered=2)
+    assert await scheduler.wait_for_capacity() == 2
+    await scheduler.submit("venv", "0")
+    await scheduler.submit("venv", "1")
+
+    waiting = asyncio.create_task(scheduler.wait_for_capacity())
+    await asyncio.sleep(0.01)
+    assert not waiting.done()
+
+    scheduler.start()
+    assert await waiting == 1
+    await scheduler.join()
+    await scheduler.close()
+
+    metrics = scheduler.to_dict()
+    assert metrics["backpressure_pauses"] == 1
+    assert metrics["backpressure_seconds"] > 0
@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+import fakeredis
+import pytest
+from services.task_stream import TaskStream
+
+
+def make_stream(redis_client, consumer: str, **kwargs) -> TaskStream:
+    return TaskStream(
+        redis_client=redis_client,
+        stream="code_exec_tasks",
+        consumer=consumer,
+        **kwargs,
+    )
+
+
+async def add_task(redis_client, execution_id: str) -> str:
+    data = {"execution_id": execution_id, "venv_name": "venv"}
+    return await redis_client.xadd("code_exec_tasks", {"data": json.dumps(data)})
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+@pytest.mark.asyncio
+async def test_tasks_added_while_sandbox_is_down_are_delivered(redis_client):
+    stream = make_stream(redis_client, "sandbox-1")
+    await stream.ensure_group()
+    await stream.ensure_group()
+    await add_task(redis_client, "first")
+    await add_task(redis_client, "second")
+
+    messages = await stream.read(count=10)
+    assert [data["execution_id"] for _, data in messages] == ["first", "second"]
+    assert await stream.backlog() == {"lag": 0, "pending": 2}
+
+    for message_id, _ in messages:
+        await stream.ack(message_id)
+    assert await stream.backlog() == {"lag": 0, "pending": 0}
+    assert await redis_client.xlen("code_exec_tasks") == 0
+
+
+@pytest.mark.asyncio
+async def test_unacknowledged_tasks_are_delivered_again(redis_client):
+    crashed = make_stream(redis_client, "sandbox-1")
+    await crashed.ensure_group()
+    await add_task(redis_client, "first")
+    await add_task(redis_client, "second")
+    await crashed.read(count=10)
+
+    # The same consumer after a restart
+    restarted = make_stream(redis_client, "sandbox-1")
+    pending = await restarted.read_own_pending(count=1)
+    assert [data["execution_id"] for _, data in pending] == ["first"]
+    pending = await restarted.read_own_pending(count=10, after_id=pending[-1][0])
+    assert [data["execution_id"] for _, data in pending] == ["second"]
+
+    # Another consumer once the tasks are idle
+    other = make_stream(redis_client, "sandbox-2", claim_idle_ms=50)
+    assert await other.claim_stale(count=10) == ([], [])
+    await asyncio.sleep(0.1)
+    await restarted.touch([pending[0][0]])
+    claimed, exhausted = await other.claim_stale(count=10)
+    assert [data["execution_id"] for _, data in claimed] == ["first"]
+    assert exhausted == []
+
+
+@pytest.mark.asyncio
+async def test_tasks_are_given_up_after_max_deliveries(redis_client):
+    stream = make_stream(redis_client, "sandbox-1", claim_idle_ms=10, max_deliveries=2)
+    await stream.ensure_group()
+    message_id = await add_task(redis_client, "failing")
+    await stream.read(count=10)
+
+    # Second delivery
+    await asyncio.sleep(0.05)
+    claimed, exhausted = await stream.claim_stale(count=10)
+    assert len(claimed) == 1 and exhausted == []
+
+    await asyncio.sleep(0.05)
+    claimed, exhausted = await stream.claim_stale(count=10)
+    assert claimed == []
+    assert [data["execution_id"] for _, data in exhausted] == ["failing"]
+
+    await stream.ack(message_id)
+    assert await stream.backlog() == {"lag": 0, "pending": 0}
+
+
+@pytest.mark.asyncio
+async def test_tasks_in_flight_are_not_claimed(redis_client):
+    stream = make_stream(redis_client, "sandbox-1", claim_idle_ms=10)
+    await stream.ensure_group()
+    message_id = await add_task(redis_client, "running")
+    await stream.read(count=10)
+
+    await asyncio.sleep(0.05)
+    assert await stream.claim_stale(count=10, exclude={message_id}) == ([], [])
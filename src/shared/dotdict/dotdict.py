@@ -88,6 +88,15 @@ class DotDict(dict):
     def model_dump(self):
         return dict(self)
 
+    def __reduce__(self):
+        # Properties and setters hold compiled closures, pickle their source code instead
+        data = {k: v for k, v in self.items() if k not in self._properties}
+        if self._properties:
+            data["__properties__"] = {k: v.code for k, v in self._properties.items()}
+        if self._setters:
+            data["__setters__"] = {k: v.code for k, v in self._setters.items()}
+        return (DotDict, (data,))
+
 
 class DotList(list):
     def __init__(self, iterable=None):
@@ -229,3 +229,15 @@ def test_dotlist_model_dump_mixed_types():
     l = DotList([1, {"x": 2}, [3, {"y": 4}]])
     dumped = l.model_dump()
     assert dumped == [1, {"x": 2}, [3, {"y": 4}]]
+
+
+def test_dotdict_pickle_roundtrip():
+    import pickle
+
+    dotdict = DotDict({"a": 1, "b": {"c": [1, {"d": 2}]}})
+    restored = pickle.loads(pickle.dumps(dotdict))
+
+    assert isinstance(restored, DotDict)
+    assert isinstance(restored.b.c, DotList)
+    assert restored.b.c[1].d == 2
+    assert restored == dotdict